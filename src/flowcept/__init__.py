@@ -79,6 +79,10 @@ def __getattr__(name):
     raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
 __all__ = [
     "FlowceptDaskWorkerAdapter",
     "TaskQueryAPI",
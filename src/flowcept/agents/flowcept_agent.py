@@ -7,6 +7,7 @@ from flowcept.agents.agents_utils import ToolResult
 from flowcept.agents.tools.general_tools import prompt_handler
 from flowcept.agents.agent_client import run_tool
 from flowcept.agents.flowcept_ctx_manager import mcp_flowcept, ctx_manager
+from flowcept.commons.buffer_log import iter_buffer_file
 from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.configs import AGENT_HOST, AGENT_PORT, DUMP_BUFFER_PATH, MQ_ENABLED
 from flowcept.flowceptor.consumers.agent.base_agent_context_manager import BaseAgentContextManager
@@ -60,7 +61,7 @@ class FlowceptAgent:
 
     def _load_buffer_once(self) -> int:
         """
-        Load messages from a JSONL buffer file into the agent context.
+        Load messages from a buffer file, JSONL or buffer log, into the agent context.
 
         Returns
         -------
@@ -77,14 +78,9 @@ class FlowceptAgent:
             agent_id = str(uuid4())
             BaseAgentContextManager.agent_id = agent_id
             ctx_manager.agent_id = agent_id
-        with open(path, "r") as handle:
-            for line in handle:
-                line = line.strip()
-                if not line:
-                    continue
-                msg_obj = json.loads(line)
-                ctx_manager.message_handler(msg_obj)
-                count += 1
+        for msg_obj in iter_buffer_file(path):
+            ctx_manager.message_handler(msg_obj)
+            count += 1
         self.logger.info(f"Loaded {count} messages from buffer.")
         return count
 
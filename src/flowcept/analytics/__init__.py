@@ -1,15 +1,14 @@
 """Analytics subpackage."""
 
-from flowcept.analytics.analytics_utils import (
-    clean_dataframe,
-    analyze_correlations_used_vs_generated,
-    analyze_correlations,
-    analyze_correlations_used_vs_telemetry_diff,
-    analyze_correlations_generated_vs_telemetry_diff,
-    analyze_correlations_between,
-    describe_col,
-    describe_cols,
-)
+
+def __getattr__(name):
+    # Deferred so that importing the subpackage does not import pandas and numpy.
+    if name in __all__:
+        from flowcept.analytics import analytics_utils
+
+        return getattr(analytics_utils, name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
 
 __all__ = [
     "clean_dataframe",
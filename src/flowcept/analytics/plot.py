@@ -1,10 +1,7 @@
 """Plot module."""
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-import plotly.graph_objs as go
 
 from flowcept.analytics.analytics_utils import format_number, identify_pareto
 
@@ -18,6 +15,9 @@ def heatmap(df: pd.DataFrame, method="kendall", figsize=(13, 10), heatmap_args={
     :param method: Possible values: 'kendall', 'spearman', 'pearson'
     :return:
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     correlation_matrix = df.corr(method=method)
     plt.figure(figsize=figsize)
     sns.heatmap(
@@ -48,6 +48,8 @@ def scatter2d_with_colors(
     plot_pareto=True,
 ):
     """Scatter 2D plot with colors."""
+    import plotly.graph_objs as go
+
     x_label = x_col if x_label is None else x_label
     y_label = y_col if y_label is None else y_label
     color_label = color_col if color_label is None else color_label
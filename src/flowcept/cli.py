@@ -432,6 +432,68 @@ def get_task(task_id: str):
     print(json.dumps(Flowcept.db.query(_query), indent=2, default=str))
 
 
+def dump_to_file(
+    dump_filter: str = None, collection: str = "tasks", output_file: str = None, export_format: str = "parquet"
+):
+    """
+    Export a DB collection to a Parquet or JSON file, streaming it from the DB.
+
+    Parameters
+    ----------
+    dump_filter : str, optional
+        A JSON string with the filter of the documents to export. Default exports all documents.
+    collection : str, optional
+        tasks (default) or workflows.
+    output_file : str, optional
+        Path to the output file. Default is docs_dump_<collection>_<timestamp>.<format>.
+    export_format : str, optional
+        parquet (default) or json. Parquet files have one typed column per key of used and generated.
+    """
+    from flowcept import Flowcept
+
+    _filter = json.loads(dump_filter) if dump_filter else {}
+    ok = Flowcept.db.dump_to_file(
+        collection=collection,
+        filter=_filter,
+        output_file=output_file,
+        export_format=export_format,
+        should_zip=export_format == "json" and not dump_filter,
+    )
+    print("Export finished." if ok else "Export failed. Check the logs.")
+
+
+def migrate_lmdb_store(path: str = None, train_dict: bool = False, compact_path: str = None):
+    """
+    Rewrite an LMDB store in the record format set in the settings (databases.lmdb).
+
+    Parameters
+    ----------
+    path : str, optional
+        Path to the LMDB store. Defaults to databases.lmdb.path.
+    train_dict : bool, optional
+        Train a zstd dictionary on the stored tasks and save it to databases.lmdb.zstd_dict_path first.
+    compact_path : str, optional
+        Also write a compacted copy of the migrated store to this path.
+    """
+    from flowcept.commons.daos.docdb_dao.lmdb_records import (
+        LMDBRecordCodec,
+        migrate_lmdb_store as _migrate,
+        train_zstd_dictionary,
+    )
+    from flowcept.configs import LMDB_SETTINGS
+
+    path = path or LMDB_SETTINGS.get("path", "flowcept_lmdb")
+    if train_dict:
+        dict_path = LMDB_SETTINGS.get("zstd_dict_path", None)
+        if not dict_path:
+            print("Set databases.lmdb.zstd_dict_path in the settings to train a dictionary.")
+            return
+        train_zstd_dictionary(path, dict_path)
+        print(f"Saved zstd dictionary to {dict_path}.")
+    result = _migrate(path, LMDBRecordCodec.from_settings(LMDB_SETTINGS), compact_path=compact_path)
+    print(json.dumps(result, indent=2))
+
+
 def start_agent():  # TODO: start with gui
     """Start Flowcept agent."""
     from flowcept.agents.flowcept_agent import main
@@ -793,7 +855,7 @@ def generate_report(
 COMMAND_GROUPS = [
     ("Basic Commands", [version, check_services, show_settings, init_settings, start_services, stop_services]),
     ("Consumption Commands", [start_consumption_services, stop_consumption_services, stream_messages]),
-    ("Database Commands", [workflow_count, query, get_task]),
+    ("Database Commands", [workflow_count, query, get_task, dump_to_file, migrate_lmdb_store]),
     ("Report Commands", [generate_report]),
     ("Agent Commands", [start_agent, agent_client, start_agent_gui]),
     ("External Services", [start_mongo, start_redis, start_webservice]),
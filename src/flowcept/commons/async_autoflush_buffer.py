@@ -0,0 +1,129 @@
+"""Async autoflush module.
+
+Kept apart from :mod:`flowcept.commons.autoflush_buffer` so that importing the synchronous
+buffers does not import :mod:`asyncio`.
+"""
+
+import asyncio
+from typing import Callable, Dict, List
+
+
+class AsyncAutoflushBuffer:
+    """Autoflush buffer for asyncio code, whose flushes are tasks awaited on the event loop.
+
+    ``flush_function`` is a coroutine function. Appends never block: when ``max_size`` items
+    are pending, or every ``flush_interval`` seconds, the active list is detached and handed to
+    a flush task on the loop, so the coroutines that append never wait for the MQ round trip.
+    ``capacity`` bounds the number of items pending or being flushed: past it,
+    :meth:`wait_for_capacity` waits until a flush completes, which applies backpressure to the
+    coroutine that produces the messages instead of blocking the loop.
+
+    It must be used from the thread that runs its loop. :meth:`drain` returns what has not been
+    flushed yet (including the batches of flushes cancelled with the loop), so a synchronous
+    caller can publish it another way.
+    """
+
+    def __init__(self, flush_function: Callable, max_size=None, flush_interval=None, capacity=None):
+        self._max_size = max_size or float("inf")
+        self._capacity = capacity or (4 * max_size if max_size else float("inf"))
+        self._flush_interval = flush_interval
+        self._flush_function = flush_function
+        self._buffer: List = []
+        self._in_flight: Dict[asyncio.Task, List] = {}
+        self._timer_task: asyncio.Task = None
+        self.loop: asyncio.AbstractEventLoop = None
+
+    @property
+    def current_buffer(self):
+        """Return the currently active buffer (read-only)."""
+        return self._buffer
+
+    def start(self) -> "AsyncAutoflushBuffer":
+        """Bind the buffer to the running loop and start the time-based flushes."""
+        self.loop = asyncio.get_running_loop()
+        if self._flush_interval:
+            self._timer_task = self.loop.create_task(self._time_based_flush())
+        return self
+
+    def append(self, item):
+        """Append an item, starting a flush if ``max_size`` items are pending."""
+        self._buffer.append(item)
+        if len(self._buffer) >= self._max_size:
+            self._schedule_flush()
+
+    def extend(self, items):
+        """Extend the buffer with several items, starting a flush if ``max_size`` items are pending."""
+        self._buffer.extend(items)
+        if len(self._buffer) >= self._max_size:
+            self._schedule_flush()
+
+    @property
+    def pending(self) -> int:
+        """Number of items not flushed yet, including the ones being flushed."""
+        return len(self._buffer) + sum(len(batch) for batch in self._in_flight.values())
+
+    async def wait_for_capacity(self):
+        """Wait for flushes to complete while more than ``capacity`` items are pending."""
+        while self.pending > self._capacity:
+            in_flight = [task for task in self._in_flight if not task.done()]
+            if not in_flight:
+                return
+            await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+    def _schedule_flush(self):
+        batch = self._buffer
+        if not batch:
+            return
+        self._buffer = []
+        task = self.loop.create_task(self._flush_function(batch))
+        self._in_flight[task] = batch
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        # A cancelled flush keeps its batch in _in_flight, for drain.
+        if task.cancelled():
+            return
+        self._in_flight.pop(task, None)
+        if task.exception() is not None:
+            from flowcept.commons.flowcept_logger import FlowceptLogger
+
+            FlowceptLogger().exception(task.exception())
+
+    async def _time_based_flush(self):
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            self._schedule_flush()
+
+    async def flush(self):
+        """Flush the pending items and wait for every flush in flight."""
+        self._schedule_flush()
+        in_flight = [task for task in self._in_flight if not task.done()]
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    async def stop(self):
+        """Stop the time-based flushes and flush whatever is still pending."""
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            self._timer_task = None
+        await self.flush()
+
+    def drain(self) -> List:
+        """Stop the buffer without awaiting, and return the items not flushed yet.
+
+        Flushes still in flight are cancelled and their batches returned, so an item may be
+        published twice, but none is lost. The buffer no longer refers to its loop afterwards.
+        """
+        if self._timer_task is not None and not self.loop.is_closed():
+            self._timer_task.cancel()
+        self._timer_task = None
+        items = []
+        for task, batch in self._in_flight.items():
+            if not task.done() and not self.loop.is_closed():
+                task.cancel()
+            items.extend(batch)
+        self._in_flight = {}
+        items.extend(self._buffer)
+        self._buffer = []
+        self.loop = None
+        return items
@@ -1,7 +1,14 @@
 """Autoflush module."""
 
-from typing import Callable
-from threading import Thread, Event
+import os
+import struct
+import tempfile
+from collections import deque
+from time import perf_counter
+from typing import Callable, Dict, List
+from threading import Thread, Event, Condition, Lock
+
+_LENGTH = struct.Struct("<I")
 
 
 class AutoflushBuffer:
@@ -88,3 +95,264 @@ class AutoflushBuffer:
         self._flush_thread.join()
         self._timer_thread.join()
         self._do_flush()
+
+
+class BoundedAutoflushBuffer:
+    """Bounded autoflush buffer with backpressure and overflow policies.
+
+    Producers append into a single active list guarded by a condition variable. When
+    ``max_size`` items are pending, or every ``flush_interval`` seconds, the flush thread
+    detaches the active list and hands that very list object to ``flush_function``, so no
+    copy of the batch is ever made. ``capacity`` bounds the number of pending items; what
+    happens when it is reached depends on ``overflow_policy``:
+
+    - ``"block"``: the producer waits until the flush thread detaches the active list.
+    - ``"drop_oldest"``: the oldest pending item is discarded to make room.
+    - ``"spill"``: the pending items are appended to ``spill_path`` and replayed
+      through ``flush_function`` by the flush thread once the in-flight flush returns, before
+      the items appended after them. The producer writes the file after releasing the lock.
+      Records are msgpack messages prefixed with their 4-byte length, so items come back with
+      the same types as the ones flushed directly. By default, the file is in the temp dir.
+    """
+
+    OVERFLOW_POLICIES = {"block", "drop_oldest", "spill"}
+
+    def __init__(
+        self,
+        flush_function: Callable,
+        max_size=None,
+        flush_interval=None,
+        capacity=None,
+        overflow_policy="block",
+        spill_path=None,
+        flush_function_args=(),
+        flush_function_kwargs=None,
+    ):
+        if overflow_policy not in BoundedAutoflushBuffer.OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow_policy '{overflow_policy}'. "
+                f"Use one of {sorted(BoundedAutoflushBuffer.OVERFLOW_POLICIES)}."
+            )
+        self._max_size = max_size or float("inf")
+        self._capacity = capacity or (4 * max_size if max_size else float("inf"))
+        self._flush_interval = flush_interval
+        self._overflow_policy = overflow_policy
+        self._spill_path = spill_path or os.path.join(
+            tempfile.gettempdir(), f"flowcept_buffer_spill_{os.getpid()}_{id(self)}.spill"
+        )
+        self._spilled_pending = 0  # Items written to the spill file and not replayed yet.
+        self._spill_queue = deque()  # Batches detached by overflows, not written to the file yet.
+        self._spill_lock = Lock()  # Serializes the spill file writes and the replays.
+
+        self._flush_function = flush_function
+        self._flush_function_args = flush_function_args
+        self._flush_function_kwargs = flush_function_kwargs or {}
+
+        self._buffer: List = []
+        self._cond = Condition()
+        self._flush_event = Event()
+        self._stop_event = Event()
+
+        self._appends = 0
+        self._drops = 0
+        self._spilled = 0
+        self._flushes = 0
+        self._flushed_items = 0
+        self._flush_latencies = deque(maxlen=1024)
+
+        self._flush_thread = Thread(target=self._flush_loop, daemon=True)
+        self._flush_thread.start()
+
+    @property
+    def current_buffer(self):
+        """Return the currently active buffer (read-only)."""
+        return self._buffer
+
+    def append(self, item):
+        """Append an item, applying the overflow policy if the buffer is at capacity."""
+        with self._cond:
+            if len(self._buffer) >= self._capacity:
+                self._handle_overflow(1)
+            self._buffer.append(item)
+            self._appends += 1
+            if len(self._buffer) >= self._max_size:
+                self._flush_event.set()
+        if self._spill_queue:
+            self._write_spills()
+
+    def extend(self, items):
+        """Extend the buffer with several items, applying the overflow policy as needed."""
+        with self._cond:
+            if len(self._buffer) + len(items) <= self._capacity:
+                self._buffer.extend(items)
+                self._appends += len(items)
+            else:
+                for item in items:
+                    if len(self._buffer) >= self._capacity:
+                        self._handle_overflow(1)
+                    self._buffer.append(item)
+                    self._appends += 1
+            if len(self._buffer) >= self._max_size:
+                self._flush_event.set()
+        if self._spill_queue:
+            self._write_spills()
+
+    def _handle_overflow(self, n_incoming):
+        # Called with self._cond held.
+        if self._overflow_policy == "block":
+            self._flush_event.set()
+            while len(self._buffer) + n_incoming > self._capacity and not self._stop_event.is_set():
+                self._cond.wait()
+        elif self._overflow_policy == "drop_oldest":
+            n_drop = len(self._buffer) + n_incoming - self._capacity
+            del self._buffer[:n_drop]
+            self._drops += n_drop
+        else:
+            # Written to the spill file by _write_spills, once self._cond is released.
+            self._spill_queue.append(self._buffer)
+            self._spilled += len(self._buffer)
+            self._buffer = []
+            self._flush_event.set()
+
+    def _write_spills(self):
+        """Append the detached batches to the spill file, in order, without holding self._cond."""
+        with self._spill_lock:
+            while True:
+                with self._cond:
+                    if not self._spill_queue:
+                        return
+                    # Dequeued only once written, so that the flush thread sees it as pending meanwhile.
+                    items = self._spill_queue[0]
+                self._spill(items)
+                with self._cond:
+                    self._spill_queue.popleft()
+                    self._spilled_pending += len(items)
+
+    def _spill(self, items):
+        from flowcept.commons.serializers import get_serializer
+
+        serializer = get_serializer("msgpack")
+        with open(self._spill_path, "ab", buffering=1_048_576) as f:
+            for obj in items:
+                payload = serializer.dumps(obj)
+                f.write(_LENGTH.pack(len(payload)))
+                f.write(payload)
+
+    def _replay_spill(self):
+        with self._spill_lock:
+            if not self._spilled_pending:
+                return
+            spill_tmp = f"{self._spill_path}.replay"
+            os.replace(self._spill_path, spill_tmp)
+            with self._cond:
+                self._spilled_pending = 0
+
+        from flowcept.commons.serializers import get_serializer
+
+        serializer = get_serializer("msgpack")
+        batch = []
+        with open(spill_tmp, "rb", buffering=1_048_576) as f:
+            while header := f.read(_LENGTH.size):
+                (length,) = _LENGTH.unpack(header)
+                batch.append(serializer.loads(f.read(length)))
+                if len(batch) >= self._max_size:
+                    self._call_flush_function(batch)
+                    batch = []
+        if batch:
+            self._call_flush_function(batch)
+        os.remove(spill_tmp)
+
+    def _call_flush_function(self, batch):
+        t0 = perf_counter()
+        try:
+            self._flush_function(batch, *self._flush_function_args, **self._flush_function_kwargs)
+        except Exception as e:
+            from flowcept.commons.flowcept_logger import FlowceptLogger
+
+            FlowceptLogger().exception(e)
+        finally:
+            self._flush_latencies.append(perf_counter() - t0)
+            self._flushes += 1
+            self._flushed_items += len(batch)
+
+    def _do_flush(self):
+        # Spilled items are older than the ones in the buffer, so they are flushed first.
+        while True:
+            if self._spill_queue or self._spilled_pending:
+                self._write_spills()
+                self._replay_spill()
+            with self._cond:
+                if self._spill_queue or self._spilled_pending:
+                    continue  # Spilled again while replaying.
+                batch = self._buffer
+                if batch:
+                    self._buffer = []
+                self._cond.notify_all()
+                break
+        if batch:
+            self._call_flush_function(batch)
+
+    def _flush_loop(self):
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self._flush_interval)
+            self._flush_event.clear()
+            self._do_flush()
+
+    @property
+    def metrics(self) -> Dict:
+        """Return counters for appends, drops, spills and flush latencies (in seconds)."""
+        latencies = list(self._flush_latencies)
+        return {
+            "appends": self._appends,
+            "drops": self._drops,
+            "spilled": self._spilled,
+            "flushes": self._flushes,
+            "flushed_items": self._flushed_items,
+            "pending": len(self._buffer),
+            "last_flush_latency": latencies[-1] if latencies else None,
+            "max_flush_latency": max(latencies) if latencies else None,
+            "avg_flush_latency": sum(latencies) / len(latencies) if latencies else None,
+        }
+
+    def stop(self):
+        """Stop the flush thread and flush whatever is still pending."""
+        self._stop_event.set()
+        self._flush_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._flush_thread.join()
+        self._do_flush()
+
+
+def build_autoflush_buffer(
+    flush_function: Callable,
+    engine: str = "default",
+    max_size=None,
+    flush_interval=None,
+    capacity=None,
+    overflow_policy="block",
+    spill_path=None,
+    flush_function_args=(),
+    flush_function_kwargs=None,
+):
+    """Build the autoflush buffer selected by ``engine`` (``default`` or ``bounded``)."""
+    if engine == "bounded":
+        return BoundedAutoflushBuffer(
+            flush_function=flush_function,
+            max_size=max_size,
+            flush_interval=flush_interval,
+            capacity=capacity,
+            overflow_policy=overflow_policy,
+            spill_path=spill_path,
+            flush_function_args=flush_function_args,
+            flush_function_kwargs=flush_function_kwargs,
+        )
+    elif engine == "default":
+        return AutoflushBuffer(
+            flush_function=flush_function,
+            max_size=max_size,
+            flush_interval=flush_interval,
+            flush_function_args=list(flush_function_args),
+            flush_function_kwargs=flush_function_kwargs or {},
+        )
+    raise NotImplementedError(f"Unknown buffer engine '{engine}'.")
@@ -0,0 +1,261 @@
+"""Buffer log module.
+
+Format of the buffer files with ``project.dump_buffer.format: segments``. Instead of one JSONL
+file, a buffer log is a directory of size-rotated segments (``00000000.seg``, ``00000001.seg``,
+...), each starting with :data:`SEGMENT_MAGIC` and followed by records, each a 4-byte
+little-endian length and a msgpack message.
+
+Next to each segment, a sidecar index (``00000000.idx``) holds one msgpack entry per record:
+``[offset, length, type, workflow_id, task_id, written_at_ns]``. Readers use it to seek to the
+records that match a filter without decoding the others, and the k-way merge of the logs that
+parallel writers produce for one workflow uses ``written_at_ns`` to order the records, copying
+them without decoding. Records written after the last index entry, e.g., by a process that
+crashed between the two writes, are still read, by decoding them, and the next writer of the
+log indexes them before appending.
+
+:func:`iter_buffer_file` reads buffer files of both formats, one message at a time.
+"""
+
+import heapq
+import mmap
+import os
+import shutil
+import struct
+from time import time_ns
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import msgpack
+
+from flowcept.commons.serializers import get_serializer
+
+BUFFER_FORMATS = {"jsonl", "segments"}
+SEGMENT_MAGIC = b"FCSEG001"
+
+_SERIALIZER = get_serializer("msgpack")
+_LENGTH = struct.Struct("<I")
+_OFFSET, _SIZE, _TYPE, _WORKFLOW_ID, _TASK_ID, _WRITTEN_AT = range(6)
+
+
+def is_buffer_log(path: str) -> bool:
+    """Return whether ``path`` is a buffer log, rather than a JSONL buffer file."""
+    return os.path.isdir(path)
+
+
+def _segment_ids(path: str) -> List[int]:
+    return sorted(int(name[:-4]) for name in os.listdir(path) if name.endswith(".seg"))
+
+
+def _segment_path(path: str, segment_id: int, ext: str = "seg") -> str:
+    return os.path.join(path, f"{segment_id:08d}.{ext}")
+
+
+class _LogWriter:
+    """Append records to a buffer log, rotating segments at ``segment_bytes``."""
+
+    def __init__(self, path: str, segment_bytes: int):
+        self._path = path
+        self._segment_bytes = segment_bytes
+        ids = _segment_ids(path)
+        self._segment_id = ids[-1] if ids else 0
+        self._seg = None
+        self._entries: List[List] = []
+        self._open()
+
+    def _open(self):
+        seg_path = _segment_path(self._path, self._segment_id)
+        if os.path.exists(seg_path) and os.path.getsize(seg_path) > len(SEGMENT_MAGIC):
+            self._recover_tail(seg_path)
+        self._seg = open(seg_path, "ab", buffering=1_048_576)
+        self._size = self._seg.tell()
+        if self._size == 0:
+            self._seg.write(SEGMENT_MAGIC)
+            self._size = len(SEGMENT_MAGIC)
+
+    def _recover_tail(self, seg_path: str):
+        """Index the records after the last index entry, and drop a partial last record or entry.
+
+        A writer that died between writing its records and their index entries, or in the middle
+        of either, leaves such a tail. Appending after it would hide the records from the index, or
+        make the next records unreadable.
+        """
+        idx_path = _segment_path(self._path, self._segment_id, "idx")
+        seg_size = os.path.getsize(seg_path)
+        end, written_at, idx_size = len(SEGMENT_MAGIC), 0, 0
+        if os.path.exists(idx_path):
+            with open(idx_path, "rb") as idx:
+                unpacker = msgpack.Unpacker(idx, use_list=True)
+                for entry in unpacker:
+                    if entry[_OFFSET] + entry[_SIZE] > seg_size:
+                        break
+                    end, written_at, idx_size = entry[_OFFSET] + entry[_SIZE], entry[_WRITTEN_AT], unpacker.tell()
+            if idx_size < os.path.getsize(idx_path):
+                os.truncate(idx_path, idx_size)
+        with open(seg_path, "rb") as f:
+            f.seek(end)
+            tail = f.read()
+        pos = 0
+        while pos + _LENGTH.size <= len(tail):
+            (length,) = _LENGTH.unpack_from(tail, pos)
+            payload = tail[pos + _LENGTH.size : pos + _LENGTH.size + length]
+            if len(payload) < length:
+                break
+            try:
+                entry = _index_entry(_SERIALIZER.loads(payload), written_at)
+            except Exception:
+                break
+            entry[_OFFSET], entry[_SIZE] = end + pos + _LENGTH.size, length
+            self._entries.append(entry)
+            pos += _LENGTH.size + length
+        if end + pos < seg_size:
+            os.truncate(seg_path, end + pos)
+
+    def _close(self):
+        # Records first, so that an index entry never points past the end of its segment.
+        self._seg.close()
+        with open(_segment_path(self._path, self._segment_id, "idx"), "ab") as idx:
+            pack = msgpack.Packer().pack
+            idx.write(b"".join(pack(entry) for entry in self._entries))
+        self._entries = []
+
+    def write(self, payload: bytes, entry: List):
+        """Append an encoded message and its index entry. ``entry`` gets the record's offset."""
+        if self._size > len(SEGMENT_MAGIC) and self._size + _LENGTH.size + len(payload) > self._segment_bytes:
+            self._close()
+            self._segment_id += 1
+            self._open()
+        entry[_OFFSET] = self._size + _LENGTH.size
+        entry[_SIZE] = len(payload)
+        self._seg.write(_LENGTH.pack(len(payload)))
+        self._seg.write(payload)
+        self._entries.append(entry)
+        self._size += _LENGTH.size + len(payload)
+
+    def close(self):
+        """Flush and close the current segment, then write its index entries."""
+        self._close()
+
+
+def _index_entry(msg: Dict, written_at: int) -> List:
+    return [0, 0, msg.get("type"), msg.get("workflow_id"), msg.get("task_id"), written_at]
+
+
+def append_buffer_log(buffer: List[Dict], path: str, segment_bytes: int = 64 * 1024 * 1024):
+    """Append messages to the buffer log at ``path``, creating it if needed.
+
+    Writers of the same log take turns with an exclusive lock on it.
+    """
+    import fcntl  # Not available on Windows, where buffer logs can still be read.
+
+    os.makedirs(path, exist_ok=True)
+    written_at = time_ns()
+    with open(os.path.join(path, ".lock"), "ab") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        writer = _LogWriter(path, segment_bytes)
+        try:
+            for msg in buffer:
+                writer.write(_SERIALIZER.dumps(msg), _index_entry(msg, written_at))
+        finally:
+            writer.close()
+
+
+def _iter_index(path: str, segment_id: int) -> Iterator[List]:
+    try:
+        f = open(_segment_path(path, segment_id, "idx"), "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        # A partial last entry, from an interrupted write, is ignored.
+        yield from msgpack.Unpacker(f, use_list=True)
+
+
+def _iter_segment_records(path: str, segment_id: int, match: Callable = None) -> Iterator[Tuple[List, bytes]]:
+    """Yield the index entry and the encoded message of the records of a segment, in order.
+
+    Indexed records whose entry does not ``match`` are skipped without being read.
+    """
+    seg_path = _segment_path(path, segment_id)
+    with open(seg_path, "rb") as f:
+        if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+            raise ValueError(f"{seg_path} is not a Flowcept buffer log segment.")
+        size = os.fstat(f.fileno()).st_size
+        if size == len(SEGMENT_MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end, written_at = len(SEGMENT_MAGIC), 0
+            for entry in _iter_index(path, segment_id):
+                end, written_at = entry[_OFFSET] + entry[_SIZE], entry[_WRITTEN_AT]
+                if end > size:
+                    return
+                if match is None or match(entry):
+                    yield entry, mm[entry[_OFFSET] : end]
+            # Records without index entries.
+            while end + _LENGTH.size <= size:
+                (length,) = _LENGTH.unpack_from(mm, end)
+                offset, end = end + _LENGTH.size, end + _LENGTH.size + length
+                if end > size:
+                    return
+                payload = mm[offset:end]
+                entry = _index_entry(_SERIALIZER.loads(payload), written_at)
+                entry[_OFFSET], entry[_SIZE] = offset, length
+                if match is None or match(entry):
+                    yield entry, payload
+
+
+def _iter_log_records(path: str, match: Callable = None) -> Iterator[Tuple[List, bytes]]:
+    for segment_id in _segment_ids(path):
+        yield from _iter_segment_records(path, segment_id, match)
+
+
+def iter_buffer_log(path: str, workflow_id: str = None, task_id: str = None, type: str = None) -> Iterator[Dict]:
+    """Yield the messages of a buffer log in the order they were written.
+
+    Filters on ``workflow_id``, ``task_id``, and ``type`` are matched against the index, so only
+    the matching records are decoded.
+    """
+    filters = [(k, v) for k, v in ((_WORKFLOW_ID, workflow_id), (_TASK_ID, task_id), (_TYPE, type)) if v is not None]
+    match = (lambda entry: all(entry[k] == v for k, v in filters)) if filters else None
+    for _, payload in _iter_log_records(path, match):
+        yield _SERIALIZER.loads(payload)
+
+
+def _iter_jsonl(path: str, workflow_id: str = None, task_id: str = None, type: str = None) -> Iterator[Dict]:
+    serializer = get_serializer("json")
+    filters = [(k, v) for k, v in (("workflow_id", workflow_id), ("task_id", task_id), ("type", type)) if v is not None]
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            msg = serializer.loads(line)
+            if all(msg.get(k) == v for k, v in filters):
+                yield msg
+
+
+def iter_buffer_file(path: str, workflow_id: str = None, task_id: str = None, type: str = None) -> Iterator[Dict]:
+    """Yield the messages of a buffer file, JSONL or buffer log, one at a time."""
+    if is_buffer_log(path):
+        return iter_buffer_log(path, workflow_id=workflow_id, task_id=task_id, type=type)
+    return _iter_jsonl(path, workflow_id=workflow_id, task_id=task_id, type=type)
+
+
+def merge_buffer_logs(sources: List[str], dest: str, segment_bytes: int = 64 * 1024 * 1024) -> int:
+    """Merge buffer logs into ``dest`` in the order their records were written. Return the count.
+
+    A k-way merge of the sources, which holds one record per source in memory. ``dest`` may be
+    one of the sources: the merge is written next to it and then replaces it.
+    """
+    tmp_dest = f"{dest.rstrip(os.sep)}.merging.{os.getpid()}"
+    shutil.rmtree(tmp_dest, ignore_errors=True)
+    os.makedirs(tmp_dest)
+    writer = _LogWriter(tmp_dest, segment_bytes)
+    count = 0
+    try:
+        merged = heapq.merge(*(_iter_log_records(s) for s in sources), key=lambda record: record[0][_WRITTEN_AT])
+        for entry, payload in merged:
+            writer.write(payload, list(entry))
+            count += 1
+    finally:
+        writer.close()
+    shutil.rmtree(dest, ignore_errors=True)
+    os.rename(tmp_dest, dest)
+    return count
@@ -3,16 +3,23 @@
 This module provides an abstract base class `DocumentDBDAO` for document-based database operations.
 """
 
+import io
+import json
+import zipfile
 from abc import ABC, abstractmethod
-from typing import List, Dict
-
-import pandas as pd
-
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List
 
 from flowcept.commons.flowcept_dataclasses.workflow_object import WorkflowObject
+from flowcept.commons.vocabulary import Status
 from flowcept.configs import MONGO_ENABLED, LMDB_ENABLED
 
 
+def _started_at_key(task: Dict):
+    started_at = task.get("started_at")
+    return started_at is None, started_at or 0
+
+
 class DocumentDBDAO(ABC):
     """Abstract class for document database operations.
 
@@ -136,7 +143,7 @@ class DocumentDBDAO(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def to_df(self, collection, filter=None) -> pd.DataFrame:
+    def to_df(self, collection, filter=None):
         """Convert a collection to a pandas DataFrame.
 
         Parameters
@@ -186,6 +193,73 @@ class DocumentDBDAO(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def iter_query(
+        self, filter=None, projection=None, sort=None, batch_size=1000, resume_after=None, collection="tasks"
+    ) -> Iterator[Dict]:
+        """Stream the documents of a collection matching a filter.
+
+        Documents are read from the DB in batches of ``batch_size``, so memory use does not
+        grow with the result set. Without ``sort``, documents come in order of their id
+        (``task_id`` or ``workflow_id``), and an interrupted iteration can be resumed by passing
+        the last id seen as ``resume_after``.
+
+        Parameters
+        ----------
+        filter : dict, optional
+            Query filter.
+        projection : list, optional
+            Fields to include.
+        sort : list, optional
+            Sorting order. Cannot be combined with ``resume_after``.
+        batch_size : int, optional
+            Number of documents read from the DB at a time.
+        resume_after : str, optional
+            Id of the last document already consumed.
+        collection : str, optional
+            ``tasks`` or ``workflows``.
+
+        Raises
+        ------
+        NotImplementedError
+            This method must be implemented by subclasses.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _dump_docs_to_json(docs: Iterable[Dict], output_file: str, should_zip: bool, dumps: Callable = json.dumps):
+        """Write documents as a JSON array, one document at a time, optionally inside a zip file."""
+
+        def _write(f):
+            f.write("[")
+            for i, doc in enumerate(docs):
+                if i:
+                    f.write(", ")
+                f.write(dumps(doc))
+            f.write("]")
+
+        if should_zip:
+            with zipfile.ZipFile(output_file, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                with io.TextIOWrapper(zip_file.open("dump_file.json", "w"), encoding="utf-8") as f:
+                    _write(f)
+        else:
+            with open(output_file, "w") as f:
+                _write(f)
+
+    @staticmethod
+    def _dump_docs_to_parquet(docs: Iterable[Dict], output_file: str) -> int:
+        """Stream documents into a Parquet file. See ``ParquetExporter``. Requires pyarrow."""
+        from flowcept.commons.daos.docdb_dao.parquet_exporter import ParquetExporter
+
+        return ParquetExporter(output_file).write(docs)
+
+    @staticmethod
+    def _default_dump_file_name(collection, export_format, should_zip) -> str:
+        from flowcept.commons.utils import get_utc_now_str
+
+        extension = "parquet" if export_format == "parquet" else "zip" if should_zip else "json"
+        return f"docs_dump_{collection}_{get_utc_now_str()}.{extension}"
+
     @abstractmethod
     def task_query(self, filter, projection, limit, sort, aggregation, remove_json_unserializables):
         """Query task documents.
@@ -265,9 +339,11 @@ class DocumentDBDAO(ABC):
         output_file : str
             Path to the output file.
         export_format : str
-            Format of the exported file (e.g., JSON, CSV).
+            ``json`` or ``parquet``. Parquet files have one typed column per key of the
+            ``used`` and ``generated`` fields.
         should_zip : bool
-            Whether to compress the output file into a ZIP archive.
+            Whether to compress a JSON output file into a ZIP archive. Parquet files are
+            always compressed.
 
         Raises
         ------
@@ -277,7 +353,7 @@ class DocumentDBDAO(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def get_tasks_recursive(self, workflow_id, max_depth=999):
+    def get_tasks_recursive(self, workflow_id, max_depth=999, mapping=None):
         """
         Retrieve all tasks recursively for a given workflow ID.
 
@@ -292,6 +368,8 @@ class DocumentDBDAO(ABC):
         max_depth : int, optional
             The maximum depth to traverse in the task hierarchy (default is 999).
             Helps avoid excessive recursion for workflows with deeply nested tasks.
+        mapping : dict, optional
+            Rules used to compute the ``custom_characterization`` of each task.
 
         Returns
         -------
@@ -310,6 +388,111 @@ class DocumentDBDAO(ABC):
         """
         raise NotImplementedError
 
+    def _build_task_tree(
+        self, roots: List[Dict], children_of: Callable[[str], List[Dict]], max_depth=999, mapping=None
+    ) -> List[Dict]:
+        """Assemble the task tree returned by ``get_tasks_recursive``. See ``_iter_task_tree``."""
+        return list(self._iter_task_tree(roots, children_of, max_depth, mapping))
+
+    def _iter_task_tree(
+        self, roots: Iterable[Dict], children_of: Callable[[str], List[Dict]], max_depth=999, mapping=None
+    ) -> Iterator[Dict]:
+        """Yield the tasks of a task tree, in the order of ``get_tasks_recursive``.
+
+        Each task gets its ``depth`` (0 for the roots) and ``ancestor_ids``, a list of
+        ``{activity_id: task_id}`` from the root to its parent, and, if a ``mapping`` is given,
+        its ``custom_characterization``. Each root is followed by its descendants: the children
+        of a task are listed together, sorted by ``started_at``, and then the subtree of each
+        child, depth first. Tasks at ``max_depth`` are not expanded.
+
+        Parameters
+        ----------
+        roots : iterable of dict
+            The root tasks.
+        children_of : Callable
+            Returns the child tasks of a task_id.
+        """
+        for root in roots:
+            if "finished" in root:
+                root["status"] = Status.FINISHED.value
+            root["ancestor_ids"] = []
+            root["depth"] = 0
+            yield root
+            tasks_ancestors = {root["task_id"]: []}
+            queue = deque([root])
+            while queue:
+                parent = queue.popleft()
+                if parent["depth"] >= max_depth:
+                    continue
+                children = sorted(children_of(parent["task_id"]), key=_started_at_key)
+                for task in children:
+                    if "finished" in task:
+                        task["status"] = Status.FINISHED.value
+                    tasks_ancestors[task["task_id"]] = tasks_ancestors[parent["task_id"]] + [parent]
+                    task["ancestor_ids"] = parent["ancestor_ids"] + [{parent.get("activity_id"): parent["task_id"]}]
+                    task["depth"] = parent["depth"] + 1
+                    if mapping is not None:
+                        self._resolve_mapping(task, mapping, tasks_ancestors)
+                yield from children
+                queue.extendleft(reversed(children))
+
+    def _resolve_mapping(self, task, mapping, ancestors):
+        def do_eval(x, task, ancestors):
+            for word in ["task", "ancestors"]:
+                if word in x:
+                    return eval(x)
+            return x
+
+        custom_characterization = {}
+        for mapping_type in {"activity_id", "subtype"}:
+            if mapping_type in task and task[mapping_type] in mapping[mapping_type]:
+                rules = mapping[mapping_type].get(task[mapping_type])
+                rules_str = str(rules)
+                if "grandparent" in rules_str:
+                    rules_str = rules_str.replace("grandparent", "ancestors[task['task_id']][-2]")
+                if "parent" in rules_str:
+                    rules_str = rules_str.replace("parent", "ancestors[task['task_id']][-1]")
+                if "primogenitor" in rules_str:
+                    rules_str = rules_str.replace("primogenitor", "ancestors[task['task_id']][0]")
+                rules = eval(rules_str)
+                for k, v in rules.items():
+                    k = do_eval(k, task, ancestors)
+                    v = do_eval(v, task, ancestors)
+                    if k == "extend":
+                        if isinstance(v, list):
+                            for _ in v:
+                                custom_characterization.update(_)
+                        elif isinstance(v, dict):
+                            custom_characterization.update(v)
+                    elif k == "query":
+                        query = v
+                        new_filter = {}
+                        for fk, fv in query["filter"].items():
+                            new_filter[fk] = do_eval(fv, task, ancestors)
+                        try:
+                            docs = self.query(
+                                filter=new_filter,
+                                collection=query.get("collection", None),
+                                projection=query.get("projection"),
+                                remove_json_unserializables=True,
+                            )
+                            if docs is not None:
+                                if len(docs) == 1:
+                                    query_result = docs[0]
+                                    for dict_field in {"used", "generated", "custom_metadata"}:
+                                        if dict_field in query_result:
+                                            dict_value = query_result.pop(dict_field)
+                                            custom_characterization.update(dict_value)
+                                    custom_characterization.update(query_result)
+                                elif len(docs) > 1:
+                                    custom_characterization["query_result"] = docs
+                        except Exception as e:
+                            self.logger.exception(e)
+                            continue
+                    else:
+                        custom_characterization[k] = v
+                task["custom_characterization"] = custom_characterization
+
     @abstractmethod
     def dump_tasks_to_file_recursive(self, workflow_id, output_file="tasks.parquet", max_depth=999, mapping=None):
         """
@@ -327,6 +510,8 @@ class DocumentDBDAO(ABC):
         max_depth : int, optional
             The maximum depth to traverse in the task hierarchy (default is 999).
             Helps avoid excessive recursion for workflows with deeply nested tasks.
+        mapping : dict, optional
+            Rules used to compute the ``custom_characterization`` of each task.
 
         Returns
         -------
@@ -3,43 +3,115 @@
 This module provides the `LMDBDAO` class for interacting with an LMDB-backed database.
 """
 
+import json
+from bisect import bisect_right
 from time import time
-from typing import List, Dict
+from typing import Dict, Iterator, List
 
 import lmdb
-import json
-import pandas as pd
 
 from flowcept import WorkflowObject
 from flowcept.commons.daos.docdb_dao.docdb_dao_base import DocumentDBDAO
+from flowcept.commons.daos.docdb_dao.lmdb_query_planner import (
+    INDEXED_TASK_FIELDS,
+    encode_index_key,
+    match_filter,
+    plan_query,
+    project,
+    sort_docs,
+)
 from flowcept.commons.flowcept_logger import FlowceptLogger
-from flowcept.configs import PERF_LOG, LMDB_SETTINGS
-from flowcept.flowceptor.consumers.consumer_utils import curate_dict_task_messages
+from flowcept.commons.daos.docdb_dao.lmdb_records import LMDBRecordCodec
+from flowcept.configs import PERF_LOG, LMDB_SETTINGS, LMDB_ZERO_COPY_READS
+from flowcept.flowceptor.consumers.consumer_utils import curate_dict_task_messages, merge_task_doc
+
+
+def _dump_json(doc):
+    return json.dumps(doc, default=str)
 
 
 class LMDBDAO(DocumentDBDAO):
     """DocumentDBDAO implementation for interacting with LMDB.
 
     Provides methods for storing and retrieving task and workflow data.
+
+    Tasks have secondary indexes on ``INDEXED_TASK_FIELDS``, kept in ``dupsort`` sub-databases
+    updated in the same transaction as the tasks. Queries use the most selective index for the
+    filter and only deserialize the candidate tasks.
+
+    Documents are stored as binary records (see ``lmdb_records``) and, with
+    ``lmdb.zero_copy_reads``, decoded straight from the memory map instead of being copied first.
     """
 
+    MAX_DBS = 16
+    INDEX_VERSION_KEY = b"task_indexes"
+
     def __init__(self):
         # TODO: if we are inheriting from DocumentDBDAO, shouldn't we call super() here?
         self._initialized = True
+        self._serializer = LMDBRecordCodec.from_settings(LMDB_SETTINGS)
         self._open()
         self.logger = FlowceptLogger()
 
     def _open(self):
         """Open LMDB environment and databases."""
         _path = LMDB_SETTINGS.get("path", "flowcept_lmdb")
-        self._env = lmdb.open(_path, map_size=10**12, max_dbs=2)
+        self._env = lmdb.open(_path, map_size=10**12, max_dbs=LMDBDAO.MAX_DBS)
         self._tasks_db = self._env.open_db(b"tasks")
         self._workflows_db = self._env.open_db(b"workflows")
+        self._meta_db = self._env.open_db(b"meta")
+        self._task_index_dbs = {
+            field: self._env.open_db(f"tasks_idx_{field}".encode(), dupsort=True) for field in INDEXED_TASK_FIELDS
+        }
         self._is_closed = False
+        self._build_task_indexes()
+
+    def _build_task_indexes(self):
+        """(Re)build the task indexes if the database was written without them or with other fields."""
+        version = ",".join(INDEXED_TASK_FIELDS).encode()
+        with self._env.begin(write=True) as txn:
+            if txn.get(LMDBDAO.INDEX_VERSION_KEY, db=self._meta_db) == version:
+                return
+            for index_db in self._task_index_dbs.values():
+                txn.drop(index_db, delete=False)
+            for key, value in txn.cursor(db=self._tasks_db):
+                self._index_task(txn, key, self._serializer.loads(value))
+            txn.put(LMDBDAO.INDEX_VERSION_KEY, version, db=self._meta_db)
+
+    def _index_task(self, txn, task_key: bytes, new_doc: Dict = None, old_doc: Dict = None):
+        """Update the index entries of a task within the caller's write transaction."""
+        for field, index_db in self._task_index_dbs.items():
+            old_key = encode_index_key(old_doc.get(field)) if old_doc else None
+            new_key = encode_index_key(new_doc.get(field)) if new_doc else None
+            if old_key == new_key:
+                continue
+            if old_key is not None:
+                txn.delete(old_key, task_key, db=index_db)
+            if new_key is not None:
+                txn.put(new_key, task_key, db=index_db)
+
+    def _put_task(self, txn, task_key: bytes, doc: Dict, merge=True):
+        """Write a task, merged into its stored version with ``merge_task_doc`` unless ``merge`` is False."""
+        old_value = txn.get(task_key, db=self._tasks_db)
+        old_doc = self._serializer.loads(old_value) if old_value is not None else None
+        if merge and old_doc is not None:
+            # Shallow copy: the indexed fields of old_doc must survive the merge.
+            doc = merge_task_doc(dict(old_doc), doc)
+        txn.put(task_key, self._serializer.dumps(doc), db=self._tasks_db)
+        self._index_task(txn, task_key, doc, old_doc)
+
+    def _delete_task(self, txn, task_key: bytes):
+        old_value = txn.pop(task_key, db=self._tasks_db)
+        if old_value is not None:
+            self._index_task(txn, task_key, old_doc=self._serializer.loads(old_value))
 
     def insert_and_update_many_tasks(self, docs: List[Dict], indexing_key=None):
         """Insert or update multiple task documents in the LMDB database.
 
+        Tasks already stored are merged with the new messages as MongoDB's upserts do: nested
+        fields are updated instead of replaced, and a finished status is not overwritten by a
+        late message. The whole batch is written in a single transaction.
+
         Parameters
         ----------
         docs : list of dict
@@ -60,10 +132,11 @@ class LMDBDAO(DocumentDBDAO):
                 docs, indexing_key, t0, convert_times=False, keys_to_drop=["data"]
             )
 
-            with self._env.begin(write=True, db=self._tasks_db) as txn:
-                for key, value in indexed_buffer.items():
-                    k, v = key.encode(), json.dumps(value).encode()
-                    txn.put(k, v)
+            # One write transaction per batch, in key order so that the B-tree pages are
+            # visited sequentially.
+            with self._env.begin(write=True) as txn:
+                for key in sorted(indexed_buffer):
+                    self._put_task(txn, key.encode(), indexed_buffer[key])
             return True
         except Exception as e:
             self.logger.exception(e)
@@ -83,9 +156,8 @@ class LMDBDAO(DocumentDBDAO):
             True if the operation succeeds, False otherwise.
         """
         try:
-            with self._env.begin(write=True, db=self._tasks_db) as txn:
-                k, v = task_dict.get("task_id").encode(), json.dumps(task_dict).encode()
-                txn.put(k, v)
+            with self._env.begin(write=True) as txn:
+                self._put_task(txn, task_dict.get("task_id").encode(), task_dict, merge=False)
             return True
         except Exception as e:
             self.logger.exception(e)
@@ -108,7 +180,7 @@ class LMDBDAO(DocumentDBDAO):
             _dict = wf_obj.to_dict()
             with self._env.begin(write=True, db=self._workflows_db) as txn:
                 key = _dict.get("workflow_id").encode()
-                value = json.dumps(_dict).encode()
+                value = self._serializer.dumps(_dict)
                 txn.put(key, value)
             return True
         except Exception as e:
@@ -118,26 +190,23 @@ class LMDBDAO(DocumentDBDAO):
     def delete_task_keys(self, key_name, keys_list: List[str]) -> bool:
         """Delete task documents by a key value list.
 
-        When deleting by task_id, deletes keys directly. Otherwise, scans
-        tasks and deletes matching entries.
+        When deleting by task_id, deletes keys directly. Otherwise, finds the
+        matching tasks through the index on ``key_name`` or, if there is none, a scan.
         """
         if self._is_closed:
             self._open()
         if type(keys_list) is not list:
             keys_list = [keys_list]
         try:
-            with self._env.begin(write=True, db=self._tasks_db) as txn:
+            with self._env.begin(write=True) as txn:
                 if key_name == "task_id":
-                    for key in keys_list:
-                        if key is None:
-                            continue
-                        txn.delete(str(key).encode())
+                    task_keys = [str(key).encode() for key in keys_list if key is not None]
                 else:
-                    cursor = txn.cursor()
-                    for key, value in cursor:
-                        entry = json.loads(value.decode())
-                        if entry.get(key_name) in keys_list:
-                            cursor.delete()
+                    filter = {key_name: {"$in": keys_list}}
+                    candidates, _ = self._plan(txn, self._tasks_db, filter)
+                    task_keys = [key for key, _ in self._iter_matches(txn, self._tasks_db, filter, candidates)]
+                for task_key in task_keys:
+                    self._delete_task(txn, task_key)
             return True
         except Exception as e:
             self.logger.exception(e)
@@ -148,7 +217,8 @@ class LMDBDAO(DocumentDBDAO):
         if self._is_closed:
             self._open()
         try:
-            return self._env.stat(db=self._tasks_db).get("entries", 0)
+            with self._env.begin() as txn:
+                return txn.stat(self._tasks_db).get("entries", 0)
         except Exception as e:
             self.logger.exception(e)
             return -1
@@ -158,7 +228,8 @@ class LMDBDAO(DocumentDBDAO):
         if self._is_closed:
             self._open()
         try:
-            return self._env.stat(db=self._workflows_db).get("entries", 0)
+            with self._env.begin() as txn:
+                return txn.stat(self._workflows_db).get("entries", 0)
         except Exception as e:
             self.logger.exception(e)
             return -1
@@ -180,15 +251,37 @@ class LMDBDAO(DocumentDBDAO):
         bool
             True if the entry matches the filter, otherwise False.
         """
-        if not filter:
-            return True
-
-        for key, value in filter.items():
-            if entry.get(key) != value:
-                return False
-        return True
-
-    def to_df(self, collection="tasks", filter=None) -> pd.DataFrame:
+        return match_filter(entry, filter)
+
+    def _plan(self, txn, db, filter, sort=None):
+        """Return the candidate keys for the filter, or None for a full scan, and whether they follow the sort."""
+        plan = plan_query(txn, self._task_index_dbs, filter, sort) if db == self._tasks_db else None
+        if plan is None:
+            return None, False
+        field, keys = plan
+        if sort and len(sort) == 1 and sort[0][0] == field:
+            if sort[0][1] in {-1, "desc", "DESC", "descending"}:
+                keys.reverse()
+            return keys, True
+        return keys, False
+
+    def _iter_matches(self, txn, db, filter, keys=None):
+        """Yield ``(key, doc)`` for the documents matching the filter, among ``keys`` if given."""
+        if keys is None:
+            for key, value in txn.cursor(db=db):
+                doc = self._serializer.loads(value)
+                if match_filter(doc, filter):
+                    yield key, doc
+            return
+        for key in keys:
+            value = txn.get(key, db=db)
+            if value is None:
+                continue
+            doc = self._serializer.loads(value)
+            if match_filter(doc, filter):
+                yield key, doc
+
+    def to_df(self, collection="tasks", filter=None):
         """Fetch data from LMDB and return a DataFrame with optional MongoDB-style filtering.
 
         Args:
@@ -200,8 +293,69 @@ class LMDBDAO(DocumentDBDAO):
         -------
          pd.DataFrame: A DataFrame containing the filtered data.
         """
-        docs = self.query(collection, filter)
-        return pd.DataFrame(docs)
+        import pandas as pd
+
+        return pd.DataFrame(self.iter_query(filter=filter, collection=collection))
+
+    def _get_db(self, collection):
+        if collection == "tasks":
+            return self._tasks_db
+        elif collection == "workflows":
+            return self._workflows_db
+        msg = "Only tasks and workflows "
+        raise Exception(msg + "collections are currently available for this.")
+
+    def iter_query(
+        self, filter=None, projection=None, sort=None, batch_size=1000, resume_after=None, collection="tasks"
+    ) -> Iterator[Dict]:
+        """Stream the documents matching a filter. See ``DocumentDBDAO.iter_query``.
+
+        Each batch is read in its own read transaction, so no transaction stays open while the
+        caller consumes the documents. A sort that no index can serve needs all the matching
+        documents in memory.
+        """
+        if self._is_closed:
+            self._open()
+        if sort and resume_after is not None:
+            raise ValueError("resume_after cannot be combined with sort.")
+        _db = self._get_db(collection)
+        with self._env.begin() as txn:
+            keys, presorted = self._plan(txn, _db, filter, sort)
+        if sort and not presorted:
+            yield from self.query(filter=filter, projection=projection, sort=sort, collection=collection) or []
+            return
+
+        last_key = resume_after.encode() if resume_after is not None else None
+        if keys is not None:
+            if not presorted:
+                keys.sort()  # Id order, which also makes the reads sequential.
+                if last_key is not None:
+                    keys = keys[bisect_right(keys, last_key) :]
+            for i in range(0, len(keys), batch_size):
+                with self._env.begin(buffers=LMDB_ZERO_COPY_READS) as txn:
+                    batch = [doc for _, doc in self._iter_matches(txn, _db, filter, keys[i : i + batch_size])]
+                for doc in batch:
+                    yield project(doc, projection)
+            return
+
+        positioned = True
+        while positioned:
+            batch = []
+            with self._env.begin(buffers=LMDB_ZERO_COPY_READS) as txn:
+                cursor = txn.cursor(db=_db)
+                positioned = cursor.set_range(last_key) if last_key is not None else cursor.first()
+                if positioned and last_key is not None and bytes(cursor.key()) == last_key:
+                    positioned = cursor.next()
+                n = 0
+                while positioned and n < batch_size:
+                    key, value = cursor.item()
+                    doc = self._serializer.loads(value)
+                    if match_filter(doc, filter):
+                        batch.append(doc)
+                    last_key, n = bytes(key), n + 1
+                    positioned = cursor.next()
+            for doc in batch:
+                yield project(doc, projection)
 
     def query(
         self,
@@ -219,14 +373,14 @@ class LMDBDAO(DocumentDBDAO):
         ----------
         filter : dict, optional
             Filter criteria.
-        projection : dict, optional
-            Fields to include or exclude.
+        projection : list or dict, optional
+            Fields to include, or a MongoDB-like projection dict.
         limit : int, optional
-            Maximum number of results to return.
-        sort : list, optional
-            Sorting criteria.
+            Maximum number of results to return. 0 or None means no limit.
+        sort : list of tuple, optional
+            Sorting criteria. Example: [("started_at", 1), ("task_id", "desc")].
         aggregation : list, optional
-            Aggregation stages.
+            Aggregation stages. Not supported in LMDB.
         remove_json_unserializables : bool, optional
             Remove JSON-unserializable fields.
         collection : str, optional
@@ -240,22 +394,26 @@ class LMDBDAO(DocumentDBDAO):
         if self._is_closed:
             self._open()
 
-        if collection == "tasks":
-            _db = self._tasks_db
-        elif collection == "workflows":
-            _db = self._workflows_db
-        else:
-            msg = "Only tasks and workflows "
-            raise Exception(msg + "collections are currently available for this.")
+        _db = self._get_db(collection)
+        if aggregation:
+            raise NotImplementedError("Aggregations are not supported in LMDB.")
 
         try:
             data = []
-            with self._env.begin(db=_db) as txn:
-                cursor = txn.cursor()
-                for key, value in cursor:
-                    entry = json.loads(value.decode())
-                    if LMDBDAO._match_filter(entry, filter):
-                        data.append(entry)
+            with self._env.begin(buffers=LMDB_ZERO_COPY_READS) as txn:
+                keys, presorted = self._plan(txn, _db, filter, sort)
+                # Without a sort, or with the index already following it, the limit stops the reads.
+                stop_at = limit if limit and (not sort or presorted) else None
+                for _, entry in self._iter_matches(txn, _db, filter, keys):
+                    data.append(entry)
+                    if stop_at is not None and len(data) >= stop_at:
+                        break
+            if sort and not presorted:
+                sort_docs(data, sort)
+            if limit:
+                data = data[:limit]
+            if projection:
+                data = [project(doc, projection) for doc in data]
             return data
         except Exception as e:
             self.logger.exception(e)
@@ -356,16 +514,47 @@ class LMDBDAO(DocumentDBDAO):
         raise NotImplementedError
 
     def get_tasks_recursive(self, workflow_id, max_depth=999, mapping=None):
-        """Get_tasks_recursive in LMDB."""
-        raise NotImplementedError
+        """Get the task tree of a workflow.
+
+        The ``parent_task_id`` index is the adjacency list of the tree: the children of a task
+        are one index lookup away, read in a single read transaction. See
+        ``DocumentDBDAO._build_task_tree``.
+        """
+        if self._is_closed:
+            self._open()
+        parent_index = self._task_index_dbs["parent_task_id"]
+        with self._env.begin() as txn:
+            root_filter = {"workflow_id": workflow_id, "parent_task_id": None}
+            keys, _ = self._plan(txn, self._tasks_db, root_filter)
+            roots = [doc for _, doc in self._iter_matches(txn, self._tasks_db, root_filter, keys)]
+
+            def children_of(task_id):
+                cursor = txn.cursor(db=parent_index)
+                if not cursor.set_key(encode_index_key(task_id)):
+                    return []
+                child_keys = list(cursor.iternext_dup(keys=False, values=True))
+                return [self._serializer.loads(txn.get(key, db=self._tasks_db)) for key in child_keys]
+
+            return self._build_task_tree(roots, children_of, max_depth, mapping)
 
     def dump_tasks_to_file_recursive(self, workflow_id, output_file="tasks.parquet", max_depth=999, mapping=None):
         """Dump_tasks_to_file_recursive in LMDB."""
-        raise NotImplementedError
-
-    def dump_to_file(self, collection, filter, output_file, export_format, should_zip):
-        """Dump data to file."""
-        raise NotImplementedError
+        tasks = self.get_tasks_recursive(workflow_id, max_depth=max_depth, mapping=mapping)
+        self._dump_docs_to_parquet(tasks, output_file)
+
+    def dump_to_file(self, collection="tasks", filter=None, output_file=None, export_format="json", should_zip=False):
+        """Dump the documents matching a filter to a JSON or Parquet file, streaming them from LMDB."""
+        self._get_db(collection)
+        if export_format not in {"json", "parquet"}:
+            raise Exception("Sorry, only JSON and Parquet are currently supported.")
+        if output_file is None:
+            output_file = self._default_dump_file_name(collection, export_format, should_zip)
+        docs = self.iter_query(filter=filter, collection=collection)
+        if export_format == "parquet":
+            self._dump_docs_to_parquet(docs, output_file)
+        else:
+            self._dump_docs_to_json(docs, output_file, should_zip, dumps=_dump_json)
+        self.logger.info(f"DB dump file {output_file} saved.")
 
     def save_or_update_object(
         self,
@@ -0,0 +1,222 @@
+"""LMDB query planner module.
+
+Secondary indexes for LMDBDAO and the MongoDB-like filter matching used to answer queries.
+
+Each index is a ``dupsort`` LMDB sub-database mapping an encoded field value to the ids of the
+documents holding it. Values are encoded so that the byte order of the keys follows the value
+order, which lets range filters and sorts walk the index.
+"""
+
+import struct
+from typing import Dict, List, Optional, Tuple
+
+# Task fields with a secondary index.
+INDEXED_TASK_FIELDS = ("workflow_id", "campaign_id", "activity_id", "parent_task_id", "status", "started_at")
+
+_NUMBER_PREFIX = b"\x01"
+_STRING_PREFIX = b"\x02"
+_MAX_KEY_SIZE = 500  # LMDB keys are limited to 511 bytes. Longer values are truncated.
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+
+def encode_index_key(value) -> Optional[bytes]:
+    """Encode a value as an order-preserving index key. Returns None for values that are not indexed."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        packed = bytearray(struct.pack(">d", float(value)))
+        if packed[0] & 0x80:  # Negative: invert all bits so that larger magnitudes sort first.
+            packed = bytearray(b ^ 0xFF for b in packed)
+        else:
+            packed[0] |= 0x80
+        return _NUMBER_PREFIX + bytes(packed)
+    if isinstance(value, str):
+        return _STRING_PREFIX + value.encode()[: _MAX_KEY_SIZE - 1]
+    return None
+
+
+def get_field(doc: Dict, field: str):
+    """Return the value of a possibly dotted field, or None."""
+    if field in doc:
+        return doc[field]
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _compare(op, value, arg) -> bool:
+    if value is None or arg is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > arg
+        elif op == "$gte":
+            return value >= arg
+        elif op == "$lt":
+            return value < arg
+        return value <= arg
+    except TypeError:
+        return False
+
+
+def _match_condition(value, condition) -> bool:
+    if not (isinstance(condition, dict) and condition and all(str(k).startswith("$") for k in condition)):
+        return value == condition
+    for op, arg in condition.items():
+        if op == "$eq":
+            ok = value == arg
+        elif op == "$ne":
+            ok = value != arg
+        elif op in _RANGE_OPERATORS:
+            ok = _compare(op, value, arg)
+        elif op == "$in":
+            ok = value in arg
+        elif op == "$nin":
+            ok = value not in arg
+        elif op == "$exists":
+            ok = (value is not None) == bool(arg)
+        else:
+            raise NotImplementedError(f"Filter operator {op} is not supported in LMDB.")
+        if not ok:
+            return False
+    return True
+
+
+def match_filter(doc: Dict, filter: Dict) -> bool:
+    """Check if a document matches a MongoDB-like filter.
+
+    Supports equality, ``$eq``, ``$ne``, ``$gt``, ``$gte``, ``$lt``, ``$lte``, ``$in``, ``$nin``,
+    ``$exists``, ``$and``, ``$or``, and dotted field names.
+    """
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(match_filter(doc, f) for f in condition):
+                return False
+        elif key == "$or":
+            if not any(match_filter(doc, f) for f in condition):
+                return False
+        elif not _match_condition(get_field(doc, key), condition):
+            return False
+    return True
+
+
+def _index_keys_for_condition(condition) -> Tuple[Optional[List[bytes]], Optional[Tuple]]:
+    """Return ``(keys, None)`` for equality/$in conditions, ``(None, (low, high))`` for ranges, or (None, None)."""
+    if not (isinstance(condition, dict) and condition and all(str(k).startswith("$") for k in condition)):
+        key = encode_index_key(condition)
+        return ([key], None) if key is not None else (None, None)
+    if "$eq" in condition:
+        key = encode_index_key(condition["$eq"])
+        return ([key], None) if key is not None else (None, None)
+    if "$in" in condition:
+        keys = [encode_index_key(v) for v in condition["$in"]]
+        if keys and all(k is not None for k in keys):
+            return sorted(set(keys)), None
+        return None, None
+    low = condition.get("$gt", condition.get("$gte"))
+    high = condition.get("$lt", condition.get("$lte"))
+    low_key, high_key = encode_index_key(low), encode_index_key(high)
+    if low_key is None and high_key is None:
+        return None, None
+    # Keys of one type only: numbers and strings never compare in the filter.
+    prefix = (low_key or high_key)[:1]
+    if (low_key and high_key and low_key[:1] != high_key[:1]) or (low is not None and low_key is None):
+        return None, None
+    if high is not None and high_key is None:
+        return None, None
+    # Bounds are inclusive: truncated keys may tie. The filter is re-checked on the documents.
+    # UTF-8 strings never contain 0xFF, and numbers under a 0xFF byte still start with it.
+    return None, (low_key or prefix, high_key or prefix + b"\xff")
+
+
+def _range_ids(cursor, low: bytes, high: bytes) -> List[bytes]:
+    ids = []
+    if not cursor.set_range(low):
+        return ids
+    for key, value in cursor.iternext(keys=True, values=True):
+        key = bytes(key)  # Transactions opened with buffers=True return memoryviews.
+        if key > high and not key.startswith(high):
+            break
+        ids.append(bytes(value))
+    return ids
+
+
+def plan_query(txn, index_dbs: Dict, filter: Dict, sort: List[Tuple] = None) -> Optional[Tuple[str, List[bytes]]]:
+    """Pick the most selective index for the filter.
+
+    Returns ``(field, ids)``, the indexed field used and the candidate document ids in ascending
+    order of that field, or None when a full scan is needed. Equality and ``$in`` conditions are
+    costed by their number of index entries. A range condition is used only when there is no
+    equality condition, or when it is on the single sort field, since then the candidates are
+    already sorted and a limit can stop the query early.
+    """
+    if not filter:
+        return None
+    best = None  # (cost, field, keys)
+    range_plan = None
+    sort_field = sort[0][0] if sort and len(sort) == 1 else None
+    for field, condition in filter.items():
+        if field not in index_dbs:
+            continue
+        keys, bounds = _index_keys_for_condition(condition)
+        cursor = txn.cursor(db=index_dbs[field])
+        if keys is not None:
+            cost = sum(cursor.count() if cursor.set_key(k) else 0 for k in keys)
+            if best is None or cost < best[0]:
+                best = (cost, field, keys)
+        elif bounds is not None and (range_plan is None or field == sort_field):
+            range_plan = (field, bounds)
+
+    if best is not None and not (range_plan and range_plan[0] == sort_field and best[0] > 0):
+        _, field, keys = best
+        cursor = txn.cursor(db=index_dbs[field])
+        ids = []
+        for k in keys:
+            if cursor.set_key(k):
+                ids.extend(bytes(v) for v in cursor.iternext_dup(keys=False, values=True))
+        return field, ids
+    if range_plan is not None:
+        field, (low, high) = range_plan
+        return field, _range_ids(txn.cursor(db=index_dbs[field]), low, high)
+    return None
+
+
+def _sort_key(value):
+    # Missing values first, as in MongoDB. Numbers before strings, so that mixed types do not raise.
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    return (2, str(value))
+
+
+def sort_docs(docs: List[Dict], sort: List[Tuple]) -> List[Dict]:
+    """Sort documents by ``[(field, order), ...]``, where order is 1/-1 or "asc"/"desc"."""
+    for field, order in reversed(sort):
+        descending = order in {-1, "desc", "DESC", "descending"}
+        docs.sort(key=lambda d: _sort_key(get_field(d, field)), reverse=descending)
+    return docs
+
+
+def project(doc: Dict, projection) -> Dict:
+    """Apply a projection given as a list of fields to keep or a MongoDB-like dict."""
+    if not projection:
+        return doc
+    if isinstance(projection, dict):
+        included = [f for f, v in projection.items() if v and f != "_id"]
+        if not included:
+            excluded = {f for f, v in projection.items() if not v}
+            return {k: v for k, v in doc.items() if k not in excluded}
+    else:
+        included = list(projection)
+    out = {}
+    for field in included:
+        value = get_field(doc, field)
+        if value is not None:
+            out[field] = value
+    return out
@@ -0,0 +1,191 @@
+"""LMDB records module.
+
+Encoding of the documents stored by LMDBDAO. By default, a record is a plain JSON document,
+which starts with ``{``. With ``lmdb.record_format: msgpack``, a record is one header byte
+followed by the payload:
+
+- ``0x01``: msgpack.
+- ``0x02``: msgpack compressed with zstd.
+- ``0x03``: msgpack compressed with zstd and a trained dictionary (``zstd_dict_path``).
+
+Records of every format are readable whatever the configured one, and
+:func:`migrate_lmdb_store` rewrites a store in the configured format.
+"""
+
+import os
+from typing import Dict, Iterator, List
+
+import lmdb
+
+from flowcept.commons.serializers import get_serializer
+
+RECORD_MSGPACK = 0x01
+RECORD_MSGPACK_ZSTD = 0x02
+RECORD_MSGPACK_ZSTD_DICT = 0x03
+RECORD_FORMATS = {"json", "msgpack"}
+RECORD_COMPRESSIONS = {"none", "zstd"}
+
+
+class LMDBRecordCodec:
+    """Encode and decode LMDB records.
+
+    Parameters
+    ----------
+    record_format : str
+        ``json`` (default) or ``msgpack``. JSON records decode faster; msgpack records are
+        smaller and can be compressed.
+    compression : str
+        ``none`` or ``zstd``. zstd requires the msgpack record format.
+    zstd_dict_path : str, optional
+        Dictionary trained with :func:`train_zstd_dictionary`. Compresses small records much
+        better than plain zstd. Required to read records written with it.
+    zstd_level : int
+        zstd compression level.
+    """
+
+    def __init__(self, record_format="json", compression="none", zstd_dict_path=None, zstd_level=3):
+        if record_format not in RECORD_FORMATS:
+            raise NotImplementedError(f"Unknown LMDB record format '{record_format}'. Use one of {RECORD_FORMATS}.")
+        if compression not in RECORD_COMPRESSIONS:
+            raise NotImplementedError(f"Unknown LMDB compression '{compression}'. Use one of {RECORD_COMPRESSIONS}.")
+        if compression != "none" and record_format != "msgpack":
+            raise NotImplementedError(f"LMDB compression '{compression}' requires the msgpack record format.")
+        self.record_format = record_format
+        self.compression = compression
+        self._msgpack = get_serializer("msgpack")
+        self._json = get_serializer("json")
+        self._compressor = self._zstd_decompressor = self._dict_decompressor = None
+        self._zstd_dict = None
+        if zstd_dict_path:
+            import zstandard
+
+            with open(zstd_dict_path, "rb") as f:
+                self._zstd_dict = zstandard.ZstdCompressionDict(f.read())
+            self._dict_decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dict)
+        if self.compression == "zstd":
+            import zstandard
+
+            kwargs = {"dict_data": self._zstd_dict} if self._zstd_dict is not None else {}
+            self._compressor = zstandard.ZstdCompressor(level=zstd_level, **kwargs)
+
+    @classmethod
+    def from_settings(cls, lmdb_settings: Dict) -> "LMDBRecordCodec":
+        """Build the codec configured in the ``databases.lmdb`` settings."""
+        return cls(
+            record_format=lmdb_settings.get("record_format", "json"),
+            compression=lmdb_settings.get("compression", "none"),
+            zstd_dict_path=lmdb_settings.get("zstd_dict_path", None),
+        )
+
+    def dumps(self, doc: Dict) -> bytes:
+        """Encode a document."""
+        if self.record_format == "json":
+            return self._json.dumps(doc)
+        payload = self._msgpack.dumps(doc)
+        if self._compressor is None:
+            return bytes((RECORD_MSGPACK,)) + payload
+        header = RECORD_MSGPACK_ZSTD_DICT if self._zstd_dict is not None else RECORD_MSGPACK_ZSTD
+        return bytes((header,)) + self._compressor.compress(payload)
+
+    def loads(self, record) -> Dict:
+        """Decode a record, given as bytes or as a buffer read with ``buffers=True``."""
+        header = record[0]
+        if header == RECORD_MSGPACK:
+            return self._msgpack.loads(record[1:])
+        elif header == RECORD_MSGPACK_ZSTD:
+            if self._zstd_decompressor is None:
+                import zstandard
+
+                self._zstd_decompressor = zstandard.ZstdDecompressor()
+            return self._msgpack.loads(self._zstd_decompressor.decompress(record[1:]))
+        elif header == RECORD_MSGPACK_ZSTD_DICT:
+            if self._dict_decompressor is None:
+                raise ValueError("This LMDB record was compressed with a zstd dictionary. Set lmdb.zstd_dict_path.")
+            return self._msgpack.loads(self._dict_decompressor.decompress(record[1:]))
+        return self._json.loads(record)  # Records written before the binary format.
+
+    def is_current(self, record) -> bool:
+        """Return True if the record is already encoded as this codec would encode it."""
+        header = record[0]
+        if self.record_format == "json":
+            return header not in {RECORD_MSGPACK, RECORD_MSGPACK_ZSTD, RECORD_MSGPACK_ZSTD_DICT}
+        if self._compressor is None:
+            return header == RECORD_MSGPACK
+        return header == (RECORD_MSGPACK_ZSTD_DICT if self._zstd_dict is not None else RECORD_MSGPACK_ZSTD)
+
+
+def _iter_values(env, db, limit=None) -> Iterator[bytes]:
+    with env.begin(db=db) as txn:
+        for i, value in enumerate(txn.cursor().iternext(keys=False, values=True)):
+            if limit is not None and i >= limit:
+                break
+            yield value
+
+
+def train_zstd_dictionary(path: str, output_path: str, dict_size: int = 112_640, n_samples: int = 10_000) -> str:
+    """Train a zstd dictionary on the tasks of an LMDB store and save it to ``output_path``."""
+    import zstandard
+
+    env = lmdb.open(path, max_dbs=16, readonly=True, lock=False)
+    try:
+        tasks_db = env.open_db(b"tasks", create=False)
+        reader, msgpack_serializer = LMDBRecordCodec(), get_serializer("msgpack")
+        samples: List[bytes] = []
+        for value in _iter_values(env, tasks_db, limit=n_samples):
+            samples.append(msgpack_serializer.dumps(reader.loads(value)))
+    finally:
+        env.close()
+    zstd_dict = zstandard.train_dictionary(dict_size, samples)
+    with open(output_path, "wb") as f:
+        f.write(zstd_dict.as_bytes())
+    return output_path
+
+
+def migrate_lmdb_store(path: str, codec: LMDBRecordCodec, batch_size: int = 10_000, compact_path: str = None) -> Dict:
+    """Rewrite every record of an LMDB store with ``codec``, in place.
+
+    Records already in the target format are skipped, so an interrupted migration can be run
+    again. Each batch is committed in its own write transaction. LMDB does not give freed pages
+    back to the file system; pass ``compact_path`` to also write a compacted copy of the store.
+
+    Returns
+    -------
+    dict
+        Number of rewritten records per database and the store size before and after.
+    """
+    env = lmdb.open(path, map_size=10**12, max_dbs=16)
+    size_before = os.path.getsize(os.path.join(path, "data.mdb"))
+    rewritten = {}
+    try:
+        for name in (b"tasks", b"workflows"):
+            db = env.open_db(name)
+            count, last_key = 0, None
+            while True:
+                with env.begin(write=True, db=db) as txn:
+                    cursor = txn.cursor()
+                    positioned = cursor.set_range(last_key) if last_key is not None else cursor.first()
+                    if positioned and last_key is not None and cursor.key() == last_key:
+                        positioned = cursor.next()
+                    n = 0
+                    while positioned and n < batch_size:
+                        key, value = cursor.item()
+                        if not codec.is_current(value):
+                            cursor.put(key, codec.dumps(codec.loads(value)))
+                            count += 1
+                        last_key, n = key, n + 1
+                        positioned = cursor.next()
+                if not positioned:
+                    break
+            rewritten[name.decode()] = count
+        if compact_path:
+            env.copy(compact_path, compact=True)
+    finally:
+        env.close()
+    result = {
+        "rewritten": rewritten,
+        "size_before": size_before,
+        "size_after": os.path.getsize(os.path.join(path, "data.mdb")),
+    }
+    if compact_path:
+        result["compacted_size"] = os.path.getsize(os.path.join(compact_path, "data.mdb"))
+    return result
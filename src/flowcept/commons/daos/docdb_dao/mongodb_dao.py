@@ -1,23 +1,19 @@
 """Document DB interaction module."""
 
-import os
 import hashlib
-from typing import List, Dict, Tuple, Any
-import io
-import json
+from collections import OrderedDict
+from itertools import islice
+from typing import List, Dict, Tuple, Any, Iterator
 from uuid import uuid4
 from datetime import datetime, timezone
 
 import pickle
-import zipfile
-
-import pandas as pd
-import pyarrow.parquet as pq
-import pyarrow as pa
 
 from bson import ObjectId
+from bson.codec_options import TypeRegistry
 from bson.json_util import dumps
 from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from flowcept.commons.daos.docdb_dao.docdb_dao_base import DocumentDBDAO
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
@@ -25,15 +21,27 @@ from flowcept.commons.flowcept_dataclasses.workflow_object import (
 )
 from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
-from flowcept.commons.utils import perf_log, get_utc_now_str
+from flowcept.commons.utils import perf_log
 from flowcept.commons.vocabulary import Status
-from flowcept.configs import PERF_LOG, MONGO_CREATE_INDEX
+from flowcept.configs import PERF_LOG, MONGO_CREATE_INDEX, MONGO_ADAPTIVE_WRITES
 from flowcept.flowceptor.consumers.consumer_utils import (
     curate_dict_task_messages,
 )
 from time import time, sleep
 
 
+def _encode_numpy(obj):
+    """Encode the numpy values that messages carry, e.g., decoded from the MQ wire, as BSON lists and scalars."""
+    if type(obj).__module__ == "numpy":
+        import numpy as np
+
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        elif isinstance(obj, np.generic):
+            return obj.item()
+    return obj
+
+
 class MongoDBDAO(DocumentDBDAO):
     """
     A data access object for MongoDB.
@@ -50,6 +58,16 @@ class MongoDBDAO(DocumentDBDAO):
     #         DocumentDBDAO._instance = super(MongoDBDAO, cls).__new__(cls)
     #     return DocumentDBDAO._instance
 
+    # Max number of task keys remembered as already written by this DAO.
+    WRITTEN_KEYS_CAPACITY = 100_000
+    DUPLICATE_KEY_ERROR = 11000
+    # Documents fetched per cursor round-trip when streaming a collection.
+    ITER_BATCH_SIZE = 1000
+    # Parent task_ids per query when walking a task tree level by level.
+    TREE_LEVEL_BATCH_SIZE = 1000
+    # Root tasks whose subtrees are fetched and exported together.
+    TREE_ROOT_BATCH_SIZE = 1000
+
     def __init__(self, create_indices=MONGO_CREATE_INDEX):
         # if not hasattr(self, "_initialized"):
         from flowcept.configs import (
@@ -69,6 +87,7 @@ class MongoDBDAO(DocumentDBDAO):
                 socketTimeoutMS=60000,
                 connectTimeoutMS=60000,
                 serverSelectionTimeoutMS=60000,
+                type_registry=TypeRegistry(fallback_encoder=_encode_numpy),
             )
         else:
             self._client = MongoClient(
@@ -78,6 +97,7 @@ class MongoDBDAO(DocumentDBDAO):
                 socketTimeoutMS=60000,
                 connectTimeoutMS=60000,
                 serverSelectionTimeoutMS=60000,
+                type_registry=TypeRegistry(fallback_encoder=_encode_numpy),
             )
         self._db = self._client[MONGO_DB]
 
@@ -86,6 +106,12 @@ class MongoDBDAO(DocumentDBDAO):
         self._obj_collection = self._db["objects"]
         self._obj_history_collection = self._db["object_history"]
 
+        self._written_task_keys: OrderedDict = OrderedDict()
+        self._unique_task_keys = None
+        self._write_paths = {"insert": 0, "upsert": 0, "mixed": 0}
+        self._write_counts = {"inserted": 0, "upserted": 0, "duplicate_fallbacks": 0}
+        self.last_write_path = None
+
         if create_indices:
             self._create_indices()
 
@@ -249,7 +275,10 @@ class MongoDBDAO(DocumentDBDAO):
         Insert and update multiple task documents in the tasks collection.
 
         This method will curate the provided list of task dictionaries, update existing records
-        with the same indexing key or insert new ones.
+        with the same indexing key or insert new ones. If ``mongodb.adaptive_writes`` is enabled and
+        the indexing key has a unique index, tasks not written before by this DAO go through an
+        unordered ``insert_many``; only the others, and those that turn out to exist already, are
+        upserted. See ``write_metrics`` for the path each batch took.
 
         Parameters
         ----------
@@ -280,23 +309,88 @@ class MongoDBDAO(DocumentDBDAO):
             t1 = perf_log("doc_curate_dict_task_messages", t0)
             if len(indexed_buffer) == 0:
                 return False
-            requests = []
-            for indexing_key_value in indexed_buffer:
-                requests.append(
-                    UpdateOne(
-                        filter={indexing_key: indexing_key_value},
-                        update=[{"$set": indexed_buffer[indexing_key_value]}],
-                        upsert=True,
-                    )
-                )
-            t2 = perf_log("indexing_buffer", t1)
-            self._tasks_collection.bulk_write(requests)
-            perf_log("bulk_write", t2)
+            if MONGO_ADAPTIVE_WRITES and self._is_unique_task_key(indexing_key):
+                self._adaptive_write(indexed_buffer, indexing_key)
+            else:
+                self._upsert_many(indexed_buffer, indexing_key)
+                self._record_write_path(0, len(indexed_buffer), 0)
+            perf_log("bulk_write", t1)
             return True
         except Exception as e:
             self.logger.exception(e)
             return False
 
+    def _upsert_many(self, indexed_buffer: Dict, indexing_key: str):
+        requests = []
+        for indexing_key_value in indexed_buffer:
+            requests.append(
+                UpdateOne(
+                    filter={indexing_key: indexing_key_value},
+                    update=[{"$set": indexed_buffer[indexing_key_value]}],
+                    upsert=True,
+                )
+            )
+        self._tasks_collection.bulk_write(requests)
+
+    def _is_unique_task_key(self, indexing_key: str) -> bool:
+        """Return True if the tasks collection has a unique index on ``indexing_key`` alone."""
+        if self._unique_task_keys is None:
+            self._unique_task_keys = {
+                index["key"][0][0]
+                for index in self._tasks_collection.index_information().values()
+                if index.get("unique") and len(index["key"]) == 1
+            }
+        return indexing_key in self._unique_task_keys
+
+    def _adaptive_write(self, indexed_buffer: Dict, indexing_key: str):
+        """Insert the tasks this DAO has not written yet and upsert the others.
+
+        Tasks written by another process are caught by the unique index and upserted instead.
+        """
+        new_keys = [k for k in indexed_buffer if k not in self._written_task_keys]
+        update_keys = [k for k in indexed_buffer if k in self._written_task_keys]
+        fallback_keys = []
+        if new_keys:
+            try:
+                self._tasks_collection.insert_many([indexed_buffer[k] for k in new_keys], ordered=False)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != MongoDBDAO.DUPLICATE_KEY_ERROR for err in write_errors):
+                    raise
+                fallback_keys = [new_keys[err["index"]] for err in write_errors]
+                for k in fallback_keys:
+                    indexed_buffer[k].pop("_id", None)  # Set by insert_many; cannot be $set on an existing doc.
+        if update_keys or fallback_keys:
+            self._upsert_many({k: indexed_buffer[k] for k in update_keys + fallback_keys}, indexing_key)
+        for k in indexed_buffer:
+            self._written_task_keys[k] = None
+            self._written_task_keys.move_to_end(k)
+        while len(self._written_task_keys) > MongoDBDAO.WRITTEN_KEYS_CAPACITY:
+            self._written_task_keys.popitem(last=False)
+        self._record_write_path(len(new_keys) - len(fallback_keys), len(update_keys), len(fallback_keys))
+
+    def _record_write_path(self, inserted: int, upserted: int, duplicate_fallbacks: int):
+        if not upserted and not duplicate_fallbacks:
+            path = "insert"
+        elif not inserted:
+            path = "upsert"
+        else:
+            path = "mixed"
+        self._write_paths[path] += 1
+        self._write_counts["inserted"] += inserted
+        self._write_counts["upserted"] += upserted + duplicate_fallbacks
+        self._write_counts["duplicate_fallbacks"] += duplicate_fallbacks
+        self.last_write_path = path
+        self.logger.debug(
+            f"Task batch written via {path}: {inserted} inserted, {upserted} upserted, "
+            f"{duplicate_fallbacks} duplicate fallbacks."
+        )
+
+    @property
+    def write_metrics(self) -> Dict:
+        """Return how many task batches took each write path and how many docs were inserted or upserted."""
+        return {"batches": dict(self._write_paths), **self._write_counts, "last_write_path": self.last_write_path}
+
     def delete_task_ids(self, ids_list: List[ObjectId]) -> bool:
         """
         Delete task documents by their ObjectIds from the tasks collection.
@@ -643,7 +737,7 @@ class MongoDBDAO(DocumentDBDAO):
             self.logger.exception(e)
             return False
 
-    def to_df(self, collection="tasks", filter=None) -> pd.DataFrame:
+    def to_df(self, collection="tasks", filter=None):
         """
         Convert the contents of a MongoDB collection to a pandas DataFrame.
 
@@ -672,7 +766,9 @@ class MongoDBDAO(DocumentDBDAO):
             msg = "Only tasks and workflows "
             raise Exception(msg + "collections are currently available for this.")
         try:
-            cursor = _collection.find(filter=filter)
+            import pandas as pd
+
+            cursor = _collection.find(filter=filter, batch_size=self.ITER_BATCH_SIZE)
             return pd.DataFrame(cursor)
         except Exception as e:
             self.logger.exception(e)
@@ -694,37 +790,29 @@ class MongoDBDAO(DocumentDBDAO):
             msg = "Only tasks and workflows "
             raise Exception(msg + "collections are currently available for dump.")
 
-        if export_format != "json":
-            raise Exception("Sorry, only JSON is currently supported.")
+        if export_format not in {"json", "parquet"}:
+            raise Exception("Sorry, only JSON and Parquet are currently supported.")
 
         if output_file is None:
-            output_file = f"docs_dump_{collection}_{get_utc_now_str()}"
-            output_file += ".zip" if should_zip else ".json"
+            output_file = self._default_dump_file_name(collection, export_format, should_zip)
 
-        try:
-            cursor = _collection.find(filter=filter)
-        except Exception as e:
-            self.logger.exception(e)
+        if export_format == "parquet":
+            self._dump_docs_to_parquet(
+                self.iter_query(filter=filter, collection=collection, batch_size=self.ITER_BATCH_SIZE), output_file
+            )
+            self.logger.info(f"DB dump file {output_file} saved.")
             return
 
         try:
-            json_data = dumps(cursor)
+            cursor = _collection.find(filter=filter, batch_size=self.ITER_BATCH_SIZE)
         except Exception as e:
             self.logger.exception(e)
             return
 
         try:
-            if should_zip:
-                in_memory_stream = io.BytesIO()
-                with zipfile.ZipFile(in_memory_stream, "w", zipfile.ZIP_DEFLATED) as zip_file:
-                    zip_file.writestr("dump_file.json", json_data)
-                compressed_data = in_memory_stream.getvalue()
-                with open(output_file, "wb") as f:
-                    f.write(compressed_data)
-            else:
-                with open(output_file, "w") as f:
-                    json.dump(json.loads(json_data), f)
-
+            # Documents are written as the cursor fetches them, never all in memory.
+            with cursor:
+                self._dump_docs_to_json(cursor, output_file, should_zip, dumps=dumps)
             self.logger.info(f"DB dump file {output_file} saved.")
         except Exception as e:
             self.logger.exception(e)
@@ -1069,6 +1157,38 @@ class MongoDBDAO(DocumentDBDAO):
                 f"You used type={collection}, but MongoDB only stores tasks, workflows, objects, and object_history"
             )
 
+    def iter_query(
+        self, filter=None, projection=None, sort=None, batch_size=1000, resume_after=None, collection="tasks"
+    ) -> Iterator[Dict]:
+        """Stream the documents matching a filter. See ``DocumentDBDAO.iter_query``.
+
+        The cursor fetches ``batch_size`` documents per round-trip. Without ``sort``, documents
+        are sorted by their indexed id, so ``resume_after`` turns into a range condition.
+        """
+        if collection == "tasks":
+            _collection, id_field = self._tasks_collection, TaskObject.task_id_field()
+        elif collection == "workflows":
+            _collection, id_field = self._wfs_collection, "workflow_id"
+        else:
+            msg = "Only tasks and workflows "
+            raise Exception(msg + "collections are currently available for this.")
+        if sort and resume_after is not None:
+            raise ValueError("resume_after cannot be combined with sort.")
+
+        _filter = filter or {}
+        if resume_after is not None:
+            _filter = {"$and": [_filter, {id_field: {"$gt": resume_after}}]}
+        _projection = {proj_field: 1 for proj_field in projection} if projection else {"timestamp": 0}
+        _projection["_id"] = 0
+        cursor = _collection.find(
+            filter=_filter, projection=_projection, sort=sort or [(id_field, 1)], batch_size=batch_size
+        )
+        with cursor:
+            for doc in cursor:
+                if collection == "tasks" and "finished" in doc:
+                    doc["status"] = Status.FINISHED.value
+                yield doc
+
     def raw_task_pipeline(self, pipeline: List[Dict]):
         """
         Run a raw MongoDB aggregation pipeline on the tasks collection.
@@ -1269,211 +1389,69 @@ class MongoDBDAO(DocumentDBDAO):
 
         return stats
 
-    def get_tasks_recursive(self, workflow_id, max_depth=999, mapping=None):
-        """Get_tasks_recursive in MongoDB."""
-        try:
-            result = []
-            parent_tasks = self._tasks_collection.find(
-                {"workflow_id": workflow_id, "parent_task_id": None}, projection={"_id": 0}
-            )
-            for parent_task in parent_tasks:
-                if "finished" in parent_task and parent_task["status"] != Status.FINISHED.value:
-                    parent_task["status"] = Status.FINISHED.value
-                result.append(parent_task)
-                self._get_children_tasks_iterative(parent_task, result, max_depth, mapping)
-            return result
-        except Exception as e:
-            raise Exception(e)
+    def _children_by_parent(self, parent_ids: List[str], max_depth: int) -> Dict[str, List[Dict]]:
+        """Return the descendants of tasks, up to ``max_depth`` levels below them, by ``parent_task_id``.
 
-    @staticmethod
-    def _align_schemas(tables):
+        The tree is walked level by level, with one query on the ``parent_task_id`` index per
+        ``TREE_LEVEL_BATCH_SIZE`` tasks of a level. Unlike ``$graphLookup``, whose results must fit
+        in 100MB of memory on the server, this works for trees of any size.
         """
-        Aligns schemas of a list of PyArrow tables by adding missing columns with default values
-        and ensuring a consistent column order.
+        children = {}
+        seen = set(parent_ids)
+        level = list(parent_ids)
+        for _ in range(max_depth):
+            next_level = []
+            for i in range(0, len(level), self.TREE_LEVEL_BATCH_SIZE):
+                cursor = self._tasks_collection.find(
+                    {"parent_task_id": {"$in": level[i : i + self.TREE_LEVEL_BATCH_SIZE]}},
+                    projection={"_id": 0},
+                    batch_size=self.ITER_BATCH_SIZE,
+                )
+                with cursor:
+                    for task in cursor:
+                        if task["task_id"] in seen:
+                            continue
+                        seen.add(task["task_id"])
+                        children.setdefault(task["parent_task_id"], []).append(task)
+                        next_level.append(task["task_id"])
+            if not next_level:
+                break
+            level = next_level
+        return children
 
-        Parameters
-        ----------
-        tables : list of pyarrow.Table
-            List of tables to be aligned.
+    def _iter_tasks_recursive(self, workflow_id, max_depth=999, mapping=None) -> Iterator[Dict]:
+        """Yield the task tree of a workflow, ``TREE_ROOT_BATCH_SIZE`` root tasks at a time.
 
-        Returns
-        -------
-        list of pyarrow.Table
-            The tables with aligned schemas.
+        The root tasks (without ``parent_task_id``) are read from a cursor. The descendants of each
+        batch of roots are fetched level by level, see ``_children_by_parent``, and their subtrees
+        are yielded before the next batch is read, so only one batch of subtrees is in memory.
         """
-        if not tables:
-            return []
-
-        # Reference schema: take from the first table
-        reference_schema = tables[0].schema
+        root_filter = {"workflow_id": workflow_id, "parent_task_id": None}
+        cursor = self._tasks_collection.find(root_filter, projection={"_id": 0}, batch_size=self.ITER_BATCH_SIZE)
+        with cursor:
+            while True:
+                roots = list(islice(cursor, self.TREE_ROOT_BATCH_SIZE))
+                if not roots:
+                    break
+                children = self._children_by_parent([root["task_id"] for root in roots], max_depth)
+                yield from self._iter_task_tree(roots, lambda task_id: children.get(task_id, []), max_depth, mapping)
 
-        aligned_tables = []
-        for table in tables:
-            current_schema = table.schema
-
-            # Find missing columns in the current table
-            missing_columns = [
-                (field.name, field.type) for field in reference_schema if field.name not in current_schema.names
-            ]
-
-            # Add missing columns with default values
-            for col_name, col_type in missing_columns:
-                if pa.types.is_integer(col_type) or pa.types.is_floating(col_type):
-                    default_value = 0
-                elif pa.types.is_boolean(col_type):
-                    default_value = False
-                elif pa.types.is_timestamp(col_type):
-                    default_value = pa.scalar(0, type=col_type)
-                elif pa.types.is_string(col_type):
-                    default_value = ""
-                else:
-                    default_value = None  # Default to None for unknown types
-
-                table = table.append_column(col_name, pa.array([default_value] * len(table), type=col_type))
-
-            # Reorder columns to match reference schema
-            table = table.select([field.name for field in reference_schema])
-            aligned_tables.append(table)
+    def get_tasks_recursive(self, workflow_id, max_depth=999, mapping=None):
+        """Get the task tree of a workflow, querying it level by level.
 
-        return aligned_tables
+        The root tasks (without ``parent_task_id``) are fetched first, then their descendants,
+        one level at a time with batched ``$in`` queries, instead of one query per parent task.
+        See ``DocumentDBDAO._iter_task_tree``.
+        """
+        try:
+            return list(self._iter_tasks_recursive(workflow_id, max_depth, mapping))
+        except Exception as e:
+            raise Exception(e)
 
     def dump_tasks_to_file_recursive(self, workflow_id, output_file="tasks.parquet", max_depth=999, mapping=None):
-        """Dump_tasks_to_file_recursive in MongoDB."""
+        """Stream the task tree of a workflow into a Parquet file, one batch of root tasks at a time."""
         try:
-            tasks = self.get_tasks_recursive(workflow_id, max_depth=max_depth, mapping=mapping)
-            chunk_size = 100_000
-            dict_fields = TaskObject.get_dict_field_names()
-            dict_fields.extend(["ancestor_ids", "custom_characterization"])
-            output_dir = "temp_chunks"
-            os.makedirs(output_dir, exist_ok=True)
-            # Write chunks to temporary Parquet files
-            chunk = []
-            file_count = 0
-            for idx, record in enumerate(tasks):
-                chunk.append(record)
-                if (idx + 1) % chunk_size == 0:
-                    df = pd.DataFrame(chunk)
-                    for field in dict_fields:
-                        if field in df.columns:
-                            df[field] = df[field].apply(lambda x: json.dumps(x))
-                    table = pa.Table.from_pandas(df)
-                    pq.write_table(table, f"{output_dir}/chunk_{file_count}.parquet")
-                    file_count += 1
-                    chunk = []  # Clear the chunk
-
-            # Write remaining rows
-            if chunk:
-                df = pd.DataFrame(chunk)
-                for field in dict_fields:
-                    if field in df.columns:
-                        df[field] = df[field].apply(lambda x: json.dumps(x))
-                table = pa.Table.from_pandas(df)
-                pq.write_table(table, f"{output_dir}/chunk_{file_count}.parquet")
-
-            # Merge all chunked files into a single Parquet file
-            chunk_files = [f"{output_dir}/chunk_{i}.parquet" for i in range(file_count + 1)]
-            tables = [pq.read_table(f) for f in chunk_files]
-            tables = MongoDBDAO._align_schemas(tables)  # Use the returned aligned tables
-            merged_table = pa.concat_tables(tables)
-            pq.write_table(merged_table, output_file)
-
-            # Cleanup temporary files
-            try:
-                for f in chunk_files:
-                    os.remove(f)
-                os.rmdir(output_dir)
-            except Exception as e:
-                self.logger.warning(e)
-
+            self._dump_docs_to_parquet(self._iter_tasks_recursive(workflow_id, max_depth, mapping), output_file)
         except Exception as e:
             self.logger.exception(e)
             raise e
-
-    def _resolve_mapping(self, task, mapping, ancestors):
-        def do_eval(x, task, ancestors):
-            for word in ["task", "ancestors"]:
-                if word in x:
-                    return eval(x)
-            return x
-
-        custom_characterization = {}
-        for mapping_type in {"activity_id", "subtype"}:
-            if mapping_type in task and task[mapping_type] in mapping[mapping_type]:
-                rules = mapping[mapping_type].get(task[mapping_type])
-                rules_str = str(rules)
-                if "grandparent" in rules_str:
-                    rules_str = rules_str.replace("grandparent", "ancestors[task['task_id']][-2]")
-                if "parent" in rules_str:
-                    rules_str = rules_str.replace("parent", "ancestors[task['task_id']][-1]")
-                if "primogenitor" in rules_str:
-                    rules_str = rules_str.replace("primogenitor", "ancestors[task['task_id']][0]")
-                rules = eval(rules_str)
-                for k, v in rules.items():
-                    k = do_eval(k, task, ancestors)
-                    v = do_eval(v, task, ancestors)
-                    if k == "extend":
-                        if isinstance(v, list):
-                            for _ in v:
-                                custom_characterization.update(_)
-                        elif isinstance(v, dict):
-                            custom_characterization.update(v)
-                    elif k == "query":
-                        query = v
-                        new_filter = {}
-                        for fk, fv in query["filter"].items():
-                            new_filter[fk] = do_eval(fv, task, ancestors)
-                        try:
-                            docs = self.query(
-                                filter=new_filter,
-                                collection=query.get("collection", None),
-                                projection=query.get("projection"),
-                                remove_json_unserializables=True,
-                            )
-                            if docs is not None:
-                                if len(docs) == 1:
-                                    query_result = docs[0]
-                                    for dict_field in {"used", "generated", "custom_metadata"}:
-                                        if dict_field in query_result:
-                                            dict_value = query_result.pop(dict_field)
-                                            custom_characterization.update(dict_value)
-                                    custom_characterization.update(query_result)
-                                elif len(docs) > 1:
-                                    custom_characterization["query_result"] = docs
-                        except Exception as e:
-                            self.logger.exception(e)
-                            continue
-                    else:
-                        custom_characterization[k] = v
-                task["custom_characterization"] = custom_characterization
-
-    def _get_children_tasks_iterative(self, current_parent, result, max_depth=999, mapping=None):
-        queue = []
-        tasks_ancestors = {current_parent["task_id"]: []}
-        current_parent["ancestor_ids"] = []
-        current_parent["depth"] = 0
-
-        while current_parent["depth"] < max_depth:
-            tasks = []
-            rs = self._tasks_collection.find({"parent_task_id": current_parent["task_id"]}, projection={"_id": 0})
-
-            for task in rs:
-                if "finished" in task and task["status"] != Status.FINISHED.value:
-                    task["status"] = Status.FINISHED.value
-                tasks_ancestors[task["task_id"]] = tasks_ancestors[current_parent["task_id"]] + [current_parent]
-                task["ancestor_ids"] = current_parent["ancestor_ids"] + [
-                    {current_parent["activity_id"]: current_parent["task_id"]}
-                ]
-                task["depth"] = current_parent["depth"] + 1
-                if mapping is not None:
-                    self._resolve_mapping(task, mapping, tasks_ancestors)
-                tasks.append(task)
-
-            if len(tasks):
-                result.extend(tasks)
-                queue = tasks + queue
-
-            if len(queue):
-                current_parent = queue[0]
-                queue = queue[1:]
-            else:
-                break
@@ -0,0 +1,169 @@
+"""Parquet exporter module.
+
+Streams documents into a Parquet file with ``pyarrow.parquet.ParquetWriter``, one batch at a
+time, so exporting a collection needs memory for one batch only.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class ParquetExporter:
+    """Write documents to a Parquet file, batch by batch.
+
+    Fields listed in ``flatten_fields`` (by default ``used`` and ``generated``) are flattened into
+    one typed column per key, e.g., ``used.epoch``. Other nested values become JSON strings.
+
+    The schema evolves as batches arrive: new columns are added, integer columns that receive
+    floats become float columns, and columns with incompatible types become string columns.
+    Because a ParquetWriter has a fixed schema, each schema change starts a new part file in a
+    private temporary directory next to ``output_file``. The parts are merged into
+    ``output_file`` at the end, batch by batch, so concurrent exports never share files.
+
+    Parameters
+    ----------
+    output_file : str
+        Path of the Parquet file to write.
+    batch_size : int
+        Documents per batch. Each batch becomes at least one row group.
+    flatten_fields : list of str
+        Dict fields flattened into columns.
+    compression : str
+        Parquet compression codec.
+    """
+
+    def __init__(self, output_file: str, batch_size=10_000, flatten_fields=("used", "generated"), compression="zstd"):
+        self.output_file = output_file
+        self.batch_size = batch_size
+        self.flatten_fields = set(flatten_fields)
+        self.compression = compression
+        self._schema: pa.Schema = None
+        self._writer: pq.ParquetWriter = None
+        self._parts: List[str] = []
+        self._tmp_dir = None
+        self.rows_written = 0
+
+    def _flatten(self, doc: Dict) -> Dict:
+        row = {}
+        for key, value in doc.items():
+            if key in self.flatten_fields and isinstance(value, dict):
+                self._flatten_into(row, key, value)
+            else:
+                row[key] = self._to_scalar(value)
+        return row
+
+    def _flatten_into(self, row: Dict, prefix: str, value: Dict):
+        for k, v in value.items():
+            name = f"{prefix}.{k}"
+            if isinstance(v, dict) and v:
+                self._flatten_into(row, name, v)
+            else:
+                row[name] = self._to_scalar(v)
+
+    @staticmethod
+    def _to_scalar(value):
+        if isinstance(value, (dict, list, tuple)):
+            return json.dumps(value, default=str)
+        return value
+
+    @staticmethod
+    def _to_array(values: List) -> pa.Array:
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError, TypeError):
+            return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+    def _to_table(self, docs: List[Dict]) -> pa.Table:
+        rows = [self._flatten(doc) for doc in docs]
+        names = {}
+        for row in rows:
+            for k in row:
+                names.setdefault(k, None)
+        return pa.table({name: self._to_array([row.get(name) for row in rows]) for name in names})
+
+    @staticmethod
+    def _merge_type(current: pa.DataType, new: pa.DataType) -> pa.DataType:
+        if current == new or pa.types.is_null(new):
+            return current
+        if pa.types.is_null(current):
+            return new
+        numeric = (pa.types.is_integer, pa.types.is_floating)
+        if any(f(current) for f in numeric) and any(f(new) for f in numeric):
+            return pa.float64()
+        return pa.string()
+
+    @staticmethod
+    def _merge_schema(current: pa.Schema, new: pa.Schema) -> pa.Schema:
+        fields = []
+        for field in current:
+            if field.name in new.names:
+                field = pa.field(field.name, ParquetExporter._merge_type(field.type, new.field(field.name).type))
+            fields.append(field)
+        fields.extend(field for field in new if field.name not in current.names)
+        return pa.schema(fields)
+
+    @staticmethod
+    def _conform(table: pa.Table, schema: pa.Schema) -> pa.Table:
+        columns = []
+        for field in schema:
+            if field.name not in table.column_names:
+                columns.append(pa.nulls(len(table), type=field.type))
+            else:
+                column = table.column(field.name)
+                columns.append(column if column.type == field.type else column.cast(field.type))
+        return pa.table(columns, schema=schema)
+
+    def _open_part(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._tmp_dir is None:
+            out_dir = os.path.dirname(os.path.abspath(self.output_file))
+            self._tmp_dir = tempfile.mkdtemp(prefix=".flowcept_parquet_", dir=out_dir)
+        path = os.path.join(self._tmp_dir, f"part_{len(self._parts)}.parquet")
+        self._parts.append(path)
+        self._writer = pq.ParquetWriter(path, self._schema, compression=self.compression)
+
+    def _write_batch(self, docs: List[Dict]):
+        table = self._to_table(docs)
+        schema = table.schema if self._schema is None else self._merge_schema(self._schema, table.schema)
+        if self._schema is None or not schema.equals(self._schema):
+            self._schema = schema
+            self._open_part()
+        self._writer.write_table(self._conform(table, self._schema))
+        self.rows_written += len(table)
+
+    def _finish(self):
+        self._writer.close()
+        self._writer = None
+        if len(self._parts) == 1:
+            os.replace(self._parts[0], self.output_file)
+            return
+        with pq.ParquetWriter(self.output_file, self._schema, compression=self.compression) as writer:
+            for part in self._parts:
+                for batch in pq.ParquetFile(part).iter_batches(batch_size=self.batch_size):
+                    writer.write_table(self._conform(pa.Table.from_batches([batch]), self._schema))
+
+    def write(self, docs: Iterable[Dict]) -> int:
+        """Write the documents to ``output_file`` and return the number of rows written."""
+        try:
+            batch = []
+            for doc in docs:
+                batch.append(doc)
+                if len(batch) >= self.batch_size:
+                    self._write_batch(batch)
+                    batch = []
+            if batch or self._schema is None:
+                self._write_batch(batch)
+            self._finish()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+            if self._tmp_dir is not None:
+                shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        return self.rows_written
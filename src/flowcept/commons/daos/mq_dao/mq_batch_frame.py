@@ -0,0 +1,113 @@
+"""MQ batch frame module.
+
+A batch frame is a single MQ message carrying many Flowcept messages. On the wire it is a
+regular msgpack map, so consumers that do not know about frames see a message with an
+unknown ``type`` and skip it::
+
+    {"type": "flowcept_batch", "v": 1, "codec": "zlib", "n": 3, "payload": <bytes>}
+
+``payload`` is a msgpack array with the ``n`` serialized messages, optionally compressed
+with ``codec``. Transports that cannot carry bytes (e.g., Mofka's JSON metadata) use an
+uncompressed ``"messages"`` list instead of ``payload``.
+"""
+
+import zlib
+from typing import Dict, Iterator, List
+
+import msgpack
+
+from flowcept.commons.serializers import get_serializer
+
+BATCH_FRAME_TYPE = "flowcept_batch"
+BATCH_FRAME_VERSION = 1
+BATCH_FRAME_CODECS = {"none", "zlib", "zstd"}
+
+
+def _compress(payload: bytes, codec: str) -> bytes:
+    if codec == "none":
+        return payload
+    elif codec == "zlib":
+        return zlib.compress(payload, 1)
+    elif codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=1).compress(payload)
+    raise NotImplementedError(f"Unknown batch frame codec '{codec}'. Use one of {sorted(BATCH_FRAME_CODECS)}.")
+
+
+def _decompress(payload: bytes, codec: str) -> bytes:
+    if codec == "none":
+        return payload
+    elif codec == "zlib":
+        return zlib.decompress(payload)
+    elif codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise NotImplementedError(f"Unknown batch frame codec '{codec}'.")
+
+
+def build_batch_frame(serialized_messages: List[bytes], codec: str = "none") -> Dict:
+    """Build a batch frame from messages that were already serialized with msgpack.
+
+    Serializing each message separately lets the caller skip only the messages that fail to
+    serialize, as the single-message publishing path does.
+    """
+    packer = msgpack.Packer()
+    payload = packer.pack_array_header(len(serialized_messages)) + b"".join(serialized_messages)
+    return {
+        "type": BATCH_FRAME_TYPE,
+        "v": BATCH_FRAME_VERSION,
+        "codec": codec,
+        "n": len(serialized_messages),
+        "payload": _compress(payload, codec),
+    }
+
+
+def build_json_batch_frame(messages: List[Dict]) -> Dict:
+    """Build an uncompressed batch frame for transports that only carry JSON documents."""
+    return {
+        "type": BATCH_FRAME_TYPE,
+        "v": BATCH_FRAME_VERSION,
+        "codec": "none",
+        "n": len(messages),
+        "messages": messages,
+    }
+
+
+def is_batch_frame(msg_obj) -> bool:
+    """Return True if the message is a batch frame."""
+    return isinstance(msg_obj, dict) and msg_obj.get("type") == BATCH_FRAME_TYPE
+
+
+def unpack_batch_frame(frame: Dict) -> List[Dict]:
+    """Return the messages carried by a batch frame.
+
+    Raises
+    ------
+    ValueError
+        If the frame was produced with a newer, unsupported frame version.
+    """
+    version = frame.get("v")
+    if not isinstance(version, int) or version > BATCH_FRAME_VERSION:
+        raise ValueError(
+            f"Unsupported batch frame version {version}. This consumer supports up to v{BATCH_FRAME_VERSION}."
+        )
+    if "messages" in frame:
+        return frame["messages"]
+    payload = _decompress(frame["payload"], frame.get("codec", "none"))
+    return get_serializer("msgpack").loads(payload)
+
+
+def iter_messages(msg_obj: Dict, logger=None) -> Iterator[Dict]:
+    """Yield the message itself or, if it is a batch frame, each message it carries."""
+    if not is_batch_frame(msg_obj):
+        yield msg_obj
+        return
+    try:
+        messages = unpack_batch_frame(msg_obj)
+    except Exception as e:
+        if logger is not None:
+            logger.error(f"Rejecting batch frame: {e}")
+        return
+    yield from messages
@@ -0,0 +1,98 @@
+"""Async MQ module."""
+
+import asyncio
+
+from flowcept.commons.async_autoflush_buffer import AsyncAutoflushBuffer
+from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.configs import (
+    MQ_BUFFER_SIZE,
+    MQ_INSERTION_BUFFER_TIME,
+    MQ_BUFFER_CAPACITY,
+    MQ_SETTINGS,
+    MQ_TYPE,
+    MQ_REDIS_MODE,
+    MQ_TIMING,
+)
+
+
+class AsyncMQDao(object):
+    """Publisher of the messages intercepted from coroutines, bound to one asyncio event loop.
+
+    Messages go into an :class:`AsyncAutoflushBuffer` whose flushes are awaited on the loop.
+    This base class publishes each batch with the synchronous ``MQDao.bulk_publish`` of the
+    interceptor, in the loop's default executor, so any MQ type works without blocking the
+    loop. Transports with an asyncio client publish natively instead (see :meth:`build`).
+    Connection, serialization, and control messages remain the synchronous DAO's.
+    """
+
+    @staticmethod
+    def build(mq_dao) -> "AsyncMQDao":
+        """Build the async publisher for ``mq_dao``, the interceptor's synchronous DAO."""
+        if MQ_TYPE == "redis" and MQ_REDIS_MODE != "streams" and not MQ_TIMING:
+            if not MQ_SETTINGS.get("same_as_kvdb", False):
+                from flowcept.commons.daos.mq_dao.mq_dao_redis_async import AsyncMQDaoRedis
+
+                return AsyncMQDaoRedis(mq_dao)
+        return AsyncMQDao(mq_dao)
+
+    def __init__(self, mq_dao):
+        self.logger = FlowceptLogger()
+        self._mq_dao = mq_dao
+        self.buffer: AsyncAutoflushBuffer = None
+        self._loop_shutdown_hook = None
+        self._closed = False
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop the buffer is bound to."""
+        return self.buffer.loop if self.buffer is not None else None
+
+    def init_buffer(self) -> "AsyncMQDao":
+        """Create the buffer on the running event loop.
+
+        The loop's ``shutdown_asyncgens`` (called by ``asyncio.run`` before it closes the loop)
+        hands the messages not published yet to the synchronous buffer and closes this
+        publisher, so a loop closed without :meth:`stop` leaves no open connection behind.
+        """
+        self.buffer = AsyncAutoflushBuffer(
+            flush_function=self.bulk_publish,
+            max_size=MQ_BUFFER_SIZE,
+            flush_interval=MQ_INSERTION_BUFFER_TIME,
+            capacity=MQ_BUFFER_CAPACITY,
+        ).start()
+        self._loop_shutdown_hook = self._close_at_loop_shutdown()
+        try:
+            # Running the generator to its yield registers it with the loop.
+            self._loop_shutdown_hook.asend(None).send(None)
+        except StopIteration:
+            pass
+        return self
+
+    async def _close_at_loop_shutdown(self):
+        try:
+            yield
+        finally:
+            pending = self.buffer.drain()
+            if pending:
+                self._mq_dao.buffer.extend(pending)
+            await self.close()
+            self._loop_shutdown_hook = None  # Its finalizer refers to the loop.
+
+    async def bulk_publish(self, buffer):
+        """Publish a batch without blocking the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self._mq_dao.bulk_publish, buffer)
+
+    async def close(self):
+        """Release the connections of this publisher, once."""
+        if self._closed:
+            return
+        self._closed = True
+        await self._close()
+
+    async def _close(self):
+        pass
+
+    async def stop(self):
+        """Flush the buffer, awaiting the last publishes, and close the publisher."""
+        await self.buffer.stop()
+        await self.close()
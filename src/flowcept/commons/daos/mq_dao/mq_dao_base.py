@@ -1,13 +1,15 @@
 """MQ base module."""
 
 from abc import abstractmethod
-from typing import Union, List, Callable
+from typing import Union, List, Callable, Dict
 import csv
-import msgpack
+import zlib
 from time import time
 import flowcept.commons
-from flowcept.commons.autoflush_buffer import AutoflushBuffer
+from flowcept.commons.autoflush_buffer import AutoflushBuffer, BoundedAutoflushBuffer, build_autoflush_buffer
 from flowcept.commons.daos.keyvalue_dao import KeyValueDAO
+from flowcept.commons.daos.mq_dao.mq_batch_frame import build_batch_frame
+from flowcept.commons.serializers import get_serializer, set_wire_serializer
 from flowcept.commons.utils import chunked, buffer_to_disk, resolve_dump_buffer_path
 from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.configs import (
@@ -16,33 +18,59 @@ from flowcept.configs import (
     MQ_BUFFER_SIZE,
     MQ_INSERTION_BUFFER_TIME,
     MQ_CHUNK_SIZE,
+    MQ_BUFFER_ENGINE,
+    MQ_BUFFER_CAPACITY,
+    MQ_BUFFER_OVERFLOW_POLICY,
+    MQ_BUFFER_SPILL_PATH,
+    MQ_PUBLISHER_WORKERS,
+    MQ_PUBLISHER_QUEUE_SIZE,
+    MQ_BATCH_FRAMES,
+    MQ_BATCH_FRAME_CODEC,
     MQ_TYPE,
+    MQ_REDIS_MODE,
     MQ_TIMING,
     KVDB_ENABLED,
     MQ_ENABLED,
     DUMP_BUFFER_PATH,
+    DUMP_BUFFER_FORMAT,
     APPEND_WORKFLOW_ID_TO_PATH,
     APPEND_ID_TO_PATH,
+    DB_INSERTER_PARTITION_KEY,
 )
 
 from flowcept.commons.utils import GenericJSONEncoder
 
+_MSGPACK = get_serializer("msgpack")
+
 
 class MQDao(object):
     """MQ base class."""
 
     ENCODER = GenericJSONEncoder if JSON_SERIALIZER == "complex" else None
+    SERIALIZER = _MSGPACK  # Wire format shared by all MQ producers and consumers.
     # TODO we don't have a unit test to cover complex dict!
     MQ_THREAD_SET_ID = "started_mq_thread_execution"
     MQ_FLUSH_COMPLETE_SET_ID = "pending_mq_flush_complete"
+    # Set by transports with acknowledgements on each message delivered when manual_ack is True.
+    MSG_ID_FIELD = "_mq_msg_id"
+    # Whether the transport routes each Document Inserter partition to its own consumer (see partition_of).
+    PARTITIONED_CONSUMERS = False
 
     @staticmethod
     def build(*args, **kwargs) -> "MQDao":
         """Build it."""
         if not MQ_ENABLED:
+            # Offline messages end up in the buffer file, which is msgpack only with segments.
+            set_wire_serializer(_MSGPACK if DUMP_BUFFER_FORMAT == "segments" else None)
             return MQDao()
+        # Mofka sends the messages as JSON metadata.
+        set_wire_serializer(None if MQ_TYPE == "mofka" else MQDao.SERIALIZER)
+
+        if MQ_TYPE == "redis" and MQ_REDIS_MODE == "streams":
+            from flowcept.commons.daos.mq_dao.mq_dao_redis_streams import MQDaoRedisStreams
 
-        if MQ_TYPE == "redis":
+            return MQDaoRedisStreams(*args, **kwargs)
+        elif MQ_TYPE == "redis":
             from flowcept.commons.daos.mq_dao.mq_dao_redis import MQDaoRedis
 
             return MQDaoRedis(*args, **kwargs)
@@ -68,7 +96,17 @@ class MQDao(object):
         else:
             self._keyvalue_dao = None
         self._time_based_flushing_started = False
-        self.buffer: Union[AutoflushBuffer, List] = None
+        self.buffer: Union[AutoflushBuffer, BoundedAutoflushBuffer, List] = None
+        self._publisher_pool = None
+        # Consumer side. consumer_group is the name of the consumer kind (e.g., its class name),
+        # used by transports with consumer groups. With manual_ack, the consumer calls ack() itself.
+        self.consumer_group: str = None
+        self.manual_ack = False
+        # Set on the consumers of a DocumentInserterPool, on transports with PARTITIONED_CONSUMERS:
+        # partition is the index of the partition the consumer reads, and group_id the consumer
+        # group shared by all of them when mq.group_id is auto.
+        self.partition: int = None
+        self.group_id: str = None
         if MQ_TIMING:
             self._flush_events = []
             self.stop = self._stop_timed
@@ -77,17 +115,72 @@ class MQDao(object):
         else:
             self.stop = self._stop
 
+    @staticmethod
+    def partition_of(message: dict, n_partitions: int) -> int:
+        """Return the Document Inserter partition of a data message.
+
+        Tasks are partitioned by ``db_buffer.inserter_partition_key`` and workflows by
+        ``workflow_id``, so all messages of a task go to the same partition. Messages without
+        the key fall back to ``workflow_id``, then to partition 0.
+        """
+        if n_partitions <= 1:
+            return 0
+        is_workflow = message.get("type") == "workflow" or (
+            message.get("type") is None and "task_id" not in message and "activity_id" not in message
+        )
+        key = message.get("workflow_id") if is_workflow else message.get(DB_INSERTER_PARTITION_KEY)
+        if key is None:
+            key = message.get("workflow_id")
+        if key is None:
+            return 0
+        # Not hash(): it is salted per process, and producers and consumers must agree on the owner.
+        return zlib.crc32(str(key).encode()) % n_partitions
+
+    @staticmethod
+    def group_by_partition(buffer, n_partitions: int) -> Dict[int, List]:
+        """Split a buffer into the messages of each partition, keeping their order."""
+        if n_partitions <= 1:
+            return {0: buffer}
+        groups: Dict[int, List] = {}
+        for message in buffer:
+            groups.setdefault(MQDao.partition_of(message, n_partitions), []).append(message)
+        return groups
+
     @abstractmethod
-    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=_MSGPACK.dumps, producer=None):
         raise NotImplementedError()
 
-    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=_MSGPACK.dumps, producer=None):
         raise NotImplementedError()
 
+    def _serialize_buffer(self, buffer, serializer=_MSGPACK.dumps) -> List[bytes]:
+        """Serialize a buffer into the payloads to publish.
+
+        Returns one payload per message or, if ``mq.batch_frames`` is enabled, a single batch
+        frame carrying all of them. Messages that cannot be serialized are logged and skipped.
+        """
+        serialized = []
+        for message in buffer:
+            try:
+                serialized.append(serializer(message))
+            except Exception as e:
+                self.logger.exception(e)
+                self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
+                self.logger.error(f"Message that caused error: {message}")
+        if MQ_BATCH_FRAMES and serialized:
+            return [serializer(build_batch_frame(serialized, MQ_BATCH_FRAME_CODEC))]
+        return serialized
+
+    def _build_producer(self):
+        """Build a dedicated producer for a publisher worker. None means sharing the DAO's producer."""
+        return None
+
     def bulk_publish(self, buffer):
         """Publish it."""
         # self.logger.info(f"Going to flush {len(buffer)} to MQ...")
-        if MQ_CHUNK_SIZE > 1:
+        if self._publisher_pool is not None:
+            self._publisher_pool.submit(buffer)
+        elif MQ_CHUNK_SIZE > 1:
             for chunk in chunked(buffer, MQ_CHUNK_SIZE):
                 self._bulk_publish(chunk)
         else:
@@ -155,10 +248,24 @@ class MQDao(object):
         """Create the buffer."""
         if not self.started:
             if flowcept.configs.DB_FLUSH_MODE == "online":
-                self.buffer = AutoflushBuffer(
+                if MQ_PUBLISHER_WORKERS > 1:
+                    from flowcept.commons.daos.mq_dao.mq_publisher_pool import MQPublisherPool
+
+                    self._publisher_pool = MQPublisherPool(
+                        publish_function=lambda chunk, producer: self._bulk_publish(chunk, producer=producer),
+                        n_workers=MQ_PUBLISHER_WORKERS,
+                        producer_factory=self._build_producer,
+                        chunk_size=MQ_CHUNK_SIZE,
+                        max_queued_chunks=MQ_PUBLISHER_QUEUE_SIZE,
+                    )
+                self.buffer = build_autoflush_buffer(
                     flush_function=self.bulk_publish,
+                    engine=MQ_BUFFER_ENGINE,
                     max_size=MQ_BUFFER_SIZE,
                     flush_interval=MQ_INSERTION_BUFFER_TIME,
+                    capacity=MQ_BUFFER_CAPACITY,
+                    overflow_policy=MQ_BUFFER_OVERFLOW_POLICY,
+                    spill_path=MQ_BUFFER_SPILL_PATH,
                 )
                 if check_safe_stops:
                     self.register_time_based_thread_init(interceptor_instance_id, exec_bundle_id)
@@ -169,7 +276,11 @@ class MQDao(object):
 
     def _close_buffer(self):
         if flowcept.configs.DUMP_BUFFER_ENABLED and DUMP_BUFFER_PATH is not None:
-            _buf = self.buffer.current_buffer if isinstance(self.buffer, AutoflushBuffer) else self.buffer
+            _buf = (
+                self.buffer.current_buffer
+                if isinstance(self.buffer, (AutoflushBuffer, BoundedAutoflushBuffer))
+                else self.buffer
+            )
             dump_path = resolve_dump_buffer_path(
                 DUMP_BUFFER_PATH,
                 flowcept.Flowcept.current_workflow_id,
@@ -181,6 +292,10 @@ class MQDao(object):
         if flowcept.configs.DB_FLUSH_MODE == "online":
             if self._time_based_flushing_started:
                 self.buffer.stop()
+                if self._publisher_pool is not None:
+                    self.logger.debug(f"MQ publisher pool metrics: {self._publisher_pool.metrics}")
+                    self._publisher_pool.stop()
+                    self._publisher_pool = None
                 self._time_based_flushing_started = False
                 self.logger.debug("MQ time-based flushed for the last time!")
             else:
@@ -241,15 +356,19 @@ class MQDao(object):
         self.send_message(msg)
 
     @abstractmethod
-    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=_MSGPACK.dumps):
         """Send a message."""
         raise NotImplementedError()
 
     @abstractmethod
-    def _send_message_timed(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _send_message_timed(self, message: dict, channel=MQ_CHANNEL, serializer=_MSGPACK.dumps):
         """Send a message."""
         raise NotImplementedError()
 
+    def ack(self, msg_ids: List):
+        """Acknowledge messages consumed with ``manual_ack``. No-op for transports without acks."""
+        pass
+
     @abstractmethod
     def message_listener(self, message_handler: Callable):
         """Get message listener."""
@@ -1,8 +1,7 @@
 """MQ kafka module."""
 
-from typing import Callable
+from typing import Callable, Dict, Set
 from time import time
-import msgpack
 
 import os
 from uuid import uuid4
@@ -10,6 +9,7 @@ from uuid import uuid4
 from confluent_kafka import Producer, Consumer, KafkaError
 from confluent_kafka.admin import AdminClient
 
+from flowcept.commons.daos.mq_dao.mq_batch_frame import iter_messages
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
 from flowcept.configs import (
     MQ_CHANNEL,
@@ -20,7 +20,21 @@ from flowcept.configs import (
 
 
 class MQDaoKafka(MQDao):
-    """MQ kafka class."""
+    """MQ kafka class.
+
+    Each data message is produced to the topic partition given by ``MQDao.partition_of`` over the
+    number of partitions of the topic, so all messages of a task land in the same partition. The
+    workers of a DocumentInserterPool share one consumer group, and Kafka assigns the topic
+    partitions among them; the topic needs at least ``db_buffer.inserter_workers`` partitions for
+    all of them to receive messages.
+
+    Control messages are produced to every partition and handed to the message handler once they
+    were received from all the partitions assigned to the consumer, so that they are handled once,
+    after all the data produced before them.
+    """
+
+    PARTITIONED_CONSUMERS = True
+    BROADCAST_ID_FIELD = "_mq_broadcast_id"
 
     def __init__(self, adapter_settings=None):
         super().__init__(adapter_settings)
@@ -30,12 +44,25 @@ class MQDaoKafka(MQDao):
         }
         self._producer = Producer(self._kafka_conf)
         self._consumer = None
+        self._n_partitions = None
+        self._broadcasts: Dict[str, Set[int]] = {}
+
+    def _topic_partitions(self) -> int:
+        """Return the number of partitions of the topic, read once from the cluster metadata."""
+        if self._n_partitions is None:
+            try:
+                topic = self._producer.list_topics(MQ_CHANNEL, timeout=5).topics.get(MQ_CHANNEL)
+                self._n_partitions = max(len(topic.partitions), 1) if topic is not None else 1
+            except Exception as e:
+                self.logger.exception(e)
+                return 1
+        return self._n_partitions
 
     def subscribe(self):
         """Subscribe to the interception channel."""
         group_id = MQ_GROUP_ID
         if not group_id or group_id == "auto":
-            group_id = f"flowcept_{os.getpid()}_{uuid4().hex[:8]}"
+            group_id = self.group_id or f"flowcept_{os.getpid()}_{uuid4().hex[:8]}"
         self._kafka_conf.update(
             {
                 "group.id": group_id,
@@ -59,53 +86,81 @@ class MQDaoKafka(MQDao):
                     else:
                         self.logger.error(f"Consumer error: {msg.error()}")
                         break
-                message = msgpack.loads(msg.value(), raw=False, strict_map_key=False)
+                message = self.SERIALIZER.loads(msg.value())
                 self.logger.debug(f"Received message: {message}")
-                if not message_handler(message):
+                if isinstance(message, dict) and self.BROADCAST_ID_FIELD in message:
+                    if not self._broadcast_complete(message, msg.partition()):
+                        continue
+                if not all(message_handler(item) for item in iter_messages(message, self.logger)):
                     break
         except Exception as e:
             self.logger.exception(e)
         finally:
             self.unsubscribe()
 
-    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _broadcast_complete(self, message: dict, partition: int) -> bool:
+        """Record a broadcast copy. True once it was received from all the partitions assigned to us."""
+        broadcast_id = message[self.BROADCAST_ID_FIELD]
+        seen = self._broadcasts.setdefault(broadcast_id, set())
+        seen.add(partition)
+        assigned = {tp.partition for tp in self._consumer.assignment() if tp.topic == MQ_CHANNEL}
+        if not assigned <= seen:
+            return False
+        del self._broadcasts[broadcast_id]
+        message.pop(self.BROADCAST_ID_FIELD)
+        return True
+
+    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps):
         """Send the message."""
-        self._producer.produce(channel, key=channel, value=serializer(message))
+        n_partitions = self._topic_partitions()
+        if message.get("type") == "flowcept_control":
+            payload = serializer({**message, self.BROADCAST_ID_FIELD: uuid4().hex})
+            for partition in range(n_partitions):
+                self._producer.produce(channel, value=payload, partition=partition)
+        else:
+            partition = self.partition_of(message, n_partitions)
+            self._producer.produce(channel, value=serializer(message), partition=partition)
         self._producer.flush()
 
-    def _send_message_timed(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _send_message_timed(self, message: dict, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps):
         t1 = time()
         self.send_message(message, channel, serializer)
         t2 = time()
         self._flush_events.append(["single", t1, t2, t2 - t1, len(str(message).encode())])
 
-    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
-        for message in buffer:
-            try:
-                self._producer.produce(channel, key=channel, value=serializer(message))
-            except Exception as e:
-                self.logger.exception(e)
-                self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
-                self.logger.error(f"Message that caused error: {message}")
+    def _build_producer(self):
+        """Build a dedicated Kafka producer for a publisher worker."""
+        return Producer({"bootstrap.servers": self._kafka_conf["bootstrap.servers"]})
+
+    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps, producer=None):
+        producer = producer or self._producer
+        for partition, messages in self.group_by_partition(buffer, self._topic_partitions()).items():
+            for payload in self._serialize_buffer(messages, serializer):
+                try:
+                    producer.produce(channel, value=payload, partition=partition)
+                except Exception as e:
+                    self.logger.exception(e)
+                    self.logger.error("Some messages couldn't be flushed!")
         try:
-            self._producer.flush()
+            producer.flush()
             self.logger.info(f"Flushed {len(buffer)} msgs to MQ!")
         except Exception as e:
             self.logger.exception(e)
 
-    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps, producer=None):
+        producer = producer or self._producer
         total = 0
-        for message in buffer:
-            try:
-                self._producer.produce(channel, key=channel, value=serializer(message))
-                total += len(str(message).encode())
-            except Exception as e:
-                self.logger.exception(e)
-                self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
-                self.logger.error(f"Message that caused error: {message}")
+        for partition, messages in self.group_by_partition(buffer, self._topic_partitions()).items():
+            for payload in self._serialize_buffer(messages, serializer):
+                try:
+                    producer.produce(channel, value=payload, partition=partition)
+                    total += len(payload)
+                except Exception as e:
+                    self.logger.exception(e)
+                    self.logger.error("Some messages couldn't be flushed!")
         try:
             t1 = time()
-            self._producer.flush()
+            producer.flush()
             t2 = time()
             self._flush_events.append(["bulk", t1, t2, t2 - t1, total])
             self.logger.info(f"Flushed {len(buffer)} msgs to MQ!")
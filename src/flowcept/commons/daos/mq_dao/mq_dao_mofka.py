@@ -1,15 +1,15 @@
 import uuid
 from typing import Callable
 
-import msgpack
 from time import time
 import json
 
 import mochi.mofka.client as mofka
 from mochi.mofka.client import ThreadPool, AdaptiveBatchSize
 
+from flowcept.commons.daos.mq_dao.mq_batch_frame import build_json_batch_frame, iter_messages
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
-from flowcept.configs import MQ_SETTINGS, MQ_CHANNEL
+from flowcept.configs import MQ_SETTINGS, MQ_CHANNEL, MQ_BATCH_FRAMES
 
 
 class MQDaoMofka(MQDao):
@@ -45,29 +45,32 @@ class MQDaoMofka(MQDao):
                 event = self.consumer.pull().wait()
                 message = json.loads(event.metadata)
                 self.logger.debug(f"Received message: {message}")
-                if not message_handler(message):
+                if not all(message_handler(item) for item in iter_messages(message, self.logger)):
                     break
         except Exception as e:
             self.logger.exception(e)
         finally:
             pass
 
-    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps):
         """Send a single message to Mofka."""
         self.producer.push(metadata=message)  # using metadata to send data
         self.producer.flush()
 
-    def _send_message_timed(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _send_message_timed(self, message: dict, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps):
         t1 = time()
         self.send_message(message, channel, serializer)
         t2 = time()
         self._flush_events.append(["single", t1, t2, t2 - t1, len(str(message).encode())])
 
-    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps, producer=None):
         try:
             # self.logger.debug(f"Going to send Message:\n\t[BEGIN_MSG]{buffer}\n[END_MSG]\t")
-            for m in buffer:
-                self.producer.push(m)
+            if MQ_BATCH_FRAMES:
+                self.producer.push(build_json_batch_frame(buffer))
+            else:
+                for m in buffer:
+                    self.producer.push(m)
 
         except Exception as e:
             self.logger.exception(e)
@@ -79,14 +82,18 @@ class MQDaoMofka(MQDao):
         except Exception as e:
             self.logger.exception(e)
 
-    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps, producer=None):
         total = 0
         try:
             # self.logger.debug(f"Going to send Message:\n\t[BEGIN_MSG]{buffer}\n[END_MSG]\t")
 
-            for m in buffer:
-                self.producer.push(m)
-                total += len(str(m).encode())
+            if MQ_BATCH_FRAMES:
+                self.producer.push(build_json_batch_frame(buffer))
+                total += len(str(buffer).encode())
+            else:
+                for m in buffer:
+                    self.producer.push(m)
+                    total += len(str(m).encode())
 
         except Exception as e:
             self.logger.exception(e)
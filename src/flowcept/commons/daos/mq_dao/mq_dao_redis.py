@@ -4,9 +4,9 @@ from threading import Thread
 from typing import Callable
 import redis
 
-import msgpack
 from time import time, sleep
 
+from flowcept.commons.daos.mq_dao.mq_batch_frame import iter_messages
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
 from flowcept.commons.daos.redis_conn import RedisConn
 from flowcept.configs import MQ_CHANNEL, MQ_HOST, MQ_PORT, MQ_PASSWORD, MQ_URI, MQ_SETTINGS, KVDB_ENABLED
@@ -86,10 +86,13 @@ class MQDaoRedis(MQDao):
                         continue
 
                     try:
-                        msg_obj = msgpack.loads(message["data"], strict_map_key=False)
+                        msg_obj = self.SERIALIZER.loads(message["data"])
                         # self.logger.debug(f"In mq dao redis, received msg!  {msg_obj}")
-                        if not message_handler(msg_obj):
-                            should_continue = False  # Break While loop
+                        for item in iter_messages(msg_obj, self.logger):
+                            if not message_handler(item):
+                                should_continue = False  # Break While loop
+                                break
+                        if not should_continue:
                             break  # Break For loop
                     except Exception as e:
                         self.logger.error(f"Failed to process message {message}")
@@ -112,43 +115,39 @@ class MQDaoRedis(MQDao):
                 self.logger.exception(e)
                 continue
 
-    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps):
         """Send the message."""
         self._producer.publish(channel, serializer(message))
 
-    def _send_message_timed(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _send_message_timed(self, message: dict, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps):
         """Send the message using timing for performance evaluation."""
         t1 = time()
         self.send_message(message, channel, serializer)
         t2 = time()
         self._flush_events.append(["single", t1, t2, t2 - t1, len(str(message).encode())])
 
-    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
-        pipe = self._producer.pipeline()
-        for message in buffer:
-            try:
-                pipe.publish(channel, serializer(message))
-            except Exception as e:
-                self.logger.exception(e)
-                self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
-                self.logger.error(f"Message that caused error: {message}")
+    def _build_producer(self):
+        """Build a dedicated Redis connection for a publisher worker."""
+        if MQ_SETTINGS.get("same_as_kvdb", False):
+            return None
+        return RedisConn.build_redis_conn_pool(host=MQ_HOST, port=MQ_PORT, password=MQ_PASSWORD, uri=MQ_URI)
+
+    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps, producer=None):
+        pipe = (producer or self._producer).pipeline()
+        for payload in self._serialize_buffer(buffer, serializer):
+            pipe.publish(channel, payload)
         try:
             pipe.execute()
             self.logger.debug(f"Flushed {len(buffer)} msgs to MQ!")
         except Exception as e:
             self.logger.exception(e)
 
-    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
+    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps, producer=None):
         total = 0
-        pipe = self._producer.pipeline()
-        for message in buffer:
-            try:
-                total += len(str(message).encode())
-                pipe.publish(channel, serializer(message))
-            except Exception as e:
-                self.logger.exception(e)
-                self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
-                self.logger.error(f"Message that caused error: {message}")
+        pipe = (producer or self._producer).pipeline()
+        for payload in self._serialize_buffer(buffer, serializer):
+            total += len(payload)
+            pipe.publish(channel, payload)
         try:
             t1 = time()
             pipe.execute()
@@ -0,0 +1,46 @@
+"""Async MQ redis module."""
+
+from redis import asyncio as redis_asyncio
+
+from flowcept.commons.daos.mq_dao.mq_dao_async import AsyncMQDao
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.configs import MQ_CHANNEL, MQ_HOST, MQ_PORT, MQ_PASSWORD, MQ_URI, MQ_CHUNK_SIZE
+from flowcept.commons.utils import chunked
+
+
+class AsyncMQDaoRedis(AsyncMQDao):
+    """Async MQ redis class, publishing with a ``redis.asyncio`` connection pool."""
+
+    def __init__(self, mq_dao):
+        super().__init__(mq_dao)
+        pool_kwargs = {
+            "db": 0,
+            "password": MQ_PASSWORD,
+            "decode_responses": False,
+            "socket_keepalive": True,
+        }
+        if MQ_URI:
+            self._producer = redis_asyncio.Redis.from_url(MQ_URI, **pool_kwargs)
+        else:
+            self._producer = redis_asyncio.Redis(host=MQ_HOST, port=MQ_PORT, **pool_kwargs)
+
+    async def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps):
+        pipe = self._producer.pipeline(transaction=False)
+        for payload in self._mq_dao._serialize_buffer(buffer, serializer):
+            pipe.publish(channel, payload)
+        try:
+            await pipe.execute()
+            self.logger.debug(f"Flushed {len(buffer)} msgs to MQ!")
+        except Exception as e:
+            self.logger.exception(e)
+
+    async def bulk_publish(self, buffer):
+        """Publish a batch with pipelined, awaited PUBLISH commands."""
+        if MQ_CHUNK_SIZE > 1:
+            for chunk in chunked(buffer, MQ_CHUNK_SIZE):
+                await self._bulk_publish(chunk)
+        else:
+            await self._bulk_publish(buffer)
+
+    async def _close(self):
+        await self._producer.aclose()
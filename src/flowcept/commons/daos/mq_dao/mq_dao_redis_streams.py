@@ -0,0 +1,277 @@
+"""MQ Redis Streams module."""
+
+import os
+import socket
+from threading import Lock
+from time import sleep, time
+from typing import Callable, Dict, List
+
+import redis
+
+from flowcept.commons.daos.mq_dao.mq_batch_frame import iter_messages
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.commons.daos.mq_dao.mq_dao_redis import MQDaoRedis
+from flowcept.configs import (
+    MQ_CHANNEL,
+    MQ_STREAM_GROUP,
+    MQ_STREAM_CONSUMER,
+    MQ_STREAM_MAXLEN,
+    MQ_STREAM_READ_COUNT,
+    MQ_STREAM_BLOCK_MS,
+    MQ_STREAM_CLAIM_IDLE_MS,
+    DB_INSERTER_WORKERS,
+)
+
+
+class MQDaoRedisStreams(MQDaoRedis):
+    """MQ Redis Streams class.
+
+    Data messages are appended with ``XADD`` to the ``MQ_CHANNEL`` stream, trimmed to about
+    ``stream_maxlen`` entries, and read with ``XREADGROUP``. Consumers sharing a group split the
+    entries among themselves, and entries stay pending until acknowledged, so a consumer that
+    crashes resumes from its last acknowledged entry, and entries pending for longer than
+    ``stream_claim_idle_ms`` are claimed by the next consumer that subscribes.
+
+    With ``db_buffer.inserter_workers`` greater than 1, producers append each data message to the
+    ``<channel>:<partition>`` stream of its Document Inserter partition (see
+    ``MQDao.partition_of``). The workers of a DocumentInserterPool share one consumer group, and
+    each of them reads the stream of its own partition, so every entry is read and decoded once
+    and all messages of a task reach the same worker. Other consumers read all partition streams.
+
+    Control messages (e.g., ``stop_document_inserter``) go to a separate ``<channel>:control``
+    stream that every consumer reads without a group, since each consumer must see them.
+
+    By default an entry is acknowledged once the message handler returned for all messages it
+    carries. Consumers that persist messages asynchronously set ``manual_ack`` and call
+    :meth:`ack` with the ids found in ``MQDao.MSG_ID_FIELD`` once the messages are persisted.
+    """
+
+    CONTROL_STREAM_MAXLEN = 10_000
+    PARTITIONED_CONSUMERS = True
+
+    def __init__(self, adapter_settings=None):
+        super().__init__(adapter_settings)
+        self._stream = MQ_CHANNEL
+        self._n_partitions = DB_INSERTER_WORKERS
+        self._control_stream = f"{MQ_CHANNEL}:control"
+        self._consumer_name = MQ_STREAM_CONSUMER or f"{socket.gethostname()}_{os.getpid()}"
+        self._control_last_id = None
+        self._unacked: Dict[str, int] = {}
+        self._unacked_lock = Lock()
+
+    def _data_stream(self, partition: int) -> str:
+        return f"{self._stream}:{partition}" if self._n_partitions > 1 else self._stream
+
+    @property
+    def streams(self) -> List[str]:
+        """Data streams this consumer reads: the one of its partition, if set, or all of them."""
+        if self.partition is not None:
+            return [self._data_stream(self.partition)]
+        return [self._data_stream(i) for i in range(self._n_partitions)]
+
+    @property
+    def consumer_name(self) -> str:
+        """Consumer name in the group, suffixed with the partition for the workers of a pool."""
+        if self.partition is not None:
+            return f"{self._consumer_name}:{self.partition}"
+        return self._consumer_name
+
+    @property
+    def group_name(self) -> str:
+        """Consumer group name: the ``stream_group`` prefix plus the consumer class, if known."""
+        if self.consumer_group:
+            return f"{MQ_STREAM_GROUP}:{self.consumer_group}"
+        return MQ_STREAM_GROUP
+
+    def subscribe(self):
+        """Create the consumer group if needed and claim entries abandoned by crashed consumers."""
+        for stream in self.streams:
+            try:
+                self._producer.xgroup_create(stream, self.group_name, id="0", mkstream=True)
+            except redis.exceptions.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        last_control = self._producer.xrevrange(self._control_stream, count=1)
+        self._control_last_id = last_control[0][0] if last_control else "0-0"
+        self._claim_idle_entries()
+
+    def _claim_idle_entries(self):
+        for stream in self.streams:
+            start_id = "0-0"
+            while True:
+                next_id, claimed, *_ = self._producer.xautoclaim(
+                    stream,
+                    self.group_name,
+                    self.consumer_name,
+                    min_idle_time=MQ_STREAM_CLAIM_IDLE_MS,
+                    start_id=start_id,
+                    count=MQ_STREAM_READ_COUNT,
+                )
+                if claimed:
+                    self.logger.warning(f"Claimed {len(claimed)} entries of {stream} left pending by other consumers.")
+                if next_id in {b"0-0", "0-0"}:
+                    break
+                start_id = next_id
+
+    def unsubscribe(self):
+        """Nothing to do: the consumer group keeps the position of this consumer."""
+        pass
+
+    def ack(self, msg_ids: List):
+        """Acknowledge messages delivered with ``manual_ack``.
+
+        An entry carrying a batch frame is acknowledged when all its messages were acknowledged.
+        Message ids are ``<stream>/<entry id>``.
+        """
+        ready = []
+        with self._unacked_lock:
+            for msg_id in msg_ids:
+                remaining = self._unacked.get(msg_id, 1) - 1
+                if remaining > 0:
+                    self._unacked[msg_id] = remaining
+                else:
+                    self._unacked.pop(msg_id, None)
+                    ready.append(msg_id)
+        self._xack(ready)
+
+    def _xack(self, msg_ids: List):
+        by_stream: Dict[str, List] = {}
+        for msg_id in msg_ids:
+            stream, _, entry_id = msg_id.rpartition("/")
+            by_stream.setdefault(stream, []).append(entry_id)
+        for stream, entry_ids in by_stream.items():
+            self._producer.xack(stream, self.group_name, *entry_ids)
+
+    def _read_entries(self, read_ids: Dict[str, str]) -> Dict[str, List]:
+        """Read the entries after each stream's id. Blocks only if all streams are read with ``>``."""
+        response = self._producer.xreadgroup(
+            self.group_name,
+            self.consumer_name,
+            read_ids,
+            count=MQ_STREAM_READ_COUNT,
+            block=MQ_STREAM_BLOCK_MS if all(i == ">" for i in read_ids.values()) else None,
+        )
+        return {(s.decode() if isinstance(s, bytes) else s): entries for s, entries in response or []}
+
+    def _read_control_messages(self) -> List[Dict]:
+        response = self._producer.xread({self._control_stream: self._control_last_id}, count=MQ_STREAM_READ_COUNT)
+        if not response:
+            return []
+        entries = response[0][1]
+        self._control_last_id = entries[-1][0]
+        return [self.SERIALIZER.loads(fields[b"data"]) for _, fields in entries]
+
+    def _handle_entries(self, stream: str, entries: List, message_handler: Callable) -> bool:
+        """Hand the messages in the entries to the handler. Returns False if the handler asked to stop."""
+        to_ack = []
+        try:
+            for entry_id, fields in entries:
+                msg_id = f"{stream}/{entry_id.decode()}"
+                try:
+                    items = list(iter_messages(self.SERIALIZER.loads(fields[b"data"]), self.logger))
+                except Exception as e:
+                    self.logger.error(f"Failed to decode stream entry {msg_id}. Acknowledging it.")
+                    self.logger.exception(e)
+                    to_ack.append(msg_id)
+                    continue
+
+                if self.manual_ack:
+                    tracked = [item for item in items if isinstance(item, dict)]
+                    for item in tracked:
+                        item[MQDao.MSG_ID_FIELD] = msg_id
+                    if tracked:
+                        with self._unacked_lock:
+                            self._unacked[msg_id] = len(tracked)
+                    else:
+                        to_ack.append(msg_id)
+                for item in items:
+                    if not message_handler(item):
+                        return False
+                if not self.manual_ack:
+                    to_ack.append(msg_id)
+            return True
+        finally:
+            self._xack(to_ack)
+
+    def message_listener(self, message_handler: Callable):
+        """Read entries with XREADGROUP, first this consumer's pending ones, then new ones."""
+        max_retrials = 10
+        current_trials = 0
+        should_continue = True
+        read_ids = dict.fromkeys(self.streams, "0")
+        control_messages = []
+        while should_continue and current_trials < max_retrials:
+            try:
+                # Control messages are read before the data, so a short read of new entries on every
+                # stream means that all the data published before them was delivered to the group.
+                # Only then we handle them.
+                control_messages.extend(self._read_control_messages())
+                reading_new = all(i == ">" for i in read_ids.values())
+                responses = self._read_entries(read_ids)
+                for stream, read_id in read_ids.items():
+                    if read_id != ">":
+                        entries = responses.get(stream)
+                        read_ids[stream] = entries[-1][0] if entries else ">"
+                for stream, entries in responses.items():
+                    should_continue = self._handle_entries(stream, entries, message_handler)
+                    if not should_continue:
+                        break
+                caught_up = reading_new and all(len(e) < MQ_STREAM_READ_COUNT for e in responses.values())
+                if should_continue and caught_up:
+                    while should_continue and control_messages:
+                        should_continue = message_handler(control_messages.pop(0))
+                current_trials = 0
+            except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
+                current_trials += 1
+                self.logger.critical(f"Redis connection lost: {e}. Trying to reconnect in 3 seconds...")
+                sleep(3)
+                try:
+                    self.subscribe()
+                    read_ids = dict.fromkeys(self.streams, "0")
+                    self.logger.warning(f"Redis reconnected after {current_trials} trials.")
+                    current_trials = 0
+                except Exception as e:
+                    self.logger.critical(f"Redis error when trying to reconnect: {e}.")
+            except Exception as e:
+                self.logger.exception(e)
+                continue
+
+    def _stream_for(self, message: dict) -> str:
+        if message.get("type") == "flowcept_control":
+            return self._control_stream
+        return self._data_stream(self.partition_of(message, self._n_partitions))
+
+    def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps):
+        """Send the message."""
+        stream = self._stream_for(message)
+        maxlen = self.CONTROL_STREAM_MAXLEN if stream == self._control_stream else MQ_STREAM_MAXLEN
+        self._producer.xadd(stream, {"data": serializer(message)}, maxlen=maxlen, approximate=True)
+
+    def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps, producer=None):
+        pipe = (producer or self._producer).pipeline(transaction=False)
+        for partition, messages in self.group_by_partition(buffer, self._n_partitions).items():
+            stream = self._data_stream(partition)
+            for payload in self._serialize_buffer(messages, serializer):
+                pipe.xadd(stream, {"data": payload}, maxlen=MQ_STREAM_MAXLEN, approximate=True)
+        try:
+            pipe.execute()
+            self.logger.debug(f"Flushed {len(buffer)} msgs to MQ!")
+        except Exception as e:
+            self.logger.exception(e)
+
+    def _bulk_publish_timed(self, buffer, channel=MQ_CHANNEL, serializer=MQDao.SERIALIZER.dumps, producer=None):
+        total = 0
+        pipe = (producer or self._producer).pipeline(transaction=False)
+        for partition, messages in self.group_by_partition(buffer, self._n_partitions).items():
+            stream = self._data_stream(partition)
+            for payload in self._serialize_buffer(messages, serializer):
+                total += len(payload)
+                pipe.xadd(stream, {"data": payload}, maxlen=MQ_STREAM_MAXLEN, approximate=True)
+        try:
+            t1 = time()
+            pipe.execute()
+            t2 = time()
+            self._flush_events.append(["bulk", t1, t2, t2 - t1, total])
+            self.logger.debug(f"Flushed {len(buffer)} msgs to MQ!")
+        except Exception as e:
+            self.logger.exception(e)
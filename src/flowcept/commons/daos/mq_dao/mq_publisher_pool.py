@@ -0,0 +1,128 @@
+"""MQ publisher pool module."""
+
+from collections import deque
+from queue import Queue
+from threading import Thread
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.utils import chunked
+
+
+class MQPublisherPool:
+    """Pool of publisher threads that publish MQ chunks concurrently.
+
+    Messages are partitioned by ``workflow_id`` so that all messages of a workflow are
+    published by the same worker, in the order they were submitted. Each worker owns a
+    producer built by ``producer_factory`` (e.g., its own Redis connection or Kafka
+    producer), which is passed to ``publish_function`` as the ``producer`` keyword.
+
+    Parameters
+    ----------
+    publish_function : Callable
+        Function called as ``publish_function(chunk, producer=producer)``.
+    n_workers : int
+        Number of publisher threads.
+    producer_factory : Callable, optional
+        Builds one producer per worker. If None, workers pass ``producer=None``.
+    chunk_size : int, optional
+        Max number of messages per published chunk. Values <= 1 publish each partition as one chunk.
+    max_queued_chunks : int, optional
+        Max chunks waiting per worker. Submitting blocks when a worker queue is full.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        publish_function: Callable,
+        n_workers: int,
+        producer_factory: Callable = None,
+        chunk_size: int = -1,
+        max_queued_chunks: int = 0,
+    ):
+        self.logger = FlowceptLogger()
+        self._publish_function = publish_function
+        self._producer_factory = producer_factory
+        self._n_workers = max(1, int(n_workers))
+        self._chunk_size = chunk_size
+        self._queues: List[Queue] = [Queue(maxsize=max_queued_chunks) for _ in range(self._n_workers)]
+        self._chunk_latencies = deque(maxlen=1024)
+        # Counters per worker: each worker only updates its own, so no lock is needed.
+        self._published_chunks = [0] * self._n_workers
+        self._published_msgs = [0] * self._n_workers
+        self._threads = [
+            Thread(target=self._worker, args=(i,), daemon=True, name=f"flowcept_mq_publisher_{i}")
+            for i in range(self._n_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _worker(self, worker_idx: int):
+        q = self._queues[worker_idx]
+        producer = None
+        if self._producer_factory is not None:
+            producer = self._producer_factory()
+        while True:
+            chunk = q.get()
+            try:
+                if chunk is MQPublisherPool._STOP:
+                    break
+                t0 = perf_counter()
+                self._publish_function(chunk, producer=producer)
+                self._chunk_latencies.append(perf_counter() - t0)
+                self._published_chunks[worker_idx] += 1
+                self._published_msgs[worker_idx] += len(chunk)
+            except Exception as e:
+                self.logger.exception(e)
+            finally:
+                q.task_done()
+
+    def _partition(self, buffer) -> List[List]:
+        if self._n_workers == 1:
+            return [buffer]
+        partitions = [[] for _ in range(self._n_workers)]
+        for msg in buffer:
+            partitions[hash(msg.get("workflow_id")) % self._n_workers].append(msg)
+        return partitions
+
+    def submit(self, buffer):
+        """Partition the buffer by workflow_id and enqueue its chunks to the workers."""
+        for worker_idx, partition in enumerate(self._partition(buffer)):
+            if not partition:
+                continue
+            if self._chunk_size > 1:
+                for chunk in chunked(partition, self._chunk_size):
+                    self._queues[worker_idx].put(chunk)
+            else:
+                self._queues[worker_idx].put(partition)
+
+    def join(self):
+        """Block until every submitted chunk has been published."""
+        for q in self._queues:
+            q.join()
+
+    def stop(self):
+        """Publish all pending chunks and stop the workers."""
+        for q in self._queues:
+            q.put(MQPublisherPool._STOP)
+        for t in self._threads:
+            t.join()
+
+    @property
+    def metrics(self) -> Dict:
+        """Return queue depths and per-chunk publish latencies (in seconds)."""
+        latencies = list(self._chunk_latencies)
+        depths = [q.qsize() for q in self._queues]
+        return {
+            "workers": self._n_workers,
+            "queue_depth": sum(depths),
+            "queue_depth_per_worker": depths,
+            "published_chunks": sum(self._published_chunks),
+            "published_msgs": sum(self._published_msgs),
+            "published_msgs_per_worker": list(self._published_msgs),
+            "last_chunk_latency": latencies[-1] if latencies else None,
+            "max_chunk_latency": max(latencies) if latencies else None,
+            "avg_chunk_latency": sum(latencies) / len(latencies) if latencies else None,
+        }
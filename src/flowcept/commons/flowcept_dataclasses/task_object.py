@@ -7,19 +7,42 @@ import flowcept
 from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry
 from flowcept.commons.vocabulary import Status
 from flowcept.configs import (
-    HOSTNAME,
     PRIVATE_IP,
     PUBLIC_IP,
-    LOGIN_NAME,
     NODE_NAME,
+    get_hostname,
+    get_login_name,
 )
 
 
+_TIME_FIELD_NAMES = ("started_at", "ended_at", "submitted_at", "registered_at", "utc_timestamp")
+_DICT_FIELD_NAMES = ("used", "generated", "custom_metadata", "telemetry_at_start", "telemetry_at_end")
+_DEFAULT_ENRICH_VALUES = None
+
+
+def _default_enrich_values() -> Dict:
+    # Built on the first enrichment, so that importing the module does not resolve the host name.
+    global _DEFAULT_ENRICH_VALUES
+    if _DEFAULT_ENRICH_VALUES is None:
+        _DEFAULT_ENRICH_VALUES = {
+            "node_name": NODE_NAME,
+            "login_name": get_login_name(),
+            "public_ip": PUBLIC_IP,
+            "private_ip": PRIVATE_IP,
+            "hostname": get_hostname(),
+        }
+    return _DEFAULT_ENRICH_VALUES
+
+
 class TaskObject:
     """Task object class.
 
     Represents a single provenance task in Flowcept, including inputs, outputs,
     execution metadata, telemetry, and environment details.
+
+    Not slotted on purpose: CPython stores the attributes of plain instances inline, in a
+    values array keyed by the class, which takes less memory than one slot per field when a
+    task sets a dozen of its ~40 fields. See tests/benchmarks/task_object_benchmark.py.
     """
 
     type = "task"
@@ -73,6 +96,9 @@ class TaskObject:
     telemetry_at_end: Telemetry = None
     """Telemetry snapshot captured at the end of the task."""
 
+    telemetry_summary: Dict = None
+    """Telemetry summary of the task, computed at capture time when the telemetry sampler is enabled."""
+
     workflow_name: AnyStr = None
     """Name of the workflow this task belongs to."""
 
@@ -139,35 +165,15 @@ class TaskObject:
     source_agent_id: str = None
     """Identifier of the agent that sent this task to be executed (if any)."""
 
-    _DEFAULT_ENRICH_VALUES = {
-        "node_name": NODE_NAME,
-        "login_name": LOGIN_NAME,
-        "public_ip": PUBLIC_IP,
-        "private_ip": PRIVATE_IP,
-        "hostname": HOSTNAME,
-    }
-
     @staticmethod
     def get_time_field_names():
         """Get the time field."""
-        return [
-            "started_at",
-            "ended_at",
-            "submitted_at",
-            "registered_at",
-            "utc_timestamp",
-        ]
+        return _TIME_FIELD_NAMES
 
     @staticmethod
     def get_dict_field_names():
         """Get field names."""
-        return [
-            "used",
-            "generated",
-            "custom_metadata",
-            "telemetry_at_start",
-            "telemetry_at_end",
-        ]
+        return _DICT_FIELD_NAMES
 
     @staticmethod
     def task_id_field():
@@ -189,30 +195,27 @@ class TaskObject:
         if self.utc_timestamp is None:
             self.utc_timestamp = flowcept.commons.utils.get_utc_now()
 
-        for key, fallback_value in TaskObject._DEFAULT_ENRICH_VALUES.items():
+        for key, fallback_value in _default_enrich_values().items():
             if getattr(self, key) is None and fallback_value is not None:
                 setattr(self, key, fallback_value)
 
     @staticmethod
     def enrich_task_dict(task_dict: dict):
         """Enrich the task."""
-        for key, fallback_value in TaskObject._DEFAULT_ENRICH_VALUES.items():
+        for key, fallback_value in _default_enrich_values().items():
             if (key not in task_dict or task_dict[key] is None) and fallback_value is not None:
                 task_dict[key] = fallback_value
 
     def to_dict(self):
         """Convert to dictionary."""
-        result_dict = {}
-        for attr, value in self.__dict__.items():
-            if value is not None:
-                if attr == "telemetry_at_start":
-                    result_dict[attr] = self.telemetry_at_start.to_dict()
-                elif attr == "telemetry_at_end":
-                    result_dict[attr] = self.telemetry_at_end.to_dict()
-                elif attr == "status":
-                    result_dict[attr] = value.value
-                else:
-                    result_dict[attr] = value
+        result_dict = {attr: value for attr, value in self.__dict__.items() if value is not None}
+        for attr in ("telemetry_at_start", "telemetry_at_end"):
+            value = result_dict.get(attr)
+            if isinstance(value, Telemetry):
+                result_dict[attr] = value.to_dict()
+        status = result_dict.get("status")
+        if isinstance(status, Status):
+            result_dict["status"] = status.value
         result_dict["type"] = "task"
         return result_dict
 
@@ -237,9 +240,9 @@ class TaskObject:
         task = TaskObject()
 
         for key, value in task_obj_dict.items():
-            if hasattr(task, key):
+            if key in _FIELD_NAMES:
                 if key == "status" and isinstance(value, str):
-                    setattr(task, key, Status(value))
+                    task.status = Status(value)
                 else:
                     setattr(task, key, value)
 
@@ -258,3 +261,6 @@ class TaskObject:
                 attrs.append(opt)
         attr_str = ", ".join(f"{attr}={repr(getattr(self, attr))}" for attr in attrs)
         return f"TaskObject({attr_str})"
+
+
+_FIELD_NAMES = frozenset(TaskObject.__annotations__)
@@ -8,6 +8,42 @@ def remove_none_values(_dict):
     return {k: v for (k, v) in _dict if v is not None}
 
 
+class _TelemetryGroup:
+    """Base of the telemetry groups.
+
+    Groups are slotted, with no per-instance ``__dict__``. Fields that were not captured are
+    None, and ``to_dict`` omits them.
+    """
+
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.to_dict = _compile_to_dict(cls.__slots__)
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary, with the captured fields only."""
+        return {}
+
+
+def _compile_to_dict(names):
+    """Return a ``to_dict`` that reads each slot directly, unrolled, instead of a getattr loop."""
+    lines = ["def to_dict(self):", "    d = {}"]
+    for name in names:
+        lines.append(f"    if (v := self.{name}) is not None:")
+        lines.append(f"        d[{name!r}] = v")
+    lines.append("    return d")
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    to_dict = namespace["to_dict"]
+    to_dict.__doc__ = _TelemetryGroup.to_dict.__doc__
+    return to_dict
+
+
 class Telemetry:
     """Telemetry class.
 
@@ -16,41 +52,67 @@ class Telemetry:
 
     We are using psutils and the data it can capture depends on the platform.
     So, we won't use dataclasses because we can't list all possible info to
-    be captured in any platform.
+    be captured in any platform. Each group keeps its fields in slots and leaves
+    the ones it could not capture as None.
     """
 
-    class CPU:
+    class CPU(_TelemetryGroup):
         """CPU class."""
 
-        times_avg: Dict[str, float] = None
-        percent_all: float = None
-        frequency: int = 0
+        __slots__ = ("times_avg", "percent_all", "frequency", "times_per_cpu", "percent_per_cpu")
+
+        times_avg: Dict[str, float]
+        percent_all: float
+        frequency: int
 
-        times_per_cpu: List[Dict[str, float]] = None
-        percent_per_cpu: List[float] = None
+        times_per_cpu: List[Dict[str, float]]
+        percent_per_cpu: List[float]
 
-    class Memory:
+    class Memory(_TelemetryGroup):
         """Memory class."""
 
+        __slots__ = ("virtual", "swap")
+
         virtual: Dict[str, float]
         swap: Dict[str, float]
 
-    class Network:
+    class Network(_TelemetryGroup):
         """Network class."""
 
-        netio: Dict[str, int]
+        __slots__ = ("netio_sum", "netio_per_interface")
+
+        netio_sum: Dict[str, int]
         netio_per_interface: Dict[str, Dict[str, int]]
 
-    class Disk:
+    class Disk(_TelemetryGroup):
         """Disk class."""
 
+        __slots__ = ("disk_usage", "io_sum", "io_per_disk")
+
         disk_usage: Dict[str, float]
-        io: Dict[str, float]
+        io_sum: Dict[str, float]
         io_per_disk: Dict[str, Dict[str, float]]
 
-    class Process:
+    class Process(_TelemetryGroup):
         """Process class."""
 
+        __slots__ = (
+            "pid",
+            "cpu_number",
+            "memory",
+            "memory_percent",
+            "cpu_times",
+            "cpu_percent",
+            "io_counters",
+            "num_connections",
+            "num_open_files",
+            "num_open_file_descriptors",
+            "num_threads",
+            "num_ctx_switches",
+            "executable",
+            "cmd_line",
+        )
+
         pid: int
         cpu_number: int
         memory: Dict[str, float]
@@ -80,26 +142,36 @@ class Telemetry:
     #     gpu_sums: GPUMetrics
     #     per_gpu: Dict[int, GPUMetrics] = None
 
-    cpu: CPU = None
-    process: Process = None
-    memory: Memory = None
-    disk: Disk = None
-    network: Network = None
-    gpu: Dict = None  # TODO: use dataclasses
+    __slots__ = ("cpu", "process", "memory", "disk", "network", "gpu")
+
+    cpu: CPU
+    process: Process
+    memory: Memory
+    disk: Disk
+    network: Network
+    gpu: Dict  # TODO: use dataclasses
+
+    def __init__(self):
+        self.cpu = None
+        self.process = None
+        self.memory = None
+        self.disk = None
+        self.network = None
+        self.gpu = None
 
     def to_dict(self):
         """Convert to dictionary."""
         ret = {}
         if self.cpu is not None:
-            ret["cpu"] = self.cpu.__dict__
+            ret["cpu"] = self.cpu.to_dict()
         if self.process is not None:
-            ret["process"] = self.process.__dict__
+            ret["process"] = self.process.to_dict()
         if self.memory is not None:
-            ret["memory"] = self.memory.__dict__
+            ret["memory"] = self.memory.to_dict()
         if self.disk is not None:
-            ret["disk"] = self.disk.__dict__
+            ret["disk"] = self.disk.to_dict()
         if self.network is not None:
-            ret["network"] = self.network.__dict__
+            ret["network"] = self.network.to_dict()
         if self.gpu is not None:
             # ret["gpu"] = asdict(self.gpu, dict_factory=remove_none_values)
             ret["gpu"] = self.gpu
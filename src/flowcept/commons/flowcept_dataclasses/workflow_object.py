@@ -2,7 +2,6 @@
 
 from typing import Dict, AnyStr, List
 import msgpack
-from omegaconf import OmegaConf, DictConfig
 
 from flowcept.version import __version__
 from flowcept.commons.utils import get_utc_now, get_git_info
@@ -117,7 +116,7 @@ class WorkflowObject:
     def enrich(self, adapter_key=None):
         """Enrich it."""
         self.utc_timestamp = get_utc_now()
-        self.flowcept_settings = OmegaConf.to_container(settings) if isinstance(settings, DictConfig) else settings
+        self.flowcept_settings = settings
         self.conf = {"settings_path": SETTINGS_PATH}
         if adapter_key is not None:
             # TODO :base-interceptor-refactor: :code-reorg: :usability:
@@ -136,10 +135,7 @@ class WorkflowObject:
             self.sys_name = SYS_NAME
 
         if self.extra_metadata is None and EXTRA_METADATA is not None:
-            _extra_metadata = (
-                OmegaConf.to_container(EXTRA_METADATA) if isinstance(EXTRA_METADATA, DictConfig) else EXTRA_METADATA
-            )
-            self.extra_metadata = _extra_metadata
+            self.extra_metadata = EXTRA_METADATA
 
         if ENRICH_MESSAGES and self.code_repository is None:
             try:
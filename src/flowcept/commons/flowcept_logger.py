@@ -7,10 +7,11 @@ from flowcept.configs import (
     LOG_FILE_PATH,
     LOG_STREAM_LEVEL,
     LOG_FILE_LEVEL,
-    HOSTNAME,
+    get_hostname,
 )
 
-_fmt = f"[%(name)s][%(levelname)s][{HOSTNAME}][pid=%(process)d]"
+# The host name is filled in when a handler is set up, as resolving it may query the DNS.
+_fmt = "[%(name)s][%(levelname)s][{hostname}][pid=%(process)d]"
 _BASE_FORMAT = _fmt + "[thread=%(thread)d][function=%(funcName)s][%(message)s]"
 
 
@@ -32,14 +33,14 @@ class FlowceptLogger(object):
         if stream_level <= logging.CRITICAL:
             stream_handler = logging.StreamHandler()
             stream_handler.setLevel(stream_level)
-            stream_format = logging.Formatter(_BASE_FORMAT)
+            stream_format = logging.Formatter(_BASE_FORMAT.replace("{hostname}", get_hostname()))
             stream_handler.setFormatter(stream_format)
             logger.addHandler(stream_handler)
 
         if file_level <= logging.CRITICAL:
             file_handler = logging.FileHandler(LOG_FILE_PATH, delay=True, mode="a+")
             file_handler.setLevel(file_level)
-            file_format = logging.Formatter(f"[%(asctime)s]{_BASE_FORMAT}")
+            file_format = logging.Formatter("[%(asctime)s]" + _BASE_FORMAT.replace("{hostname}", get_hostname()))
             file_handler.setFormatter(file_format)
             logger.addHandler(file_handler)
 
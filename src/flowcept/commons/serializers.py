@@ -0,0 +1,230 @@
+"""Serializers module.
+
+Single registry for the serializers used to move Flowcept messages around: the MQ wire
+format (``msgpack``), the documents stored by LMDBDAO and the buffer files (``json``), and a
+column-oriented encoding for lists of task dicts (``columnar``).
+
+Examples
+--------
+>>> from flowcept.commons.serializers import get_serializer
+>>> serializer = get_serializer("msgpack")
+>>> serializer.loads(serializer.dumps({"task_id": "t1"}))
+{'task_id': 't1'}
+"""
+
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import msgpack
+import orjson
+
+# msgpack extension type codes. Keep them stable: they are part of the wire format.
+EXT_NDARRAY = 1
+EXT_DATETIME = 2
+EXT_DATE = 3
+EXT_MISSING = 4
+
+
+def _is_numpy(obj) -> bool:
+    # Avoids importing numpy just to check types.
+    return type(obj).__module__ == "numpy"
+
+
+def _msgpack_default(obj):
+    """Encode the types msgpack does not know natively as extension types."""
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(EXT_DATETIME, obj.isoformat().encode())
+    elif isinstance(obj, date):
+        return msgpack.ExtType(EXT_DATE, obj.isoformat().encode())
+    elif _is_numpy(obj):
+        import numpy as np
+
+        if isinstance(obj, np.ndarray):
+            if obj.dtype.hasobject:
+                return obj.tolist()
+            header = msgpack.packb([obj.dtype.str, list(obj.shape)])
+            return msgpack.ExtType(EXT_NDARRAY, header + obj.tobytes())
+        elif isinstance(obj, np.generic):
+            return obj.item()
+    raise TypeError(f"Cannot serialize object of type {type(obj).__name__}")
+
+
+def _msgpack_ext_hook(code, data):
+    if code == EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    elif code == EXT_DATE:
+        return date.fromisoformat(data.decode())
+    elif code == EXT_NDARRAY:
+        import numpy as np
+
+        unpacker = msgpack.Unpacker()
+        unpacker.feed(data)
+        dtype, shape = unpacker.unpack()
+        offset = unpacker.tell()
+        return np.frombuffer(data, dtype=np.dtype(dtype), offset=offset).reshape(shape)
+    elif code == EXT_MISSING:
+        return _MISSING
+    return msgpack.ExtType(code, data)
+
+
+class _Missing:
+    """Marker for absent keys in columnar encoding."""
+
+    def __repr__(self):
+        return "<missing>"
+
+
+_MISSING = _Missing()
+
+
+class Serializer(object):
+    """Base serializer class.
+
+    Subclasses convert Python objects to ``bytes`` and back.
+    """
+
+    name: str = None
+
+    def dumps(self, obj) -> bytes:
+        """Serialize an object to bytes."""
+        raise NotImplementedError()
+
+    def loads(self, data: bytes):
+        """Deserialize bytes to an object."""
+        raise NotImplementedError()
+
+    def encodes_natively(self, obj) -> bool:
+        """Return whether ``obj``, which is not a plain JSON type, round-trips through this serializer."""
+        return False
+
+
+class MsgpackSerializer(Serializer):
+    """msgpack serializer with native extension types for numpy arrays and datetimes.
+
+    Plain dicts, lists and scalars are encoded exactly as ``msgpack.dumps`` does, so the
+    output stays readable by consumers that call ``msgpack.loads`` directly.
+    """
+
+    name = "msgpack"
+
+    def __init__(self):
+        self._packer_kwargs = {"default": _msgpack_default, "datetime": False}
+
+    def dumps(self, obj) -> bytes:
+        """Serialize an object to msgpack bytes."""
+        return msgpack.packb(obj, **self._packer_kwargs)
+
+    def loads(self, data: bytes):
+        """Deserialize msgpack bytes."""
+        return msgpack.unpackb(data, raw=False, strict_map_key=False, ext_hook=_msgpack_ext_hook)
+
+    def encodes_natively(self, obj) -> bool:
+        """Return True for numpy arrays and scalars and for datetimes, which have extension types."""
+        if _is_numpy(obj):
+            import numpy as np
+
+            return isinstance(obj, (np.ndarray, np.generic)) and not (
+                isinstance(obj, np.ndarray) and obj.dtype.hasobject
+            )
+        return isinstance(obj, (datetime, date))
+
+
+class JSONSerializer(Serializer):
+    """JSON serializer backed by orjson, with native numpy and datetime support."""
+
+    name = "json"
+
+    def __init__(self):
+        self._option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj) -> bytes:
+        """Serialize an object to JSON bytes."""
+        return orjson.dumps(obj, option=self._option)
+
+    def loads(self, data):
+        """Deserialize JSON bytes or str.
+
+        Falls back to the standard library for documents orjson rejects, such as the ``NaN``
+        literals written by ``json.dumps``.
+        """
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            import json
+
+            return json.loads(bytes(data).decode() if not isinstance(data, str) else data)
+
+
+class ColumnarSerializer(Serializer):
+    """Column-oriented msgpack encoding for lists of dicts.
+
+    Field names are written once per batch instead of once per record, which pays off for
+    task messages that repeat the same ~30 top-level keys. Absent keys round-trip as absent.
+    """
+
+    name = "columnar"
+
+    def __init__(self):
+        self._row = MsgpackSerializer()
+
+    def dumps(self, records: List[Dict]) -> bytes:
+        """Serialize a list of dicts column by column."""
+        keys = {}
+        for record in records:
+            for k in record:
+                keys.setdefault(k, None)
+        keys = list(keys)
+        missing = msgpack.ExtType(EXT_MISSING, b"")
+        columns = [[record.get(k, missing) for record in records] for k in keys]
+        return self._row.dumps({"n": len(records), "keys": keys, "columns": columns})
+
+    def loads(self, data: bytes) -> List[Dict]:
+        """Deserialize bytes produced by :meth:`dumps` into a list of dicts."""
+        table = self._row.loads(data)
+        records = [{} for _ in range(table["n"])]
+        for k, column in zip(table["keys"], table["columns"]):
+            for record, value in zip(records, column):
+                if value is not _MISSING:
+                    record[k] = value
+        return records
+
+
+_SERIALIZERS: Dict[str, Serializer] = {}
+
+
+def register_serializer(serializer: Serializer, name: str = None):
+    """Register a serializer instance under ``name`` (defaults to ``serializer.name``)."""
+    _SERIALIZERS[name or serializer.name] = serializer
+
+
+def get_serializer(name: str) -> Serializer:
+    """Return the registered serializer with the given name."""
+    try:
+        return _SERIALIZERS[name]
+    except KeyError:
+        raise NotImplementedError(f"Unknown serializer '{name}'. Registered: {sorted(_SERIALIZERS)}.")
+
+
+def list_serializers() -> List[str]:
+    """Return the names of the registered serializers."""
+    return sorted(_SERIALIZERS)
+
+
+register_serializer(MsgpackSerializer())
+register_serializer(JSONSerializer())
+register_serializer(ColumnarSerializer())
+
+# Serializer of the wire the captured messages are sent on, set by MQDao.build. None means that
+# only plain JSON types are safe, e.g., for Mofka, which sends messages as JSON metadata.
+_WIRE_SERIALIZER: Optional[Serializer] = None
+
+
+def set_wire_serializer(serializer: Optional[Serializer]):
+    """Set the serializer of the wire the captured messages are sent on, or None if unknown."""
+    global _WIRE_SERIALIZER
+    _WIRE_SERIALIZER = serializer
+
+
+def encodes_natively_on_wire(obj) -> bool:
+    """Return whether ``obj``, which is not a plain JSON type, round-trips through the wire serializer."""
+    return _WIRE_SERIALIZER is not None and _WIRE_SERIALIZER.encodes_natively(obj)
@@ -0,0 +1,154 @@
+"""Telemetry payload module.
+
+Compact encodings of the telemetry a task message carries, selected with
+``telemetry_capture.payload``:
+
+- ``full``: ``telemetry_at_start`` and ``telemetry_at_end`` snapshots, as captured.
+- ``delta``: ``telemetry_at_start`` and, instead of ``telemetry_at_end``, a ``telemetry_delta``
+  with the difference of every numeric field, in the order of the start snapshot's field table.
+  Float differences do not always add back to the end value exactly; for those fields the delta
+  carries the end value itself, and their positions in ``raw``, so decoding is lossless.
+- ``summary``: only the ``telemetry_summary``, without snapshots.
+
+The field table of a snapshot lists its numeric fields (e.g., ``cpu.percent_per_cpu.3``), in
+traversal order. It is not sent: the consumer derives it from ``telemetry_at_start`` and checks
+it against the table id in the delta. Tables are interned, so tasks with the same telemetry
+fields share one table.
+"""
+
+from typing import Dict, List, Tuple
+from zlib import crc32
+
+from flowcept.commons.flowcept_logger import FlowceptLogger
+
+PAYLOAD_MODES = {"full", "delta", "summary"}
+
+_TABLES: Dict[int, Tuple[str, ...]] = {}
+
+
+_NUMERIC_TYPES = (int, float)
+
+
+def _is_numeric(value) -> bool:
+    return type(value) in _NUMERIC_TYPES  # Excludes bool.
+
+
+def _children(value):
+    if isinstance(value, dict):
+        return value.items()
+    return enumerate(value)
+
+
+def _diff(start, end, prefix: str, names: List[str], deltas: List, raw: List[int]) -> bool:
+    """Append the numeric fields of ``start`` and their deltas. Return False if the structures differ.
+
+    The positions of the fields whose delta does not add back to ``end`` exactly are appended to
+    ``raw``, and their end values to ``deltas``.
+    """
+    if isinstance(start, (dict, list)):
+        if type(start) is not type(end) or len(start) != len(end):
+            return False
+        if isinstance(start, dict) and start.keys() != end.keys():
+            return False
+        for key, value in _children(start):
+            if not _diff(value, end[key], f"{prefix}.{key}" if prefix else str(key), names, deltas, raw):
+                return False
+        return True
+    if _is_numeric(start) and _is_numeric(end):
+        names.append(prefix)
+        delta = end - start
+        delta = 0 if delta == 0 else delta
+        decoded = start + delta
+        if decoded != end or type(decoded) is not type(end):
+            raw.append(len(deltas))
+            delta = end
+        deltas.append(delta)
+        return True
+    return start == end
+
+
+def _field_names(value, prefix: str, names: List[str]):
+    if isinstance(value, (dict, list)):
+        for key, child in _children(value):
+            _field_names(child, f"{prefix}.{key}" if prefix else str(key), names)
+    elif _is_numeric(value):
+        names.append(prefix)
+
+
+def _intern_table(names: List[str]) -> int:
+    table_id = crc32("\n".join(names).encode())
+    _TABLES.setdefault(table_id, tuple(names))
+    return table_id
+
+
+def field_table(snapshot: Dict) -> Tuple[str, ...]:
+    """Return the interned field table of a telemetry snapshot."""
+    names = []
+    _field_names(snapshot, "", names)
+    return _TABLES[_intern_table(names)]
+
+
+def encode_telemetry_delta(start: Dict, end: Dict) -> Dict:
+    """Encode ``end`` as deltas from ``start``, or return None if their fields differ."""
+    names, deltas, raw = [], [], []
+    if not _diff(start, end, "", names, deltas, raw):
+        return None
+    encoded = {"table": _intern_table(names), "values": deltas}
+    if raw:
+        encoded["raw"] = raw
+    return encoded
+
+
+def decode_telemetry_delta(start: Dict, delta: Dict) -> Dict:
+    """Rebuild the end snapshot from the start snapshot and the delta."""
+    names = []
+    _field_names(start, "", names)
+    if _intern_table(names) != delta["table"] or len(names) != len(delta["values"]):
+        raise ValueError("The telemetry delta does not match the field table of telemetry_at_start.")
+    values = iter(delta["values"])
+    raw = set(delta.get("raw", ()))
+    position = iter(range(len(names)))
+
+    def rebuild(value):
+        if isinstance(value, dict):
+            return {k: rebuild(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [rebuild(v) for v in value]
+        if _is_numeric(value):
+            return next(values) if next(position) in raw else value + next(values)
+        return value
+
+    return rebuild(start)
+
+
+def encode_telemetry_payload(task: Dict, mode: str) -> Dict:
+    """Encode the telemetry of a task message in place, in the given payload mode."""
+    if mode == "full":
+        return task
+    start, end = task.get("telemetry_at_start"), task.get("telemetry_at_end")
+    if not start or not end:
+        # Tasks whose start and end are sent in different messages are sent as captured.
+        return task
+    if mode == "delta":
+        delta = encode_telemetry_delta(start, end)
+        if delta is not None:
+            task["telemetry_delta"] = delta
+            del task["telemetry_at_end"]
+    elif mode == "summary":
+        if not task.get("telemetry_summary"):
+            from flowcept.commons.task_data_preprocess import summarize_telemetry
+
+            task["telemetry_summary"] = summarize_telemetry(task, FlowceptLogger())
+        del task["telemetry_at_start"]
+        del task["telemetry_at_end"]
+    else:
+        raise NotImplementedError(f"Unknown telemetry payload '{mode}'. Use one of {PAYLOAD_MODES}.")
+    return task
+
+
+def decode_telemetry_payload(task: Dict) -> Dict:
+    """Restore the ``telemetry_at_end`` of a task message sent in the ``delta`` mode, in place."""
+    delta = task.pop("telemetry_delta", None)
+    if delta is not None and task.get("telemetry_at_start"):
+        task["telemetry_at_end"] = decode_telemetry_delta(task["telemetry_at_start"], delta)
+    return task
@@ -10,11 +10,11 @@ import os
 import platform
 import subprocess
 import types
-import numpy as np
 
 from flowcept import configs
 from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
 from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.serializers import encodes_natively_on_wire
 from flowcept.configs import PERF_LOG
 from flowcept.commons.vocabulary import Status
 
@@ -153,10 +153,6 @@ class GenericJSONEncoder(json.JSONEncoder):
                 return str(obj)
             except Exception:
                 return None
-        elif isinstance(obj, np.int) or isinstance(obj, np.int32) or isinstance(obj, np.int64):
-            return int(obj)
-        elif isinstance(obj, np.float) or isinstance(obj, np.float32) or isinstance(obj, np.float64):
-            return float(obj)
         return super().default(obj)
 
 
@@ -186,6 +182,9 @@ def replace_non_serializable(obj):
             return m(obj)
         elif isinstance(obj, __DICT__CLASSES):
             return obj.__dict__
+        elif encodes_natively_on_wire(obj):
+            # E.g., numpy arrays, sent as msgpack extension types.
+            return obj
         else:
             # Replace non-serializable values with id()
             return f"{obj.__class__.__name__}_instance_id_{id(obj)}"
@@ -256,17 +255,30 @@ def generate_pseudo_id() -> str:
 
 def buffer_to_disk(buffer: List[Dict], path: str, logger):
     """
-    Append the in-memory buffer to a JSON Lines (JSONL) file on disk.
+    Append the in-memory buffer to a buffer file on disk.
+
+    The file is a JSON Lines (JSONL) file, or a segmented buffer log when ``project.dump_buffer.format``
+    is ``segments`` or ``path`` already is one.
     """
     if not buffer:
         logger.warning("The buffer is currently empty.")
         return
+    from flowcept.commons.buffer_log import append_buffer_log, is_buffer_log
+
+    if configs.DUMP_BUFFER_FORMAT == "segments" or is_buffer_log(path):
+        for obj in buffer:
+            obj.pop("data", None)
+        append_buffer_log(buffer, path, configs.DUMP_BUFFER_SEGMENT_BYTES)
+        logger.info(f"Saved Flowcept buffer into {path}.")
+        return
+
+    from flowcept.commons.serializers import get_serializer
+
+    serializer = get_serializer("json")
     with open(path, "ab", buffering=1_048_576) as f:
         for obj in buffer:
             obj.pop("data", None)  # We are not going to store data in the buffer file.
-            from orjson import orjson
-
-            f.write(orjson.dumps(obj))
+            f.write(serializer.dumps(obj))
             f.write(b"\n")
 
     logger.info(f"Saved Flowcept buffer into {path}.")
@@ -1,8 +1,6 @@
 """Configuration module."""
 
 import os
-import socket
-import getpass
 
 from flowcept.version import __version__
 
@@ -45,14 +43,79 @@ def _get_env_bool(name: str, default=False) -> bool:
     return str(_get_env(name, str(default))).strip().lower() in _TRUE_VALUES
 
 
+_SETTINGS_DIR = os.path.expanduser(f"~/.{PROJECT_NAME}")
+_CACHE_DIR = os.getenv("FLOWCEPT_CACHE_DIR", os.path.join(_SETTINGS_DIR, "cache"))
+_USE_CACHE = os.getenv("FLOWCEPT_SETTINGS_CACHE", "True").lower() in _TRUE_VALUES
+
+
+def _read_snapshot(path: str):
+    """Return the object of a msgpack snapshot, or None if it cannot be read."""
+    import msgpack
+
+    try:
+        with open(path, "rb") as f:
+            return msgpack.unpackb(f.read(), strict_map_key=False)
+    except Exception:
+        return None
+
+
+def _write_snapshot(path: str, obj):
+    """Write a msgpack snapshot atomically. Failures are ignored: the snapshot is only a cache."""
+    import msgpack
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(msgpack.packb(obj))
+        os.replace(tmp_path, path)
+    except Exception:
+        pass
+
+
+def _compile_settings(path: str) -> dict:
+    """Return the resolved settings of a file as a plain dict, from its compiled snapshot if any.
+
+    Compiling parses the YAML with OmegaConf, resolves its interpolations, and writes the result
+    in msgpack to ``~/.flowcept/cache`` (or ``FLOWCEPT_CACHE_DIR``). The snapshot is keyed by the
+    hash of the file and by the environment variables that its ``${oc.env:...}`` interpolations
+    read, so the next processes load it with one read and one unpack, without importing OmegaConf.
+    Files with interpolations of other resolvers are compiled every time. Set
+    ``FLOWCEPT_SETTINGS_CACHE=false`` to disable the snapshots.
+    """
+    from zlib import crc32
+
+    with open(path, "rb") as f:
+        data = f.read()
+    env_names, cacheable = [], _USE_CACHE
+    if b"${" in data:
+        import re
+
+        text = data.decode()
+        resolvers = set(re.findall(r"\$\{\s*([\w.]+)\s*:", text))
+        cacheable = cacheable and resolvers <= {"oc.env"}
+        env_names = sorted(set(re.findall(r"\$\{\s*oc\.env\s*:\s*([^,}\s]+)", text)))
+
+    if cacheable:
+        key = [__version__, len(data), crc32(data), [os.environ.get(name) for name in env_names]]
+        snapshot_path = os.path.join(_CACHE_DIR, f"settings_{crc32(repr(key).encode()):08x}.msgpack")
+        snapshot = _read_snapshot(snapshot_path)
+        if snapshot is not None and snapshot.get("key") == key:
+            return snapshot["settings"]
+
+    from omegaconf import OmegaConf
+
+    compiled = OmegaConf.to_container(OmegaConf.create(data.decode()), resolve=True) or {}
+    if cacheable:
+        _write_snapshot(snapshot_path, {"key": key, "settings": compiled})
+    return compiled
+
+
 if USE_DEFAULT:
     settings = DEFAULT_SETTINGS.copy()
     SETTINGS_PATH = "FLOWCEPT_DEFAULT_SETTINGS"
 
 else:
-    from omegaconf import OmegaConf
-
-    _SETTINGS_DIR = os.path.expanduser(f"~/.{PROJECT_NAME}")
     SETTINGS_PATH = os.getenv("FLOWCEPT_SETTINGS_PATH", f"{_SETTINGS_DIR}/settings.yaml")
 
     if not os.path.exists(SETTINGS_PATH):
@@ -60,10 +123,7 @@ else:
 
         SETTINGS_PATH = str(resources.files("resources").joinpath("sample_settings.yaml"))
 
-        with open(SETTINGS_PATH) as f:
-            settings = OmegaConf.load(f)
-    else:
-        settings = OmegaConf.load(SETTINGS_PATH)
+    settings = _compile_settings(SETTINGS_PATH)
 
 # Making sure all settings are in place.
 keys = DEFAULT_SETTINGS.keys() - settings.keys()
@@ -108,6 +168,22 @@ MQ_BUFFER_SIZE = settings["mq"].get("buffer_size", 1)
 MQ_INSERTION_BUFFER_TIME = settings["mq"].get("insertion_buffer_time_secs", 1)
 MQ_TIMING = settings["mq"].get("timing", False)
 MQ_CHUNK_SIZE = int(settings["mq"].get("chunk_size", -1))
+MQ_BUFFER_ENGINE = settings["mq"].get("buffer_engine", "default")  # default or bounded
+MQ_BUFFER_CAPACITY = settings["mq"].get("buffer_capacity", None)
+MQ_BUFFER_OVERFLOW_POLICY = settings["mq"].get("buffer_overflow_policy", "block")
+MQ_BUFFER_SPILL_PATH = settings["mq"].get("buffer_spill_path", None)
+MQ_PUBLISHER_WORKERS = int(_get_env("MQ_PUBLISHER_WORKERS", settings["mq"].get("publisher_workers", 1)))
+MQ_PUBLISHER_QUEUE_SIZE = int(settings["mq"].get("publisher_queue_size", 0))
+MQ_ASYNC_PUBLISHING = _get_env_bool("MQ_ASYNC_PUBLISHING", settings["mq"].get("async_publishing", True))
+MQ_BATCH_FRAMES = settings["mq"].get("batch_frames", False)
+MQ_BATCH_FRAME_CODEC = settings["mq"].get("batch_frame_codec", "none")  # none, zlib, or zstd
+MQ_REDIS_MODE = _get_env("MQ_REDIS_MODE", settings["mq"].get("redis_mode", "pubsub"))  # pubsub or streams
+MQ_STREAM_GROUP = _get_env("MQ_STREAM_GROUP", settings["mq"].get("stream_group", "flowcept"))
+MQ_STREAM_CONSUMER = _get_env("MQ_STREAM_CONSUMER", settings["mq"].get("stream_consumer", None))
+MQ_STREAM_MAXLEN = int(settings["mq"].get("stream_maxlen", 1_000_000))
+MQ_STREAM_READ_COUNT = int(settings["mq"].get("stream_read_count", 500))
+MQ_STREAM_BLOCK_MS = int(settings["mq"].get("stream_block_ms", 100))
+MQ_STREAM_CLAIM_IDLE_MS = int(settings["mq"].get("stream_claim_idle_ms", 60_000))
 
 #####################
 # KV SETTINGS       #
@@ -132,6 +208,7 @@ MONGO_HOST = None
 MONGO_PORT = None
 MONGO_DB = PROJECT_NAME
 MONGO_CREATE_INDEX = True
+MONGO_ADAPTIVE_WRITES = True
 if _mongo_settings:
     MONGO_ENABLED = _get_env_bool("MONGO_ENABLED", _mongo_settings.get("enabled", False))
     MONGO_URI = _get_env("MONGO_URI", _mongo_settings.get("uri"))
@@ -139,6 +216,7 @@ if _mongo_settings:
     MONGO_PORT = int(_get_env("MONGO_PORT", _mongo_settings.get("port", 27017)))
     MONGO_DB = _mongo_settings.get("db", PROJECT_NAME)
     MONGO_CREATE_INDEX = _mongo_settings.get("create_collection_index", True)
+    MONGO_ADAPTIVE_WRITES = _mongo_settings.get("adaptive_writes", True)
 
 ######################
 #  LMDB Settings  #
@@ -147,6 +225,8 @@ LMDB_SETTINGS = DATABASES.get("lmdb", {})
 LMDB_ENABLED = False
 if LMDB_SETTINGS:
     LMDB_ENABLED = _get_env_bool("LMDB_ENABLED", LMDB_SETTINGS.get("enabled", False))
+# Decode records straight from the memory map instead of copying them out first.
+LMDB_ZERO_COPY_READS = LMDB_SETTINGS.get("zero_copy_reads", True)
 
 # if not LMDB_ENABLED and not MONGO_ENABLED:
 #     # At least one of these variables need to be enabled.
@@ -162,6 +242,15 @@ DB_BUFFER_SIZE = int(db_buffer_settings.get("buffer_size", 50))
 REMOVE_EMPTY_FIELDS = db_buffer_settings.get("remove_empty_fields", False)
 DB_INSERTER_MAX_TRIALS_STOP = db_buffer_settings.get("stop_max_trials", 240)
 DB_INSERTER_SLEEP_TRIALS_STOP = db_buffer_settings.get("stop_trials_sleep", 0.01)
+DB_BUFFER_ENGINE = db_buffer_settings.get("buffer_engine", "default")  # default or bounded
+DB_BUFFER_CAPACITY = db_buffer_settings.get("buffer_capacity", None)
+DB_BUFFER_OVERFLOW_POLICY = db_buffer_settings.get("buffer_overflow_policy", "block")
+DB_BUFFER_SPILL_PATH = db_buffer_settings.get("buffer_spill_path", None)
+DB_INSERTER_WORKERS = int(_get_env("DB_INSERTER_WORKERS", db_buffer_settings.get("inserter_workers", 1)))
+DB_INSERTER_PARTITION_KEY = db_buffer_settings.get("inserter_partition_key", "task_id")  # task_id or workflow_id
+DB_TASK_ASSEMBLY = db_buffer_settings.get("task_assembly", False)
+DB_TASK_ASSEMBLY_CAPACITY = int(db_buffer_settings.get("task_assembly_capacity", 10_000))
+DB_TASK_ASSEMBLY_TIMEOUT = float(db_buffer_settings.get("task_assembly_timeout_secs", 5))
 
 
 ###########################
@@ -195,16 +284,27 @@ DUMP_BUFFER_PATH = settings["project"].get("dump_buffer", {}).get("path", "flowc
 APPEND_WORKFLOW_ID_TO_PATH = settings["project"].get("dump_buffer", {}).get("append_workflow_id_to_path", False)
 APPEND_ID_TO_PATH = settings["project"].get("dump_buffer", {}).get("append_id_to_path", False)
 DELETE_BUFFER_FILE = settings["project"].get("dump_buffer", {}).get("delete_previous_file", True)
+# jsonl: one JSON message per line. segments: a directory of size-rotated msgpack segments with an
+# index. See flowcept.commons.buffer_log. Readers detect the format of each file.
+DUMP_BUFFER_FORMAT = settings["project"].get("dump_buffer", {}).get("format", "jsonl")
+DUMP_BUFFER_SEGMENT_BYTES = int(settings["project"].get("dump_buffer", {}).get("segment_bytes", 64 * 1024 * 1024))
 
 TELEMETRY_CAPTURE = settings.get("telemetry_capture", None)
 TELEMETRY_ENABLED = _get_env_bool("TELEMETRY_ENABLED", True)
 TELEMETRY_ENABLED = TELEMETRY_ENABLED and (TELEMETRY_CAPTURE is not None) and (len(TELEMETRY_CAPTURE) > 0)
+# How task messages carry their telemetry: full, delta, or summary. See flowcept.commons.telemetry_payload.
+TELEMETRY_PAYLOAD = _get_env("TELEMETRY_PAYLOAD", (TELEMETRY_CAPTURE or {}).get("payload", "full"))
+# Samples telemetry in a background thread instead of at every task start and end.
+TELEMETRY_SAMPLER_ENABLED = _get_env_bool(
+    "TELEMETRY_SAMPLER",
+    ((TELEMETRY_CAPTURE or {}).get("sampler", None) or {}).get("enabled", False),
+)
 
 ######################
 # SYS METADATA #
 ######################
 
-LOGIN_NAME = None
+_login_name = None
 PUBLIC_IP = None
 PRIVATE_IP = None
 SYS_NAME = None
@@ -216,34 +316,75 @@ if sys_metadata is not None:
     ENVIRONMENT_ID = sys_metadata.get("environment_id", None)
     SYS_NAME = sys_metadata.get("sys_name", None)
     NODE_NAME = sys_metadata.get("node_name", None)
-    LOGIN_NAME = sys_metadata.get("login_name", None)
+    _login_name = sys_metadata.get("login_name", None)
     PUBLIC_IP = sys_metadata.get("public_ip", None)
     PRIVATE_IP = sys_metadata.get("private_ip", None)
 
 
-if LOGIN_NAME is None:
-    try:
-        LOGIN_NAME = sys_metadata.get("login_name", getpass.getuser())
-    except Exception:
-        try:
-            LOGIN_NAME = os.getlogin()
-        except Exception:
-            LOGIN_NAME = None
-
 SYS_NAME = SYS_NAME if SYS_NAME is not None else os.uname()[0]
 NODE_NAME = NODE_NAME if NODE_NAME is not None else os.uname()[1]
 
-try:
-    HOSTNAME = socket.getfqdn()
-except Exception:
+# HOSTNAME and LOGIN_NAME are resolved on first access (see __getattr__ below): resolving the host
+# name queries the DNS, and the login name may query the user directory, which can take seconds on
+# some HPC nodes.
+_NODE_IDENTITY = {"login_name": _login_name} if _login_name is not None else {}
+
+
+def _resolve_hostname() -> str:
+    import socket
+
     try:
-        HOSTNAME = socket.gethostname()
+        return socket.getfqdn()
     except Exception:
         try:
-            with open("/etc/hostname", "r") as f:
-                HOSTNAME = f.read().strip()
+            return socket.gethostname()
         except Exception:
-            HOSTNAME = "unknown_hostname"
+            try:
+                with open("/etc/hostname", "r") as f:
+                    return f.read().strip()
+            except Exception:
+                return "unknown_hostname"
+
+
+def get_hostname() -> str:
+    """Return the fully qualified host name of this node.
+
+    It is resolved on the first call and cached in ``~/.flowcept/cache`` (or ``FLOWCEPT_CACHE_DIR``)
+    per node, so only the first process that runs on a node queries the DNS.
+    """
+    if "hostname" not in _NODE_IDENTITY:
+        node_path = os.path.join(_CACHE_DIR, f"node_{os.uname()[1]}.msgpack")
+        snapshot = _read_snapshot(node_path) if _USE_CACHE else None
+        if snapshot is not None and snapshot.get("hostname"):
+            _NODE_IDENTITY["hostname"] = snapshot["hostname"]
+        else:
+            _NODE_IDENTITY["hostname"] = _resolve_hostname()
+            if _USE_CACHE:
+                _write_snapshot(node_path, {"hostname": _NODE_IDENTITY["hostname"]})
+    return _NODE_IDENTITY["hostname"]
+
+
+def get_login_name() -> str:
+    """Return ``sys_metadata.login_name``, or the login name of the user, resolved on the first call."""
+    if "login_name" not in _NODE_IDENTITY:
+        import getpass
+
+        try:
+            _NODE_IDENTITY["login_name"] = getpass.getuser()
+        except Exception:
+            try:
+                _NODE_IDENTITY["login_name"] = os.getlogin()
+            except Exception:
+                _NODE_IDENTITY["login_name"] = None
+    return _NODE_IDENTITY["login_name"]
+
+
+def __getattr__(name):
+    if name == "HOSTNAME":
+        return get_hostname()
+    elif name == "LOGIN_NAME":
+        return get_login_name()
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 
 EXTRA_METADATA = settings.get("extra_metadata", {})
@@ -270,6 +411,9 @@ ANALYTICS = settings.get("analytics", None)
 
 INSTRUMENTATION = settings.get("instrumentation", {})
 INSTRUMENTATION_ENABLED = INSTRUMENTATION.get("enabled", True)
+# Which executions of instrumented tasks, loops, and torch modules are captured.
+# See flowcept.instrumentation.sampling.
+INSTRUMENTATION_SAMPLING = INSTRUMENTATION.get("sampling", None) or {}
 
 AGENT = settings.get("agent", {})
 AGENT_AUDIO = _get_env_bool("AGENT_AUDIO", settings["agent"].get("audio_enabled", "false"))
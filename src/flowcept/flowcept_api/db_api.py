@@ -1,7 +1,7 @@
 """DB API module."""
 
 import uuid
-from typing import List, Dict
+from typing import Dict, Iterator, List
 
 from flowcept.commons.daos.docdb_dao.docdb_dao_base import DocumentDBDAO
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
@@ -165,6 +165,53 @@ class DBAPI(object):
             return None
         return results
 
+    def iter_tasks(
+        self, filter: Dict = None, projection=None, sort=None, batch_size=1000, resume_after=None
+    ) -> Iterator[Dict]:
+        """Stream the tasks matching a filter without loading them all in memory.
+
+        Parameters
+        ----------
+        filter : dict, optional
+            Filter expression used by the backend DAO.
+        projection : list, optional
+            Fields to include in returned task records.
+        sort : list, optional
+            Sort expression (field/order pairs). Cannot be combined with ``resume_after``.
+        batch_size : int, optional
+            Number of tasks fetched from the DB at a time.
+        resume_after : str, optional
+            ``task_id`` of the last task already consumed. Without ``sort``, tasks come in
+            ``task_id`` order, so an interrupted iteration can continue from there.
+
+        Returns
+        -------
+        iterator of dict
+            Matching task records.
+
+        Examples
+        --------
+        >>> for task in Flowcept.db.iter_tasks({"campaign_id": campaign_id}, batch_size=5000):
+        ...     process(task)
+        """
+        return self.iter_query(filter, projection, sort, batch_size, resume_after, collection="tasks")
+
+    def iter_query(
+        self, filter=None, projection=None, sort=None, batch_size=1000, resume_after=None, collection="tasks"
+    ) -> Iterator[Dict]:
+        """Stream the documents of the ``tasks`` or ``workflows`` collection matching a filter.
+
+        See :meth:`iter_tasks` for the parameters.
+        """
+        return DBAPI._dao().iter_query(
+            filter=filter,
+            projection=projection,
+            sort=sort,
+            batch_size=batch_size,
+            resume_after=resume_after,
+            collection=collection,
+        )
+
     def blob_object_query(self, filter) -> List[Dict]:
         """Query the ``objects`` collection.
 
@@ -487,16 +534,17 @@ class DBAPI(object):
         output_file : str, optional
             Output file path.
         export_format : str, optional
-            Export format supported by backend DAO.
+            ``json`` or ``parquet``. Parquet exports are streamed with one typed column per
+            key of ``used`` and ``generated``.
         should_zip : bool, optional
-            Whether output should be compressed.
+            Whether JSON output should be compressed. Parquet output is always compressed.
 
         Returns
         -------
         bool
             ``True`` on success, ``False`` on validation or DAO errors.
         """
-        if filter is None and not should_zip:
+        if filter is None and not should_zip and export_format != "parquet":
             self.logger.error("Not allowed to dump entire database without filter and without zipping it.")
             return False
         try:
@@ -1,12 +1,13 @@
 """Controller module."""
 
 import os
+import shutil
 from pathlib import Path
 from typing import List, Dict, Any
 from uuid import uuid4
 
 import flowcept
-from flowcept.commons.autoflush_buffer import AutoflushBuffer
+from flowcept.commons.autoflush_buffer import AutoflushBuffer, BoundedAutoflushBuffer
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
     WorkflowObject,
@@ -27,8 +28,10 @@ from flowcept.configs import (
     KVDB_ENABLED,
     MQ_ENABLED,
     DUMP_BUFFER_PATH,
+    DUMP_BUFFER_SEGMENT_BYTES,
     APPEND_WORKFLOW_ID_TO_PATH,
     APPEND_ID_TO_PATH,
+    DB_INSERTER_WORKERS,
 )
 from flowcept.flowceptor.adapters.base_interceptor import BaseInterceptor
 
@@ -64,6 +67,7 @@ class Flowcept(object):
         check_safe_stops=True,  # TODO add to docstring
         save_workflow=True,
         delete_buffer_file=None,
+        process_group=False,
         *args,
         **kwargs,
     ):
@@ -110,6 +114,11 @@ class Flowcept(object):
             If True, deletes any existing dump buffer file on startup.
             If None, uses project.dump_buffer.delete_previous_file from settings.yaml.
 
+        process_group : bool, default=False
+            If True, child processes send their tasks through a shared-memory ring that this
+            process drains and publishes, instead of starting their own Flowcept. The ring is
+            exposed as ``self.process_group``. See flowcept.instrumentation.process_group.
+
         Additional arguments (`*args`, `**kwargs`) are used for specific adapters.
             For example, when using the Dask interceptor, the `dask_client` argument
             should be provided in `kwargs` to enable saving the Dask workflow, which is recommended.
@@ -138,6 +147,8 @@ class Flowcept(object):
                 self._interceptors = ["instrumentation"]
 
         self._interceptor_instances = None
+        self._process_group = process_group
+        self.process_group = None
         self._should_save_workflow = save_workflow
         self._workflow_saved = False  # This is to ensure that the wf is saved only once.
         self.current_workflow_id = workflow_id or str(uuid4())
@@ -184,7 +195,7 @@ class Flowcept(object):
                 interceptor_inst = BaseInterceptor.build(interceptor)
                 interceptor_inst.start(bundle_exec_id=self.bundle_exec_id, check_safe_stops=self._check_safe_stops)
                 self._interceptor_instances.append(interceptor_inst)
-                if isinstance(interceptor_inst._mq_dao.buffer, AutoflushBuffer):
+                if isinstance(interceptor_inst._mq_dao.buffer, (AutoflushBuffer, BoundedAutoflushBuffer)):
                     Flowcept.buffer = self.buffer = interceptor_inst._mq_dao.buffer.current_buffer
                 else:
                     Flowcept.buffer = self.buffer = interceptor_inst._mq_dao.buffer
@@ -194,6 +205,12 @@ class Flowcept(object):
 
         else:
             Flowcept.current_workflow_id = None
+        if self._process_group:
+            from flowcept.instrumentation.process_group import ProcessGroupCapture
+
+            self.process_group = ProcessGroupCapture(
+                workflow_id=self.current_workflow_id, campaign_id=self.campaign_id
+            ).start()
         self.is_started = True
         self.logger.debug("Flowcept started successfully.")
         return self
@@ -247,7 +264,8 @@ class Flowcept(object):
 
         Each element of the buffer (a dictionary) is serialized as a single line
         of JSON. If no path is provided, the default path from the settings file
-        is used.
+        is used. With ``project.dump_buffer.format: segments``, the buffer is
+        appended to a segmented buffer log instead.
 
         Parameters
         ----------
@@ -284,6 +302,59 @@ class Flowcept(object):
         )
         buffer_to_disk(self.buffer, path, self.logger)
 
+    @staticmethod
+    def iter_buffer(
+        file_path: str | None = None,
+        workflow_id: str | None = None,
+        task_id: str | None = None,
+        type: str | None = None,
+    ):
+        """
+        Iterate over the messages of a buffer file, one at a time.
+
+        Unlike :meth:`read_buffer_file`, the file is streamed, so memory use does not grow with its
+        size. Both JSONL files and segmented buffer logs (``project.dump_buffer.format: segments``)
+        are supported. On buffer logs, the filters are matched against the segment indexes and only
+        the matching messages are decoded.
+
+        Parameters
+        ----------
+        file_path : str, optional
+            Path to the buffer file. Defaults to ``DUMP_BUFFER_PATH`` from the configuration.
+        workflow_id : str, optional
+            Only yield the messages of this workflow.
+        task_id : str, optional
+            Only yield the messages of this task.
+        type : str, optional
+            Only yield the messages of this type, e.g., ``"task"`` or ``"workflow"``.
+
+        Yields
+        ------
+        dict
+            The messages, in the order they were written.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the buffer file does not exist.
+
+        Examples
+        --------
+        >>> for task in Flowcept.iter_buffer("flowcept_buffer.log", type="task"):
+        ...     print(task["task_id"])
+        """
+        from flowcept.commons.buffer_log import iter_buffer_file
+        from flowcept.commons.telemetry_payload import decode_telemetry_payload
+
+        if file_path is None:
+            file_path = DUMP_BUFFER_PATH
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Flowcept buffer file '{file_path}' was not found.")
+        for msg in iter_buffer_file(file_path, workflow_id=workflow_id, task_id=task_id, type=type):
+            if "telemetry_delta" in msg:
+                decode_telemetry_payload(msg)
+            yield msg
+
     @staticmethod
     def read_buffer_file(
         file_path: str | None = None,
@@ -294,11 +365,12 @@ class Flowcept(object):
         cleanup_files: bool = True,
     ):
         """
-        Read a JSON Lines (JSONL) file containing captured Flowcept messages.
+        Read a buffer file containing captured Flowcept messages.
 
-        This function loads a file where each line is a serialized JSON object.
-        It joins the lines into a single JSON array and parses them efficiently
-        with ``orjson``. If ``return_df`` is True, it returns a pandas DataFrame
+        This function loads a JSON Lines (JSONL) file, where each line is a serialized
+        JSON object, or a segmented buffer log (``project.dump_buffer.format: segments``).
+        To stream the messages instead of loading them all, use :meth:`iter_buffer`.
+        If ``return_df`` is True, it returns a pandas DataFrame
         created via ``pandas.json_normalize(..., sep='.')`` so nested fields become
         dot-separated columns (for example, ``generated.attention``).
 
@@ -315,11 +387,11 @@ class Flowcept(object):
             If True, normalize the inner dicts (e.g., used, generated, custom_metadata) as individual columns in the
             returned DataFrame.
         consolidate: bool, default False
-            If True, merge all matching workflow buffer files into a single JSONL file first.
+            If True, merge all matching workflow buffer files into a single buffer file first.
         workflow_id : str, optional
             Workflow ID to use when consolidating buffer files.
         cleanup_files : bool, default True
-            If True, delete consolidated input files and keep a single JSONL file
+            If True, delete consolidated input files and keep a single buffer file
             with only the workflow ID appended to the base path.
 
         Returns
@@ -353,8 +425,7 @@ class Flowcept(object):
         >>> "generated.attention" in df.columns
         True
         """
-        import os
-        import orjson
+        from flowcept.commons.buffer_log import is_buffer_log
 
         if file_path is None:
             file_path = DUMP_BUFFER_PATH
@@ -370,10 +441,7 @@ class Flowcept(object):
                 f"have started Flowcept."
             )
 
-        with open(file_path, "rb") as f:
-            lines = [ln for ln in f.read().splitlines() if ln]
-
-        buffer: List[Dict[str, Any]] = orjson.loads(b"[" + b",".join(lines) + b"]")
+        buffer: List[Dict[str, Any]] = list(Flowcept.iter_buffer(file_path))
 
         if return_df:
             try:
@@ -382,6 +450,8 @@ class Flowcept(object):
                 raise ModuleNotFoundError("pandas is required when return_df=True. Please install pandas.") from e
             if normalize_df:
                 return pd.json_normalize(buffer, sep=".")
+            elif is_buffer_log(file_path):
+                return pd.DataFrame(buffer)
             else:
                 return pd.read_json(file_path, lines=True)
 
@@ -461,7 +531,7 @@ class Flowcept(object):
         Parameters
         ----------
         path : str, optional
-            Path to the buffer JSONL file. If not provided,
+            Path to the buffer file or buffer log. If not provided,
             defaults to ``DUMP_BUFFER_PATH`` as configured in the settings.
 
         Returns
@@ -487,7 +557,10 @@ class Flowcept(object):
             path = DUMP_BUFFER_PATH
 
         try:
-            if os.path.exists(path):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+                FlowceptLogger().info(f"Buffer file deleted: {path}")
+            elif os.path.exists(path):
                 os.remove(path)
                 FlowceptLogger().info(f"Buffer file deleted: {path}")
         except Exception as e:
@@ -497,7 +570,10 @@ class Flowcept(object):
     @staticmethod
     def _consolidate_buffer_file(path: str, workflow_id: str, cleanup_files: bool = True) -> str:
         """
-        Consolidate all buffer files for a workflow into a single JSONL file.
+        Consolidate all buffer files for a workflow into a single buffer file.
+
+        JSONL files are concatenated. Buffer logs are merged in the order their messages were
+        written, without decoding the messages.
 
         Parameters
         ----------
@@ -511,6 +587,8 @@ class Flowcept(object):
         str
             Path to the consolidated buffer file.
         """
+        from flowcept.commons.buffer_log import is_buffer_log, merge_buffer_logs
+
         base_path = Path(path)
         suffix = base_path.suffix
         name_base = base_path.stem
@@ -526,17 +604,19 @@ class Flowcept(object):
         if matches == [consolidated_path]:
             return str(consolidated_path)
 
-        with open(consolidated_path, "wb") as out_handle:
-            for path_obj in matches:
-                if path_obj == consolidated_path:
-                    continue
-                with open(path_obj, "rb") as in_handle:
-                    data = in_handle.read()
-                    if not data:
-                        continue
-                    out_handle.write(data)
-                    if not data.endswith(b"\n"):
-                        out_handle.write(b"\n")
+        sources = [path_obj for path_obj in matches if path_obj != consolidated_path]
+        if is_buffer_log(str(sources[0])):
+            merge_buffer_logs([str(p) for p in sources], str(consolidated_path), DUMP_BUFFER_SEGMENT_BYTES)
+        else:
+            with open(consolidated_path, "wb") as out_handle:
+                for path_obj in sources:
+                    with open(path_obj, "rb") as in_handle:
+                        shutil.copyfileobj(in_handle, out_handle, 1_048_576)
+                        if in_handle.tell() == 0:
+                            continue
+                        in_handle.seek(-1, os.SEEK_END)
+                        if in_handle.read(1) != b"\n":
+                            out_handle.write(b"\n")
 
         if cleanup_files:
             removed = 0
@@ -544,7 +624,10 @@ class Flowcept(object):
                 if path_obj == consolidated_path:
                     continue
                 try:
-                    path_obj.unlink()
+                    if path_obj.is_dir():
+                        shutil.rmtree(path_obj)
+                    else:
+                        path_obj.unlink()
                     removed += 1
                 except Exception:
                     continue
@@ -604,9 +687,16 @@ class Flowcept(object):
         if not LMDB_ENABLED and not MONGO_ENABLED:
             return
 
-        from flowcept.flowceptor.consumers.document_inserter import DocumentInserter
+        if DB_INSERTER_WORKERS > 1:
+            from flowcept.flowceptor.consumers.document_inserter_pool import DocumentInserterPool
+
+            doc_inserter = DocumentInserterPool(
+                DB_INSERTER_WORKERS, check_safe_stops=self._check_safe_stops, bundle_exec_id=self.bundle_exec_id
+            )
+        else:
+            from flowcept.flowceptor.consumers.document_inserter import DocumentInserter
 
-        doc_inserter = DocumentInserter(check_safe_stops=self._check_safe_stops, bundle_exec_id=self.bundle_exec_id)
+            doc_inserter = DocumentInserter(check_safe_stops=self._check_safe_stops, bundle_exec_id=self.bundle_exec_id)
         doc_inserter.start()
         self._db_inserters.append(doc_inserter)
 
@@ -616,6 +706,10 @@ class Flowcept(object):
             self.logger.warning("Flowcept is already stopped or may never have been started!")
             return
 
+        if self.process_group is not None:
+            self.process_group.stop()
+            self.process_group = None
+
         if self._interceptors and len(self._interceptor_instances):
             for interceptor in self._interceptor_instances:
                 if interceptor is None:
@@ -650,6 +744,19 @@ class Flowcept(object):
         """Run the stop function."""
         self.stop()
 
+    async def __aenter__(self):
+        """Run the start function."""
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Await the last flush of the messages intercepted on this event loop, then run the stop function."""
+        if self.is_started and self._interceptor_instances:
+            for interceptor in self._interceptor_instances:
+                if interceptor is not None:
+                    await interceptor.stop_async_publishing()
+        self.stop()
+
     @staticmethod
     def services_alive() -> bool:
         """
@@ -722,6 +829,8 @@ class Flowcept(object):
         - The method initializes the `DocumentInserter` service, which processes documents
           based on the provided parameters.
         - The `threaded` parameter for `DocumentInserter.start` is set to `False`.
+        - If `db_buffer.inserter_workers` is greater than 1, a `DocumentInserterPool` with that
+          many processes is started instead, and this method blocks until all of them stop.
 
         Examples
         --------
@@ -729,9 +838,18 @@ class Flowcept(object):
         """
         if consumers is not None:
             raise NotImplementedError("We currently only have one type of consumer.")
+        logger = FlowceptLogger()
+        if DB_INSERTER_WORKERS > 1:
+            from flowcept.flowceptor.consumers.document_inserter_pool import DocumentInserterPool
+
+            logger.debug(f"Starting {DB_INSERTER_WORKERS} doc inserter processes.")
+            DocumentInserterPool(
+                DB_INSERTER_WORKERS, check_safe_stops=check_safe_stops, bundle_exec_id=bundle_exec_id
+            ).start().join()
+            return
+
         from flowcept.flowceptor.consumers.document_inserter import DocumentInserter
 
-        logger = FlowceptLogger()
         doc_inserter = DocumentInserter(check_safe_stops=check_safe_stops, bundle_exec_id=bundle_exec_id)
         logger.debug("Starting doc inserter service.")
         doc_inserter.start(threaded=False)
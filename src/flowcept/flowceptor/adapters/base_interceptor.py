@@ -3,19 +3,24 @@
 from abc import abstractmethod
 from typing import Dict, List
 from uuid import uuid4
+from weakref import WeakKeyDictionary
 
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
     WorkflowObject,
 )
 from flowcept.configs import (
     ENRICH_MESSAGES,
+    MQ_ASYNC_PUBLISHING,
     TELEMETRY_ENABLED,
     TELEMETRY_CAPTURE,
+    TELEMETRY_PAYLOAD,
 )
 from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.autoflush_buffer import AutoflushBuffer, BoundedAutoflushBuffer
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
 from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
 from flowcept.commons.settings_factory import get_settings
+from flowcept.commons.telemetry_payload import encode_telemetry_payload
 
 
 # TODO :base-interceptor-refactor: :ml-refactor: :code-reorg: :usability:
@@ -71,6 +76,8 @@ class BaseInterceptor(object):
         else:
             self.settings = None
         self._mq_dao = MQDao.build(adapter_settings=self.settings)
+        # Async publishers (AsyncMQDao) by event loop, imported with asyncio on the first use.
+        self._async_mq_daos: WeakKeyDictionary = WeakKeyDictionary()
         self._bundle_exec_id = None
         self.started = False
         self._interceptor_instance_id = str(id(self))
@@ -100,6 +107,11 @@ class BaseInterceptor(object):
 
     def stop(self, check_safe_stops: bool = True):
         """Stop an interceptor."""
+        if self.kind == "instrumentation":
+            from flowcept.instrumentation.sampling import flush_samplers
+
+            flush_samplers(self)
+        self._stop_async_mq_daos()
         self._mq_dao.stop(
             interceptor_instance_id=self._interceptor_instance_id,
             check_safe_stops=check_safe_stops,
@@ -150,10 +162,79 @@ class BaseInterceptor(object):
 
     def intercept(self, obj_msg: Dict):
         """Intercept a message."""
+        if TELEMETRY_PAYLOAD != "full" and obj_msg.get("type") == "task":
+            encode_telemetry_payload(obj_msg, TELEMETRY_PAYLOAD)
         self._mq_dao.buffer.append(obj_msg)
 
+    async def intercept_async(self, obj_msg: Dict):
+        """Intercept a message from a coroutine running on an asyncio event loop.
+
+        With ``mq.async_publishing`` and online flushing, the message goes into the buffer of the
+        running loop, whose flushes are awaited on the loop. If that buffer holds more than its
+        capacity, this waits for a flush to complete. Otherwise, it is the same as :meth:`intercept`.
+        """
+        async_mq_dao = self._get_async_mq_dao()
+        if async_mq_dao is None:
+            self.intercept(obj_msg)
+            return
+        if TELEMETRY_PAYLOAD != "full" and obj_msg.get("type") == "task":
+            encode_telemetry_payload(obj_msg, TELEMETRY_PAYLOAD)
+        async_mq_dao.buffer.append(obj_msg)
+        await async_mq_dao.buffer.wait_for_capacity()
+
+    def _get_async_mq_dao(self):
+        """Return the async publisher of the running event loop, or None to publish synchronously."""
+        if not MQ_ASYNC_PUBLISHING or not isinstance(self._mq_dao.buffer, (AutoflushBuffer, BoundedAutoflushBuffer)):
+            # Offline, or the buffer of a child process in process-group capture.
+            return None
+        import asyncio
+        from flowcept.commons.daos.mq_dao.mq_dao_async import AsyncMQDao
+
+        loop = asyncio.get_running_loop()
+        async_mq_dao = self._async_mq_daos.get(loop)
+        if async_mq_dao is None:
+            # Loops closed without shutdown_asyncgens (unlike asyncio.run) may have left messages.
+            for closed_loop in [lp for lp in self._async_mq_daos if lp.is_closed()]:
+                self._mq_dao.buffer.extend(self._async_mq_daos.pop(closed_loop).buffer.drain())
+            async_mq_dao = self._async_mq_daos[loop] = AsyncMQDao.build(self._mq_dao).init_buffer()
+        return async_mq_dao
+
+    async def stop_async_publishing(self):
+        """Flush the buffer of the running event loop, awaiting its last publishes."""
+        import asyncio
+
+        async_mq_dao = self._async_mq_daos.pop(asyncio.get_running_loop(), None)
+        if async_mq_dao is not None:
+            await async_mq_dao.stop()
+
+    def _stop_async_mq_daos(self):
+        """Flush the buffers of the event loops before the synchronous buffer is closed."""
+        if not self._async_mq_daos:
+            return
+        import asyncio
+
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        for loop in list(self._async_mq_daos):
+            async_mq_dao = self._async_mq_daos.pop(loop)
+            if loop is not current_loop and loop.is_running():
+                # The loop runs in another thread: flush there and wait.
+                asyncio.run_coroutine_threadsafe(async_mq_dao.stop(), loop).result()
+                continue
+            # This thread's loop cannot be awaited from a synchronous stop, and a closed loop
+            # cannot run: the synchronous buffer publishes what their buffers hold.
+            self._mq_dao.buffer.extend(async_mq_dao.buffer.drain())
+            if loop is current_loop:
+                loop.create_task(async_mq_dao.close())
+
     def intercept_many(self, obj_messages: List[Dict]):
         """Intercept a list of messages."""
+        if TELEMETRY_PAYLOAD != "full":
+            for obj_msg in obj_messages:
+                if obj_msg.get("type") == "task":
+                    encode_telemetry_payload(obj_msg, TELEMETRY_PAYLOAD)
         self._mq_dao.buffer.extend(obj_messages)
 
     def set_buffer(self, buffer):
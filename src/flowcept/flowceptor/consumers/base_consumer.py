@@ -34,6 +34,7 @@ class BaseConsumer(object):
             raise Exception("MQ is disabled in the settings. You cannot consume messages.")
 
         self._mq_dao = MQDao.build()
+        self._mq_dao.consumer_group = self.__class__.__name__
 
     @abstractmethod
     def message_handler(self, msg_obj: Dict) -> bool:
@@ -9,6 +9,7 @@ from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
 from flowcept.commons.vocabulary import Status
 
 UTC_TZ = ZoneInfo("UTC")
+_FINISHED_STATUSES = {s.value for s in Status.get_finished_statuses()}
 
 
 def curate_task_msg(task_msg_dict: dict, convert_times=True, keys_to_drop: List = None):
@@ -152,7 +153,7 @@ def curate_dict_task_messages(
         for field in TaskObject.get_dict_field_names():
             if field in doc:
                 if doc[field] is not None and len(doc[field]):
-                    doc[field] = convert_keys_to_strings(doc[field])
+                    # curate_task_msg already converted the keys to strings.
                     if field in indexed_buffer[indexing_key_value]:
                         indexed_buffer[indexing_key_value][field].update(doc[field])
                     else:
@@ -161,3 +162,29 @@ def curate_dict_task_messages(
 
         indexed_buffer[indexing_key_value].update(**doc)
     return indexed_buffer
+
+
+def merge_task_doc(task: Dict, message: Dict) -> Dict:
+    """Merge a task message into a stored task document, in place.
+
+    Follows the rules ``curate_dict_task_messages`` applies within a batch: nested dict fields
+    (e.g., ``used`` and ``generated``) are updated instead of replaced, the flags of previous
+    statuses are kept, and a finished status is not overwritten by a late, unfinished one.
+    ``message`` is consumed in the process.
+    """
+    task_status = task.get("status")
+    if task_status is not None:
+        task[task_status.lower()] = True
+    msg_status = message.get("status")
+    for field in TaskObject.get_dict_field_names():
+        value = message.pop(field, None)
+        if value is None:
+            continue
+        if isinstance(value, dict) and isinstance(task.get(field), dict):
+            task[field].update(value)
+        else:
+            task[field] = value
+    task.update(message)
+    if task_status in _FINISHED_STATUSES and msg_status not in _FINISHED_STATUSES:
+        task["status"] = task_status
+    return task
@@ -6,8 +6,10 @@ from typing import Dict, Callable, Tuple
 from uuid import uuid4
 
 from flowcept.commons.task_data_preprocess import summarize_telemetry, tag_critical_task
+from flowcept.commons.telemetry_payload import decode_telemetry_payload
 from flowcept.flowceptor.consumers.base_consumer import BaseConsumer
-from flowcept.commons.autoflush_buffer import AutoflushBuffer
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.commons.autoflush_buffer import AutoflushBuffer, BoundedAutoflushBuffer, build_autoflush_buffer
 from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
     WorkflowObject,
@@ -18,8 +20,15 @@ from flowcept.commons.vocabulary import Status
 from flowcept.configs import (
     INSERTION_BUFFER_TIME,
     DB_BUFFER_SIZE,
+    DB_BUFFER_ENGINE,
+    DB_BUFFER_CAPACITY,
+    DB_BUFFER_OVERFLOW_POLICY,
+    DB_BUFFER_SPILL_PATH,
     DB_INSERTER_MAX_TRIALS_STOP,
     DB_INSERTER_SLEEP_TRIALS_STOP,
+    DB_TASK_ASSEMBLY,
+    DB_TASK_ASSEMBLY_CAPACITY,
+    DB_TASK_ASSEMBLY_TIMEOUT,
     REMOVE_EMPTY_FIELDS,
     JSON_SERIALIZER,
     ENRICH_MESSAGES,
@@ -62,7 +71,26 @@ class DocumentInserter(BaseConsumer):
         self,
         check_safe_stops=True,
         bundle_exec_id=None,
+        partition: int = None,
+        group_id: str = None,
+        message_queue=None,
     ):
+        """
+        Parameters
+        ----------
+        check_safe_stops : bool, optional
+            Whether to wait for all interceptors to report their flushes before stopping.
+        bundle_exec_id : str, optional
+            Execution bundle this inserter belongs to.
+        partition : int, optional
+            Index of the partition this inserter reads, on transports that route the partitions
+            of a DocumentInserterPool to its workers (see ``MQDao.PARTITIONED_CONSUMERS``).
+        group_id : str, optional
+            Consumer group shared by the workers of the pool, used when ``mq.group_id`` is auto.
+        message_queue : multiprocessing.Queue, optional
+            If given, the inserter reads the messages of its partition from this queue, fed by the
+            router of a DocumentInserterPool, instead of subscribing to the MQ.
+        """
         self._doc_daos = []
         self.logger = FlowceptLogger()
         if MONGO_ENABLED:
@@ -84,18 +112,41 @@ class DocumentInserter(BaseConsumer):
         self._curr_db_buffer_size = DB_BUFFER_SIZE
         self._bundle_exec_id = bundle_exec_id
         self.check_safe_stops = check_safe_stops
-        self.buffer: AutoflushBuffer = AutoflushBuffer(
+        self._message_queue = message_queue
+        self.handled_msgs = 0
+        if partition is not None:
+            self._mq_dao.partition = partition
+            self._mq_dao.group_id = group_id
+        # Task messages are acknowledged to the MQ only after they are flushed to the DocDBs.
+        self._mq_dao.manual_ack = True
+        self.buffer: AutoflushBuffer | BoundedAutoflushBuffer = build_autoflush_buffer(
             flush_function=DocumentInserter.flush_function,
-            flush_function_kwargs={"logger": self.logger, "doc_daos": self._doc_daos},
+            flush_function_kwargs={"logger": self.logger, "doc_daos": self._doc_daos, "mq_dao": self._mq_dao},
+            engine=DB_BUFFER_ENGINE,
             max_size=self._curr_db_buffer_size,
             flush_interval=INSERTION_BUFFER_TIME,
+            capacity=DB_BUFFER_CAPACITY,
+            overflow_policy=DB_BUFFER_OVERFLOW_POLICY,
+            spill_path=DB_BUFFER_SPILL_PATH,
         )
+        self._task_assembler = None
+        if DB_TASK_ASSEMBLY:
+            from flowcept.flowceptor.consumers.task_assembler import TaskAssembler
+
+            self._task_assembler = TaskAssembler(
+                emit_function=self._buffer_task_message,
+                capacity=DB_TASK_ASSEMBLY_CAPACITY,
+                timeout=DB_TASK_ASSEMBLY_TIMEOUT,
+            )
 
     @staticmethod
-    def flush_function(buffer, doc_daos, logger):
+    def flush_function(buffer, doc_daos, logger, mq_dao=None):
         """
         Flush the buffer contents to all configured document databases.
 
+        Once all DocDBs are written, the flushed messages are acknowledged to the MQ, for
+        transports that support it (see ``MQDao.ack``).
+
         Parameters
         ----------
         buffer : list
@@ -104,16 +155,32 @@ class DocumentInserter(BaseConsumer):
             List of DAO instances to insert data into (e.g., MongoDBDAO, LMDBDAO).
         logger : FlowceptLogger
             Logger instance for debug and info logging.
+        mq_dao : MQDao, optional
+            MQ DAO the messages were consumed from.
         """
         logger.info(f"Current Doc buffer size: {len(buffer)}, Gonna flush {len(buffer)} msgs to DocDBs!")
+        msg_ids = []
+        for msg in buffer:
+            msg_id = msg.pop(MQDao.MSG_ID_FIELD, None)
+            if isinstance(msg_id, list):  # Task assembled from several messages
+                msg_ids.extend(msg_id)
+            elif msg_id is not None:
+                msg_ids.append(msg_id)
         for dao in doc_daos:
             dao.insert_and_update_many_tasks(buffer, TaskObject.task_id_field())
             logger.debug(
                 f"DocDao={id(dao)},DocDaoClass={dao.__class__.__name__};\
                 Flushed {len(buffer)} msgs to this DocDB!"
             )  # TODO: add name
+        if mq_dao is not None and msg_ids:
+            mq_dao.ack(msg_ids)
 
     def _handle_task_message(self, message: Dict):
+        if "telemetry_delta" in message:
+            try:
+                decode_telemetry_payload(message)
+            except Exception as e:
+                self.logger.exception(e)
         if "workflow_id" not in message and len(message.get("used", {})):
             wf_id = message.get("used").get("workflow_id", None)
             if wf_id:
@@ -140,17 +207,23 @@ class DocumentInserter(BaseConsumer):
             message["status"] = Status.FINISHED.value
 
         message.pop("type")
+        if self._task_assembler is not None:
+            self._task_assembler.add(message)
+        else:
+            self._buffer_task_message(message)
 
+    def _buffer_task_message(self, message: Dict):
         if ENRICH_MESSAGES:
             TaskObject.enrich_task_dict(message)
-            if (
+            if message.get("telemetry_summary") or (
                 "telemetry_at_start" in message
                 and message["telemetry_at_start"]
                 and "telemetry_at_end" in message
                 and message["telemetry_at_end"]
             ):
                 try:
-                    telemetry_summary = summarize_telemetry(message, self.logger)
+                    # Tasks captured with the telemetry sampler already carry their summary.
+                    telemetry_summary = message.get("telemetry_summary") or summarize_telemetry(message, self.logger)
                     message["telemetry_summary"] = telemetry_summary
                     # TODO: make this configurable
                     tags = tag_critical_task(
@@ -246,12 +319,27 @@ class DocumentInserter(BaseConsumer):
         if not self._should_start:
             self.logger.info("Doc Inserter cannot start as all DocDBs are disabled.")
             return self
+        if self._message_queue is not None:
+            # Fed by the router of a DocumentInserterPool: there is nothing to subscribe to.
+            if threaded:
+                self._main_thread = Thread(target=self.thread_target, daemon=daemon)
+                self._main_thread.start()
+            else:
+                self.thread_target()
+            return self
         super().start(target=self.thread_target, threaded=threaded, daemon=daemon)
         return self
 
     def thread_target(self):
         """Function to be used in the self.start method."""
-        super().default_thread_target()
+        if self._message_queue is None:
+            super().default_thread_target()
+        else:
+            while self.message_handler(self._message_queue.get()):
+                pass
+        if self._task_assembler is not None:
+            self._task_assembler.stop()
+            self.logger.info(f"Task assembler metrics: {self._task_assembler.metrics}")
         self.buffer.stop()
         self.logger.info("Ok, we broke the doc inserter message listen loop!")
 
@@ -270,8 +358,12 @@ class DocumentInserter(BaseConsumer):
             False if a stop control message is received, True otherwise.
         """
         msg_type = msg_obj.get("type")
+        if msg_type != "flowcept_control":
+            self.handled_msgs += 1
         if msg_type == "flowcept_control":
+            msg_id = msg_obj.pop(MQDao.MSG_ID_FIELD, None)
             r = self._handle_control_message(msg_obj)
+            self._ack(msg_id)
             if r == "stop":
                 return False
             return True
@@ -279,7 +371,9 @@ class DocumentInserter(BaseConsumer):
             self._handle_task_message(msg_obj)
             return True
         elif msg_type == "workflow":
+            msg_id = msg_obj.pop(MQDao.MSG_ID_FIELD, None)
             self._handle_workflow_message(msg_obj)
+            self._ack(msg_id)
             return True
         elif msg_type is None:
             # Trying to infer the type
@@ -288,14 +382,23 @@ class DocumentInserter(BaseConsumer):
                 self._handle_task_message(msg_obj)
             elif "name" in msg_obj or "environment_id" in msg_obj:
                 msg_obj["type"] = "workflow"
+                msg_id = msg_obj.pop(MQDao.MSG_ID_FIELD, None)
                 self._handle_workflow_message(msg_obj)
+                self._ack(msg_id)
             else:
                 self.logger.error(f"We couldn't infer msg type!!! --> {msg_obj}")
+                self._ack(msg_obj.pop(MQDao.MSG_ID_FIELD, None))
             return True
         else:
             self.logger.error("Unexpected message type")
+            self._ack(msg_obj.pop(MQDao.MSG_ID_FIELD, None))
             return True
 
+    def _ack(self, msg_id):
+        """Acknowledge a message that is not buffered, e.g., a workflow or control message."""
+        if msg_id is not None:
+            self._mq_dao.ack([msg_id])
+
     def stop(self, bundle_exec_id=None):
         """
         Stop the DocumentInserter safely, waiting for all time-based threads to end.
@@ -314,34 +417,41 @@ class DocumentInserter(BaseConsumer):
             self.logger.info("Doc Inserter has not been started, so it can't stop.")
             return self
         if self.check_safe_stops:
-            trial = 0
-            while not (
-                self._mq_dao.all_time_based_threads_ended(bundle_exec_id)
-                and self._mq_dao.all_flush_complete_received(bundle_exec_id)
-            ):
-                self.logger.debug(
-                    f"# time_based_threads for bundle_exec_id {bundle_exec_id} is"
-                    f"{self._mq_dao._keyvalue_dao.set_count(bundle_exec_id)}"
-                )
-                trial += 1
-                self.logger.info(
-                    f"Doc Inserter {id(self)}: It's still not safe to stop DocInserter. "
-                    f"Checking again in {DB_INSERTER_SLEEP_TRIALS_STOP} secs. Trial={trial}."
-                )
-                sleep(DB_INSERTER_SLEEP_TRIALS_STOP)
-                if trial >= DB_INSERTER_MAX_TRIALS_STOP:
-                    # if len(self._mq_dao._buffer) == 0:
-                    msg = f"DocInserter {id(self)} gave up waiting for signal. "
-                    self.logger.critical(msg + "Safe to stop now.")
-                    break
-            self._mq_dao.delete_current_campaign_id()
+            DocumentInserter.wait_for_safe_stop(self._mq_dao, bundle_exec_id, self.logger, inserter_id=id(self))
 
         self.logger.info("Sending message to stop document inserter.")
         self._mq_dao.send_document_inserter_stop(exec_bundle_id=self._bundle_exec_id)
         self.logger.info(f"Doc Inserter {id(self)} Sent message to stop itself.")
         self._main_thread.join()
+        self.close()
+        self.logger.info("Document Inserter is stopped.")
+
+    def close(self):
+        """Close the DocDB connections."""
         for dao in self._doc_daos:
             self.logger.info(f"Closing document_inserter {dao.__class__.__name__} connection.")
             dao.close()
 
-        self.logger.info("Document Inserter is stopped.")
+    @staticmethod
+    def wait_for_safe_stop(mq_dao: MQDao, bundle_exec_id, logger, inserter_id=None):
+        """Wait until all interceptors of the bundle stopped and reported their last flush, then clear the campaign."""
+        trial = 0
+        while not (
+            mq_dao.all_time_based_threads_ended(bundle_exec_id) and mq_dao.all_flush_complete_received(bundle_exec_id)
+        ):
+            logger.debug(
+                f"# time_based_threads for bundle_exec_id {bundle_exec_id} is"
+                f"{mq_dao._keyvalue_dao.set_count(bundle_exec_id)}"
+            )
+            trial += 1
+            logger.info(
+                f"Doc Inserter {inserter_id}: It's still not safe to stop DocInserter. "
+                f"Checking again in {DB_INSERTER_SLEEP_TRIALS_STOP} secs. Trial={trial}."
+            )
+            sleep(DB_INSERTER_SLEEP_TRIALS_STOP)
+            if trial >= DB_INSERTER_MAX_TRIALS_STOP:
+                # if len(self._mq_dao._buffer) == 0:
+                msg = f"DocInserter {inserter_id} gave up waiting for signal. "
+                logger.critical(msg + "Safe to stop now.")
+                break
+        mq_dao.delete_current_campaign_id()
@@ -0,0 +1,174 @@
+"""Document Inserter pool module."""
+
+import multiprocessing as mp
+from time import time
+from typing import Dict, List
+from uuid import uuid4
+
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.flowceptor.consumers.base_consumer import BaseConsumer
+
+
+def _run_partition(index, check_safe_stops, bundle_exec_id, ready, handled_msgs, group_id, message_queue):
+    """Run the DocumentInserter of one partition until it receives its stop message."""
+    from flowcept.flowceptor.consumers.document_inserter import DocumentInserter
+
+    inserter = DocumentInserter(
+        check_safe_stops=check_safe_stops,
+        bundle_exec_id=bundle_exec_id,
+        partition=None if message_queue is not None else index,
+        group_id=group_id,
+        message_queue=message_queue,
+    )
+    inserter.start(daemon=True)
+    ready.set()
+    while inserter._main_thread.is_alive():
+        inserter._main_thread.join(timeout=1)
+        handled_msgs[index] = inserter.handled_msgs
+    handled_msgs[index] = inserter.handled_msgs
+    inserter.close()
+
+
+class _PartitionRouter(BaseConsumer):
+    """Read the MQ once and route each message to the queue of the worker owning its partition.
+
+    Control messages go to every worker. The router stops with the pool's stop message.
+    """
+
+    def __init__(self, queues, bundle_exec_id=None):
+        super().__init__()
+        self._queues = queues
+        self._bundle_exec_id = bundle_exec_id
+
+    def message_handler(self, msg_obj: Dict) -> bool:
+        """Route a message. Returns False once the pool's stop message was forwarded."""
+        if msg_obj.get("type") == "flowcept_control":
+            for queue in self._queues:
+                queue.put(msg_obj)
+            return not (
+                msg_obj.get("info") == "stop_document_inserter"
+                and msg_obj.get("exec_bundle_id") == self._bundle_exec_id
+            )
+        self._queues[MQDao.partition_of(msg_obj, len(self._queues))].put(msg_obj)
+        return True
+
+
+def _run_router(queues, bundle_exec_id, ready):
+    """Run the partition router until the pool's stop message."""
+    router = _PartitionRouter(queues, bundle_exec_id)
+    router.start(daemon=True)
+    ready.set()
+    router._main_thread.join()
+
+
+class DocumentInserterPool:
+    """Run ``n_workers`` DocumentInserter processes, each owning a partition of the messages.
+
+    Messages are partitioned by ``db_buffer.inserter_partition_key`` (see ``MQDao.partition_of``),
+    so curation, enrichment, and DB writes run in parallel while all messages of a task are still
+    handled by the same process, and each message is read and decoded by one process only:
+
+    - On transports with ``MQDao.PARTITIONED_CONSUMERS`` (Redis Streams, Kafka), producers route
+      each message to its partition, and the workers read their partitions as consumers of one
+      shared consumer group.
+    - On the others (e.g., Redis Pub/Sub), one router process subscribes to the MQ and hands each
+      message to its worker through a queue.
+
+    The pool has the same ``start``/``stop`` interface as a DocumentInserter, and it runs the
+    safe-stop protocol once for all workers.
+
+    Parameters
+    ----------
+    n_workers : int
+        Number of DocumentInserter processes.
+    check_safe_stops : bool, optional
+        Whether to wait for all interceptors to report their flushes before stopping.
+    bundle_exec_id : str, optional
+        Execution bundle the inserters belong to.
+    """
+
+    READY_TIMEOUT = 120  # In seconds. Spawning a process imports flowcept from scratch.
+
+    def __init__(self, n_workers: int, check_safe_stops=True, bundle_exec_id=None):
+        self.logger = FlowceptLogger()
+        self._n_workers = n_workers
+        self.check_safe_stops = check_safe_stops
+        self._bundle_exec_id = bundle_exec_id
+        # Spawn instead of fork: the parent usually has MQ flushing threads and open connections.
+        self._ctx = mp.get_context("spawn")
+        self._handled_msgs = self._ctx.Array("q", n_workers)
+        self._processes: List[mp.Process] = []
+        self._start_time = None
+
+    def start(self):
+        """Start the workers, and the router if needed, and wait until they are subscribed to the MQ."""
+        routed_by_mq = MQDao.build().PARTITIONED_CONSUMERS
+        queues = [None] * self._n_workers if routed_by_mq else [self._ctx.Queue() for _ in range(self._n_workers)]
+        group_id = f"flowcept_{self.__class__.__name__}_{uuid4().hex[:8]}"
+        events = []
+        for i in range(self._n_workers):
+            ready = self._ctx.Event()
+            p = self._ctx.Process(
+                target=_run_partition,
+                args=(
+                    i,
+                    self.check_safe_stops,
+                    self._bundle_exec_id,
+                    ready,
+                    self._handled_msgs,
+                    group_id,
+                    queues[i],
+                ),
+                name=f"flowcept_doc_inserter_{i}",
+                daemon=True,
+            )
+            p.start()
+            self._processes.append(p)
+            events.append(ready)
+        if not routed_by_mq:
+            ready = self._ctx.Event()
+            p = self._ctx.Process(
+                target=_run_router,
+                args=(queues, self._bundle_exec_id, ready),
+                name="flowcept_doc_inserter_router",
+                daemon=True,
+            )
+            p.start()
+            self._processes.append(p)
+            events.append(ready)
+        for i, ready in enumerate(events):
+            if not ready.wait(DocumentInserterPool.READY_TIMEOUT):
+                raise Exception(f"Document Inserter process {self._processes[i].name} did not start.")
+        self._start_time = time()
+        self.logger.info(f"Started {self._n_workers} Document Inserter processes.")
+        return self
+
+    def join(self):
+        """Block until all workers have stopped."""
+        for p in self._processes:
+            p.join()
+
+    def stop(self, bundle_exec_id=None):
+        """Wait for a safe stop, then stop all workers with a single stop message."""
+        mq_dao = MQDao.build()
+        if self.check_safe_stops:
+            from flowcept.flowceptor.consumers.document_inserter import DocumentInserter
+
+            DocumentInserter.wait_for_safe_stop(mq_dao, bundle_exec_id, self.logger, inserter_id=id(self))
+        self.logger.info("Sending message to stop the document inserters.")
+        mq_dao.send_document_inserter_stop(exec_bundle_id=self._bundle_exec_id)
+        self.join()
+        self.logger.info(f"Document Inserter pool is stopped. Metrics: {self.metrics}")
+
+    @property
+    def metrics(self) -> Dict:
+        """Return the messages handled by each worker and the aggregate throughput (msgs/s)."""
+        per_worker = list(self._handled_msgs)
+        elapsed = time() - self._start_time if self._start_time else None
+        return {
+            "workers": self._n_workers,
+            "handled_msgs_per_worker": per_worker,
+            "handled_msgs": sum(per_worker),
+            "throughput": sum(per_worker) / elapsed if elapsed else None,
+        }
@@ -0,0 +1,119 @@
+"""Task assembler module."""
+
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+from time import time
+from typing import Callable, Dict, List
+
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.commons.vocabulary import Status
+from flowcept.flowceptor.consumers.consumer_utils import merge_task_doc
+
+_FINISHED_STATUSES = {s.value for s in Status.get_finished_statuses()}
+
+
+class TaskAssembler:
+    """Merge the partial messages of a task into one document before it is buffered for the DocDBs.
+
+    A task usually produces several messages (e.g., one when it starts and one when it ends) that
+    may land in different flush windows, which costs one DB upsert per message. The assembler
+    keeps the partial task documents in a bounded LRU keyed by task_id, merges new messages into
+    them with ``merge_task_doc``, the rules the DAOs also apply when they merge a batch, and emits
+    a task once it reaches a finished status. Partial tasks are emitted anyway after ``timeout``
+    seconds without updates, when the LRU is full, or on ``stop``.
+
+    Parameters
+    ----------
+    emit_function : Callable
+        Called with each assembled task message.
+    capacity : int
+        Max number of partial tasks kept in memory.
+    timeout : float
+        Seconds a partial task may wait for its next message before being emitted.
+    """
+
+    def __init__(self, emit_function: Callable, capacity: int = 10_000, timeout: float = 5):
+        self._emit_function = emit_function
+        self._capacity = capacity
+        self._timeout = timeout
+        self._partials: OrderedDict = OrderedDict()  # task_id -> (last update time, message)
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._merged = 0
+        self._emitted_complete = 0
+        self._emitted_partial = 0
+        self._sweep_thread = Thread(target=self._sweep_loop, daemon=True, name="flowcept_task_assembler")
+        self._sweep_thread.start()
+
+    @staticmethod
+    def _merge(task: Dict, message: Dict):
+        """Merge ``message`` into ``task`` in place."""
+        msg_id = message.pop(MQDao.MSG_ID_FIELD, None)
+        if msg_id is not None:
+            # Every merged message must still be acknowledged once the task is flushed.
+            ids = task.get(MQDao.MSG_ID_FIELD)
+            if ids is None:
+                task[MQDao.MSG_ID_FIELD] = msg_id
+            elif isinstance(ids, list):
+                ids.append(msg_id)
+            else:
+                task[MQDao.MSG_ID_FIELD] = [ids, msg_id]
+        merge_task_doc(task, message)
+
+    def add(self, message: Dict):
+        """Merge a task message and emit the task if it is complete."""
+        to_emit: List[Dict] = []
+        task_id = message.get("task_id")
+        with self._lock:
+            entry = self._partials.pop(task_id, None)
+            if entry is not None:
+                task = entry[1]
+                TaskAssembler._merge(task, message)
+                self._merged += 1
+            else:
+                task = message
+            if task.get("status") in _FINISHED_STATUSES:
+                self._emitted_complete += 1
+                to_emit.append(task)
+            else:
+                self._partials[task_id] = (time(), task)
+                while len(self._partials) > self._capacity:
+                    to_emit.append(self._partials.popitem(last=False)[1][1])
+                    self._emitted_partial += 1
+        for task in to_emit:
+            self._emit_function(task)
+
+    def _pop_expired(self, now: float) -> List[Dict]:
+        expired = []
+        with self._lock:
+            # The LRU is ordered by last update, so expired tasks are at the head.
+            while self._partials:
+                updated_at, task = next(iter(self._partials.values()))
+                if now - updated_at < self._timeout:
+                    break
+                self._partials.popitem(last=False)
+                expired.append(task)
+            self._emitted_partial += len(expired)
+        return expired
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self._timeout / 2):
+            for task in self._pop_expired(time()):
+                self._emit_function(task)
+
+    def stop(self):
+        """Emit every partial task and stop the timeout thread."""
+        self._stop_event.set()
+        self._sweep_thread.join()
+        for task in self._pop_expired(float("inf")):
+            self._emit_function(task)
+
+    @property
+    def metrics(self) -> Dict:
+        """Return how many messages were merged and how many tasks were emitted complete or partial."""
+        return {
+            "pending": len(self._partials),
+            "merged_msgs": self._merged,
+            "emitted_complete": self._emitted_complete,
+            "emitted_partial": self._emitted_partial,
+        }
@@ -1,22 +1,23 @@
 """Telemetry module."""
 
-from typing import Callable, Set, List
+from typing import Callable, Dict, Set, List
 
 import platform
+import threading
 
 import os
 
 from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.configs import (
     TELEMETRY_CAPTURE,
-    HOSTNAME,
-    LOGIN_NAME,
+    TELEMETRY_SAMPLER_ENABLED,
+    get_hostname,
+    get_login_name,
 )
 from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry
 
 if TELEMETRY_CAPTURE is not None and len(TELEMETRY_CAPTURE):
     import psutil
-    import cpuinfo
 
 
 class GPUCapture:
@@ -205,9 +206,17 @@ elif GPUCapture.GPU_VENDOR == "nvidia":
 
 
 class TelemetryCapture:
-    """Telemetry class."""
+    """Telemetry class.
 
-    def __init__(self, conf=TELEMETRY_CAPTURE):
+    With ``telemetry_capture.sampler.enabled``, a :class:`TelemetrySampler` shared by the whole
+    process samples the telemetry in the background, and :meth:`capture` returns its latest
+    samples instead of querying psutil.
+    """
+
+    _sampler = None
+    _sampler_lock = threading.Lock()
+
+    def __init__(self, conf=TELEMETRY_CAPTURE, use_sampler=TELEMETRY_SAMPLER_ENABLED):
         self.logger = FlowceptLogger()
         self.conf = conf
         self._gpu_conf = None
@@ -215,11 +224,45 @@ class TelemetryCapture:
             self._gpu_conf = self.conf.get("gpu", {})
             if self._gpu_conf is not None:
                 self._gpu_conf = set(self._gpu_conf)
+        self.sampler = self._get_sampler() if (use_sampler and self.conf) else None
+
+    def _get_sampler(self):
+        with TelemetryCapture._sampler_lock:
+            if TelemetryCapture._sampler is None:
+                from flowcept.flowceptor.telemetry_sampler import TelemetrySampler
+
+                sampler_conf = self.conf.get("sampler", None) or {}
+                TelemetryCapture._sampler = TelemetrySampler(
+                    self._sampled_groups(),
+                    intervals=sampler_conf.get("intervals", None),
+                    ring_size=sampler_conf.get("ring_size", 1000),
+                ).start()
+            return TelemetryCapture._sampler
+
+    def _sampled_groups(self) -> Dict[str, Callable]:
+        groups = {}
+        if self.conf.get("process_info", False):
+            groups["process_info"] = self._capture_process_info
+        capt_cpu = self.conf.get("cpu", False)
+        capt_per_cpu = self.conf.get("per_cpu", False)
+        if capt_cpu or capt_per_cpu:
+            groups["cpu"] = lambda: self._capture_cpu(capt_cpu, capt_per_cpu)
+        if self.conf.get("mem", False):
+            groups["mem"] = self._capture_memory
+        if self.conf.get("network", False):
+            groups["network"] = self._capture_network
+        if self.conf.get("disk", False):
+            groups["disk"] = self._capture_disk
+        if self._gpu_conf:
+            groups["gpu"] = self._capture_gpu
+        return groups
 
     def capture(self) -> Telemetry:
         """Capture it."""
         if not self.conf:
             return None
+        if self.sampler is not None:
+            return self.sampler.snapshot()
         tel = Telemetry()
         if self.conf.get("process_info", False):
             tel.process = self._capture_process_info()
@@ -243,6 +286,12 @@ class TelemetryCapture:
 
         return tel
 
+    def summarize(self, started_at, ended_at) -> Dict:
+        """Summarize the telemetry of a time window from the sampler, or return None without it."""
+        if self.sampler is None or started_at is None or ended_at is None:
+            return None
+        return self.sampler.summarize(started_at, ended_at)
+
     def capture_machine_info(self):
         """Capture info."""
         # TODO: add ifs for each type of telem; improve this method overall
@@ -260,6 +309,8 @@ class TelemetryCapture:
             platform_info = platform.uname()._asdict()
             network_info_raw = psutil.net_if_addrs()
             network_info = {ifname: [addr._asdict() for addr in addrs] for ifname, addrs in network_info_raw.items()}
+            import cpuinfo
+
             processor_info = cpuinfo.get_cpu_info()
 
             gpu_info = None
@@ -273,9 +324,9 @@ class TelemetryCapture:
                 "cpu": processor_info,
                 "network": network_info,
                 "environment": dict(os.environ),
-                "hostname": HOSTNAME,
-                "login_name": LOGIN_NAME,
-                "process": self._capture_process_info().__dict__,
+                "hostname": get_hostname(),
+                "login_name": get_login_name(),
+                "process": self._capture_process_info().to_dict(),
             }
             if gpu_info is not None:
                 info["gpu"] = gpu_info
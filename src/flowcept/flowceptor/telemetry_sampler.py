@@ -0,0 +1,178 @@
+"""Telemetry sampler module."""
+
+import os
+import threading
+from bisect import bisect_right
+from collections import deque
+from time import time
+from typing import Callable, Dict, List, Tuple
+
+from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry
+from flowcept.commons.flowcept_logger import FlowceptLogger
+
+DEFAULT_INTERVALS = {
+    "cpu": 0.5,
+    "mem": 1.0,
+    "process_info": 1.0,
+    "gpu": 1.0,
+    "disk": 2.0,
+    "network": 2.0,
+}
+"""Default sampling interval, in seconds, of each metric group."""
+
+# Metric group -> Telemetry attribute filled by the group.
+GROUP_ATTRIBUTES = {
+    "cpu": "cpu",
+    "mem": "memory",
+    "process_info": "process",
+    "gpu": "gpu",
+    "disk": "disk",
+    "network": "network",
+}
+
+
+class TelemetrySampler:
+    """Sample telemetry in a background thread and keep the recent samples in ring buffers.
+
+    Each metric group (``cpu``, which also covers ``per_cpu``, ``mem``, ``process_info``,
+    ``gpu``, ``disk``, and ``network``) is sampled at its own interval into its own ring of
+    ``ring_size`` ``(timestamp, sample)`` pairs. Tasks then read the latest samples with
+    :meth:`snapshot`, which makes no psutil calls, and :meth:`summarize` computes the telemetry
+    summary of a time window from the samples in the rings.
+
+    A task shorter than a group's interval sees the same sample of that group at its start and
+    end, so lower the interval of the groups you need at a finer grain.
+
+    Parameters
+    ----------
+    capture_funcs : dict
+        Metric group -> function returning a new sample of the group.
+    intervals : dict, optional
+        Metric group -> sampling interval in seconds. Defaults to ``DEFAULT_INTERVALS``.
+    ring_size : int
+        Number of samples kept per group.
+    """
+
+    def __init__(self, capture_funcs: Dict[str, Callable], intervals: Dict[str, float] = None, ring_size=1000):
+        self.logger = FlowceptLogger()
+        intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+        self._capture_funcs = capture_funcs
+        self._intervals = {group: float(intervals[group]) for group in capture_funcs}
+        self._rings: Dict[str, deque] = {group: deque(maxlen=ring_size) for group in capture_funcs}
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread = None
+        self._pid = None
+
+    @property
+    def intervals(self) -> Dict[str, float]:
+        """Sampling interval of each metric group."""
+        return dict(self._intervals)
+
+    def start(self) -> "TelemetrySampler":
+        """Take a first sample of every group and start the sampling thread."""
+        now = time()
+        for group in self._capture_funcs:
+            self._sample(group, now)
+        self._stop_event.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="flowcept-telemetry-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the sampling thread."""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the sampling thread is alive in this process."""
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def _ensure_running(self):
+        # Threads do not survive a fork: restart the sampler in the child process.
+        if self._pid != os.getpid() and not self._stop_event.is_set():
+            self.start()
+
+    def _sample(self, group, now):
+        try:
+            sample = self._capture_funcs[group]()
+        except Exception as e:
+            self.logger.exception(e)
+            return
+        if sample is not None:
+            self._rings[group].append((now, sample))
+
+    def _run(self):
+        next_due = {group: time() + interval for group, interval in self._intervals.items()}
+        while not self._stop_event.is_set():
+            now = time()
+            for group, due in next_due.items():
+                if due <= now:
+                    self._sample(group, now)
+                    next_due[group] = max(due + self._intervals[group], now)
+            self._stop_event.wait(max(0.0, min(next_due.values()) - time()))
+
+    def snapshot(self) -> Telemetry:
+        """Return a Telemetry with the latest sample of each group."""
+        self._ensure_running()
+        tel = Telemetry()
+        for group, ring in self._rings.items():
+            if ring:
+                setattr(tel, GROUP_ATTRIBUTES[group], ring[-1][1])
+        return tel
+
+    def samples(self, group: str, start: float = None, end: float = None) -> List[Tuple[float, object]]:
+        """Return the ``(timestamp, sample)`` pairs of a group, in time order.
+
+        With ``start``, the result begins with the last sample taken at or before ``start``, the
+        state of the group when the window opened.
+        """
+        ring = list(self._rings.get(group, ()))
+        if start is not None:
+            first = max(bisect_right(ring, start, key=lambda s: s[0]) - 1, 0)
+            ring = ring[first:]
+        if end is not None:
+            ring = ring[: bisect_right(ring, end, key=lambda s: s[0])]
+        return ring
+
+    def summarize(self, started_at: float, ended_at: float) -> Dict:
+        """Summarize the telemetry between two timestamps from the sampled rings.
+
+        The result has the same differences as ``summarize_telemetry`` computes from a task's
+        start and end snapshots, between the samples in effect at ``started_at`` and at
+        ``ended_at``. It also has the number of samples used per group and, for CPU and memory,
+        the average and maximum usage seen within the window.
+        """
+        from flowcept.commons.task_data_preprocess import summarize_telemetry
+
+        self._ensure_running()
+        start_tel, end_tel = Telemetry(), Telemetry()
+        windows = {}
+        for group in self._rings:
+            window = self.samples(group, started_at, ended_at)
+            if not window:
+                continue
+            windows[group] = window
+            setattr(start_tel, GROUP_ATTRIBUTES[group], window[0][1])
+            setattr(end_tel, GROUP_ATTRIBUTES[group], window[-1][1])
+
+        task = {
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "telemetry_at_start": start_tel.to_dict(),
+            "telemetry_at_end": end_tel.to_dict(),
+        }
+        summary = summarize_telemetry(task, self.logger)
+        summary["samples"] = {group: len(window) for group, window in windows.items()}
+        cpu_percents = [s.percent_all for _, s in windows.get("cpu", ()) if getattr(s, "percent_all", None) is not None]
+        if cpu_percents and "cpu" in summary:
+            summary["cpu"]["percent_all_avg"] = sum(cpu_percents) / len(cpu_percents)
+            summary["cpu"]["percent_all_max"] = max(cpu_percents)
+        mem_percents = [s.virtual["percent"] for _, s in windows.get("mem", ()) if getattr(s, "virtual", None)]
+        if mem_percents and "memory" in summary:
+            summary["memory"]["percent_avg"] = sum(mem_percents) / len(mem_percents)
+            summary["memory"]["percent_max"] = max(mem_percents)
+        return summary
@@ -1,13 +1,18 @@
 """Flowcept Loop module."""
 
 import uuid
-from time import time
+from time import perf_counter, time
 from typing import Union, Sized, Iterator, Dict
 
 from flowcept import Flowcept
 from flowcept.commons.vocabulary import Status
-from flowcept.configs import INSTRUMENTATION_ENABLED, TELEMETRY_ENABLED
+from flowcept.configs import INSTRUMENTATION, INSTRUMENTATION_ENABLED, TELEMETRY_ENABLED
 from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
+from flowcept.instrumentation.sampling import build_sampler
+
+LIGHTWEIGHT_LOOP_CONFIG = INSTRUMENTATION.get("lightweight_loop", None) or {}
+
+LOOP_SUMMARY_SUBTYPE = "loop_summary"
 
 
 class FlowceptLoop:
@@ -36,6 +41,7 @@ class FlowceptLoop:
         workflow_id=None,
         items_length=0,
         capture_enabled=True,
+        sampling=None,
     ):
         """
         Initialize a FlowceptLoop instance for tracking iterations.
@@ -71,6 +77,9 @@ class FlowceptLoop:
         capture_enabled : bool, optional
             Whether to enable provenance/telemetry capture. If ``False``, the loop runs
             without instrumentation. Default is ``True``.
+        sampling : dict, optional
+            Overrides the ``instrumentation.sampling`` settings for this loop's iterations.
+            See ``flowcept.instrumentation.sampling``. Default is ``None``.
 
         Raises
         ------
@@ -128,6 +137,15 @@ class FlowceptLoop:
         self._item_name = item_name
         self._parent_task_id = parent_task_id
         self.workflow_id = workflow_id or Flowcept.current_workflow_id or str(uuid.uuid4())
+        self._sampler = build_sampler(
+            self._act_id,
+            FlowceptLoop._interceptor,
+            sampling,
+            workflow_id=self.workflow_id,
+            group_id=self._group_id,
+            parent_task_id=parent_task_id,
+        )
+        self._iteration_captured = True
 
     def __iter__(self):
         return self
@@ -154,6 +172,8 @@ class FlowceptLoop:
         if self._next_counter == self._max:
             # End loop
             self._capture_iteration_bounds()
+            if self._sampler is not None:
+                self._sampler.flush()
 
         self._current_item = next(self._iterator)
 
@@ -174,6 +194,8 @@ class FlowceptLoop:
         self._last_iteration_task = self._current_iteration_task
 
     def _begin_iteration_task(self):
+        if self._sampler is not None:
+            self._iteration_captured = self._sampler.capture_next()
         iteration_task = {
             "started_at": time(),
             "task_id": self._group_id + str(self._next_counter),
@@ -186,11 +208,17 @@ class FlowceptLoop:
         return iteration_task
 
     def _end_iteration_task(self, _):
+        if self._sampler is not None:
+            t0 = perf_counter()
+            if not self._sampler.observe(self._iteration_captured, self._last_iteration_task["started_at"], time()):
+                return
         self._last_iteration_task["status"] = Status.FINISHED.value
         if TELEMETRY_ENABLED:
             tel = FlowceptLoop._interceptor.telemetry_capture.capture()
             self._last_iteration_task["telemetry_at_end"] = tel.to_dict()
         FlowceptLoop._interceptor.intercept(self._last_iteration_task)
+        if self._sampler is not None:
+            self._sampler.add_overhead(perf_counter() - t0)
 
     def _do_nothing_in_end_iter(self, *args, **kwargs):
         pass
@@ -244,6 +272,10 @@ class FlowceptLightweightLoop:
     This class integrates with the `Flowcept` system for telemetry and tracking, ensuring
     detailed monitoring of loops and their iterations. It is designed for cases where
     capturing granular runtime behavior of loops is critical.
+
+    Iterations are recorded in chunks of ``chunk_size`` slots, which are reused from chunk to
+    chunk. A chunk is sent when it is full, when it is older than ``chunk_secs``, and when the
+    loop ends, so the memory used does not grow with the number of iterations.
     """
 
     _interceptor = InstrumentationInterceptor.get_instance()
@@ -257,13 +289,17 @@ class FlowceptLightweightLoop:
         workflow_id=None,
         items_length=0,
         capture_enabled=True,
+        sampling=None,
+        chunk_size=None,
+        chunk_secs=None,
+        columnar=None,
     ):
         """
         Initialize a FlowceptLightweightLoop instance for tracking iterations.
 
         This constructor provides a lower-overhead loop wrapper compared to
-        ``FlowceptLoop``. Iterations are pre-registered as task objects, and capture
-        primarily updates ``used`` and ``generated`` fields as the loop progresses.
+        ``FlowceptLoop``. Iterations are recorded in a pool of reused slots, and capture
+        primarily updates ``used`` and ``generated`` values as the loop progresses.
 
         Parameters
         ----------
@@ -290,6 +326,21 @@ class FlowceptLightweightLoop:
         capture_enabled : bool, optional
             Whether to enable provenance/telemetry capture. If ``False``, the loop runs
             without instrumentation. Default is ``True``.
+        sampling : dict, optional
+            Overrides the ``instrumentation.sampling`` settings for this loop's iterations.
+            Iterations are not timed, so only head sampling (``every``) applies.
+            Default is ``None``.
+        chunk_size : int, optional
+            Number of iterations sent together, and of slots in the pool. Defaults to
+            ``instrumentation.lightweight_loop.chunk_size`` in the settings, or 10,000. Use 0 to
+            send all iterations when the loop ends.
+        chunk_secs : float, optional
+            Also sends the recorded iterations when the chunk is older than this many
+            seconds. Defaults to ``instrumentation.lightweight_loop.chunk_secs``, or ``None``.
+        columnar : bool, optional
+            If ``True``, sends one ``loop_summary`` task per chunk, whose ``used`` and
+            ``generated`` hold arrays with one value per iteration, instead of one task per
+            iteration. Defaults to ``instrumentation.lightweight_loop.columnar``, or ``False``.
 
         Raises
         ------
@@ -299,8 +350,8 @@ class FlowceptLightweightLoop:
         Notes
         -----
         - This class is designed for high-performance scenarios with many iterations.
-        - Iteration tasks are pre-allocated, and provenance capture is batched via
-          the Flowcept interceptor.
+        - Iterations are recorded in reused slots, and provenance capture is batched
+          per chunk via the Flowcept interceptor.
         - Compared to ``FlowceptLoop``, this class avoids per-iteration telemetry
           overhead unless explicitly enabled.
         """
@@ -329,21 +380,34 @@ class FlowceptLightweightLoop:
         self._group_id = str(id(self) + id(self._iterator) + id(parent_task_id))
         self._act_id = loop_name + "_iteration"
         self.workflow_id = workflow_id or Flowcept.current_workflow_id or str(uuid.uuid4())
-        task_obj = {
+        self._task_template = {
             "workflow_id": self.workflow_id,
             "activity_id": self._act_id,
             "group_id": self._group_id,
-            "generated": {},
             "status": Status.FINISHED.value,
         }
         if parent_task_id is not None:
-            task_obj["parent_task_id"] = parent_task_id
-        self._current_iteration_tasks = []
-        for i in range(self._max):
-            new_task = dict(task_obj)
-            new_task["task_id"] = self._group_id + str(i)
-            new_task["used"] = {"i": i, self._item_name: None}
-            self._current_iteration_tasks.append(new_task)
+            self._task_template["parent_task_id"] = parent_task_id
+        self._sampler = build_sampler(
+            self._act_id,
+            FlowceptLightweightLoop._interceptor,
+            sampling,
+            workflow_id=self.workflow_id,
+            group_id=self._group_id,
+            parent_task_id=parent_task_id,
+        )
+        if chunk_size is None:
+            chunk_size = LIGHTWEIGHT_LOOP_CONFIG.get("chunk_size", None)
+            chunk_size = 10_000 if chunk_size is None else chunk_size
+        self._chunk_secs = chunk_secs if chunk_secs is not None else LIGHTWEIGHT_LOOP_CONFIG.get("chunk_secs", None)
+        self._columnar = columnar if columnar is not None else LIGHTWEIGHT_LOOP_CONFIG.get("columnar", False)
+        pool_size = min(chunk_size, self._max) if chunk_size and chunk_size > 0 else self._max
+        # The pool: the item and the generated values of each iteration of the current chunk.
+        self._items = [None] * pool_size
+        self._generated = [None] * pool_size
+        self._slot = -1
+        self._chunk_start = 0
+        self._chunk_started_at = time()
 
     def __iter__(self):
         return self
@@ -369,17 +433,64 @@ class FlowceptLightweightLoop:
         if self._next_counter == self._max - 1:
             # End loop
             self._capture_iteration_bounds()
-            FlowceptLightweightLoop._interceptor.intercept_many(self._current_iteration_tasks)
+            self._send_chunk(self._slot + 1)
+            self._items = self._generated = None
 
         self._current_item = next(self._iterator)
 
         self._next_counter += 1
+        self._slot += 1
+        if self._slot == len(self._items) or (
+            self._chunk_secs is not None and time() - self._chunk_started_at >= self._chunk_secs
+        ):
+            self._send_chunk(self._slot)
+            self._slot = 0
+        self._generated[self._slot] = None
 
         self._capture_iteration_bounds()
         return self._current_item
 
+    def _send_chunk(self, n):
+        """Send the first ``n`` iterations recorded in the pool, which start the next chunk."""
+        start = self._chunk_start
+        rows = range(n)
+        if self._sampler is not None:
+            rows = [j for j in rows if self._sampler.capture_next()]
+            self._sampler.count_executions(len(rows), n - len(rows), self._chunk_started_at, time())
+        if self._columnar:
+            if rows:
+                FlowceptLightweightLoop._interceptor.intercept(self._chunk_summary(start, rows))
+        else:
+            tasks = []
+            for j in rows:
+                task = dict(self._task_template)
+                task["task_id"] = self._group_id + str(start + j)
+                task["used"] = {"i": start + j, self._item_name: self._items[j]}
+                task["generated"] = self._generated[j] or {}
+                tasks.append(task)
+            FlowceptLightweightLoop._interceptor.intercept_many(tasks)
+        if self._sampler is not None:
+            self._sampler.flush()
+        self._chunk_start = start + n
+        self._chunk_started_at = time()
+
+    def _chunk_summary(self, start, rows):
+        """Return the loop_summary task of a chunk, with one array value per iteration."""
+        generated = [self._generated[j] or {} for j in rows]
+        keys = {}
+        for values in generated:
+            keys.update(dict.fromkeys(values))
+        task = dict(self._task_template)
+        task["task_id"] = f"{self._group_id}_{start}"
+        task["subtype"] = LOOP_SUMMARY_SUBTYPE
+        task["started_at"] = self._chunk_started_at
+        task["ended_at"] = time()
+        task["used"] = {"i": [start + j for j in rows], self._item_name: [self._items[j] for j in rows]}
+        task["generated"] = {key: [values.get(key) for values in generated] for key in keys}
+        return task
+
     def _capture_iteration_bounds(self):
-        self._current_iteration_tasks[self._next_counter]["used"][self._item_name] = self._current_item
+        self._items[self._slot] = self._current_item
 
     def end_iter(self, generated_value: Dict):
         """
@@ -394,4 +505,4 @@ class FlowceptLightweightLoop:
            A dictionary containing the generated values for the current iteration. These values
            will be stored in the `generated` field of the iteration's metadata.
         """
-        self._current_iteration_tasks[self._next_counter]["generated"] = generated_value
+        self._generated[self._slot] = generated_value
@@ -1,12 +1,11 @@
 """Task module."""
 
 import threading
-from time import time
+from time import perf_counter, time
 import inspect
 from functools import wraps
 import argparse
 
-from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
 from flowcept.commons.vocabulary import Status
 from flowcept.commons.flowcept_logger import FlowceptLogger
 
@@ -14,15 +13,18 @@ from flowcept.commons.utils import replace_non_serializable
 from flowcept.configs import (
     REPLACE_NON_JSON_SERIALIZABLE,
     INSTRUMENTATION_ENABLED,
-    HOSTNAME,
+    get_hostname,
     TELEMETRY_ENABLED,
 )
 from flowcept.flowcept_api.flowcept_controller import Flowcept
 from flowcept.flowceptor.adapters.instrumentation_interceptor import (
     InstrumentationInterceptor,
 )
+from flowcept.instrumentation.sampling import build_sampler
 
 _thread_local = threading.local()
+_FINISHED = Status.FINISHED.value
+_ERROR = Status.ERROR.value
 
 
 # TODO: :code-reorg: consider moving it to utils and reusing it in dask interceptor
@@ -42,6 +44,55 @@ def default_args_handler(*args, **kwargs):
     return args_handled
 
 
+_SCALAR_TYPES = frozenset({int, float, bool, str, type(None)})
+
+
+def _compile_args_mapper(func, sig: inspect.Signature, sanitize: bool):
+    """Generate, once per decorated function, a function that maps a call's arguments to a dict.
+
+    The generated function has the exact signature of ``func`` (defaults included), so Python
+    itself binds the arguments, and it returns them as a dict in one expression. It is
+    equivalent to ``sig.bind`` plus ``apply_defaults`` plus ``replace_non_serializable`` (when
+    ``sanitize``), without building a BoundArguments or walking scalar values.
+
+    Returns None if the signature cannot be compiled, in which case callers use ``sig.bind``.
+    """
+    namespace = {"_flowcept_replace": replace_non_serializable, "_flowcept_scalars": _SCALAR_TYPES}
+    params, entries = [], []
+    has_star = False
+    for i, p in enumerate(sig.parameters.values()):
+        name = p.name
+        if name.startswith("_flowcept_"):
+            return None
+        if p.kind == p.VAR_POSITIONAL:
+            params.append(f"*{name}")
+            has_star = True
+        elif p.kind == p.VAR_KEYWORD:
+            params.append(f"**{name}")
+        else:
+            if p.kind == p.KEYWORD_ONLY and not has_star:
+                params.append("*")
+                has_star = True
+            if p.default is not p.empty:
+                namespace[f"_flowcept_default_{i}"] = p.default
+                params.append(f"{name}=_flowcept_default_{i}")
+            else:
+                params.append(name)
+            if p.kind == p.POSITIONAL_ONLY and (
+                i + 1 == len(sig.parameters) or list(sig.parameters.values())[i + 1].kind != p.POSITIONAL_ONLY
+            ):
+                params.append("/")
+        value = f"{name} if type({name}) in _flowcept_scalars else _flowcept_replace({name})" if sanitize else name
+        entries.append(f"{name!r}: {value}")
+    func_name = func.__name__ if func.__name__.isidentifier() else "_flowcept_args"
+    source = f"def {func_name}({', '.join(params)}):\n    return {{{', '.join(entries)}}}\n"
+    try:
+        exec(compile(source, f"<flowcept_task {func.__qualname__}>", "exec"), namespace)
+    except SyntaxError:
+        return None
+    return namespace[func_name]
+
+
 def telemetry_flowcept_task(func=None):
     """Get telemetry task."""
     if INSTRUMENTATION_ENABLED:
@@ -116,8 +167,12 @@ def flowcept_task(func=None, **decorator_kwargs):
     Flowcept task decorator.
 
     Now supports BOTH sync and async functions. For async functions, we await
-    the function before capturing outputs in `task_obj.generated`, so we no
-    longer store just the coroutine object.
+    the function before capturing outputs in the task's `generated`, so we no
+    longer store just the coroutine object, and their tasks are published from a
+    buffer whose flushes are awaited on the running event loop (``mq.async_publishing``).
+
+    A ``sampling`` dict overrides the ``instrumentation.sampling`` settings for
+    this function. See flowcept.instrumentation.sampling.
     """
     if INSTRUMENTATION_ENABLED:
         interceptor = InstrumentationInterceptor.get_instance()
@@ -134,53 +189,103 @@ def flowcept_task(func=None, **decorator_kwargs):
         tags = decorator_kwargs.get("tags", None)
         subtype = decorator_kwargs.get("subtype", None)
         output_names = decorator_kwargs.get("output_names", None)
+        sampler = (
+            build_sampler(func.__name__, interceptor, decorator_kwargs.get("sampling", None))
+            if INSTRUMENTATION_ENABLED
+            else None
+        )
+
+        # With the default args_handler, the generated mapper also sanitizes the arguments.
+        uses_default_handler = args_handler is default_args_handler
+        map_args = _compile_args_mapper(func, sig, uses_default_handler and REPLACE_NON_JSON_SERIALIZABLE)
+        # Task fields that are the same in every call, as TaskObject.to_dict would emit them.
+        static_fields = {"type": "task", "activity_id": func.__name__}
+        if REPLACE_NON_JSON_SERIALIZABLE and custom_metadata is not None:
+            custom_metadata = replace_non_serializable(custom_metadata)
+        for key, value in (
+            ("subtype", subtype),
+            ("tags", tags),
+            ("custom_metadata", custom_metadata),
+            ("hostname", get_hostname()),
+        ):
+            if value is not None:
+                static_fields[key] = value
+
+        if uses_default_handler:
+
+            def _handle_output(value):
+                # Same as default_args_handler(value), without sanitizing scalars.
+                return {"arg_0": value} if type(value) in _SCALAR_TYPES else args_handler(value)
+
+            def _handle_named_outputs(named):
+                if not REPLACE_NON_JSON_SERIALIZABLE:
+                    return dict(named)
+                return {k: v if type(v) in _SCALAR_TYPES else replace_non_serializable(v) for k, v in named.items()}
+
+        else:
+            _handle_output = args_handler
+
+            def _handle_named_outputs(named):
+                return args_handler(**named)
 
         # --- shared helpers for sync+async wrappers -------------------------
 
-        def _common_prep(*f_args, **f_kwargs):
-            """
-            Build and populate the TaskObject before running the task.
-            Returns (task_obj, handled_args).
-            """
-            # Bind inputs to parameter names
-            try:
+        def _bind_args(f_args, f_kwargs):
+            """Map the call's arguments to the task's used dict."""
+            if map_args is not None:
+                if uses_default_handler:
+                    return map_args(*f_args, **f_kwargs)
+                arguments = map_args(*f_args, **f_kwargs)
+            else:
                 bound_args = sig.bind(*f_args, **f_kwargs)
                 bound_args.apply_defaults()
-                handled_args = args_handler(**dict(bound_args.arguments))
+                arguments = dict(bound_args.arguments)
+            try:
+                return args_handler(**arguments)
             except Exception as e:
                 if isinstance(e, TypeError):
                     # signature mismatch is a real error -> raise
                     raise e
                 else:
                     # fallback to positional capture
-                    handled_args = args_handler(*f_args, **f_kwargs)
-
-            task_obj = TaskObject()
-            task_obj.subtype = subtype
-            task_obj.activity_id = func.__name__
-            task_obj.workflow_id = handled_args.pop("workflow_id", Flowcept.current_workflow_id)
-            task_obj.campaign_id = handled_args.pop("campaign_id", Flowcept.campaign_id)
-            task_obj.used = handled_args
-            task_obj.tags = tags
-            task_obj.started_at = time()
-            task_obj.custom_metadata = (
-                replace_non_serializable(custom_metadata)
-                if (REPLACE_NON_JSON_SERIALIZABLE and custom_metadata is not None)
-                else custom_metadata
-            )
-            task_obj.hostname = HOSTNAME
-            task_obj.task_id = str(task_obj.started_at)
-            _thread_local._flowcept_current_context_task_id = task_obj.task_id
+                    return args_handler(*f_args, **f_kwargs)
+
+        def _common_prep(f_args, f_kwargs, started_at=None):
+            """
+            Build the task message before running the task.
+
+            The message is built as a dict with the fields TaskObject.to_dict would emit, without
+            creating a TaskObject. With ``started_at``, the message is built after the task ran,
+            for a task kept by tail sampling, and has no telemetry at start.
+            """
+            handled_args = _bind_args(f_args, f_kwargs)
+            task = dict(static_fields)
+            workflow_id = handled_args.pop("workflow_id", Flowcept.current_workflow_id)
+            if workflow_id is not None:
+                task["workflow_id"] = workflow_id
+            campaign_id = handled_args.pop("campaign_id", Flowcept.campaign_id)
+            if campaign_id is not None:
+                task["campaign_id"] = campaign_id
+            task["used"] = handled_args
+            if started_at is not None:
+                task["started_at"] = started_at
+                task["task_id"] = str(started_at)
+                return task
+            started_at = task["started_at"] = time()
+            task_id = task["task_id"] = str(started_at)
+            _thread_local._flowcept_current_context_task_id = task_id
 
             if TELEMETRY_ENABLED:
                 # capture telemetry at start
-                task_obj.telemetry_at_start = interceptor.telemetry_capture.capture()
+                tel = interceptor.telemetry_capture.capture()
+                if tel is not None:
+                    task["telemetry_at_start"] = tel.to_dict()
 
-            return task_obj
+            return task
 
-        def _attach_outputs(task_obj, result):
+        def _attach_outputs(task, result):
             """
-            Populate task_obj.generated following the same logic you had before,
+            Populate task["generated"] following the same logic you had before,
             including output_names mapping and args_handler(), but only if we
             actually got a result and we didn't error.
             """
@@ -193,9 +298,9 @@ def flowcept_task(func=None, **decorator_kwargs):
                 if isinstance(result, dict):
                     # User already returned a mapping; pass it through sanitized
                     try:
-                        task_obj.generated = args_handler(**result)
+                        task["generated"] = args_handler(**result)
                     except Exception:
-                        task_obj.generated = result
+                        task["generated"] = result
                     return
 
                 if output_names:
@@ -210,43 +315,68 @@ def flowcept_task(func=None, **decorator_kwargs):
 
                     if isinstance(named, dict):
                         try:
-                            task_obj.generated = args_handler(**named)
+                            task["generated"] = _handle_named_outputs(named)
                         except Exception:
-                            task_obj.generated = named
+                            task["generated"] = named
                     else:
                         # fallback: positional capture
-                        task_obj.generated = args_handler(result)
+                        task["generated"] = _handle_output(result)
                 else:
                     # No output_names provided, fallback to positional capture
-                    task_obj.generated = args_handler(result)
+                    task["generated"] = _handle_output(result)
 
             except Exception as e:
                 # Don't kill the flow if serialization fails
                 logger.exception(e)
 
-        def _common_post(task_obj, result, raised_exc):
+        def _common_post(task, result, raised_exc):
             """
-            Finalize task_obj (status, telemetry_at_end, generated, stderr, etc.)
-            and ship it.
+            Finalize the task message (status, telemetry_at_end, generated, stderr, etc.)
+            and return it for the wrapper to ship.
             """
             if raised_exc is None:
-                task_obj.status = Status.FINISHED
+                task["status"] = _FINISHED
             else:
-                task_obj.status = Status.ERROR
-                task_obj.stderr = str(raised_exc)
+                task["status"] = _ERROR
+                task["stderr"] = str(raised_exc)
 
-            task_obj.ended_at = time()
+            ended_at = task["ended_at"] = time()
 
             if TELEMETRY_ENABLED:
                 # capture telemetry at end
-                task_obj.telemetry_at_end = interceptor.telemetry_capture.capture()
+                tel = interceptor.telemetry_capture.capture()
+                if tel is not None:
+                    task["telemetry_at_end"] = tel.to_dict()
+                telemetry_summary = interceptor.telemetry_capture.summarize(task["started_at"], ended_at)
+                if telemetry_summary is not None:
+                    task["telemetry_summary"] = telemetry_summary
 
             # Only attach outputs if we actually finished successfully
             if raised_exc is None:
-                _attach_outputs(task_obj, result)
-
-            # Send to interceptor
-            interceptor.intercept(task_obj.to_dict())
+                _attach_outputs(task, result)
+            return task
+
+        def _sampled_prep(f_args, f_kwargs):
+            """Return the task message if the sampler captures this call, its start, and the capture time."""
+            if sampler.capture_next():
+                t0 = perf_counter()
+                task = _common_prep(f_args, f_kwargs)
+                return task, task["started_at"], perf_counter() - t0
+            started_at = time()
+            # Nested tasks still see this call as their parent, in case the tail keeps it.
+            _thread_local._flowcept_current_context_task_id = str(started_at)
+            return None, started_at, 0.0
+
+        def _sampled_post(task, started_at, overhead, f_args, f_kwargs, result, raised_exc):
+            """Return the finalized task message if the sampler captured or keeps this call, else None."""
+            t0 = perf_counter()
+            if not sampler.observe(task is not None, started_at, time(), raised_exc is not None):
+                return None
+            if task is None:
+                task = _common_prep(f_args, f_kwargs, started_at=started_at)
+            _common_post(task, result, raised_exc)
+            sampler.add_overhead(overhead + perf_counter() - t0)
+            return task
 
         # --- build either sync or async wrapper -----------------------------
 
@@ -258,7 +388,10 @@ def flowcept_task(func=None, **decorator_kwargs):
                 if not INSTRUMENTATION_ENABLED:
                     return await func(*args, **kwargs)
 
-                task_obj = _common_prep(*args, **kwargs)
+                if sampler is not None:
+                    task, started_at, overhead = _sampled_prep(args, kwargs)
+                else:
+                    task = _common_prep(args, kwargs)
 
                 result = None
                 raised_exc = None
@@ -268,7 +401,13 @@ def flowcept_task(func=None, **decorator_kwargs):
                     raised_exc = exc
                     logger.exception(exc)
 
-                _common_post(task_obj, result, raised_exc)
+                if sampler is not None:
+                    task = _sampled_post(task, started_at, overhead, args, kwargs, result, raised_exc)
+                else:
+                    _common_post(task, result, raised_exc)
+                if task is not None:
+                    # Published from a buffer whose flushes are awaited on this event loop.
+                    await interceptor.intercept_async(task)
 
                 if raised_exc is not None:
                     # propagate error to caller
@@ -285,7 +424,10 @@ def flowcept_task(func=None, **decorator_kwargs):
                 if not INSTRUMENTATION_ENABLED:
                     return func(*args, **kwargs)
 
-                task_obj = _common_prep(*args, **kwargs)
+                if sampler is not None:
+                    task, started_at, overhead = _sampled_prep(args, kwargs)
+                else:
+                    task = _common_prep(args, kwargs)
 
                 result = None
                 raised_exc = None
@@ -295,7 +437,12 @@ def flowcept_task(func=None, **decorator_kwargs):
                     raised_exc = exc
                     logger.exception(exc)
 
-                _common_post(task_obj, result, raised_exc)
+                if sampler is not None:
+                    task = _sampled_post(task, started_at, overhead, args, kwargs, result, raised_exc)
+                else:
+                    _common_post(task, result, raised_exc)
+                if task is not None:
+                    interceptor.intercept(task)
 
                 if raised_exc is not None:
                     # propagate error to caller
@@ -1,6 +1,6 @@
 """Flowcept's module for Pytorch instrumentation."""
 
-from time import time
+from time import perf_counter, time
 from types import MethodType
 
 import numpy as np
@@ -26,6 +26,7 @@ from flowcept.flowcept_api.flowcept_controller import Flowcept
 from flowcept.flowceptor.adapters.base_interceptor import BaseInterceptor
 from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
 from flowcept.instrumentation.flowcept_task import get_current_context_task_id
+from flowcept.instrumentation.sampling import build_sampler
 
 TORCH_CONFIG = INSTRUMENTATION.get("torch", {})
 
@@ -114,6 +115,10 @@ def flowcept_torch(cls):
     save_workflow : bool, optional
         If set to `True` (default), the workflow is registered and sent to the interceptor.
         If set to `False`, the workflow registration step is skipped.
+    sampling : dict, optional
+        Overrides the ``instrumentation.sampling`` settings for the parent forward passes. The
+        children's forward passes are captured only within captured parent forward passes.
+        See ``flowcept.instrumentation.sampling``.
 
     Notes
     -----
@@ -197,12 +202,21 @@ def flowcept_torch(cls):
             self._campaign_id = kwargs.get("campaign_id", Flowcept.campaign_id)
             if kwargs.get("save_workflow", True):
                 self.workflow_id = self._register_as_workflow()
+            self._forward_captured = True
+            self._sampler = build_sampler(
+                self._module_name,
+                TorchModuleWrapper._interceptor,
+                kwargs.get("sampling", None),
+                workflow_id=getattr(self, "workflow_id", None),
+            )
 
         PARENT_FORWARD = "parent_forward"
 
         def _our_forward_parent(self, *args, **kwargs):
             if self._current_epoch % self._epochs_at_every != 0:
                 return super(TorchModuleWrapper, self).forward(*args, **kwargs)
+            if self._sampler is not None and not self._sampler.capture_next():
+                return self._unsampled_forward(*args, **kwargs)
 
             started_at = time()
             self._current_forward_task_id = str(started_at)
@@ -232,6 +246,7 @@ def flowcept_torch(cls):
             y = super(TorchModuleWrapper, self).forward(*args, **kwargs)
             self._disable_children_forward()
 
+            t0 = perf_counter()
             if self._current_epoch < 1:
                 forward_task["generated"] = {"tensor": _inspect_torch_tensor(y)}
 
@@ -240,7 +255,34 @@ def flowcept_torch(cls):
                 forward_task["telemetry_at_end"] = tel.to_dict()
 
             TorchModuleWrapper._interceptor.intercept(forward_task)
+            if self._sampler is not None:
+                self._sampler.observe(True, started_at, time())
+                self._sampler.add_overhead(perf_counter() - t0)
+
+            return y
 
+        def _unsampled_forward(self, *args, **kwargs):
+            """Run a forward pass the sampler skipped, and its children's, without capturing them."""
+            started_at = time()
+            self._forward_captured = False
+            try:
+                y = super(TorchModuleWrapper, self).forward(*args, **kwargs)
+            finally:
+                self._forward_captured = True
+            if self._sampler.observe(False, started_at, time()):
+                # Kept by tail sampling, without the data its capture would have inspected.
+                self._current_forward_task_id = str(started_at)
+                forward_task = {
+                    "task_id": self._current_forward_task_id,
+                    "workflow_id": self.workflow_id,
+                    "activity_id": self._module_name,
+                    "started_at": started_at,
+                    "ended_at": time(),
+                    "parent_task_id": self.parent_task_id,
+                    "subtype": TorchModuleWrapper.PARENT_FORWARD,
+                    "status": Status.FINISHED.value,
+                }
+                TorchModuleWrapper._interceptor.intercept(forward_task)
             return y
 
         def _enable_children_forward(self):
@@ -371,6 +413,8 @@ def flowcept_torch(cls):
 
     def _our_forward_lightweight(self, *args, **kwargs):
         result = TorchModuleWrapper._original_children_forward_functions[self.__class__](self, *args, **kwargs)
+        if not self._parent_module._forward_captured:
+            return result
         task_dict = dict(
             subtype=CHILD_FORWARD,
             workflow_id=self._parent_module.workflow_id,
@@ -383,6 +427,8 @@ def flowcept_torch(cls):
 
     def _our_forward_telemetry(self, *args, **kwargs):
         result = TorchModuleWrapper._original_children_forward_functions[self.__class__](self, *args, **kwargs)
+        if not self._parent_module._forward_captured:
+            return result
         task_dict = dict(
             subtype=CHILD_FORWARD,
             workflow_id=self._parent_module.workflow_id,
@@ -396,6 +442,8 @@ def flowcept_torch(cls):
 
     def _our_forward_telemetry_tensor_inspection(self, *args, **kwargs):
         result = TorchModuleWrapper._original_children_forward_functions[self.__class__](self, *args, **kwargs)
+        if not self._parent_module._forward_captured:
+            return result
         task_dict = dict(
             subtype=CHILD_FORWARD,
             workflow_id=self._parent_module.workflow_id,
@@ -411,6 +459,8 @@ def flowcept_torch(cls):
 
     def _our_forward_tensor_inspection(self, *args, **kwargs):
         result = TorchModuleWrapper._original_children_forward_functions[self.__class__](self, *args, **kwargs)
+        if not self._parent_module._forward_captured:
+            return result
         task_dict = dict(
             subtype=CHILD_FORWARD,
             workflow_id=self._parent_module.workflow_id,
@@ -0,0 +1,287 @@
+"""Process-group capture module.
+
+Without it, every child process of a ``multiprocessing`` pool or ``ProcessPoolExecutor`` that
+captures tasks starts its own Flowcept, with its own interceptor, MQ connections, buffer
+threads, and key-value registrations. In process-group capture, the children write their task
+messages into a ring in shared memory (``multiprocessing.shared_memory``), and a single thread
+of the parent drains the ring into the parent's interceptor, which publishes them.
+
+Start it with ``Flowcept(process_group=True)``, which exposes it as ``Flowcept.process_group``,
+and stop the children before stopping Flowcept. Forked children write to the ring as soon as
+they start. Spawned children must attach, e.g., with the pool initializer::
+
+    with Flowcept(process_group=True) as f:
+        with ProcessPoolExecutor(initializer=f.process_group.attach) as executor:
+            list(executor.map(my_task, range(100)))
+
+The ring is set with ``instrumentation.process_group`` in the settings: ``ring_bytes`` (its
+size), ``drain_interval_secs``, and ``overflow``, which tells what children do when the ring is
+full: ``block`` (wait for the parent to drain it) or ``drop`` (discard the messages, counted in
+:attr:`ProcessGroupCapture.dropped`).
+"""
+
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+from multiprocessing import shared_memory
+from time import sleep
+from typing import List
+
+from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.serializers import get_serializer
+from flowcept.configs import INSTRUMENTATION
+
+PROCESS_GROUP_CONFIG = INSTRUMENTATION.get("process_group", None) or {}
+OVERFLOW_POLICIES = {"block", "drop"}
+
+_SERIALIZER = get_serializer("msgpack")
+# Header: bytes written (head), bytes drained (tail), and messages dropped, padded to a cache line.
+_HEADER = struct.Struct("<QQQ")
+_HEADER_SIZE = 64
+_LENGTH = struct.Struct("<I")
+
+_ACTIVE_GROUP: "ProcessGroupCapture" = None
+
+
+class _Ring:
+    """Multi-producer, single-consumer ring of length-prefixed records in shared memory.
+
+    Producers append under the group's lock; the consumer copies the records out of the lock.
+    Positions are byte counts since the ring was created, taken modulo the capacity.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, lock):
+        self._buf = shm.buf
+        self._lock = lock
+        self.capacity = shm.size - _HEADER_SIZE
+
+    def _header(self):
+        return _HEADER.unpack_from(self._buf, 0)
+
+    def _write(self, pos, data):
+        start = _HEADER_SIZE + pos % self.capacity
+        first = min(len(data), _HEADER_SIZE + self.capacity - start)
+        self._buf[start : start + first] = data[:first]
+        if first < len(data):
+            self._buf[_HEADER_SIZE : _HEADER_SIZE + len(data) - first] = data[first:]
+
+    def _read(self, pos, n) -> bytes:
+        start = _HEADER_SIZE + pos % self.capacity
+        first = min(n, _HEADER_SIZE + self.capacity - start)
+        data = bytes(self._buf[start : start + first])
+        if first < n:
+            data += bytes(self._buf[_HEADER_SIZE : _HEADER_SIZE + n - first])
+        return data
+
+    def put(self, payloads: List[bytes], block=True) -> bool:
+        """Append records. Return False if they were dropped."""
+        data = b"".join(_LENGTH.pack(len(p)) + p for p in payloads)
+        if len(data) > self.capacity:
+            block = False
+        while True:
+            with self._lock:
+                head, tail, dropped = self._header()
+                if len(data) <= self.capacity - (head - tail):
+                    self._write(head, data)
+                    _HEADER.pack_into(self._buf, 0, head + len(data), tail, dropped)
+                    return True
+                if not block:
+                    _HEADER.pack_into(self._buf, 0, head, tail, dropped + len(payloads))
+                    return False
+            sleep(0.001)
+
+    def get_all(self) -> List[bytes]:
+        """Remove and return all the records."""
+        with self._lock:
+            head, tail, _ = self._header()
+        if head == tail:
+            return []
+        data = self._read(tail, head - tail)
+        with self._lock:
+            new_head, _, dropped = self._header()
+            _HEADER.pack_into(self._buf, 0, new_head, head, dropped)
+        payloads, offset = [], 0
+        while offset < len(data):
+            (n,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            payloads.append(data[offset : offset + n])
+            offset += n
+        return payloads
+
+    @property
+    def dropped(self) -> int:
+        """Number of messages dropped because the ring was full."""
+        return self._header()[2]
+
+
+class _RingWriter:
+    """Buffer of the interceptor of a child process, writing each message to the ring."""
+
+    def __init__(self, ring: _Ring, block: bool):
+        self._ring = ring
+        self._block = block
+
+    def append(self, item):
+        """Write a message to the ring."""
+        self._ring.put([_SERIALIZER.dumps(item)], self._block)
+
+    def extend(self, items):
+        """Write several messages to the ring at once."""
+        if items:
+            self._ring.put([_SERIALIZER.dumps(item) for item in items], self._block)
+
+
+class ProcessGroupCapture:
+    """Shared-memory ring that the child processes write task messages to, drained by the parent.
+
+    The object is picklable: a spawned child receives it (e.g., as a pool initializer) and
+    :meth:`attach` opens the ring by name. A forked child inherits the mapped ring, and attaches
+    automatically while the group is started.
+
+    Parameters
+    ----------
+    interceptor : BaseInterceptor, optional
+        Interceptor of the parent that publishes the messages. Defaults to the instrumentation
+        interceptor.
+    workflow_id, campaign_id : str, optional
+        Ids the children use for their tasks. Default to the current workflow and campaign.
+    ring_bytes : int, optional
+        Size of the ring. Defaults to ``instrumentation.process_group.ring_bytes`` or 64 MiB.
+    drain_interval : float, optional
+        Seconds between two drains of the ring. Defaults to
+        ``instrumentation.process_group.drain_interval_secs`` or 0.05.
+    overflow : str, optional
+        ``block`` or ``drop``, see the module documentation.
+    """
+
+    def __init__(
+        self,
+        interceptor=None,
+        workflow_id: str = None,
+        campaign_id: str = None,
+        ring_bytes: int = None,
+        drain_interval: float = None,
+        overflow: str = None,
+    ):
+        from flowcept.flowcept_api.flowcept_controller import Flowcept
+
+        self.logger = FlowceptLogger()
+        self.overflow = overflow or PROCESS_GROUP_CONFIG.get("overflow", "block")
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow '{self.overflow}'. Use one of {sorted(OVERFLOW_POLICIES)}.")
+        if interceptor is None:
+            from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
+
+            interceptor = InstrumentationInterceptor.get_instance()
+        self._interceptor = interceptor
+        self.workflow_id = workflow_id or Flowcept.current_workflow_id
+        self.campaign_id = campaign_id or Flowcept.campaign_id
+        self.ring_bytes = int(ring_bytes or PROCESS_GROUP_CONFIG.get("ring_bytes", 64 * 1024 * 1024))
+        self.drain_interval = float(drain_interval or PROCESS_GROUP_CONFIG.get("drain_interval_secs", 0.05))
+        # A lock of the spawn context can also be pickled for spawned and forkserver children;
+        # forked children inherit it either way.
+        self._lock = multiprocessing.get_context("spawn").Lock()
+        self._shm: shared_memory.SharedMemory = None
+        self._ring: _Ring = None
+        self._name = None
+        self._owner_pid = None
+        self._stop_event = threading.Event()
+        self._drainer: threading.Thread = None
+
+    def __getstate__(self):
+        return {
+            "overflow": self.overflow,
+            "workflow_id": self.workflow_id,
+            "campaign_id": self.campaign_id,
+            "ring_bytes": self.ring_bytes,
+            "_lock": self._lock,
+            "_name": self._name,
+            "_owner_pid": self._owner_pid,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = FlowceptLogger()
+        self._interceptor = None
+        self._shm = self._ring = None
+        self._drainer = None
+
+    def start(self) -> "ProcessGroupCapture":
+        """Create the ring and start draining it."""
+        global _ACTIVE_GROUP
+        self._shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + self.ring_bytes)
+        _HEADER.pack_into(self._shm.buf, 0, 0, 0, 0)
+        self._name = self._shm.name
+        self._ring = _Ring(self._shm, self._lock)
+        self._owner_pid = os.getpid()
+        self._stop_event.clear()
+        self._drainer = threading.Thread(target=self._drain_loop, name="flowcept-process-group", daemon=True)
+        self._drainer.start()
+        _ACTIVE_GROUP = self
+        return self
+
+    def attach(self):
+        """Send the tasks that this child process captures to the ring. No-op in the parent."""
+        if self._owner_pid is None or os.getpid() == self._owner_pid:
+            return
+        if self._ring is None:
+            # Python >= 3.13 would otherwise register the segment for cleanup in this process too.
+            kwargs = {"track": False} if sys.version_info >= (3, 13) else {}
+            self._shm = shared_memory.SharedMemory(name=self._name, **kwargs)
+            self._ring = _Ring(self._shm, self._lock)
+
+        from flowcept.flowcept_api.flowcept_controller import Flowcept
+        from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
+
+        Flowcept.current_workflow_id = self.workflow_id
+        Flowcept.campaign_id = self.campaign_id
+        InstrumentationInterceptor.get_instance().set_buffer(_RingWriter(self._ring, self.overflow == "block"))
+
+    def drain(self) -> int:
+        """Hand the messages in the ring to the interceptor. Return how many there were."""
+        payloads = self._ring.get_all()
+        if payloads:
+            self._interceptor.intercept_many([_SERIALIZER.loads(p) for p in payloads])
+        return len(payloads)
+
+    def _drain_loop(self):
+        while not self._stop_event.wait(self.drain_interval):
+            try:
+                self.drain()
+            except Exception as e:
+                self.logger.exception(e)
+
+    @property
+    def dropped(self) -> int:
+        """Number of messages the children dropped because the ring was full."""
+        return self._ring.dropped if self._ring is not None else 0
+
+    def stop(self):
+        """Drain the ring for the last time and release it. Stop the children first."""
+        global _ACTIVE_GROUP
+        if os.getpid() != self._owner_pid or self._drainer is None:
+            return
+        if _ACTIVE_GROUP is self:
+            _ACTIVE_GROUP = None
+        self._stop_event.set()
+        self._drainer.join()
+        self._drainer = None
+        self.drain()
+        if self.dropped:
+            self.logger.warning(f"The children of the process group dropped {self.dropped} messages.")
+        self._ring = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+
+def _attach_after_fork():
+    if _ACTIVE_GROUP is not None:
+        # The drainer thread does not survive the fork; the child only writes.
+        _ACTIVE_GROUP._drainer = None
+        _ACTIVE_GROUP.attach()
+
+
+os.register_at_fork(after_in_child=_attach_after_fork)
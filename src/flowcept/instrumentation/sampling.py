@@ -0,0 +1,256 @@
+"""Sampling module.
+
+Decides which executions of instrumented tasks, loop iterations, and torch forward passes are
+captured. It is configured with ``instrumentation.sampling`` in the settings, and each entry
+point (``@flowcept_task``, ``FlowceptLoop``, ``FlowceptLightweightLoop``, ``@flowcept_torch``)
+also takes a ``sampling`` dict that overrides the settings:
+
+- ``every``: head sampling. Captures one of every N executions.
+- ``overhead_budget``: time-budget sampling. Skips captures while the time spent capturing
+  exceeds this fraction of the wall time since the first execution (e.g., 0.05 for 5%).
+- ``keep_errors`` and ``outlier_stddevs``: tail sampling. Executions that fail, and executions
+  whose duration is more than ``outlier_stddevs`` standard deviations above the mean so far
+  (after ``min_samples`` executions), are captured even if the head or the budget skipped them.
+  When the telemetry is sampled in the background (``telemetry_capture.sampler``), the CPU and
+  memory usage at the end of an execution are checked the same way.
+
+Executions that are not captured are counted. Every ``summary_every`` of them, when a loop
+ends, and when Flowcept stops, a task message with the ``sampling_summary`` subtype carries
+their count and their total, min, and max duration, so totals over the captured tasks and the
+summaries remain correct.
+"""
+
+import threading
+import weakref
+from math import sqrt
+from time import perf_counter
+from typing import Dict
+from uuid import uuid4
+
+from flowcept.commons.vocabulary import Status
+from flowcept.configs import INSTRUMENTATION_SAMPLING
+
+SAMPLING_SUMMARY_SUBTYPE = "sampling_summary"
+
+DEFAULT_SAMPLING = {
+    "every": 1,
+    "overhead_budget": None,
+    "keep_errors": True,
+    "outlier_stddevs": None,
+    "min_samples": 30,
+    "summary_every": 1000,
+}
+
+_SAMPLERS = weakref.WeakSet()
+
+
+class _RunningStats:
+    """Mean and variance of a metric, updated one value at a time (Welford's algorithm)."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value, stddevs, min_samples) -> bool:
+        """Add a value and return whether it is an outlier among the previous values."""
+        n = self.n
+        outlier = n >= min_samples and value > self.mean + stddevs * sqrt(self.m2 / (n - 1))
+        self.n = n + 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        return outlier
+
+
+class TaskSampler:
+    """Sampling decisions and counters of one instrumented activity.
+
+    Entry points call :meth:`capture_next` before an execution, to know whether to capture it,
+    and :meth:`observe` after it, to know whether to send it. Use :func:`build_sampler` to get a
+    sampler from the settings.
+
+    Parameters
+    ----------
+    activity_id : str
+        Activity of the sampled executions, used in the summary messages.
+    interceptor : BaseInterceptor
+        Interceptor the summary messages are sent to.
+    summary_fields : dict, optional
+        Fields added to the summary messages, e.g., the ``workflow_id`` or ``parent_task_id`` of a
+        loop. Without a ``workflow_id``, summaries use the current workflow.
+    **sampling
+        The sampling settings described in the module documentation.
+    """
+
+    def __init__(self, activity_id, interceptor, summary_fields: Dict = None, **sampling):
+        conf = dict(DEFAULT_SAMPLING, **sampling)
+        self.activity_id = activity_id
+        self.every = max(int(conf["every"]), 1)
+        self.overhead_budget = conf["overhead_budget"]
+        self.keep_errors = conf["keep_errors"]
+        self.outlier_stddevs = conf["outlier_stddevs"]
+        self.min_samples = max(int(conf["min_samples"]), 2)
+        self.summary_every = conf["summary_every"]
+        self._interceptor = interceptor
+        self._summary_fields = summary_fields or {}
+        self._telemetry = None
+        if self.outlier_stddevs is not None:
+            telemetry_capture = getattr(interceptor, "telemetry_capture", None)
+            if telemetry_capture is not None and getattr(telemetry_capture, "sampler", None) is not None:
+                self._telemetry = telemetry_capture.sampler
+        self._stats: Dict[str, _RunningStats] = {}
+        self._executions = 0
+        self._first_at = None
+        self._overhead = 0.0
+        self._lock = threading.Lock()
+        self._reset_counters()
+        _SAMPLERS.add(self)
+
+    def _reset_counters(self):
+        self._captured = 0
+        self._unsampled = 0
+        self._duration_sum = 0.0
+        self._duration_min = None
+        self._duration_max = None
+        self._first_started_at = None
+        self._last_ended_at = None
+
+    def capture_next(self) -> bool:
+        """Return whether the next execution is captured, by head sampling and the overhead budget."""
+        with self._lock:
+            count = self._executions
+            self._executions = count + 1
+            if count % self.every:
+                return False
+            if self.overhead_budget is not None:
+                now = perf_counter()
+                if self._first_at is None:
+                    self._first_at = now
+                elif self._overhead > self.overhead_budget * (now - self._first_at):
+                    return False
+            return True
+
+    def add_overhead(self, seconds: float):
+        """Account time spent capturing, checked against the overhead budget."""
+        with self._lock:
+            self._overhead += seconds
+
+    def _is_outlier(self, name, value) -> bool:
+        # Called with self._lock held.
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _RunningStats()
+        return stats.add(value, self.outlier_stddevs, self.min_samples)
+
+    def _telemetry_outlier(self, tel) -> bool:
+        # Called with self._lock held.
+        outlier = False
+        if tel.cpu is not None and tel.cpu.percent_all is not None:
+            outlier = self._is_outlier("cpu_percent", tel.cpu.percent_all)
+        if tel.memory is not None and tel.memory.virtual:
+            outlier = self._is_outlier("memory_percent", tel.memory.virtual["percent"]) or outlier
+        return outlier
+
+    def observe(self, captured: bool, started_at: float, ended_at: float, error=False) -> bool:
+        """Record an execution and return whether it must be sent.
+
+        It must be sent if it was captured or if tail sampling keeps it. Otherwise, it is
+        counted in the next summary message.
+        """
+        duration = ended_at - started_at
+        keep = captured
+        tel = self._telemetry.snapshot() if self.outlier_stddevs is not None and self._telemetry is not None else None
+        with self._lock:
+            if self.outlier_stddevs is not None:
+                keep = self._is_outlier("duration", duration) or keep
+                if tel is not None:
+                    keep = self._telemetry_outlier(tel) or keep
+            if error and self.keep_errors:
+                keep = True
+            if keep:
+                self._captured += 1
+                return True
+            if not self._unsampled:
+                self._first_started_at = started_at
+            if self._duration_min is None:
+                self._duration_min = self._duration_max = duration
+            else:
+                self._duration_min = min(self._duration_min, duration)
+                self._duration_max = max(self._duration_max, duration)
+            self._unsampled += 1
+            self._duration_sum += duration
+            self._last_ended_at = ended_at
+            full = self.summary_every and self._unsampled >= self.summary_every
+        if full:
+            self.flush()
+        return False
+
+    def count_executions(self, captured: int, unsampled: int, started_at: float = None, ended_at: float = None):
+        """Count executions whose durations are unknown, e.g., untimed loop iterations."""
+        with self._lock:
+            self._captured += captured
+            if unsampled <= 0:
+                return
+            if not self._unsampled:
+                self._first_started_at = started_at
+            self._unsampled += unsampled
+            self._last_ended_at = ended_at
+
+    def summary(self) -> Dict:
+        """Return the summary message of the executions not captured since the last one, or None."""
+        with self._lock:
+            if not self._unsampled:
+                return None
+            msg = {
+                "type": "task",
+                "task_id": str(uuid4()),
+                "activity_id": self.activity_id,
+                "subtype": SAMPLING_SUMMARY_SUBTYPE,
+                "status": Status.FINISHED.value,
+                "used": {"unsampled": self._unsampled, "captured": self._captured},
+            }
+            if self._duration_min is not None:
+                msg["generated"] = {
+                    "duration_sum": self._duration_sum,
+                    "duration_min": self._duration_min,
+                    "duration_max": self._duration_max,
+                }
+            if self._first_started_at is not None:
+                msg["started_at"] = self._first_started_at
+            if self._last_ended_at is not None:
+                msg["ended_at"] = self._last_ended_at
+            self._reset_counters()
+        msg.update(self._summary_fields)
+        if msg.get("workflow_id") is None:
+            from flowcept.flowcept_api.flowcept_controller import Flowcept
+
+            msg["workflow_id"] = Flowcept.current_workflow_id
+        return msg
+
+    def flush(self):
+        """Send the summary message of the executions not captured since the last one, if any."""
+        msg = self.summary()
+        if msg is not None:
+            self._interceptor.intercept(msg)
+
+
+def build_sampler(activity_id, interceptor, sampling: Dict = None, **summary_fields) -> TaskSampler:
+    """Return a sampler for the settings overridden by ``sampling``, or None if every execution is captured."""
+    conf = dict(INSTRUMENTATION_SAMPLING, **(sampling or {}))
+    if (
+        int(conf.get("every", 1)) <= 1
+        and conf.get("overhead_budget", None) is None
+        and conf.get("outlier_stddevs", None) is None
+    ):
+        return None
+    return TaskSampler(activity_id, interceptor, summary_fields=summary_fields, **conf)
+
+
+def flush_samplers(interceptor):
+    """Send the pending summary messages of the samplers that use ``interceptor``."""
+    for sampler in list(_SAMPLERS):
+        if sampler._interceptor is interceptor:
+            sampler.flush()
@@ -216,6 +216,10 @@ class FlowceptTask(object):
                 self._task.custom_metadata = sanitized_custom_metadata
 
         self._task.ended_at = ended_at or time()
+        if TELEMETRY_ENABLED:
+            self._task.telemetry_summary = self._interceptor.telemetry_capture.summarize(
+                self._task.started_at, self._task.ended_at
+            )
         self._task.status = status
         self._task.stderr = stderr
         self._task.stdout = stdout
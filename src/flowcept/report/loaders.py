@@ -6,11 +6,18 @@ import json
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
+from flowcept.commons.buffer_log import is_buffer_log, iter_buffer_log
 from flowcept.report.sanitization import sanitize_json_like
 
 
 def read_jsonl(path: Path) -> Tuple[List[Dict[str, Any]], int]:
-    """Read JSONL records and return ``(records, skipped_lines)``."""
+    """Read JSONL records and return ``(records, skipped_lines)``.
+
+    ``path`` may also be a buffer log, see :mod:`flowcept.commons.buffer_log`, whose records are
+    never skipped.
+    """
+    if is_buffer_log(str(path)):
+        return list(iter_buffer_log(str(path))), 0
     records: List[Dict[str, Any]] = []
     skipped = 0
     with path.open("r", encoding="utf-8") as handle:
@@ -74,12 +81,13 @@ def load_records_from_db(workflow_id: str | None = None, campaign_id: str | None
 
     filter_obj = {"workflow_id": workflow_id} if workflow_id else {"campaign_id": campaign_id}
     workflows = Flowcept.db.query(filter=filter_obj, collection="workflows") or []
-    tasks = Flowcept.db.query(filter=filter_obj, collection="tasks") or []
+    # Tasks are streamed and sanitized one at a time, so only the sanitized copies are kept in memory.
+    tasks = [sanitize_json_like(t) for t in Flowcept.db.iter_tasks(filter_obj) if isinstance(t, dict)]
     objects = Flowcept.db.query(filter=filter_obj, collection="objects") or []
 
     workflow = workflows[-1] if workflows else {}
     return {
         "workflow": sanitize_json_like(workflow),
-        "tasks": [sanitize_json_like(t) for t in tasks if isinstance(t, dict)],
+        "tasks": tasks,
         "objects": [sanitize_json_like(strip_blob_data(o)) for o in objects if isinstance(o, dict)],
     }
@@ -0,0 +1,81 @@
+"""Async task interception latency benchmark.
+
+Runs ``--workers`` coroutines that call an ``async def`` function decorated with
+``@flowcept_task`` in a loop, next to a ticker coroutine that sleeps 1 ms at a time and records
+how late it wakes up. The lag of the ticker is the time the event loop was kept busy, e.g., by
+MQ flushes. It compares ``mq.async_publishing`` (flushes awaited on the loop) with the
+synchronous interception path, and reports the loop lag percentiles, the task latency, and the
+task throughput. Needs the MQ running and ``db_flush_mode: online``. Not collected by pytest;
+run it directly::
+
+    python tests/benchmarks/async_intercept_benchmark.py --workers 100 --secs 5
+"""
+
+import argparse
+import asyncio
+from time import perf_counter
+from unittest.mock import patch
+
+from flowcept import Flowcept, flowcept_task
+from flowcept.flowceptor.adapters import base_interceptor
+
+
+@flowcept_task
+async def task(x):
+    """Return a trivial result after yielding to the loop."""
+    await asyncio.sleep(0)
+    return x + 1
+
+
+def percentile(values, q):
+    """Return the q-th percentile of values."""
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)] if values else float("nan")
+
+
+async def run(workers, secs):
+    """Return the ticker lags, task latencies, and number of tasks of one run."""
+    lags, latencies = [], []
+    deadline = perf_counter() + secs
+
+    async def ticker():
+        while perf_counter() < deadline:
+            t0 = perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(perf_counter() - t0 - 0.001)
+
+    async def worker():
+        i = 0
+        while perf_counter() < deadline:
+            t0 = perf_counter()
+            await task(i)
+            latencies.append(perf_counter() - t0)
+            i += 1
+
+    async with Flowcept(start_persistence=False, workflow_id="async_intercept_benchmark"):
+        await asyncio.gather(ticker(), *(worker() for _ in range(workers)))
+    return lags, latencies
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=100)
+    parser.add_argument("--secs", type=float, default=5.0)
+    args = parser.parse_args()
+    print(f"\n{args.workers} concurrent workers, {args.secs} s per run")
+    print(
+        f"{'interception':<14} {'lag p50 ms':>10} {'lag p99 ms':>10} {'lag max ms':>10} "
+        f"{'task p99 ms':>11} {'tasks/s':>9}"
+    )
+    for name, async_publishing in (("sync", False), ("async", True)):
+        with patch.object(base_interceptor, "MQ_ASYNC_PUBLISHING", async_publishing):
+            lags, latencies = asyncio.run(run(args.workers, args.secs))
+        print(
+            f"{name:<14} {percentile(lags, 50) * 1e3:>10.3f} {percentile(lags, 99) * 1e3:>10.3f} "
+            f"{max(lags) * 1e3:>10.3f} {percentile(latencies, 99) * 1e3:>11.3f} {len(latencies) / args.secs:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
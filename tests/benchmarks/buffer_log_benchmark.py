@@ -0,0 +1,106 @@
+"""Offline buffer file benchmark.
+
+Writes ``--messages`` task messages of ``--workflows`` workflows in dumps of ``--dump-size``
+messages, once as a JSONL file and once as a segmented buffer log, then compares the time and the
+peak memory (tracemalloc) of reading them back: all the messages as a list, all the messages
+streamed one at a time, and the messages of one workflow. Not collected by pytest; run it
+directly::
+
+    python tests/benchmarks/buffer_log_benchmark.py --messages 200000
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+from flowcept.commons.buffer_log import append_buffer_log, iter_buffer_file
+
+
+def make_dump(start, n, workflows):
+    """Return ``n`` task messages shaped like the ones of a decorated function."""
+    return [
+        {
+            "type": "task",
+            "task_id": f"task-{i}",
+            "workflow_id": f"wf-{i % workflows}",
+            "activity_id": "train_step",
+            "used": {"epoch": i // 1000, "batch": i, "lr": 1e-3},
+            "generated": {"loss": 1.0 / (i + 1), "accuracy": 0.5},
+            "started_at": 1700000000.0 + i,
+            "ended_at": 1700000000.5 + i,
+            "status": "FINISHED",
+            "hostname": "node0",
+        }
+        for i in range(start, start + n)
+    ]
+
+
+def write_jsonl(path, dump):
+    """Append a dump to a JSONL file, as buffer_to_disk does."""
+    from flowcept.commons.serializers import get_serializer
+
+    serializer = get_serializer("json")
+    with open(path, "ab", buffering=1_048_576) as f:
+        for msg in dump:
+            f.write(serializer.dumps(msg))
+            f.write(b"\n")
+
+
+def measure(fn):
+    """Return (seconds, peak MiB, result) of a call. The peak is measured in a second call."""
+    t0 = perf_counter()
+    result = fn()
+    elapsed = perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--dump-size", type=int, default=1_000)
+    parser.add_argument("--workflows", type=int, default=10)
+    parser.add_argument("--segment-bytes", type=int, default=8 * 1024 * 1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {"jsonl": os.path.join(tmp_dir, "buffer.jsonl"), "segments": os.path.join(tmp_dir, "buffer.log")}
+        writers = {
+            "jsonl": lambda dump: write_jsonl(paths["jsonl"], dump),
+            "segments": lambda dump: append_buffer_log(dump, paths["segments"], args.segment_bytes),
+        }
+        write_times = dict.fromkeys(paths, 0.0)
+        for start in range(0, args.messages, args.dump_size):
+            dump = make_dump(start, min(args.dump_size, args.messages - start), args.workflows)
+            for fmt, write in writers.items():
+                t0 = perf_counter()
+                write(dump)
+                write_times[fmt] += perf_counter() - t0
+
+        def size(path):
+            if os.path.isdir(path):
+                return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+            return os.path.getsize(path)
+
+        reads = {
+            "read all (list)": lambda path: len(list(iter_buffer_file(path))),
+            "stream all": lambda path: sum(1 for _ in iter_buffer_file(path)),
+            "one workflow": lambda path: sum(1 for _ in iter_buffer_file(path, workflow_id="wf-0")),
+        }
+        print(f"\n{args.messages} messages, dumps of {args.dump_size}, {args.workflows} workflows")
+        print(f"{'format':<10} {'operation':<16} {'seconds':>9} {'peak MiB':>9} {'messages':>9}")
+        for fmt, path in paths.items():
+            print(f"{fmt:<10} {'write':<16} {write_times[fmt]:>9.3f} {'':>9} {size(path) / 2**20:>7.1f}MB")
+            for name, read in reads.items():
+                elapsed, peak, count = measure(lambda: read(path))
+                print(f"{fmt:<10} {name:<16} {elapsed:>9.3f} {peak:>9.1f} {count:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Import time regression benchmark.
+
+Runs ``--statement`` (by default the imports of an instrumented script) in fresh interpreters
+with ``python -X importtime``, and reports the median time of the imports it triggers and the
+modules that took the longest. It exits with status 1 when the median exceeds ``--budget-ms``,
+or when the statement imports one of the ``--forbidden`` modules, which Flowcept only imports
+when a feature needs them. The first run is not counted: it fills the settings cache and the
+bytecode caches. Not collected by pytest; run it directly::
+
+    python tests/benchmarks/import_time_benchmark.py --budget-ms 150
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+FORBIDDEN = ["numpy", "pandas", "omegaconf", "yaml", "pyarrow", "pymongo", "asyncio"]
+
+
+def parse_importtime(stderr):
+    """Return (name, depth, self_us, cumulative_us) for the imports after the interpreter startup."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+        if depth == 0 and name.strip() == "site":
+            # Everything up to site is the interpreter startup.
+            records = []
+    return records
+
+
+def run(statement):
+    """Return the import records of one fresh interpreter running the statement."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True
+    )
+    return parse_importtime(proc.stderr)
+
+
+def main():
+    """Run the benchmark, print a table, and exit with 1 on a regression."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--statement", default="from flowcept import Flowcept, flowcept_task")
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbidden", nargs="*", default=FORBIDDEN)
+    args = parser.parse_args()
+
+    run(args.statement)
+    runs = [run(args.statement) for _ in range(args.repeat)]
+    totals = [sum(r[3] for r in records if r[1] == 0) / 1e3 for records in runs]
+    total = statistics.median(totals)
+    records = runs[totals.index(min(totals, key=lambda t: abs(t - total)))]
+
+    print(f"\n{args.statement!r}: {len(records)} modules imported")
+    print(f"{'module':<60} {'self ms':>8} {'cumul ms':>9}")
+    for name, depth, self_us, cumulative_us in sorted(records, key=lambda r: -r[3])[: args.top]:
+        print(f"{'  ' * depth + name:<60} {self_us / 1e3:>8.1f} {cumulative_us / 1e3:>9.1f}")
+    print(f"\nmedian of {args.repeat} runs: {total:.1f} ms (budget {args.budget_ms:.1f} ms)")
+
+    imported = {r[0] for r in records}
+    forbidden = [m for m in args.forbidden if m in imported]
+    failed = False
+    if forbidden:
+        print(f"FAIL: imported {', '.join(forbidden)}")
+        failed = True
+    if total > args.budget_ms:
+        print(f"FAIL: over budget by {total - args.budget_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""LMDB merge-on-write benchmark.
+
+Measures LMDBDAO's task write throughput when every task arrives as a start and an end
+message, as the Document Inserter receives them, against writing each task once. The start
+and end messages either share a flush (merged in memory by ``curate_dict_task_messages``) or
+land in different flushes (merged against the stored task). Not collected by pytest; run it
+directly::
+
+    python tests/benchmarks/lmdb_merge_benchmark.py --n 200000 --batch-size 1000
+"""
+
+import argparse
+import tempfile
+from time import perf_counter
+from unittest.mock import patch
+
+from flowcept.commons.daos.docdb_dao import lmdb_dao
+from flowcept.commons.daos.docdb_dao.lmdb_dao import LMDBDAO
+
+
+def make_messages(n):
+    """Return the start and end messages of ``n`` tasks."""
+    starts, ends = [], []
+    for i in range(n):
+        task_id = f"task_{i}"
+        starts.append(
+            {
+                "task_id": task_id,
+                "workflow_id": f"wf_{i % 100}",
+                "activity_id": "train",
+                "status": "RUNNING",
+                "started_at": float(i),
+                "used": {"lr": 0.1, "epoch": i},
+                "telemetry_at_start": {"cpu": {"percent_all": 10.0}},
+            }
+        )
+        ends.append(
+            {
+                "task_id": task_id,
+                "status": "FINISHED",
+                "ended_at": float(i) + 1,
+                "generated": {"loss": 0.5},
+                "telemetry_at_end": {"cpu": {"percent_all": 12.0}},
+            }
+        )
+    return starts, ends
+
+
+def run(batches, batch_size):
+    """Write the batches with a fresh LMDBDAO and return messages/s."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with patch.object(lmdb_dao, "LMDB_SETTINGS", {"path": tmp_dir}):
+            dao = LMDBDAO()
+        n_msgs = sum(len(b) for b in batches)
+        t0 = perf_counter()
+        for batch in batches:
+            for i in range(0, len(batch), batch_size):
+                dao.insert_and_update_many_tasks([dict(m) for m in batch[i : i + batch_size]], "task_id")
+        elapsed = perf_counter() - t0
+        assert all(t["status"] == "FINISHED" for t in dao.task_query(filter={"workflow_id": "wf_0"}))
+        dao.close()
+    return n_msgs / elapsed
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+    starts, ends = make_messages(args.n)
+    finals = [dict(s, **e) for s, e in zip(starts, ends)]
+    interleaved = [m for pair in zip(starts, ends) for m in pair]
+    cases = [
+        ("one message per task", [finals]),
+        ("start+end, same flush", [interleaved]),
+        ("start+end, separate flushes", [starts, ends]),
+    ]
+    print(f"\n{args.n} tasks, {args.batch_size} messages per flush")
+    print(f"{'case':<30} {'msgs/s':>10}")
+    for name, batches in cases:
+        print(f"{name:<30} {run(batches, args.batch_size):>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
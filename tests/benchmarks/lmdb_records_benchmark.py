@@ -0,0 +1,96 @@
+"""LMDB record format benchmark.
+
+Compares insert throughput, full-scan throughput, and store size of LMDBDAO with the default
+JSON records, msgpack records, and msgpack records compressed with zstd (plain and with a
+trained dictionary), reading with and without zero-copy buffers. Not collected by pytest;
+run it directly::
+
+    python tests/benchmarks/lmdb_records_benchmark.py --n 1000000
+"""
+
+import argparse
+import os
+import tempfile
+from time import perf_counter
+from unittest.mock import patch
+
+from flowcept.commons.daos.docdb_dao import lmdb_dao
+from flowcept.commons.daos.docdb_dao.lmdb_dao import LMDBDAO
+from flowcept.commons.daos.docdb_dao.lmdb_records import train_zstd_dictionary
+
+from serializers_benchmark import load_tasks
+
+BATCH_SIZE = 10_000
+
+
+def store_size(path):
+    """Return the bytes actually used by the store's pages."""
+    import lmdb
+
+    env = lmdb.open(path, max_dbs=16, readonly=True, lock=False)
+    try:
+        return (env.info()["last_pgno"] + 1) * env.stat()["psize"]
+    finally:
+        env.close()
+
+
+def bench(tasks, settings, zero_copy):
+    """Return (insert tasks/s, scan tasks/s, indexed query tasks/s, bytes per task)."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        settings = dict(settings, path=tmp_dir)
+        if settings.get("zstd_dict_path") == "train":
+            with patch.object(lmdb_dao, "LMDB_SETTINGS", {"path": tmp_dir}):
+                dao = LMDBDAO()
+            dao.insert_and_update_many_tasks([dict(t) for t in tasks[:BATCH_SIZE]], "task_id")
+            dao.close()
+            settings["zstd_dict_path"] = train_zstd_dictionary(tmp_dir, os.path.join(tmp_dir, "tasks.zdict"))
+            dao = None
+        with (
+            patch.object(lmdb_dao, "LMDB_SETTINGS", settings),
+            patch.object(lmdb_dao, "LMDB_ZERO_COPY_READS", zero_copy),
+        ):
+            dao = LMDBDAO()
+            dao.delete_task_keys("task_id", [t["task_id"] for t in tasks[:BATCH_SIZE]])
+            t0 = perf_counter()
+            for i in range(0, len(tasks), BATCH_SIZE):
+                dao.insert_and_update_many_tasks([dict(t) for t in tasks[i : i + BATCH_SIZE]], "task_id")
+            insert = len(tasks) / (perf_counter() - t0)
+            t0 = perf_counter()
+            n = sum(1 for _ in dao.iter_query(filter={}))
+            scan = n / (perf_counter() - t0)
+            wf_id = tasks[0]["workflow_id"]
+            t0 = perf_counter()
+            m = len(dao.task_query(filter={"workflow_id": wf_id}))
+            indexed = m / (perf_counter() - t0)
+            dao.close()
+        return insert, scan, indexed, store_size(tmp_dir) / len(tasks)
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    args = parser.parse_args()
+    tasks = load_tasks(args.n)
+    for i, task in enumerate(tasks):
+        task["workflow_id"] = f"wf_{i % 100}"
+    configs = [
+        ("json", {"record_format": "json"}),
+        ("msgpack", {"record_format": "msgpack"}),
+        ("msgpack+zstd", {"record_format": "msgpack", "compression": "zstd"}),
+        ("msgpack+zstd+dict", {"record_format": "msgpack", "compression": "zstd", "zstd_dict_path": "train"}),
+    ]
+    print(f"\n{args.n} tasks")
+    print(f"{'format':<18} {'zero-copy':>9} {'insert/s':>10} {'scan/s':>10} {'indexed/s':>10} {'bytes/task':>10}")
+    for name, settings in configs:
+        for zero_copy in (False, True):
+            try:
+                insert, scan, indexed, size = bench(tasks, settings, zero_copy)
+            except ImportError as e:
+                print(f"{name:<18} skipped: {e}")
+                break
+            print(f"{name:<18} {str(zero_copy):>9} {insert:>10,.0f} {scan:>10,.0f} {indexed:>10,.0f} {size:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
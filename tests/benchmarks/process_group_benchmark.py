@@ -0,0 +1,89 @@
+"""Process-group capture benchmark.
+
+Runs ``--tasks`` decorated tasks in each of ``--children`` processes of a
+``ProcessPoolExecutor``, in two modes: ``per_child``, where every child starts its own Flowcept
+(interceptor, MQ connection, buffer threads, and key-value registrations), and ``shared``,
+where the children write to the ring of a ``Flowcept(process_group=True)`` in the parent, which
+publishes their tasks. It reports the wall time and, from Redis ``INFO``, the connections the
+MQ received and the commands it processed. Needs Redis as the MQ and key-value DB, and
+``db_flush_mode: online``. Not collected by pytest; run it directly::
+
+    python tests/benchmarks/process_group_benchmark.py --children 8 --tasks 2000 --start-method spawn
+"""
+
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from flowcept import Flowcept, flowcept_task
+from flowcept.commons.daos.redis_conn import RedisConn
+from flowcept.configs import MQ_HOST, MQ_PORT, MQ_PASSWORD, MQ_URI
+
+
+@flowcept_task
+def task(x):
+    """Return a trivial result."""
+    return x + 1
+
+
+def run_tasks(n):
+    """Run the tasks of a child that sends them through the parent's ring."""
+    for i in range(n):
+        task(i)
+
+
+def run_tasks_with_own_flowcept(n, workflow_id):
+    """Run the tasks of a child that starts its own Flowcept."""
+    with Flowcept(start_persistence=False, save_workflow=False, workflow_id=workflow_id):
+        run_tasks(n)
+
+
+def redis_stats(redis):
+    """Return the Redis counters the benchmark compares."""
+    stats = redis.info("stats")
+    return stats["total_connections_received"], stats["total_commands_processed"]
+
+
+def run(mode, children, tasks, context, redis):
+    """Return the wall time, connections, and commands of one run."""
+    connections0, commands0 = redis_stats(redis)
+    t0 = perf_counter()
+    with Flowcept(
+        start_persistence=False,
+        save_workflow=False,
+        workflow_id=f"process_group_{mode}",
+        process_group=mode == "shared",
+    ) as f:
+        if mode == "shared":
+            with ProcessPoolExecutor(children, mp_context=context, initializer=f.process_group.attach) as executor:
+                list(executor.map(run_tasks, [tasks] * children))
+        else:
+            with ProcessPoolExecutor(children, mp_context=context) as executor:
+                list(executor.map(run_tasks_with_own_flowcept, [tasks] * children, [f.current_workflow_id] * children))
+    elapsed = perf_counter() - t0
+    connections1, commands1 = redis_stats(redis)
+    # Minus the INFO call itself.
+    return elapsed, connections1 - connections0, commands1 - commands0 - 1
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--children", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--start-method", default="spawn", choices=["fork", "spawn", "forkserver"])
+    args = parser.parse_args()
+    context = multiprocessing.get_context(args.start_method)
+    redis = RedisConn.build_redis_conn_pool(host=MQ_HOST, port=MQ_PORT, password=MQ_PASSWORD, uri=MQ_URI)
+    print(f"\n{args.children} {args.start_method} children x {args.tasks} tasks")
+    print(f"{'mode':<10} {'wall s':>8} {'tasks/s':>9} {'connections':>12} {'commands':>9}")
+    for mode in ("per_child", "shared"):
+        elapsed, connections, commands = run(mode, args.children, args.tasks, context, redis)
+        print(
+            f"{mode:<10} {elapsed:>8.2f} {args.children * args.tasks / elapsed:>9.0f} {connections:>12} {commands:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
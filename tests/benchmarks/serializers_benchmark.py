@@ -0,0 +1,76 @@
+"""Serializer benchmark.
+
+Compares encode/decode throughput and payload size of the registered serializers on task
+messages shaped like the ones Flowcept publishes, with and without numpy arrays and
+datetimes. Not collected by pytest; run it directly::
+
+    python tests/benchmarks/serializers_benchmark.py --n 20000
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+
+from flowcept.commons.serializers import get_serializer, list_serializers
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "..", "api", "sample_data_with_telemetry_and_rai.json")
+
+
+def load_tasks(n, with_numpy=False):
+    """Return ``n`` task dicts cycled from the sample data file."""
+    with open(SAMPLE_PATH) as f:
+        samples = json.load(f)
+    for s in samples:
+        s.pop("_id", None)
+    tasks = []
+    for i in range(n):
+        task = dict(samples[i % len(samples)])
+        task["task_id"] = f"{task['task_id']}_{i}"
+        if with_numpy:
+            task["generated"] = {"loss": np.random.rand(64).astype(np.float32), "epoch": np.int64(i)}
+            task["registered_at"] = datetime.now()
+        tasks.append(task)
+    return tasks
+
+
+def bench(name, tasks, repeat=3):
+    """Return (encode msgs/s, decode msgs/s, bytes per msg) for a serializer."""
+    serializer = get_serializer(name)
+    batch_level = name == "columnar"
+    best_enc = best_dec = float("inf")
+    for _ in range(repeat):
+        t0 = perf_counter()
+        payloads = [serializer.dumps(tasks)] if batch_level else [serializer.dumps(t) for t in tasks]
+        best_enc = min(best_enc, perf_counter() - t0)
+        t0 = perf_counter()
+        for p in payloads:
+            serializer.loads(p)
+        best_dec = min(best_dec, perf_counter() - t0)
+    size = sum(len(p) for p in payloads)
+    return len(tasks) / best_enc, len(tasks) / best_dec, size / len(tasks)
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=10_000)
+    args = parser.parse_args()
+    for with_numpy in (False, True):
+        tasks = load_tasks(args.n, with_numpy=with_numpy)
+        print(f"\n{args.n} tasks, numpy/datetime fields: {with_numpy}")
+        print(f"{'serializer':<10} {'enc msg/s':>12} {'dec msg/s':>12} {'bytes/msg':>10}")
+        for name in list_serializers():
+            try:
+                enc, dec, size = bench(name, tasks)
+            except Exception as e:
+                print(f"{name:<10} failed: {e}")
+                continue
+            print(f"{name:<10} {enc:>12,.0f} {dec:>12,.0f} {size:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Task decorator overhead benchmark.
+
+Reports the overhead, in nanoseconds per call, that each task decorator adds to a trivial
+function, against the undecorated function. ``flowcept_task (sig.bind)`` is ``flowcept_task``
+without the compiled argument mapper. Runs Flowcept offline, keeping the messages in memory.
+Telemetry capture dominates when enabled, so disable it to measure the decorators alone. Not
+collected by pytest; run it directly::
+
+    TELEMETRY_ENABLED=false python tests/benchmarks/task_decorator_benchmark.py --n 200000
+"""
+
+import argparse
+from time import perf_counter_ns
+from unittest.mock import patch
+
+from flowcept import Flowcept, flowcept_task, lightweight_flowcept_task, telemetry_flowcept_task
+from flowcept.instrumentation import flowcept_task as flowcept_task_module
+
+
+def task(x, y=2, *, scale=1.0):
+    """Return a trivial result."""
+    return x * y * scale
+
+
+def build_variants():
+    """Return (name, function) pairs to benchmark."""
+    with patch.object(flowcept_task_module, "_compile_args_mapper", lambda *args: None):
+        bind_path = flowcept_task(task)
+    return [
+        ("undecorated", task),
+        ("lightweight_flowcept_task", lightweight_flowcept_task(task)),
+        ("telemetry_flowcept_task", telemetry_flowcept_task(task)),
+        ("flowcept_task (sig.bind)", bind_path),
+        ("flowcept_task", flowcept_task(task)),
+        ("flowcept_task (output_names)", flowcept_task(output_names="z")(task)),
+    ]
+
+
+def time_calls(func, n):
+    """Return the mean nanoseconds per call."""
+    t0 = perf_counter_ns()
+    for i in range(n):
+        func(i, y=3)
+    return (perf_counter_ns() - t0) / n
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    variants = build_variants()
+    print(f"\n{args.n} calls, best of {args.repeat}")
+    print(f"{'decorator':<30} {'ns/call':>10} {'overhead ns':>12}")
+    baseline = None
+    with Flowcept(start_persistence=False, save_workflow=False, workflow_id="task_decorator_benchmark"):
+        for name, func in variants:
+            best = float("inf")
+            for _ in range(args.repeat):
+                Flowcept.buffer.clear()
+                best = min(best, time_calls(func, args.n))
+            baseline = best if baseline is None else baseline
+            print(f"{name:<30} {best:>10,.0f} {best - baseline:>12,.0f}")
+        Flowcept.buffer.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""TaskObject memory and conversion benchmark.
+
+Builds tasks the way the instrumentation does (a dozen fields set, telemetry at start and end)
+and reports the memory each task takes while held in memory, and the time of ``to_dict`` and
+``from_dict``. Not collected by pytest; run it directly::
+
+    python tests/benchmarks/task_object_benchmark.py --tasks 100000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from time import perf_counter
+
+from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
+from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry
+from flowcept.commons.vocabulary import Status
+
+
+def make_telemetry():
+    """Return a Telemetry with CPU and memory groups, as captured by default."""
+    tel = Telemetry()
+    tel.cpu = Telemetry.CPU()
+    tel.cpu.times_avg = {"user": 1.0, "system": 0.5, "idle": 10.0}
+    tel.cpu.percent_all = 12.5
+    tel.memory = Telemetry.Memory()
+    tel.memory.virtual = {"total": 1 << 34, "available": 1 << 33, "percent": 50.0}
+    return tel
+
+
+def make_task(i, start_tel, end_tel):
+    """Return a task with the fields the instrumentation sets."""
+    task = TaskObject()
+    task.task_id = f"task_{i}"
+    task.workflow_id = "wf"
+    task.campaign_id = "campaign"
+    task.activity_id = "train"
+    task.used = {"epoch": i}
+    task.generated = {"loss": 0.1}
+    task.started_at = 1.0 + i
+    task.ended_at = 2.0 + i
+    task.status = Status.FINISHED
+    task.hostname = "node0"
+    task.telemetry_at_start = start_tel
+    task.telemetry_at_end = end_tel
+    return task
+
+
+def bytes_per_object(factory, n):
+    """Return the memory allocated per object while ``n`` objects are alive."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [factory(i) for i in range(n)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objs
+    return allocated / n
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    args = parser.parse_args()
+    n = args.tasks
+    shared_tel = make_telemetry()
+
+    # The used/generated dicts and the task_id strings are the same in both layouts; the
+    # shared telemetry isolates the task itself, the second line counts its telemetry too.
+    task_bytes = bytes_per_object(lambda i: make_task(i, shared_tel, shared_tel), n)
+    full_bytes = bytes_per_object(lambda i: make_task(i, make_telemetry(), make_telemetry()), n)
+    tel_bytes = bytes_per_object(lambda i: make_telemetry(), n)
+    print(f"\n{n} tasks")
+    print(f"{'object':<28} {'bytes':>8}")
+    print(f"{'TaskObject':<28} {task_bytes:>8.0f}")
+    print(f"{'Telemetry (cpu, memory)':<28} {tel_bytes:>8.0f}")
+    print(f"{'TaskObject + 2 Telemetry':<28} {full_bytes:>8.0f}")
+
+    # Timed with the garbage collector off, like timeit, so collections of the tasks kept
+    # alive above do not dominate.
+    tasks = [make_task(i, shared_tel, shared_tel) for i in range(n)]
+    gc.disable()
+    t0 = perf_counter()
+    dicts = [t.to_dict() for t in tasks]
+    to_dict = perf_counter() - t0
+    t0 = perf_counter()
+    for d in dicts:
+        TaskObject.from_dict(d)
+    from_dict = perf_counter() - t0
+    gc.enable()
+    print(f"{'to_dict (us/task)':<28} {to_dict / n * 1e6:>8.2f}")
+    print(f"{'from_dict (us/task)':<28} {from_dict / n * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
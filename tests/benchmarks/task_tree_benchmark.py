@@ -0,0 +1,109 @@
+"""Task tree retrieval benchmark.
+
+Builds a synthetic training workflow (a root task, its epochs, the batches of each epoch, and
+the layers of each batch) and compares ``get_tasks_recursive`` against the previous approach,
+one query per parent task. Runs on LMDB, and on MongoDB with ``--mongo`` (uses the configured
+MongoDB). Not collected by pytest; run it directly::
+
+    python tests/benchmarks/task_tree_benchmark.py --epochs 10 --batches 100 --layers 10
+"""
+
+import argparse
+import tempfile
+from time import perf_counter
+from unittest.mock import patch
+from uuid import uuid4
+
+from flowcept.commons.daos.docdb_dao import lmdb_dao
+from flowcept.commons.daos.docdb_dao.lmdb_dao import LMDBDAO
+
+
+def make_tree(workflow_id, epochs, batches, layers):
+    """Return the tasks of a root -> epochs -> batches -> layers tree."""
+    t = 0.0
+
+    def task(task_id, parent, activity_id):
+        nonlocal t
+        t += 1
+        return {
+            "task_id": task_id,
+            "workflow_id": workflow_id,
+            "parent_task_id": parent,
+            "activity_id": activity_id,
+            "status": "FINISHED",
+            "started_at": t,
+            "used": {"n": int(t)},
+        }
+
+    root = f"{workflow_id}_root"
+    tasks = [task(root, None, "train")]
+    for e in range(epochs):
+        epoch = f"{root}_e{e}"
+        tasks.append(task(epoch, root, "epoch"))
+        for b in range(batches):
+            batch = f"{epoch}_b{b}"
+            tasks.append(task(batch, epoch, "batch"))
+            tasks.extend(task(f"{batch}_l{lay}", batch, "layer") for lay in range(layers))
+    return tasks
+
+
+def naive_tree(dao, workflow_id):
+    """Walk the tree with one query per parent task."""
+    result = dao.task_query(filter={"workflow_id": workflow_id, "parent_task_id": None})
+    queue = list(result)
+    while queue:
+        parent = queue.pop()
+        children = dao.task_query(filter={"parent_task_id": parent["task_id"]})
+        result.extend(children)
+        queue.extend(children)
+    return result
+
+
+def bench(dao, tasks):
+    """Return (naive seconds, get_tasks_recursive seconds)."""
+    workflow_id = tasks[0]["workflow_id"]
+    for i in range(0, len(tasks), 10_000):
+        dao.insert_and_update_many_tasks([dict(t) for t in tasks[i : i + 10_000]], "task_id")
+    t0 = perf_counter()
+    n = len(naive_tree(dao, workflow_id))
+    naive = perf_counter() - t0
+    t0 = perf_counter()
+    m = len(dao.get_tasks_recursive(workflow_id))
+    recursive = perf_counter() - t0
+    assert n == m == len(tasks), (n, m, len(tasks))
+    return naive, recursive
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--layers", type=int, default=10)
+    parser.add_argument("--mongo", action="store_true")
+    args = parser.parse_args()
+    tasks = make_tree(str(uuid4()), args.epochs, args.batches, args.layers)
+    print(f"\n{len(tasks)} tasks, depth 3")
+    print(f"{'db':<8} {'naive (s)':>10} {'recursive (s)':>14} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with patch.object(lmdb_dao, "LMDB_SETTINGS", {"path": tmp_dir}):
+            dao = LMDBDAO()
+        naive, recursive = bench(dao, tasks)
+        dao.close()
+    print(f"{'lmdb':<8} {naive:>10.3f} {recursive:>14.3f} {naive / recursive:>7.1f}x")
+
+    if args.mongo:
+        from flowcept.commons.daos.docdb_dao.mongodb_dao import MongoDBDAO
+
+        dao = MongoDBDAO(create_indices=True)
+        try:
+            naive, recursive = bench(dao, tasks)
+        finally:
+            dao.delete_task_keys("workflow_id", [tasks[0]["workflow_id"]])
+            dao.close()
+        print(f"{'mongodb':<8} {naive:>10.3f} {recursive:>14.3f} {naive / recursive:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,23 @@
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 from uuid import uuid4
 
+import bson
+import numpy as np
 
 from flowcept.commons.daos.docdb_dao.mongodb_dao import MongoDBDAO
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
 from flowcept.configs import MONGO_ENABLED
 
 
+def _numpy_task(task_id):
+    # As the Document Inserter receives it: numpy values decoded from the wire are read-only arrays.
+    msg = {"task_id": task_id, "used": {"arr": np.arange(3), "n": np.int64(2)}, "generated": {"x": np.float32(0.5)}}
+    return MQDao.SERIALIZER.loads(MQDao.SERIALIZER.dumps(msg))
+
+
 @unittest.skipIf(not MONGO_ENABLED, "MongoDB is disabled")
 class TestMongoDBInserter(unittest.TestCase):
     def __init__(self, *args, **kwargs):
@@ -102,3 +114,103 @@ class TestMongoDBInserter(unittest.TestCase):
         self.doc_dao.delete_task_keys("myid", [uid])
         c1 = self.doc_dao.count_tasks()
         assert c0 == c1
+
+    def test_adaptive_writes(self):
+        dao = MongoDBDAO(create_indices=True)
+        wf_id = str(uuid4())
+        task_ids = [str(uuid4()) for _ in range(3)]
+        docs = [{"task_id": t, "workflow_id": wf_id, "status": "RUNNING", "used": {"a": 1}} for t in task_ids]
+        dao.insert_and_update_many_tasks(docs, "task_id")
+        assert dao.last_write_path == "insert"
+
+        dao.insert_and_update_many_tasks([{"task_id": task_ids[0], "status": "FINISHED"}], "task_id")
+        assert dao.last_write_path == "upsert"
+
+        # Another DAO does not know task_ids[1] was written, so it falls back to an upsert.
+        other_dao = MongoDBDAO(create_indices=False)
+        docs = [
+            {"task_id": task_ids[1], "status": "FINISHED"},
+            {"task_id": str(uuid4()), "workflow_id": wf_id, "status": "FINISHED"},
+        ]
+        other_dao.insert_and_update_many_tasks(docs, "task_id")
+        assert other_dao.last_write_path == "mixed"
+        assert other_dao.write_metrics["duplicate_fallbacks"] == 1
+
+        tasks = {t["task_id"]: t for t in dao._tasks_collection.find({"workflow_id": wf_id})}
+        assert len(tasks) == 4
+        for task_id in task_ids[:2]:
+            assert tasks[task_id]["status"] == "FINISHED"
+            assert tasks[task_id]["running"] and tasks[task_id]["used"] == {"a": 1}
+        dao.delete_task_keys("workflow_id", [wf_id])
+
+    def test_insert_numpy_values(self):
+        task_id = str(uuid4())
+        self.doc_dao.insert_and_update_many_tasks([_numpy_task(task_id)], "task_id")
+        task = self.doc_dao._tasks_collection.find_one({"task_id": task_id})
+        assert task["used"] == {"arr": [0, 1, 2], "n": 2}
+        assert task["generated"] == {"x": 0.5}
+        self.doc_dao.delete_task_keys("task_id", [task_id])
+
+    def test_get_tasks_recursive(self):
+        wf_id = str(uuid4())
+        tasks = [{"task_id": f"{wf_id}_root", "activity_id": "train", "started_at": 0.0}]
+        for e in range(2):
+            epoch = f"{wf_id}_e{e}"
+            tasks.append(
+                {"task_id": epoch, "parent_task_id": f"{wf_id}_root", "activity_id": "epoch", "started_at": 2.0 - e}
+            )
+            for b in range(3):
+                tasks.append(
+                    {"task_id": f"{epoch}b{b}", "parent_task_id": epoch, "activity_id": "batch", "started_at": 10.0 + b}
+                )
+        for task in tasks:
+            task["workflow_id"] = wf_id
+        self.doc_dao.insert_and_update_many_tasks(tasks, "task_id")
+
+        # Two parents per query, so that each level takes several queries.
+        with patch.object(MongoDBDAO, "TREE_LEVEL_BATCH_SIZE", 2):
+            tree = self.doc_dao.get_tasks_recursive(wf_id)
+            shallow = self.doc_dao.get_tasks_recursive(wf_id, max_depth=1)
+        ids = [t["task_id"][len(wf_id) + 1 :] for t in tree]
+        assert ids == ["root", "e1", "e0", "e1b0", "e1b1", "e1b2", "e0b0", "e0b1", "e0b2"]
+        assert tree[4]["depth"] == 2 and tree[4]["ancestor_ids"] == [
+            {"train": f"{wf_id}_root"},
+            {"epoch": f"{wf_id}_e1"},
+        ]
+        assert [t["task_id"][len(wf_id) + 1 :] for t in shallow] == ["root", "e1", "e0"]
+        self.doc_dao.delete_task_keys("workflow_id", [wf_id])
+
+    def test_dump_tasks_to_file_recursive(self):
+        import pyarrow.parquet as pq
+
+        wf_id = str(uuid4())
+        tasks = []
+        for r in range(3):
+            root = f"{wf_id}_r{r}"
+            tasks.append({"task_id": root, "started_at": float(r)})
+            tasks.extend({"task_id": f"{root}c{c}", "parent_task_id": root, "started_at": float(c)} for c in range(2))
+        for task in tasks:
+            task["workflow_id"] = wf_id
+        self.doc_dao.insert_and_update_many_tasks(tasks, "task_id")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "tree.parquet")
+            # One root per batch, so that the export spans several batches.
+            with patch.object(MongoDBDAO, "TREE_ROOT_BATCH_SIZE", 1):
+                self.doc_dao.dump_tasks_to_file_recursive(wf_id, output_file=path)
+            table = pq.read_table(path)
+        assert table.num_rows == 9
+        assert sorted(table.column("depth").to_pylist()) == [0] * 3 + [1] * 6
+        rows = table.column("task_id").to_pylist()
+        for r in range(3):
+            root = f"{wf_id}_r{r}"
+            i = rows.index(root)
+            assert rows[i + 1 : i + 3] == [f"{root}c0", f"{root}c1"]
+        self.doc_dao.delete_task_keys("workflow_id", [wf_id])
+
+
+class TestMongoDBEncoding(unittest.TestCase):
+    def test_numpy_values_are_encoded(self):
+        codec_options = MongoDBDAO(create_indices=False)._tasks_collection.codec_options
+        doc = bson.decode(bson.encode(_numpy_task("t1"), codec_options=codec_options))
+        assert doc["used"] == {"arr": [0, 1, 2], "n": 2}
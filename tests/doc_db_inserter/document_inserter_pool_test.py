@@ -0,0 +1,43 @@
+import os
+import unittest
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from flowcept import Flowcept, flowcept_task
+from flowcept.commons.utils import assert_by_querying_tasks_until
+from flowcept.configs import MQ_ENABLED, MONGO_ENABLED, LMDB_ENABLED, MQ_TYPE, MQ_REDIS_MODE
+
+
+@flowcept_task
+def pool_test_function(x):
+    return {"y": x * 2}
+
+
+@unittest.skipIf(not MQ_ENABLED or not (MONGO_ENABLED or LMDB_ENABLED), "Requires the MQ and a DocDB")
+class TestDocumentInserterPool(unittest.TestCase):
+    def test_partitioned_insertion(self):
+        with ExitStack() as stack:
+            # The environment variable reaches the spawned workers; the patches, this process.
+            stack.enter_context(patch.dict(os.environ, {"DB_INSERTER_WORKERS": "3"}))
+            stack.enter_context(patch("flowcept.flowcept_api.flowcept_controller.DB_INSERTER_WORKERS", 3))
+            if MQ_TYPE == "redis" and MQ_REDIS_MODE == "streams":
+                from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
+
+                # Producers route the messages to the partition streams.
+                stack.enter_context(patch("flowcept.commons.daos.mq_dao.mq_dao_redis_streams.DB_INSERTER_WORKERS", 3))
+                stack.enter_context(patch.object(InstrumentationInterceptor.get_instance()._mq_dao, "_n_partitions", 3))
+            with Flowcept(workflow_name="document_inserter_pool_test") as f:
+                for i in range(60):
+                    pool_test_function(i)
+            pool = f._db_inserters[0]
+            metrics = pool.metrics
+
+        assert metrics["workers"] == 3
+        assert metrics["handled_msgs"] >= 60
+        assert all(n > 0 for n in metrics["handled_msgs_per_worker"])
+        assert assert_by_querying_tasks_until(
+            filter={"workflow_id": Flowcept.current_workflow_id},
+            condition_to_evaluate=lambda docs: len(docs) == 60,
+            max_time=30,
+            max_trials=10,
+        )
@@ -0,0 +1,48 @@
+import unittest
+from time import sleep
+
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.flowceptor.consumers.consumer_utils import curate_dict_task_messages
+from flowcept.flowceptor.consumers.task_assembler import TaskAssembler
+
+
+class TestTaskAssembler(unittest.TestCase):
+    def test_merge_start_and_end(self):
+        emitted = []
+        assembler = TaskAssembler(emitted.append, timeout=60)
+        assembler.add({"task_id": "t1", "status": "RUNNING", "used": {"x": 1}, "started_at": 1.0})
+        assembler.add({"task_id": "t2", "status": "FINISHED", "generated": {"y": 2}})
+        assert [t["task_id"] for t in emitted] == ["t2"]
+        assembler.add({"task_id": "t1", "status": "FINISHED", "generated": {"y": 2}, "ended_at": 2.0})
+        assembler.stop()
+
+        assert len(emitted) == 2
+        task = emitted[1]
+        assert task["used"] == {"x": 1} and task["generated"] == {"y": 2}
+        assert task["status"] == "FINISHED" and task["running"] is True
+        assert assembler.metrics == {"pending": 0, "merged_msgs": 1, "emitted_complete": 2, "emitted_partial": 0}
+        # Curation gives the same document it would give for both messages in a single flush.
+        curated = curate_dict_task_messages([task], "task_id", convert_times=False)["t1"]
+        assert curated["running"] and curated["finished"] and curated["status"] == "FINISHED"
+
+    def test_finished_status_wins(self):
+        emitted = []
+        assembler = TaskAssembler(emitted.append, timeout=60)
+        assembler.add({"task_id": "t1", "status": "SUBMITTED", MQDao.MSG_ID_FIELD: "1-0"})
+        assembler.add({"task_id": "t1", "status": "ERROR", MQDao.MSG_ID_FIELD: "2-0"})
+        assembler.add({"task_id": "t1", "status": "RUNNING", MQDao.MSG_ID_FIELD: "3-0"})
+        assembler.stop()
+        assert emitted[0]["status"] == "ERROR"
+        assert emitted[0][MQDao.MSG_ID_FIELD] == ["1-0", "2-0"]
+        assert emitted[1]["status"] == "RUNNING"
+
+    def test_timeout_and_capacity(self):
+        emitted = []
+        assembler = TaskAssembler(emitted.append, capacity=2, timeout=0.2)
+        for i in range(3):
+            assembler.add({"task_id": f"t{i}", "status": "RUNNING"})
+        assert [t["task_id"] for t in emitted] == ["t0"]  # Evicted, least recently updated
+        sleep(0.5)
+        assert sorted(t["task_id"] for t in emitted) == ["t0", "t1", "t2"]
+        assert assembler.metrics["emitted_partial"] == 3
+        assembler.stop()
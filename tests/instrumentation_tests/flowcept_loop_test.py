@@ -153,3 +153,35 @@ class LoopTests(unittest.TestCase):
             assert t["used"]["i"] == i
             assert t["used"]["epoch"] == i
             assert t["status"] == Status.FINISHED.value
+
+    def test_lightweight_loop_chunks(self):
+        def iterations(activity_id):
+            return [m for m in Flowcept.buffer if isinstance(m, dict) and m.get("activity_id") == activity_id]
+
+        with Flowcept(start_persistence=False, save_workflow=False):
+            loop = FlowceptLightweightLoop(items=list("abcde"), loop_name="rows", chunk_size=2, columnar=False)
+            sent = []
+            for j, _ in enumerate(loop):
+                sent.append(len(iterations("rows_iteration")))
+                assert len(loop._items) == 2  # The pool holds one chunk.
+                loop.end_iter({"j": j})
+            assert sent == [0, 0, 2, 2, 4]
+            rows = iterations("rows_iteration")
+
+            loop = FlowceptLightweightLoop(items=list("abcde"), loop_name="cols", chunk_size=2, columnar=True)
+            for j, _ in enumerate(loop):
+                if j != 3:
+                    loop.end_iter({"j": j})
+            chunks = iterations("cols_iteration")
+
+        assert [(t["used"], t["generated"]) for t in rows] == [
+            ({"i": i, "item": item}, {"j": i}) for i, item in enumerate("abcde")
+        ]
+        assert loop._items is None
+        assert [t["subtype"] for t in chunks] == ["loop_summary"] * 3
+        assert [t["used"] for t in chunks] == [
+            {"i": [0, 1], "item": ["a", "b"]},
+            {"i": [2, 3], "item": ["c", "d"]},
+            {"i": [4], "item": ["e"]},
+        ]
+        assert [t["generated"] for t in chunks] == [{"j": [0, 1]}, {"j": [2, None]}, {"j": [4]}]
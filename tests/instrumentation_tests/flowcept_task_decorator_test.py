@@ -1,3 +1,5 @@
+import asyncio
+import gc
 import multiprocessing
 import numpy as np
 import psutil
@@ -65,6 +67,12 @@ def decorated_static_function4(x, y):
     return 6, 7
 
 
+@flowcept_task(output_names="y")
+async def async_decorated_function(x):
+    await asyncio.sleep(0.01)
+    return x + 1
+
+
 @lightweight_flowcept_task
 def decorated_all_serializable(x: int):
     sleep(TIME_TO_SLEEP)
@@ -277,6 +285,68 @@ class DecoratorTests(unittest.TestCase):
                 assert t["generated"]["z"] == 6
                 assert t["generated"]["w"] == 7
 
+    def test_async_decorated_function(self):
+        async def run_tasks(first):
+            await asyncio.gather(*(async_decorated_function(x=i) for i in range(first, first + 20)))
+
+        async def main():
+            async with Flowcept():
+                await run_tasks(0)
+            return Flowcept.current_workflow_id
+
+        workflow_id = asyncio.run(main())
+        # A synchronous context around a loop that closes before the stop: its messages are
+        # handed to the synchronous buffer.
+        with Flowcept(workflow_id=workflow_id):
+            asyncio.run(run_tasks(20))
+
+        assert assert_by_querying_tasks_until(
+            filter={"workflow_id": workflow_id},
+            condition_to_evaluate=lambda docs: len(docs) == 40,
+            max_time=30,
+            max_trials=10,
+        )
+        tasks = Flowcept.db.query({"workflow_id": workflow_id})
+        assert sorted(t["generated"]["y"] - t["used"]["x"] for t in tasks) == [1] * 40
+
+    def test_async_publishers_closed_with_their_loops(self):
+        from flowcept.commons.daos.mq_dao.mq_dao_async import AsyncMQDao
+        from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
+
+        async def run_tasks(first):
+            await asyncio.gather(*(async_decorated_function(x=i) for i in range(first, first + 10)))
+
+        built = []
+
+        def build(mq_dao):
+            async_mq_dao = build.original(mq_dao)
+            built.append(async_mq_dao)
+            return async_mq_dao
+
+        build.original = AsyncMQDao.build
+        interceptor = InstrumentationInterceptor.get_instance()
+        with patch.object(AsyncMQDao, "build", staticmethod(build)):
+            with Flowcept():
+                for first in range(0, 30, 10):
+                    asyncio.run(run_tasks(first))
+                gc.collect()
+                assert len(interceptor._async_mq_daos) == 0
+
+        if flowcept.configs.MQ_ASYNC_PUBLISHING:
+            assert len(built) == 3
+        assert all(async_mq_dao._closed for async_mq_dao in built)
+        for async_mq_dao in built:
+            producer = getattr(async_mq_dao, "_producer", None)
+            if producer is not None:
+                pool = producer.connection_pool
+                assert not any(c.is_connected for c in pool._available_connections + list(pool._in_use_connections))
+        assert assert_by_querying_tasks_until(
+            filter={"workflow_id": Flowcept.current_workflow_id},
+            condition_to_evaluate=lambda docs: len(docs) == 30,
+            max_time=30,
+            max_trials=10,
+        )
+
     @pytest.mark.safeoffline
     def test_dump_buffer_offline_mode(self):
         logger = FlowceptLogger()
@@ -0,0 +1,50 @@
+import inspect
+import unittest
+
+from flowcept import Flowcept, flowcept_task
+from flowcept.commons.utils import replace_non_serializable
+from flowcept.instrumentation.flowcept_task import _compile_args_mapper
+
+
+def bound(func, *args, **kwargs):
+    b = inspect.signature(func).bind(*args, **kwargs)
+    b.apply_defaults()
+    return replace_non_serializable(dict(b.arguments))
+
+
+class TestFlowceptTaskFastPath(unittest.TestCase):
+    def test_compiled_args_mapper(self):
+        def f(a, b=2, *args, c, d=[1], **kwargs):
+            pass
+
+        def g(a, /, b, *, c=None):
+            pass
+
+        cases = [
+            (f, (1,), {"c": 3}),
+            (f, (1, 5, 6, 7), {"c": object(), "e": (1, 2)}),
+            (g, (1, 2), {}),
+            (g, (1,), {"b": 2, "c": {"x": (3,)}}),
+        ]
+        for func, args, kwargs in cases:
+            mapper = _compile_args_mapper(func, inspect.signature(func), sanitize=True)
+            assert mapper(*args, **kwargs) == bound(func, *args, **kwargs)
+        mapper = _compile_args_mapper(g, inspect.signature(g), sanitize=True)
+        with self.assertRaises(TypeError):
+            mapper(1, 2, 3)
+        with self.assertRaises(TypeError):
+            mapper(a=1, b=2)
+
+    def test_fast_path_message(self):
+        @flowcept_task(tags=["t"], output_names="y")
+        def h(x, scale=2, workflow_id=None):
+            return x * scale
+
+        with Flowcept(start_persistence=False, save_workflow=False, workflow_id="wf"):
+            assert h(3) == 6
+            task = [m for m in Flowcept.buffer if isinstance(m, dict) and m.get("type") == "task"][-1]
+        assert task["used"] == {"x": 3, "scale": 2}
+        assert task["generated"] == {"y": 6}
+        assert task["activity_id"] == "h" and task["tags"] == ["t"] and task["status"] == "FINISHED"
+        assert task["task_id"] == str(task["started_at"]) and task["ended_at"] >= task["started_at"]
+        assert "subtype" not in task
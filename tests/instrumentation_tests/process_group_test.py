@@ -0,0 +1,66 @@
+import multiprocessing
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import flowcept
+from flowcept import Flowcept, flowcept_task
+from flowcept.commons.serializers import get_serializer
+from flowcept.instrumentation.process_group import ProcessGroupCapture
+
+
+@flowcept_task
+def child_task(x):
+    return x * 2
+
+
+def _run_child_tasks(first):
+    for x in range(first, first + 50):
+        child_task(x)
+    return multiprocessing.current_process().pid
+
+
+class _ListInterceptor:
+    def __init__(self):
+        self.messages = []
+
+    def intercept_many(self, msgs):
+        self.messages.extend(msgs)
+
+
+class TestProcessGroupCapture(unittest.TestCase):
+    def test_ring_wraps_and_drops(self):
+        serializer = get_serializer("msgpack")
+        interceptor = _ListInterceptor()
+        group = ProcessGroupCapture(interceptor, workflow_id="wf", ring_bytes=256, overflow="drop").start()
+        ring = group._ring
+        for i in range(40):
+            # 40 messages of about 50 bytes go around the 256-byte ring several times.
+            assert ring.put([serializer.dumps({"i": i, "pad": "x" * 40})], block=False)
+            if i % 3 == 2:
+                group.drain()
+        assert not ring.put([serializer.dumps({"pad": "x" * 300})], block=False)
+        assert group.dropped == 1
+        group.stop()
+        assert [m["i"] for m in interceptor.messages] == list(range(40))
+
+    def test_fork_and_spawn_children(self):
+        for start_method in ("fork", "spawn"):
+            interceptor = _ListInterceptor()
+            group = ProcessGroupCapture(interceptor, workflow_id="wf").start()
+            context = multiprocessing.get_context(start_method)
+            with ProcessPoolExecutor(2, mp_context=context, initializer=group.attach) as executor:
+                list(executor.map(_run_child_tasks, range(0, 200, 50)))
+            group.stop()
+            tasks = [m for m in interceptor.messages if m.get("activity_id") == "child_task"]
+            assert sorted(t["generated"]["arg_0"] for t in tasks) == [2 * x for x in range(200)], start_method
+            assert {t["workflow_id"] for t in tasks} == {"wf"}
+
+    def test_flowcept_process_group(self):
+        if flowcept.configs.DB_FLUSH_MODE != "offline":
+            self.skipTest("Flowcept.buffer holds all the messages only in the offline mode.")
+        with Flowcept(start_persistence=False, save_workflow=False, workflow_id="wf", process_group=True) as f:
+            buffer = Flowcept.buffer
+            with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("fork")) as executor:
+                list(executor.map(_run_child_tasks, range(0, 100, 50)))
+        assert len([m for m in buffer if m.get("activity_id") == "child_task"]) == 100
+        assert f.process_group is None
@@ -0,0 +1,97 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from flowcept import Flowcept, FlowceptLoop, flowcept_task
+from flowcept.instrumentation.sampling import SAMPLING_SUMMARY_SUBTYPE, TaskSampler, build_sampler
+
+
+class _ListInterceptor:
+    telemetry_capture = None
+
+    def __init__(self):
+        self.messages = []
+
+    def intercept(self, msg):
+        self.messages.append(msg)
+
+
+def _tasks():
+    return [m for m in Flowcept.buffer if isinstance(m, dict) and "activity_id" in m]
+
+
+class TestSampling(unittest.TestCase):
+    def test_head_sampling_and_summary(self):
+        interceptor = _ListInterceptor()
+        assert build_sampler("f", interceptor, {"every": 1}) is None
+        sampler = build_sampler("f", interceptor, {"every": 3, "summary_every": 4}, workflow_id="wf")
+        kept = []
+        for i in range(9):
+            captured = sampler.capture_next()
+            kept.append(sampler.observe(captured, float(i), i + 0.5))
+        assert kept == [True, False, False] * 3
+        # The 4th unsampled execution triggered a summary; 2 remain.
+        summary = interceptor.messages[0]
+        assert summary["subtype"] == SAMPLING_SUMMARY_SUBTYPE and summary["workflow_id"] == "wf"
+        assert summary["used"] == {"unsampled": 4, "captured": 2}
+        assert summary["generated"]["duration_sum"] == 2.0 and summary["started_at"] == 1.0
+        sampler.flush()
+        assert interceptor.messages[1]["used"] == {"unsampled": 2, "captured": 1}
+        sampler.flush()
+        assert len(interceptor.messages) == 2
+
+    def test_tail_sampling(self):
+        sampler = TaskSampler("f", _ListInterceptor(), every=1000, outlier_stddevs=3, min_samples=5)
+        assert sampler.capture_next()
+        assert sampler.observe(True, 0.0, 1.0)
+        for i in range(10):
+            assert not sampler.capture_next()
+            assert not sampler.observe(False, 0.0, 1.0 + (i % 2) * 0.1)
+        assert sampler.observe(False, 0.0, 5.0)
+        assert sampler.observe(False, 0.0, 1.0, error=True)
+        assert not sampler.observe(False, 0.0, 1.05)
+
+    def test_overhead_budget(self):
+        sampler = TaskSampler("f", _ListInterceptor(), overhead_budget=0.01)
+        assert sampler.capture_next()
+        sampler.add_overhead(10.0)
+        assert not sampler.capture_next()
+
+    def test_concurrent_executions(self):
+        sampler = TaskSampler("f", _ListInterceptor(), every=4, overhead_budget=1e9)
+
+        def run(_):
+            captured = sum(sampler.capture_next() for _ in range(1000))
+            for _ in range(1000):
+                sampler.add_overhead(0.001)
+            return captured
+
+        with ThreadPoolExecutor(8) as pool:
+            assert sum(pool.map(run, range(8))) == 2000
+        assert sampler._executions == 8000
+        assert abs(sampler._overhead - 8.0) < 1e-6
+
+    def test_decorator_and_loop_sampling(self):
+        @flowcept_task(sampling={"every": 4})
+        def f(x):
+            if x == 5:
+                raise ValueError("kept")
+            return x
+
+        with Flowcept(start_persistence=False, save_workflow=False, workflow_id="wf"):
+            for i in range(10):
+                try:
+                    f(i)
+                except ValueError:
+                    pass
+            for _ in FlowceptLoop(range(5), loop_name="l", sampling={"every": 2}):
+                pass
+            tasks = _tasks()
+
+        assert [t["used"]["x"] for t in tasks if t.get("activity_id") == "f"] == [0, 4, 5, 8]
+        error = [t for t in tasks if t.get("activity_id") == "f"][2]
+        assert error["status"] == "ERROR" and "telemetry_at_start" not in error
+        iterations = [t for t in tasks if t.get("activity_id") == "l_iteration"]
+        assert [t["used"]["i"] for t in iterations if t.get("subtype") is None] == [0, 2, 4]
+        assert [t["used"] for t in iterations if t.get("subtype") == SAMPLING_SUMMARY_SUBTYPE] == [
+            {"unsampled": 2, "captured": 3}
+        ]
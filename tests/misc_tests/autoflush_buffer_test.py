@@ -0,0 +1,202 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from time import sleep
+
+import numpy as np
+
+from flowcept.commons.async_autoflush_buffer import AsyncAutoflushBuffer
+from flowcept.commons.autoflush_buffer import BoundedAutoflushBuffer, build_autoflush_buffer
+
+
+class TestBoundedAutoflushBuffer(unittest.TestCase):
+    def test_no_lost_appends_under_concurrency(self):
+        flushed = []
+        buf = BoundedAutoflushBuffer(flush_function=flushed.extend, max_size=50, flush_interval=0.01, capacity=200)
+
+        def producer(offset):
+            for i in range(2000):
+                buf.append({"task_id": f"{offset}_{i}"})
+
+        threads = [threading.Thread(target=producer, args=(t,)) for t in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        buf.stop()
+
+        assert len(flushed) == 8000
+        assert len({m["task_id"] for m in flushed}) == 8000
+        metrics = buf.metrics
+        assert metrics["appends"] == 8000
+        assert metrics["drops"] == 0
+        assert metrics["flushed_items"] == 8000
+        assert metrics["avg_flush_latency"] is not None
+
+    def test_zero_copy_handoff(self):
+        received = []
+        buf = BoundedAutoflushBuffer(flush_function=received.append, max_size=3)
+        active = buf.current_buffer
+        buf.extend([1, 2, 3])
+        buf.stop()
+        assert received[0] is active
+
+    def test_drop_oldest(self):
+        gate = threading.Event()
+        flushed = []
+
+        def slow_flush(batch):
+            gate.wait()
+            flushed.extend(batch)
+
+        buf = BoundedAutoflushBuffer(flush_function=slow_flush, max_size=5, capacity=5, overflow_policy="drop_oldest")
+        buf.extend(list(range(5)))  # This batch gets stuck in the flush function
+        sleep(0.1)
+        buf.extend(list(range(5, 15)))
+        gate.set()
+        buf.stop()
+        assert buf.metrics["drops"] == 5
+        assert flushed == list(range(5)) + list(range(10, 15))
+
+    def test_spill(self):
+        gate = threading.Event()
+        flushed = []
+
+        def slow_flush(batch):
+            gate.wait()
+            flushed.extend(batch)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spill_path = os.path.join(tmp_dir, "spill.jsonl")
+            buf = BoundedAutoflushBuffer(
+                flush_function=slow_flush, max_size=5, capacity=5, overflow_policy="spill", spill_path=spill_path
+            )
+            buf.extend([{"i": i} for i in range(5)])
+            sleep(0.1)
+            buf.extend([{"i": i} for i in range(5, 17)])
+            gate.set()
+            buf.stop()
+            assert buf.metrics["spilled"] == 10
+            assert [m["i"] for m in flushed] == list(range(17))
+            assert not os.path.exists(spill_path)
+
+    def test_spill_is_replayed_before_the_buffer(self):
+        flushed = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            buf = BoundedAutoflushBuffer(
+                flush_function=flushed.extend,
+                capacity=5,
+                overflow_policy="spill",
+                spill_path=os.path.join(tmp_dir, "spill.jsonl"),
+            )
+            buf.extend([{"i": i} for i in range(12)])
+            buf.stop()
+            assert [m["i"] for m in flushed] == list(range(12))
+
+    def test_spill_keeps_wire_types(self):
+        flushed = []
+        buf = BoundedAutoflushBuffer(flush_function=flushed.extend, capacity=2, overflow_policy="spill")
+        assert os.path.dirname(buf._spill_path) == tempfile.gettempdir()
+        at = datetime(2024, 1, 2, 3, 4, 5)
+        buf.extend([{"i": i, "arr": np.arange(i + 1), "at": at} for i in range(5)])
+        buf.stop()
+        assert buf.metrics["spilled"] == 4
+        assert [m["i"] for m in flushed] == list(range(5))
+        assert all(isinstance(m["arr"], np.ndarray) and m["at"] == at for m in flushed)
+        assert not os.path.exists(buf._spill_path)
+
+    def test_spill_is_written_outside_the_lock(self):
+        gate = threading.Event()
+        lock_free = []
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            buf = BoundedAutoflushBuffer(
+                flush_function=lambda batch: gate.wait(),
+                max_size=2,
+                capacity=2,
+                overflow_policy="spill",
+                spill_path=os.path.join(tmp_dir, "spill.jsonl"),
+            )
+            spill = buf._spill
+
+            def probe():
+                acquired = buf._cond.acquire(timeout=1)
+                if acquired:
+                    buf._cond.release()
+                lock_free.append(acquired)
+
+            def checked_spill(items):
+                # Another producer can take the lock while the file is written.
+                t = threading.Thread(target=probe)
+                t.start()
+                t.join()
+                spill(items)
+
+            buf._spill = checked_spill
+            buf.extend([{"i": i} for i in range(2)])
+            sleep(0.1)
+            buf.extend([{"i": i} for i in range(2, 7)])
+            gate.set()
+            buf.stop()
+            assert lock_free == [True, True]
+
+    def test_build(self):
+        flushed = []
+        buf = build_autoflush_buffer(flushed.extend, engine="bounded", max_size=2)
+        assert isinstance(buf, BoundedAutoflushBuffer)
+        buf.append(1)
+        buf.stop()
+        assert flushed == [1]
+        with self.assertRaises(ValueError):
+            BoundedAutoflushBuffer(flushed.extend, overflow_policy="unknown")
+
+
+class TestAsyncAutoflushBuffer(unittest.TestCase):
+    def test_flushes_awaited_on_the_loop(self):
+        flushed = []
+        flush_threads = set()
+
+        async def flush(batch):
+            await asyncio.sleep(0.01)
+            flush_threads.add(threading.get_ident())
+            flushed.append(batch)
+
+        async def main():
+            buf = AsyncAutoflushBuffer(flush, max_size=10, flush_interval=0.05, capacity=20).start()
+
+            async def producer(offset):
+                for i in range(100):
+                    buf.append({"task_id": f"{offset}_{i}"})
+                    await buf.wait_for_capacity()
+                    assert buf.pending <= 20 + 1
+
+            await asyncio.gather(*(producer(p) for p in range(4)))
+            await buf.flush()
+            assert buf.pending == 0 and sum(len(b) for b in flushed) == 400
+            buf.append({"task_id": "timed"})
+            await asyncio.sleep(0.1)  # The time-based flush sends it.
+            assert flushed[-1] == [{"task_id": "timed"}]
+            await buf.stop()
+
+        asyncio.run(main())
+        assert flush_threads == {threading.get_ident()}
+        assert sum(len(b) for b in flushed) == 401
+        assert all(len(b) <= 10 for b in flushed)
+
+    def test_drain_after_the_loop_closed(self):
+        async def never_flushes(batch):
+            await asyncio.sleep(3600)
+
+        async def main():
+            buf = AsyncAutoflushBuffer(never_flushes, max_size=2).start()
+            buf.extend([1, 2])
+            buf.append(3)
+            await asyncio.sleep(0)
+            return buf
+
+        buf = asyncio.run(main())  # Cancels the flush in flight.
+        assert buf.drain() == [1, 2, 3]
+        assert buf.drain() == []
@@ -0,0 +1,94 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from flowcept import Flowcept
+from flowcept.commons.buffer_log import (
+    append_buffer_log,
+    iter_buffer_file,
+    iter_buffer_log,
+    merge_buffer_logs,
+)
+from flowcept.commons.serializers import get_serializer
+
+
+def _tasks(workflow_id, n, start=0):
+    return [
+        {"type": "task", "workflow_id": workflow_id, "task_id": f"{workflow_id}-{i}", "used": {"i": i}}
+        for i in range(start, start + n)
+    ]
+
+
+class TestBufferLog(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+        self.path = os.path.join(self._tmp_dir.name, "flowcept_buffer.log")
+
+    def test_appends_rotate_segments_in_order(self):
+        for start in range(0, 100, 20):
+            append_buffer_log(_tasks("wf", 20, start), self.path, segment_bytes=1024)
+        assert len([name for name in os.listdir(self.path) if name.endswith(".seg")]) > 1
+        assert [m["used"]["i"] for m in iter_buffer_log(self.path)] == list(range(100))
+
+    def test_filters(self):
+        append_buffer_log(_tasks("wf1", 10) + [{"type": "workflow", "workflow_id": "wf1"}], self.path, 512)
+        append_buffer_log(_tasks("wf2", 10), self.path, 512)
+        assert len(list(iter_buffer_log(self.path, workflow_id="wf2"))) == 10
+        assert [m["task_id"] for m in iter_buffer_log(self.path, task_id="wf1-3")] == ["wf1-3"]
+        assert list(iter_buffer_log(self.path, type="workflow")) == [{"type": "workflow", "workflow_id": "wf1"}]
+        assert len(list(iter_buffer_log(self.path, workflow_id="wf1", type="task"))) == 10
+
+    def test_records_without_index_entries_are_read(self):
+        append_buffer_log(_tasks("wf", 3), self.path)
+        # A writer that died before writing its index entries.
+        payload = get_serializer("msgpack").dumps(_tasks("wf", 1, start=3)[0])
+        with open(os.path.join(self.path, "00000000.seg"), "ab") as f:
+            f.write(struct.pack("<I", len(payload)) + payload)
+            f.write(struct.pack("<I", 1000) + b"partial")
+        assert [m["task_id"] for m in iter_buffer_log(self.path, task_id="wf-3")] == ["wf-3"]
+        assert len(list(iter_buffer_log(self.path))) == 4
+
+    def test_records_without_index_entries_survive_appends(self):
+        append_buffer_log(_tasks("wf", 3), self.path)
+        payload = get_serializer("msgpack").dumps(_tasks("wf", 1, start=3)[0])
+        with open(os.path.join(self.path, "00000000.seg"), "ab") as f:
+            f.write(struct.pack("<I", len(payload)) + payload)
+            f.write(struct.pack("<I", 1000) + b"partial")
+        with open(os.path.join(self.path, "00000000.idx"), "ab") as f:
+            f.write(b"\x96\xcd")  # A partial index entry.
+        append_buffer_log(_tasks("wf", 2, start=4), self.path)
+        assert [m["used"]["i"] for m in iter_buffer_log(self.path)] == list(range(6))
+        for i in range(6):
+            assert [m["task_id"] for m in iter_buffer_log(self.path, task_id=f"wf-{i}")] == [f"wf-{i}"]
+
+    def test_merge_orders_by_write_time(self):
+        sources = [os.path.join(self._tmp_dir.name, f"part_{i}.log") for i in range(3)]
+        for start in range(0, 30, 5):
+            append_buffer_log(_tasks("wf", 5, start), sources[(start // 5) % 3], segment_bytes=256)
+        dest = os.path.join(self._tmp_dir.name, "merged.log")
+        assert merge_buffer_logs(sources, dest, segment_bytes=256) == 30
+        assert [m["used"]["i"] for m in iter_buffer_log(dest)] == list(range(30))
+
+    def test_jsonl_is_streamed_with_filters(self):
+        path = os.path.join(self._tmp_dir.name, "flowcept_buffer.jsonl")
+        serializer = get_serializer("json")
+        with open(path, "wb") as f:
+            for msg in _tasks("wf1", 3) + _tasks("wf2", 2):
+                f.write(serializer.dumps(msg) + b"\n")
+        assert len(list(iter_buffer_file(path))) == 5
+        assert len(list(iter_buffer_file(path, workflow_id="wf2"))) == 2
+
+    def test_read_buffer_file_consolidates_logs(self):
+        for part in range(3):
+            append_buffer_log(
+                _tasks("wf", 4, part * 4), os.path.join(self._tmp_dir.name, f"flowcept_buffer_wf_{part}.log")
+            )
+        msgs = Flowcept.read_buffer_file(file_path=self.path, consolidate=True, workflow_id="wf")
+        assert [m["used"]["i"] for m in msgs] == list(range(12))
+        assert os.listdir(self._tmp_dir.name) == ["flowcept_buffer_wf.log"]
+        assert (
+            len(list(Flowcept.iter_buffer(os.path.join(self._tmp_dir.name, "flowcept_buffer_wf.log"), type="task")))
+            == 12
+        )
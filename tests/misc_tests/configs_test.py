@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flowcept import configs
+
+
+class TestCompiledSettings(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self._tmp_dir.name, "cache")
+        self.path = os.path.join(self._tmp_dir.name, "settings.yaml")
+        patcher = patch.object(configs, "_CACHE_DIR", self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmp_dir.cleanup)
+
+    def write(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def test_snapshot_is_keyed_by_file_hash(self):
+        self.write("mq:\n  buffer_size: 10\n  ref: ${mq.buffer_size}\n")
+        assert configs._compile_settings(self.path) == {"mq": {"buffer_size": 10, "ref": 10}}
+        assert len(os.listdir(self.cache_dir)) == 1
+        with patch("omegaconf.OmegaConf.create", side_effect=AssertionError):
+            assert configs._compile_settings(self.path) == {"mq": {"buffer_size": 10, "ref": 10}}
+
+        self.write("mq:\n  buffer_size: 200\n  ref: ${mq.buffer_size}\n")
+        assert configs._compile_settings(self.path)["mq"]["ref"] == 200
+        assert len(os.listdir(self.cache_dir)) == 2
+
+    def test_snapshot_is_keyed_by_env_interpolations(self):
+        self.write("mq:\n  host: ${oc.env:FLOWCEPT_TEST_MQ_HOST}\n")
+        for host in ("node1", "node2", "node1"):
+            with patch.dict(os.environ, {"FLOWCEPT_TEST_MQ_HOST": host}):
+                assert configs._compile_settings(self.path)["mq"]["host"] == host
+        assert len(os.listdir(self.cache_dir)) == 2
+
+    def test_other_resolvers_are_not_cached(self):
+        self.write("mq:\n  port: ${oc.decode:'6379'}\n")
+        assert configs._compile_settings(self.path)["mq"]["port"] == 6379
+        assert not os.path.exists(self.cache_dir)
+
+    def test_hostname_is_resolved_once_per_node(self):
+        with patch.dict(configs._NODE_IDENTITY, clear=True):
+            with patch.object(configs, "_resolve_hostname", return_value="node0.example.org") as resolve:
+                assert configs.get_hostname() == "node0.example.org"
+                assert configs.HOSTNAME == "node0.example.org"
+            configs._NODE_IDENTITY.clear()
+            with patch.object(configs, "_resolve_hostname", side_effect=AssertionError):
+                assert configs.get_hostname() == "node0.example.org"
+        assert resolve.call_count == 1
@@ -0,0 +1,15 @@
+import subprocess
+import sys
+import unittest
+
+
+class TestImportTime(unittest.TestCase):
+    def test_heavy_modules_are_not_imported(self):
+        heavy = ["numpy", "pandas", "omegaconf", "pyarrow", "pymongo", "asyncio"]
+        code = (
+            "import sys\n"
+            "from flowcept import Flowcept, flowcept_task\n"
+            f"print(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == "", out.stdout
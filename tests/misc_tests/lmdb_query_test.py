@@ -0,0 +1,174 @@
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+from uuid import uuid4
+
+from flowcept.commons.daos.docdb_dao import lmdb_dao
+from flowcept.commons.daos.docdb_dao.lmdb_dao import LMDBDAO
+
+
+class TestLMDBQuery(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        with patch.object(lmdb_dao, "LMDB_SETTINGS", {"path": self._tmp_dir.name}):
+            self.dao = LMDBDAO()
+        self.wf_id = str(uuid4())
+        self.tasks = [
+            {
+                "task_id": f"t{i}",
+                "workflow_id": self.wf_id if i < 8 else "other_wf",
+                "activity_id": f"act_{i % 2}",
+                "status": "FINISHED" if i % 3 else "RUNNING",
+                "started_at": 100.0 + i,
+                "used": {"x": i},
+            }
+            for i in range(10)
+        ]
+        assert self.dao.insert_and_update_many_tasks([dict(t) for t in self.tasks], "task_id")
+
+    def tearDown(self):
+        self.dao.close()
+        self._tmp_dir.cleanup()
+
+    def test_equality_and_in(self):
+        docs = self.dao.task_query(filter={"workflow_id": self.wf_id})
+        assert sorted(d["task_id"] for d in docs) == [f"t{i}" for i in range(8)]
+
+        docs = self.dao.task_query(filter={"workflow_id": self.wf_id, "activity_id": {"$in": ["act_1"]}})
+        assert sorted(d["task_id"] for d in docs) == ["t1", "t3", "t5", "t7"]
+
+        docs = self.dao.task_query(filter={"workflow_id": self.wf_id, "status": {"$ne": "FINISHED"}})
+        assert sorted(d["task_id"] for d in docs) == ["t0", "t3", "t6"]
+
+        docs = self.dao.task_query(filter={"used.x": 4})
+        assert [d["task_id"] for d in docs] == ["t4"]
+
+    def test_range_sort_limit_projection(self):
+        docs = self.dao.task_query(
+            filter={"started_at": {"$gte": 102, "$lt": 106}},
+            sort=[("started_at", -1)],
+            limit=2,
+            projection=["task_id", "started_at"],
+        )
+        assert docs == [{"task_id": "t5", "started_at": 105.0}, {"task_id": "t4", "started_at": 104.0}]
+
+        docs = self.dao.task_query(filter={"workflow_id": self.wf_id}, sort=[("started_at", "desc")], limit=3)
+        assert [d["task_id"] for d in docs] == ["t7", "t6", "t5"]
+
+        docs = self.dao.task_query(filter={"started_at": {"$gt": -1e9}})
+        assert len(docs) == 10
+
+    def test_indexes_follow_updates_and_deletes(self):
+        assert self.dao.insert_and_update_many_tasks(
+            [{"task_id": "t0", "workflow_id": "moved_wf", "status": "FINISHED"}], "task_id"
+        )
+        assert self.dao.task_query(filter={"workflow_id": "moved_wf"})[0]["task_id"] == "t0"
+        assert len(self.dao.task_query(filter={"workflow_id": self.wf_id})) == 7
+
+        assert self.dao.delete_task_keys("workflow_id", ["other_wf"])
+        assert self.dao.task_query(filter={"workflow_id": "other_wf"}) == []
+        assert self.dao.count_tasks() == 8
+
+    def test_indexes_rebuilt_on_open(self):
+        with self.dao._env.begin(write=True) as txn:
+            txn.delete(LMDBDAO.INDEX_VERSION_KEY, db=self.dao._meta_db)
+            txn.drop(self.dao._task_index_dbs["workflow_id"], delete=False)
+        self.dao._build_task_indexes()
+        assert len(self.dao.task_query(filter={"workflow_id": self.wf_id})) == 8
+
+    def test_merge_on_write(self):
+        start = {"task_id": "m1", "workflow_id": self.wf_id, "status": "RUNNING", "used": {"a": 1}, "started_at": 1.0}
+        end = {"task_id": "m1", "status": "FINISHED", "generated": {"b": 2}, "used": {"c": 3}, "ended_at": 2.0}
+        late = {"task_id": "m1", "status": "RUNNING", "telemetry_at_start": {"cpu": 1}}
+        for msg in (start, end, late):
+            assert self.dao.insert_and_update_many_tasks([msg], "task_id")
+
+        task = self.dao.task_query(filter={"task_id": "m1"})[0]
+        assert task["status"] == "FINISHED"
+        assert task["running"] and task["finished"]
+        assert task["used"] == {"a": 1, "c": 3}
+        assert task["generated"] == {"b": 2}
+        assert task["workflow_id"] == self.wf_id and task["started_at"] == 1.0 and task["ended_at"] == 2.0
+        finished = self.dao.task_query(filter={"workflow_id": self.wf_id, "status": "FINISHED"})
+        assert "m1" in {t["task_id"] for t in finished}
+
+    def test_iter_query(self):
+        ids = [d["task_id"] for d in self.dao.iter_query(batch_size=3)]
+        assert ids == sorted(t["task_id"] for t in self.tasks)
+
+        it = self.dao.iter_query(filter={"workflow_id": self.wf_id}, projection=["task_id"], batch_size=2)
+        first = [next(it) for _ in range(3)]
+        assert first == [{"task_id": "t0"}, {"task_id": "t1"}, {"task_id": "t2"}]
+        rest = self.dao.iter_query(filter={"workflow_id": self.wf_id}, batch_size=2, resume_after="t2")
+        assert [d["task_id"] for d in rest] == ["t3", "t4", "t5", "t6", "t7"]
+        rest = self.dao.iter_query(filter={"status": "RUNNING"}, resume_after="t3")
+        assert [d["task_id"] for d in rest] == ["t6", "t9"]
+
+        docs = self.dao.iter_query(filter={"started_at": {"$gte": 107}}, sort=[("started_at", -1)], batch_size=1)
+        assert [d["task_id"] for d in docs] == ["t9", "t8", "t7"]
+        docs = self.dao.iter_query(filter={"activity_id": "act_0"}, sort=[("started_at", -1)])
+        assert [d["task_id"] for d in docs] == ["t8", "t6", "t4", "t2", "t0"]
+        with self.assertRaises(ValueError):
+            list(self.dao.iter_query(sort=[("started_at", 1)], resume_after="t1"))
+
+        assert len(self.dao.to_df(filter={"workflow_id": self.wf_id})) == 8
+
+    def test_dump_to_file(self):
+        json_path = os.path.join(self._tmp_dir.name, "dump.json")
+        self.dao.dump_to_file(filter={"workflow_id": "other_wf"}, output_file=json_path)
+        with open(json_path) as f:
+            assert [d["task_id"] for d in json.load(f)] == ["t8", "t9"]
+
+        zip_path = os.path.join(self._tmp_dir.name, "dump.zip")
+        self.dao.dump_to_file(filter={}, output_file=zip_path, should_zip=True)
+        with zipfile.ZipFile(zip_path) as z:
+            assert len(json.loads(z.read("dump_file.json"))) == 10
+
+    def test_dump_to_parquet(self):
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self._tmp_dir.name, "dump.parquet")
+        self.dao.dump_to_file(filter={"workflow_id": self.wf_id}, output_file=path, export_format="parquet")
+        table = pq.read_table(path)
+        assert table.num_rows == 8
+        assert table.column("used.x").to_pylist() == list(range(8))
+        assert [f for f in os.listdir(self._tmp_dir.name) if f.startswith(".flowcept_parquet_")] == []
+
+    def test_get_tasks_recursive(self):
+        tree_wf = str(uuid4())
+        tasks = [{"task_id": "root", "activity_id": "train", "started_at": 0.0}]
+        for e in range(2):
+            tasks.append({"task_id": f"e{e}", "parent_task_id": "root", "activity_id": "epoch", "started_at": 2.0 - e})
+            for b in range(2):
+                tasks.append(
+                    {
+                        "task_id": f"e{e}b{b}",
+                        "parent_task_id": f"e{e}",
+                        "activity_id": "batch",
+                        "started_at": 10.0 + b,
+                        "finished": True,
+                        "status": "RUNNING",
+                        "used": {"batch": b},
+                    }
+                )
+        for task in tasks:
+            task["workflow_id"] = tree_wf
+        assert self.dao.insert_and_update_many_tasks(tasks, "task_id")
+
+        tree = self.dao.get_tasks_recursive(tree_wf)
+        assert [t["task_id"] for t in tree] == ["root", "e1", "e0", "e1b0", "e1b1", "e0b0", "e0b1"]
+        e1b1 = tree[4]
+        assert e1b1["depth"] == 2 and e1b1["status"] == "FINISHED"
+        assert e1b1["ancestor_ids"] == [{"train": "root"}, {"epoch": "e1"}]
+
+        assert [t["task_id"] for t in self.dao.get_tasks_recursive(tree_wf, max_depth=1)] == ["root", "e1", "e0"]
+
+        mapping = {
+            "activity_id": {"batch": {"epoch": "parent['task_id']", "b": "task['used']['batch']"}},
+            "subtype": {},
+        }
+        tree = self.dao.get_tasks_recursive(tree_wf, mapping=mapping)
+        assert tree[4]["custom_characterization"] == {"epoch": "e1", "b": 1}
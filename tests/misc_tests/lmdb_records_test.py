@@ -0,0 +1,68 @@
+import importlib.util
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import lmdb
+
+from flowcept.commons.daos.docdb_dao import lmdb_dao
+from flowcept.commons.daos.docdb_dao.lmdb_dao import LMDBDAO
+from flowcept.commons.daos.docdb_dao.lmdb_records import (
+    RECORD_MSGPACK,
+    RECORD_MSGPACK_ZSTD,
+    LMDBRecordCodec,
+    migrate_lmdb_store,
+)
+
+HAS_ZSTD = importlib.util.find_spec("zstandard") is not None
+
+
+class TestLMDBRecords(unittest.TestCase):
+    def test_codec_roundtrip(self):
+        doc = {"task_id": "t1", "used": {"x": 1.5, "ys": [1, 2]}, "status": "FINISHED"}
+        codec = LMDBRecordCodec(record_format="msgpack")
+        record = codec.dumps(doc)
+        assert record[0] == RECORD_MSGPACK
+        assert codec.loads(record) == doc
+        assert codec.loads(memoryview(record)) == doc
+        # JSON is the default record format.
+        json_record = LMDBRecordCodec().dumps(doc)
+        assert json_record[:1] == b"{"
+        assert codec.loads(json_record) == doc
+        assert LMDBRecordCodec().loads(record) == doc
+        assert not codec.is_current(json_record)
+        assert LMDBRecordCodec().is_current(json_record)
+        with self.assertRaises(NotImplementedError):
+            LMDBRecordCodec(compression="zstd")
+
+    @unittest.skipIf(not HAS_ZSTD, "zstandard is not installed")
+    def test_codec_zstd(self):
+        doc = {"task_id": "t1", "used": {"x": "a" * 1000}}
+        codec = LMDBRecordCodec(record_format="msgpack", compression="zstd")
+        record = codec.dumps(doc)
+        assert record[0] == RECORD_MSGPACK_ZSTD and len(record) < 1000
+        assert LMDBRecordCodec().loads(record) == doc
+
+    def test_migrate_json_store(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch.object(lmdb_dao, "LMDB_SETTINGS", {"path": tmp_dir}):
+                dao = LMDBDAO()
+            tasks = [{"task_id": f"t{i}", "workflow_id": "wf", "started_at": float(i)} for i in range(25)]
+            assert dao.insert_and_update_many_tasks(tasks, "task_id")
+            dao.close()
+
+            codec = LMDBRecordCodec(record_format="msgpack")
+            result = migrate_lmdb_store(tmp_dir, codec, batch_size=10)
+            assert result["rewritten"] == {"tasks": 25, "workflows": 0}
+            assert migrate_lmdb_store(tmp_dir, codec)["rewritten"]["tasks"] == 0
+
+            env = lmdb.open(tmp_dir, max_dbs=16)
+            with env.begin(db=env.open_db(b"tasks")) as txn:
+                assert all(value[0] == RECORD_MSGPACK for value in txn.cursor().iternext(keys=False))
+            env.close()
+
+            with patch.object(lmdb_dao, "LMDB_SETTINGS", {"path": tmp_dir}):
+                dao = LMDBDAO()
+            docs = dao.task_query(filter={"workflow_id": "wf", "started_at": {"$lt": 3}}, sort=[("started_at", 1)])
+            assert [d["task_id"] for d in docs] == ["t0", "t1", "t2"]
+            dao.close()
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+
+import msgpack
+
+from flowcept.commons.daos.mq_dao import mq_dao_base
+from flowcept.commons.daos.mq_dao.mq_batch_frame import (
+    BATCH_FRAME_VERSION,
+    build_batch_frame,
+    build_json_batch_frame,
+    iter_messages,
+    unpack_batch_frame,
+)
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+
+
+class TestMQBatchFrame(unittest.TestCase):
+    def test_roundtrip(self):
+        messages = [{"type": "task", "task_id": str(i), "used": {"x": i}} for i in range(100)]
+        for codec in ["none", "zlib"]:
+            frame = build_batch_frame([msgpack.dumps(m) for m in messages], codec=codec)
+            wire = msgpack.loads(msgpack.dumps(frame), strict_map_key=False)
+            assert wire["n"] == 100
+            assert list(iter_messages(wire)) == messages
+        assert unpack_batch_frame(build_json_batch_frame(messages)) == messages
+
+    def test_plain_message_passthrough(self):
+        msg = {"type": "task", "task_id": "1"}
+        assert list(iter_messages(msg)) == [msg]
+
+    def test_newer_version_is_rejected(self):
+        frame = build_batch_frame([msgpack.dumps({"task_id": "1"})])
+        frame["v"] = BATCH_FRAME_VERSION + 1
+        with self.assertRaises(ValueError):
+            unpack_batch_frame(frame)
+        assert list(iter_messages(frame)) == []
+
+    def test_mq_dao_serialize_buffer(self):
+        dao = MQDao()
+        buffer = [{"task_id": "1"}, {"task_id": object()}, {"task_id": "3"}]
+        assert len(dao._serialize_buffer(buffer)) == 2
+        with patch.object(mq_dao_base, "MQ_BATCH_FRAMES", True):
+            payloads = dao._serialize_buffer(buffer)
+        assert len(payloads) == 1
+        frame = msgpack.loads(payloads[0], strict_map_key=False)
+        assert [m["task_id"] for m in iter_messages(frame)] == ["1", "3"]
@@ -0,0 +1,51 @@
+import threading
+import unittest
+from time import sleep
+
+from flowcept.commons.daos.mq_dao.mq_publisher_pool import MQPublisherPool
+
+
+class TestMQPublisherPool(unittest.TestCase):
+    def test_per_workflow_ordering_and_producers(self):
+        published = []
+        producers_by_thread = {}
+        lock = threading.Lock()
+
+        def publish(chunk, producer):
+            sleep(0.001)
+            with lock:
+                producers_by_thread.setdefault(threading.get_ident(), set()).add(producer)
+                published.extend(chunk)
+
+        counter = iter(range(100))
+        pool = MQPublisherPool(publish, n_workers=4, producer_factory=lambda: next(counter), chunk_size=7)
+        buffer = [{"workflow_id": f"wf_{i % 5}", "seq": i} for i in range(500)]
+        for i in range(0, 500, 50):
+            pool.submit(buffer[i : i + 50])
+        pool.join()
+        metrics = pool.metrics
+        pool.stop()
+
+        assert len(published) == 500
+        for wf in range(5):
+            seqs = [m["seq"] for m in published if m["workflow_id"] == f"wf_{wf}"]
+            assert seqs == sorted(seqs)
+        # Each worker thread used exactly one dedicated producer.
+        assert all(len(p) == 1 for p in producers_by_thread.values())
+        assert len({next(iter(p)) for p in producers_by_thread.values()}) == len(producers_by_thread)
+        assert metrics["queue_depth"] == 0
+        assert metrics["published_msgs"] == 500
+        assert len(metrics["published_msgs_per_worker"]) == 4
+        assert metrics["avg_chunk_latency"] > 0
+
+    def test_counters_with_concurrent_workers(self):
+        pool = MQPublisherPool(lambda chunk, producer: None, n_workers=8, chunk_size=2)
+        for i in range(500):
+            pool.submit([{"workflow_id": f"wf_{j}", "seq": i} for j in range(16)])
+        pool.join()
+        metrics = pool.metrics
+        pool.stop()
+
+        assert metrics["published_msgs"] == 500 * 16
+        assert sum(metrics["published_msgs_per_worker"]) == 500 * 16
+        assert metrics["published_chunks"] >= 500 * 16 // 2
@@ -0,0 +1,100 @@
+import unittest
+from uuid import uuid4
+
+import redis
+
+from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.configs import MQ_HOST, MQ_PORT, MQ_PASSWORD
+
+
+def _redis_available():
+    try:
+        return redis.Redis(host=MQ_HOST, port=MQ_PORT, password=MQ_PASSWORD, socket_connect_timeout=1).ping()
+    except Exception:
+        return False
+
+
+@unittest.skipUnless(_redis_available(), "Requires a local redis-server.")
+class TestMQDaoRedisStreams(unittest.TestCase):
+    def _build_dao(self, stream, consumer="consumer_1", n_partitions=1, partition=None):
+        from flowcept.commons.daos.mq_dao.mq_dao_redis_streams import MQDaoRedisStreams
+
+        dao = MQDaoRedisStreams()
+        dao._stream = stream
+        dao._n_partitions = n_partitions
+        dao.partition = partition
+        dao._control_stream = f"{stream}:control"
+        dao._consumer_name = consumer
+        dao.consumer_group = "test"
+        return dao
+
+    def setUp(self):
+        self.stream = f"flowcept_test_stream_{uuid4()}"
+
+    def tearDown(self):
+        conn = redis.Redis(host=MQ_HOST, port=MQ_PORT, password=MQ_PASSWORD)
+        conn.delete(self.stream, f"{self.stream}:control", *[f"{self.stream}:{i}" for i in range(3)])
+
+    def _consume(self, dao):
+        received = []
+
+        def handler(msg):
+            if msg.get("type") == "flowcept_control":
+                return False
+            received.append(msg)
+            return True
+
+        dao.subscribe()
+        dao.send_message({"type": "flowcept_control", "info": "stop_document_inserter"})
+        dao.message_listener(handler)
+        return received
+
+    def test_manual_ack_and_resume(self):
+        producer = self._build_dao(self.stream)
+        producer._bulk_publish([{"type": "task", "task_id": str(i)} for i in range(10)])
+
+        consumer = self._build_dao(self.stream)
+        consumer.manual_ack = True
+        received = self._consume(consumer)
+        assert [m["task_id"] for m in received] == [str(i) for i in range(10)]
+        assert consumer._producer.xpending(self.stream, consumer.group_name)["pending"] == 10
+
+        # A restarted consumer with the same name gets its pending entries again.
+        restarted = self._build_dao(self.stream)
+        restarted.manual_ack = True
+        received = self._consume(restarted)
+        assert len(received) == 10
+        restarted.ack([m[MQDao.MSG_ID_FIELD] for m in received])
+        assert restarted._producer.xpending(self.stream, restarted.group_name)["pending"] == 0
+
+    def test_auto_ack_and_group_split(self):
+        producer = self._build_dao(self.stream)
+        producer._bulk_publish([{"type": "task", "task_id": str(i)} for i in range(10)])
+        first = self._consume(self._build_dao(self.stream, "consumer_1"))
+        producer._bulk_publish([{"type": "task", "task_id": str(i)} for i in range(10, 20)])
+        second = self._consume(self._build_dao(self.stream, "consumer_2"))
+        assert sorted(int(m["task_id"]) for m in first + second) == list(range(20))
+        assert producer._producer.xpending(self.stream, producer.group_name)["pending"] == 0
+
+    def test_partitioned_consumers(self):
+        producer = self._build_dao(self.stream, n_partitions=3)
+        producer._bulk_publish([{"type": "task", "task_id": str(i)} for i in range(30)])
+        producer.send_message({"type": "workflow", "workflow_id": "wf"})
+
+        received = []
+        for i in range(3):
+            consumer = self._build_dao(self.stream, f"worker_{i}", n_partitions=3, partition=i)
+            consumer.manual_ack = True
+            msgs = self._consume(consumer)
+            assert all(MQDao.partition_of(m, 3) == i for m in msgs)
+            assert all(m[MQDao.MSG_ID_FIELD].startswith(f"{self.stream}:{i}/") for m in msgs)
+            consumer.ack([m[MQDao.MSG_ID_FIELD] for m in msgs])
+            assert consumer._producer.xpending(f"{self.stream}:{i}", consumer.group_name)["pending"] == 0
+            received.extend(msgs)
+        assert sorted(m["task_id"] for m in received if "task_id" in m) == sorted(str(i) for i in range(30))
+        assert len([m for m in received if m["type"] == "workflow"]) == 1
+
+        # A consumer outside the pool reads all the partition streams.
+        producer._bulk_publish([{"type": "task", "task_id": str(i)} for i in range(30, 40)])
+        other = self._consume(self._build_dao(self.stream, "other", n_partitions=3))
+        assert sorted(int(m["task_id"]) for m in other) == list(range(30, 40))
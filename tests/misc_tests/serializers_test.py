@@ -0,0 +1,83 @@
+import json
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+import msgpack
+import numpy as np
+
+from flowcept.commons.serializers import get_serializer, list_serializers, set_wire_serializer
+from flowcept.commons.utils import replace_non_serializable
+
+
+class TestSerializers(unittest.TestCase):
+    def test_msgpack_extension_types(self):
+        serializer = get_serializer("msgpack")
+        msg = {
+            "task_id": "t1",
+            "started_at": datetime(2024, 1, 2, 3, 4, 5, 6),
+            "day": date(2024, 1, 2),
+            "generated": {"arr": np.arange(12, dtype=np.float32).reshape(3, 4), "n": np.int64(7)},
+        }
+        out = serializer.loads(serializer.dumps(msg))
+        assert out["started_at"] == msg["started_at"]
+        assert out["day"] == msg["day"]
+        assert out["generated"]["n"] == 7
+        np.testing.assert_array_equal(out["generated"]["arr"], msg["generated"]["arr"])
+        assert out["generated"]["arr"].dtype == np.float32
+
+    def test_msgpack_wire_compatible(self):
+        msg = {"task_id": "t1", "used": {"x": [1, 2.5, None]}, 1: "non-str key"}
+        assert get_serializer("msgpack").dumps(msg) == msgpack.dumps(msg)
+        assert msgpack.loads(get_serializer("msgpack").dumps(msg), strict_map_key=False) == msg
+
+    def test_json(self):
+        serializer = get_serializer("json")
+        out = serializer.loads(serializer.dumps({"a": np.arange(3), "b": datetime(2024, 1, 1)}))
+        assert out == {"a": [0, 1, 2], "b": "2024-01-01T00:00:00"}
+        assert serializer.loads(b'{"a": NaN}')["a"] != 0  # Written by json.dumps
+
+    def test_columnar(self):
+        serializer = get_serializer("columnar")
+        records = [{"task_id": "t1", "status": "FINISHED"}, {"task_id": "t2", "ended_at": 1.0}]
+        assert serializer.loads(serializer.dumps(records)) == records
+        assert serializer.loads(serializer.dumps([])) == []
+
+    def test_unknown(self):
+        assert {"msgpack", "json", "columnar"} <= set(list_serializers())
+        with self.assertRaises(NotImplementedError):
+            get_serializer("pickle")
+
+    def test_replace_non_serializable_keeps_wire_types(self):
+        arr = np.arange(3)
+        with patch("flowcept.commons.serializers._WIRE_SERIALIZER", get_serializer("msgpack")):
+            out = replace_non_serializable({"arr": arr, "n": np.int64(1), "at": date(2024, 1, 2), "obj": object()})
+            assert out["arr"] is arr and out["n"] == 1 and out["at"] == date(2024, 1, 2)
+            assert out["obj"].startswith("object_instance_id_")
+            assert replace_non_serializable(np.array([object()])).startswith("ndarray_instance_id_")
+
+    def test_replace_non_serializable_on_json_wire(self):
+        from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+
+        args = {"a": np.arange(3), "b": np.float32(1.5), "at": date(2024, 1, 2)}
+        try:
+            with patch("flowcept.commons.daos.mq_dao.mq_dao_base.MQ_ENABLED", False):
+                # Offline JSONL dumps, like Mofka's JSON metadata, only take plain JSON types.
+                with patch("flowcept.commons.daos.mq_dao.mq_dao_base.DUMP_BUFFER_FORMAT", "jsonl"):
+                    MQDao.build()
+                    out = replace_non_serializable(args)
+                    assert json.loads(json.dumps(out))["a"].startswith("ndarray_instance_id_")
+                with patch("flowcept.commons.daos.mq_dao.mq_dao_base.DUMP_BUFFER_FORMAT", "segments"):
+                    MQDao.build()
+                    assert replace_non_serializable(args)["a"] is args["a"]
+        finally:
+            set_wire_serializer(None)
+
+        with patch("flowcept.commons.daos.mq_dao.mq_dao_base.MQ_ENABLED", False):
+            with patch("flowcept.commons.daos.mq_dao.mq_dao_base.DUMP_BUFFER_FORMAT", "segments"):
+                MQDao.build()
+                assert isinstance(replace_non_serializable(np.arange(3)), np.ndarray)
+            with patch("flowcept.commons.daos.mq_dao.mq_dao_base.DUMP_BUFFER_FORMAT", "jsonl"):
+                MQDao.build()
+                assert isinstance(replace_non_serializable(np.arange(3)), str)
+        set_wire_serializer(None)
@@ -1,6 +1,17 @@
+import random
 import unittest
+from time import sleep, time
+from unittest.mock import patch
 
 from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.serializers import get_serializer
+from flowcept.commons.telemetry_payload import (
+    decode_telemetry_delta,
+    decode_telemetry_payload,
+    encode_telemetry_delta,
+    encode_telemetry_payload,
+    field_table,
+)
 from flowcept.flowceptor.telemetry_capture import TelemetryCapture
 
 
@@ -15,3 +26,85 @@ class TestTelemetry(unittest.TestCase):
             self.skipTest("Telemetry capture disabled.")
         assert telemetry.to_dict()
         tele_capture.shutdown_gpu_telemetry()
+
+    def test_telemetry_sampler(self):
+        if TelemetryCapture().capture() is None:
+            self.skipTest("Telemetry capture disabled.")
+        conf = {"cpu": True, "per_cpu": True, "mem": True, "sampler": {"intervals": {"cpu": 0.01, "mem": 0.02}}}
+        with patch.object(TelemetryCapture, "_sampler", None):
+            tele_capture = TelemetryCapture(conf=conf, use_sampler=True)
+            sampler = tele_capture.sampler
+            try:
+                assert sampler.is_running and sampler.intervals == {"cpu": 0.01, "mem": 0.02}
+                started_at = time()
+                start = tele_capture.capture().to_dict()
+                sleep(0.2)
+                end = tele_capture.capture().to_dict()
+                assert set(start) == set(end) == {"cpu", "memory"}
+                assert start["cpu"]["times_avg"]["user"] <= end["cpu"]["times_avg"]["user"]
+
+                summary = tele_capture.summarize(started_at, time())
+                assert summary["samples"]["cpu"] > 5 and summary["samples"]["mem"] > 3
+                assert summary["cpu"]["percent_all_max"] >= summary["cpu"]["percent_all_avg"]
+                assert "used_mem_diff" in summary["memory"] and summary["duration_sec"] > 0.2
+            finally:
+                sampler.stop()
+        assert not sampler.is_running
+
+    def test_telemetry_payload(self):
+        def snapshot(t):
+            return {
+                "cpu": {
+                    "times_avg": {"user": 10.5 + t, "system": 3.0, "idle": 100.0 + t},
+                    "percent_all": 12.5 + t,
+                    "frequency": None,
+                    "percent_per_cpu": [float(i + t) for i in range(128)],
+                    "times_per_cpu": [{"user": i + t, "system": i, "idle": 2 * i + t} for i in range(128)],
+                },
+                "memory": {"virtual": {"used": 1000 + 10 * t, "percent": 40.0}, "swap": {"used": 0}},
+                "process": {"pid": 42, "executable": "/usr/bin/python", "cmd_line": ["python", "train.py"]},
+            }
+
+        task = {"type": "task", "task_id": "t1", "started_at": 1.0, "ended_at": 2.0}
+        full = dict(task, telemetry_at_start=snapshot(0), telemetry_at_end=snapshot(1))
+        delta = encode_telemetry_payload(dict(full), "delta")
+        assert "telemetry_at_end" not in delta and delta["telemetry_delta"]["values"][0] == 1
+        assert len(delta["telemetry_delta"]["values"]) == len(field_table(snapshot(0)))
+        assert field_table(snapshot(0)) is field_table(snapshot(5))  # Interned
+
+        serializer = get_serializer("msgpack")
+        full_size, delta_size = len(serializer.dumps(full)), len(serializer.dumps(delta))
+        assert delta_size < 0.75 * full_size
+        decoded = decode_telemetry_payload(serializer.loads(serializer.dumps(delta)))
+        assert decoded["telemetry_at_end"] == snapshot(1) and "telemetry_delta" not in decoded
+
+        # Snapshots with different fields are sent as captured.
+        end = snapshot(1)
+        end["process"]["executable"] = "/usr/bin/python3"
+        assert "telemetry_delta" not in encode_telemetry_payload(dict(full, telemetry_at_end=end), "delta")
+
+        summary = encode_telemetry_payload(dict(full), "summary")
+        assert "telemetry_at_start" not in summary and "telemetry_at_end" not in summary
+        assert summary["telemetry_summary"]["cpu"]["percent_all_diff"] == 1
+        assert len(serializer.dumps(summary)) < 0.05 * full_size
+
+    def test_telemetry_delta_is_lossless(self):
+        rng = random.Random(0)
+
+        def value():
+            kind = rng.random()
+            if kind < 0.6:
+                return rng.uniform(-1, 1) * 10 ** rng.randint(-6, 12)
+            elif kind < 0.9:
+                return rng.randint(0, 2**40)
+            return float(rng.randint(0, 100))
+
+        start = {"cpu": [value() for _ in range(2000)], "memory": {"used": 0, "percent": 0.0}}
+        end = {"cpu": [value() for _ in range(2000)], "memory": {"used": 1.5, "percent": 1}}
+        delta = encode_telemetry_delta(start, end)
+        assert delta["raw"]  # Some float deltas do not round-trip.
+        serializer = get_serializer("msgpack")
+        decoded = decode_telemetry_delta(start, serializer.loads(serializer.dumps(delta)))
+        assert decoded == end
+        assert [type(v) for v in decoded["cpu"]] == [type(v) for v in end["cpu"]]
+        assert type(decoded["memory"]["percent"]) is int and type(decoded["memory"]["used"]) is float